@@ -1,35 +1,21 @@
-import os
 import json
+import time
+import asyncio
+import queue
 import logging
+import threading
+import contextvars
 from datetime import datetime, timedelta
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
-from langchain.schema.output_parser import StrOutputParser
+from cache.store import make_key, normalize_url, text_hash
+from llm import registry as llm_registry
+from agent.streaming import IncrementalPostParser, recover_posts
+from agent.validation import repair_posts
+from telemetry.metrics import span, record_span
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+MODEL_NAME = "gpt-4o"
+TEMPERATURE = 0.8
 
-def get_llm():
-    """Initializes and returns the ChatOpenAI model."""
-    return ChatOpenAI(temperature=0.8, model_name="gpt-4o", openai_api_key=os.getenv("OPENAI_API_KEY"))
-
-def generate_campaign_content(analysis: str, url: str) -> list:
-    """
-    Generates a 7-day social media campaign based on the text analysis.
-
-    Args:
-        analysis: The structured analysis from the nlp module.
-        url: The source URL to include in the posts.
-
-    Returns:
-        A list of dictionaries, where each dictionary represents a social media post.
-    """
-    if not analysis or "Error" in analysis:
-        logging.warning("Content generation skipped due to invalid analysis.")
-        return []
-
-    logging.info("Starting social media content generation...")
-
-    generation_template = """
+GENERATION_TEMPLATE = """
     You are a world-class social media strategist. Based on the following analysis of a blog post/product announcement, create a 7-day social media campaign.
 
     **Objective**: Generate excitement and drive traffic to the source URL.
@@ -55,35 +41,324 @@ def generate_campaign_content(analysis: str, url: str) -> list:
     JSON_OUTPUT:
     """
 
-    prompt = ChatPromptTemplate.from_template(generation_template)
+PLATFORMS = ("Twitter", "LinkedIn")
+
+PLATFORM_INSTRUCTIONS = {
+    "Twitter": """Create **5-7 posts for Twitter (X)**.
+        - Tone: Catchy, concise, and engaging. Use relevant hashtags.
+        - Format: Short sentences, questions, and strong calls to action. Each must include the {url}.""",
+    "LinkedIn": """Create **5-7 posts for LinkedIn**.
+        - Tone: Professional, informative, and value-oriented.
+        - Format: Well-structured posts that explain the "why" and encourage professional discussion. Each must include the {url}.""",
+}
+
+PLATFORM_TEMPLATE = """
+    You are a world-class social media strategist. Based on the following analysis of a blog post/product announcement, create the posts for {platform} of a 7-day social media campaign.
+
+    **Objective**: Generate excitement and drive traffic to the source URL.
+    **Source URL**: {url}
+
+    **Instructions**:
+    1.  {instructions}
+    2.  Schedule the posts over 7 days, starting from tomorrow.
+    3.  Return the output as a single JSON array of objects for {platform}. Each object must have the following keys: "platform" (always "{platform}"), "content" (the post text), and "scheduled_date" (in "YYYY-MM-DD" format).
+
+    **DO NOT include any text or formatting outside of the JSON array.**
+
+    ---
+    ANALYSIS:
+    {analysis}
+    ---
+
+    JSON_OUTPUT:
+    """
+
+def get_llm():
+    """Returns the shared chat model used for content generation."""
+    return llm_registry.get_llm(MODEL_NAME, TEMPERATURE)
+
+def parse_posts(response_str: str) -> list:
+    """
+    Parses the JSON array of posts from an LLM response.
+
+    Raises:
+        json.JSONDecodeError: If the response is not valid JSON.
+    """
+    # Clean the response to ensure it's valid JSON
+    # The model sometimes wraps the JSON in ```json ... ```
+    if "```json" in response_str:
+        response_str = response_str.split("```json")[1].split("```")[0].strip()
+    elif response_str.strip().startswith("```"):
+        response_str = response_str.strip().strip("`").strip()
+    return json.loads(response_str)
+
+def schedule_date_for(index: int) -> str:
+    """Returns the date for the index-th post: posts are spread over the 7 days starting tomorrow."""
+    start_date = datetime.now().date() + timedelta(days=1)
+    day_offset = index % 7
+    return (start_date + timedelta(days=day_offset)).strftime('%Y-%m-%d')
+
+def assign_schedule(posts: list) -> list:
+    """Spreads posts over the 7 days starting tomorrow and marks them approved for the UI."""
+    for i, post in enumerate(posts):
+        # Simple scheduling logic: spread posts over 7 days
+        post['scheduled_date'] = schedule_date_for(i)
+        post['approved'] = True # Default to approved for the UI
+    return posts
+
+def generate_campaign_content(analysis: str, url: str, cache=None) -> list:
+    """
+    Generates a 7-day social media campaign based on the text analysis.
+
+    Posts that break their platform's rules are fixed with one batched repair call (see
+    agent.validation.repair_posts); valid posts are kept as generated.
+
+    Args:
+        analysis: The structured analysis from the nlp module.
+        url: The source URL to include in the posts.
+        cache: Optional ResultCache. Generated posts are keyed by the analysis hash, URL, prompt,
+            model and temperature; schedule dates are always recomputed from today.
+
+    Returns:
+        A list of dictionaries, where each dictionary represents a social media post.
+    """
+    if not analysis or "Error" in analysis:
+        logging.warning("Content generation skipped due to invalid analysis.")
+        return []
+
+    if cache is not None:
+        key = make_key(text_hash(analysis), normalize_url(url), GENERATION_TEMPLATE, MODEL_NAME, TEMPERATURE)
+        cached = cache.get("campaign", key)
+        if cached is not None:
+            logging.info(f"Using {len(cached)} cached social media posts.")
+            return assign_schedule(cached)
+        posts = generate_campaign_content(analysis, url)
+        if posts:
+            cache.set("campaign", key, _cacheable(posts))
+        return posts
+
+    logging.info("Starting social media content generation...")
+
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.output_parsers import StrOutputParser
+    prompt = ChatPromptTemplate.from_template(GENERATION_TEMPLATE)
     llm = get_llm()
     
     generation_chain = prompt | llm | StrOutputParser()
 
+    response_str = ""
     try:
-        response_str = generation_chain.invoke({"analysis": analysis, "url": url})
-        
-        # Clean the response to ensure it's valid JSON
-        # The model sometimes wraps the JSON in ```json ... ```
-        if "```json" in response_str:
-            response_str = response_str.split("```json")[1].split("```")[0].strip()
-
-        posts = json.loads(response_str)
+        with span("generate"):
+            response_str = generation_chain.invoke({"analysis": analysis, "url": url})
+        posts = parse_posts(response_str)
         
         # Validate and format dates
-        start_date = datetime.now().date() + timedelta(days=1)
-        for i, post in enumerate(posts):
-            # Simple scheduling logic: spread posts over 7 days
-            day_offset = i % 7
-            post['scheduled_date'] = (start_date + timedelta(days=day_offset)).strftime('%Y-%m-%d')
-            post['approved'] = True # Default to approved for the UI
+        assign_schedule(posts)
 
         logging.info(f"Successfully generated {len(posts)} social media posts.")
-        return posts
+        return repair_posts(posts, analysis, url)
     except json.JSONDecodeError as e:
         logging.error(f"Failed to decode JSON from LLM response: {e}")
         logging.error(f"LLM Response was: {response_str}")
-        return []
+        posts = recover_posts(response_str)
+        if not posts:
+            return []
+        logging.warning(f"Recovered {len(posts)} complete posts from the malformed response.")
+        return repair_posts(assign_schedule(posts), analysis, url)
     except Exception as e:
         logging.error(f"An error occurred during content generation: {e}")
         return []
+
+def _platform_chain():
+    """Builds the prompt | model | parser chain shared by the per-platform generators."""
+    # langchain is imported on first use so importing this module stays cheap
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.output_parsers import StrOutputParser
+    return ChatPromptTemplate.from_template(PLATFORM_TEMPLATE) | get_llm() | StrOutputParser()
+
+def _platform_cache_key(analysis: str, url: str, platforms) -> str:
+    return make_key(text_hash(analysis), normalize_url(url), PLATFORM_TEMPLATE, PLATFORM_INSTRUCTIONS,
+                    tuple(platforms), MODEL_NAME, TEMPERATURE)
+
+def _cacheable(posts: list) -> list:
+    """Strips the per-run fields so cached posts are rescheduled from today when reused."""
+    return [{k: v for k, v in post.items() if k not in ('scheduled_date', 'approved')} for post in posts]
+
+def _platform_inputs(analysis: str, url: str, platforms) -> list:
+    return [
+        {"analysis": analysis, "url": url, "platform": platform,
+         "instructions": PLATFORM_INSTRUCTIONS[platform].format(url=url)}
+        for platform in platforms
+    ]
+
+def _merge_platform_responses(responses: list, platforms) -> list:
+    """Parses each platform's response and concatenates the posts; failed platforms are logged and skipped."""
+    posts = []
+    for platform, response in zip(platforms, responses):
+        if isinstance(response, Exception):
+            logging.error(f"Content generation for {platform} failed: {response}")
+            continue
+        try:
+            platform_posts = parse_posts(response)
+        except json.JSONDecodeError as e:
+            logging.error(f"Failed to decode JSON from LLM response for {platform}: {e}")
+            continue
+        for post in platform_posts:
+            post['platform'] = platform
+        posts.extend(platform_posts)
+    return assign_schedule(posts)
+
+async def agenerate_campaign_content(analysis: str, url: str, platforms=PLATFORMS) -> list:
+    """
+    Async variant of generate_campaign_content that requests each platform's posts
+    concurrently and merges them, so the platforms' output tokens are produced in parallel.
+
+    Args:
+        analysis: The structured analysis from the nlp module.
+        url: The source URL to include in the posts.
+        platforms: The platforms to generate posts for.
+
+    Returns:
+        A list of post dictionaries, or an empty list if every platform failed.
+    """
+    if not analysis or "Error" in analysis:
+        logging.warning("Content generation skipped due to invalid analysis.")
+        return []
+
+    logging.info(f"Starting parallel social media content generation for {', '.join(platforms)}...")
+    chain = _platform_chain()
+    with span("generate"):
+        responses = await chain.abatch(_platform_inputs(analysis, url, platforms), return_exceptions=True)
+    posts = _merge_platform_responses(responses, platforms)
+    if posts:
+        posts = await asyncio.to_thread(repair_posts, posts, analysis, url, platforms)
+    logging.info(f"Successfully generated {len(posts)} social media posts.")
+    return posts
+
+def generate_campaign_content_parallel(analysis: str, url: str, platforms=PLATFORMS, cache=None) -> list:
+    """
+    Generates the campaign with one concurrent LLM request per platform.
+
+    Uses the sync pooled HTTP client from a small thread pool, so it is safe to call
+    from Streamlit's script thread and from pipeline worker threads. Posts that break their
+    platform's rules are repaired as in generate_campaign_content.
+
+    Args:
+        analysis: The structured analysis from the nlp module.
+        url: The source URL to include in the posts.
+        platforms: The platforms to generate posts for.
+        cache: Optional ResultCache.
+
+    Returns:
+        A list of post dictionaries, or an empty list if every platform failed.
+    """
+    if not analysis or "Error" in analysis:
+        logging.warning("Content generation skipped due to invalid analysis.")
+        return []
+
+    platforms = tuple(platforms)
+    if cache is not None:
+        key = _platform_cache_key(analysis, url, platforms)
+        cached = cache.get("campaign", key)
+        if cached is not None:
+            logging.info(f"Using {len(cached)} cached social media posts.")
+            return assign_schedule(cached)
+        posts = generate_campaign_content_parallel(analysis, url, platforms)
+        if posts:
+            cache.set("campaign", key, _cacheable(posts))
+        return posts
+
+    logging.info(f"Starting parallel social media content generation for {', '.join(platforms)}...")
+    chain = _platform_chain()
+    with span("generate"):
+        responses = chain.batch(_platform_inputs(analysis, url, platforms),
+                                config={"max_concurrency": len(platforms)}, return_exceptions=True)
+    posts = _merge_platform_responses(responses, platforms)
+    if posts:
+        posts = repair_posts(posts, analysis, url, platforms)
+    logging.info(f"Successfully generated {len(posts)} social media posts.")
+    return posts
+
+def stream_campaign_content(analysis: str, url: str, platforms=PLATFORMS, cache=None):
+    """
+    Streams the campaign, yielding each post as soon as its JSON object is complete.
+
+    Each platform is requested concurrently with token streaming; posts from all platforms are
+    yielded in arrival order and scheduled by that order. If a stream is cut off, the posts that
+    were already complete are kept. Posts are yielded before they can be validated, so callers
+    pass the finished list to agent.validation.repair_posts.
+
+    Args:
+        analysis: The structured analysis from the nlp module.
+        url: The source URL to include in the posts.
+        platforms: The platforms to generate posts for.
+        cache: Optional ResultCache shared with generate_campaign_content_parallel. A hit yields the
+            cached posts at once; a fully completed stream is stored.
+
+    Yields:
+        Post dictionaries with "platform", "content", "scheduled_date" and "approved".
+    """
+    if not analysis or "Error" in analysis:
+        logging.warning("Content generation skipped due to invalid analysis.")
+        return
+
+    platforms = tuple(platforms)
+    if cache is not None:
+        key = _platform_cache_key(analysis, url, platforms)
+        cached = cache.get("campaign", key)
+        if cached is not None:
+            logging.info(f"Using {len(cached)} cached social media posts.")
+            yield from assign_schedule(cached)
+            return
+
+    logging.info(f"Starting streamed social media content generation for {', '.join(platforms)}...")
+    chain = _platform_chain()
+    arrivals = queue.Queue()
+    finished = object()
+    incomplete = []
+
+    def stream_platform(platform, inputs):
+        parser = IncrementalPostParser()
+        try:
+            for chunk in chain.stream(inputs):
+                for post in parser.feed(chunk):
+                    post['platform'] = platform
+                    arrivals.put(post)
+                if parser.finished:
+                    break
+            if not parser.finished:
+                incomplete.append(platform)
+                logging.warning(f"{platform} response ended early; kept {len(parser.posts)} complete posts.")
+        except Exception as e:
+            incomplete.append(platform)
+            logging.error(f"Streamed content generation for {platform} failed after "
+                          f"{len(parser.posts)} posts: {e}")
+        finally:
+            arrivals.put(finished)
+
+    # Each thread runs in a copy of this context so its LLM usage counts toward the caller's run
+    threads = [
+        threading.Thread(target=contextvars.copy_context().run, args=(stream_platform, platform, inputs), daemon=True)
+        for platform, inputs in zip(platforms, _platform_inputs(analysis, url, platforms))
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+
+    posts, remaining = [], len(threads)
+    while remaining:
+        post = arrivals.get()
+        if post is finished:
+            remaining -= 1
+            continue
+        if not posts:
+            record_span("generate.first_post", time.perf_counter() - started)
+        post['scheduled_date'] = schedule_date_for(len(posts))
+        post['approved'] = True
+        posts.append(post)
+        yield post
+    record_span("generate", time.perf_counter() - started)
+
+    if cache is not None and posts and not incomplete:
+        cache.set("campaign", key, _cacheable(posts))
+    logging.info(f"Successfully streamed {len(posts)} social media posts.")
@@ -0,0 +1,96 @@
+# agent/streaming.py
+import json
+import logging
+
+
+class IncrementalPostParser:
+    """
+    Incrementally parses a streamed JSON array of post objects.
+
+    Text before the opening '[' (such as a ```json fence) is ignored. Each top-level
+    object is decoded as soon as its closing brace arrives, so callers get posts while
+    the rest of the array is still being generated, and everything completed before a
+    stream is cut off is kept.
+    """
+    def __init__(self):
+        self._buffer = []
+        self._in_array = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self.finished = False
+        self.posts = []
+        self.errors = 0
+
+    def feed(self, chunk: str) -> list:
+        """
+        Consumes the next piece of the response.
+
+        Args:
+            chunk: The next streamed text fragment.
+
+        Returns:
+            The posts whose objects were completed by this chunk.
+        """
+        completed = []
+        for char in chunk:
+            if self.finished:
+                break
+            if not self._in_array:
+                if char == '[':
+                    self._in_array = True
+                continue
+
+            if self._depth == 0:
+                if char == '{':
+                    self._depth = 1
+                    self._buffer = [char]
+                elif char == ']':
+                    self.finished = True
+                continue
+
+            self._buffer.append(char)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == '{':
+                self._depth += 1
+            elif char == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    post = self._decode(''.join(self._buffer))
+                    self._buffer = []
+                    if post is not None:
+                        completed.append(post)
+        self.posts.extend(completed)
+        return completed
+
+    def _decode(self, text: str):
+        try:
+            post = json.loads(text)
+        except json.JSONDecodeError as e:
+            self.errors += 1
+            logging.warning(f"Skipping malformed post object in LLM response: {e}")
+            return None
+        if not isinstance(post, dict):
+            self.errors += 1
+            return None
+        return post
+
+    @property
+    def truncated(self) -> bool:
+        """True if the stream ended inside the array (e.g. the response was cut off)."""
+        return self._in_array and not self.finished
+
+
+def recover_posts(response_str: str) -> list:
+    """Returns every complete post object from a possibly truncated or partly malformed response."""
+    parser = IncrementalPostParser()
+    parser.feed(response_str)
+    return parser.posts
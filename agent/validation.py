@@ -0,0 +1,242 @@
+# agent/validation.py
+"""
+Checks generated posts against per-platform rules and repairs only the ones that fail.
+
+Every post is checked at once (platform, content, length, source URL) and each platform's post
+count against its range. Posts over a platform's maximum are dropped, and the failing posts,
+plus any missing ones, are sent back to the LLM in one batched repair call; valid posts are
+kept exactly as generated. Posts that still fail afterwards are kept but left unapproved, so
+the review table can show why.
+"""
+import re
+import json
+import logging
+from dataclasses import dataclass, field
+from telemetry.metrics import span
+
+URL_PATTERN = re.compile(r"https?://\S+")
+# Twitter counts every link as this many characters, however long it is
+TWITTER_LINK_LENGTH = 23
+
+
+@dataclass(frozen=True)
+class PlatformRules:
+    """What every post for one platform, and the campaign as a whole, must satisfy."""
+    max_chars: int
+    min_posts: int = 5
+    max_posts: int = 7
+    link_length: int = None  # Counted length of each link; None counts its characters
+    require_url: bool = True
+
+    def describe(self, platform: str) -> str:
+        links = f" (each link counts as {self.link_length})" if self.link_length else ""
+        url = ", must include the source URL" if self.require_url else ""
+        return f"- {platform}: at most {self.max_chars} characters{links}{url}; {self.min_posts}-{self.max_posts} posts."
+
+
+PLATFORM_RULES = {
+    "Twitter": PlatformRules(max_chars=280, link_length=TWITTER_LINK_LENGTH),
+    "LinkedIn": PlatformRules(max_chars=3000),
+}
+
+REPAIR_TEMPLATE = """
+    You are a world-class social media strategist. Some posts of a social media campaign for {url} break the platform rules below.
+    Rewrite each listed post so it follows the rules for its platform, keeping its message and tone.{missing}
+
+    **Rules**:
+{rules}
+
+    **Posts to fix** (with the problems found in each):
+    {posts}
+
+    Return the output as a single JSON array of objects. Each object must have the following keys: "index" (the index of the post it fixes, or null for a new post), "platform" (one of {platforms}) and "content" (the post text).
+
+    **DO NOT include any text or formatting outside of the JSON array.**
+    {analysis}
+    JSON_OUTPUT:
+    """
+
+MISSING_INSTRUCTIONS = " Also write {count} new posts for {platform}."
+ANALYSIS_SECTION = """
+    ---
+    ANALYSIS:
+    {analysis}
+    ---
+"""
+
+
+@dataclass
+class ValidationReport:
+    """The problems found in a list of posts: one list of issues per post, plus campaign-wide ones."""
+    issues: list
+    missing: dict = field(default_factory=dict)  # Posts still needed per platform
+    extra: dict = field(default_factory=dict)  # Posts over the maximum per platform
+
+    @property
+    def failing(self) -> list:
+        """Indices of the posts with at least one issue."""
+        return [i for i, post_issues in enumerate(self.issues) if post_issues]
+
+    @property
+    def valid(self) -> bool:
+        return not self.failing and not self.missing and not self.extra
+
+    def campaign_issues(self) -> list:
+        return ([f"{count} more {platform} posts needed" for platform, count in self.missing.items()] +
+                [f"{count} {platform} posts over the maximum" for platform, count in self.extra.items()])
+
+
+def post_length(content: str, rules: PlatformRules) -> int:
+    """The length of a post as its platform counts it."""
+    if rules.link_length is None:
+        return len(content)
+    return len(URL_PATTERN.sub("", content)) + rules.link_length * len(URL_PATTERN.findall(content))
+
+
+def validate_post(post: dict, url: str = None, platforms=tuple(PLATFORM_RULES)) -> list:
+    """
+    Checks one post against its platform's rules.
+
+    Args:
+        post: A post dictionary with "platform" and "content".
+        url: The source URL every post must include, or None to skip that check.
+        platforms: The platforms the campaign is for.
+
+    Returns:
+        A short description of each problem found; empty if the post is valid.
+    """
+    platform, content = post.get("platform"), post.get("content")
+    content = content.strip() if isinstance(content, str) else ""
+    if platform not in platforms or platform not in PLATFORM_RULES:
+        return [f"unknown platform {platform!r}"]
+    if not content:
+        return ["empty content"]
+    rules = PLATFORM_RULES[platform]
+    issues = []
+    length = post_length(content, rules)
+    if length > rules.max_chars:
+        issues.append(f"{length} characters, over the {rules.max_chars} limit")
+    if rules.require_url and url and url.rstrip("/") not in content:
+        issues.append("missing the source URL")
+    return issues
+
+
+def validate_posts(posts: list, url: str = None, platforms=tuple(PLATFORM_RULES),
+                   check_counts: bool = True) -> ValidationReport:
+    """
+    Checks every post and each platform's post count.
+
+    Args:
+        posts: Post dictionaries with "platform" and "content".
+        url: The source URL every post must include, or None to skip that check.
+        platforms: The platforms the campaign is for.
+        check_counts: Whether to check each platform's post count too.
+
+    Returns:
+        A ValidationReport.
+    """
+    platforms = tuple(platforms)
+    report = ValidationReport(issues=[validate_post(post, url, platforms) for post in posts])
+    for platform in platforms if check_counts else ():
+        rules = PLATFORM_RULES.get(platform)
+        if rules is None:
+            continue
+        count = sum(1 for post in posts if post.get("platform") == platform)
+        if count < rules.min_posts:
+            report.missing[platform] = rules.min_posts - count
+        elif count > rules.max_posts:
+            report.extra[platform] = count - rules.max_posts
+    return report
+
+
+def _trim_extra(posts: list, report: ValidationReport) -> list:
+    """Drops posts over each platform's maximum, failing posts first and then the latest."""
+    dropped = set()
+    for platform, count in report.extra.items():
+        indices = [i for i, post in enumerate(posts) if post.get("platform") == platform]
+        indices.sort(key=lambda i: (not report.issues[i], -i))
+        dropped.update(indices[:count])
+    return [post for i, post in enumerate(posts) if i not in dropped]
+
+
+def _repair_prompt(posts: list, report: ValidationReport, analysis: str, url: str, platforms) -> str:
+    failing = [{"index": i, "platform": posts[i].get("platform"), "content": posts[i].get("content"),
+                "problems": report.issues[i]} for i in report.failing]
+    missing = "".join(MISSING_INSTRUCTIONS.format(count=count, platform=platform)
+                      for platform, count in report.missing.items())
+    return REPAIR_TEMPLATE.format(
+        url=url, missing=missing, platforms=", ".join(f'"{p}"' for p in platforms),
+        rules="\n".join("    " + PLATFORM_RULES[p].describe(p) for p in platforms if p in PLATFORM_RULES),
+        posts=json.dumps(failing, ensure_ascii=False) if failing else "(none)",
+        # The analysis is only needed to write new posts
+        analysis=ANALYSIS_SECTION.format(analysis=analysis) if report.missing else "",
+    )
+
+
+def repair_posts(posts: list, analysis: str, url: str, platforms=tuple(PLATFORM_RULES)) -> list:
+    """
+    Validates a campaign's posts and fixes the failing ones with a single LLM call.
+
+    Valid posts are returned unchanged and in place; repaired posts keep their schedule date and
+    approval. Posts over a platform's maximum are dropped without asking the LLM, and missing
+    posts are requested in the same call. Posts that still fail, including when the repair call
+    itself fails, are kept with "approved" set to False.
+
+    Args:
+        posts: The generated post dictionaries.
+        analysis: The analysis the posts were generated from, used to write missing posts.
+        url: The source URL every post must include.
+        platforms: The platforms the campaign is for.
+
+    Returns:
+        The validated post list.
+    """
+    from agent.content_genrator import get_llm, parse_posts, schedule_date_for
+    platforms = tuple(platforms)
+    report = validate_posts(posts, url, platforms)
+    if report.valid:
+        return posts
+    if report.extra:
+        posts = _trim_extra(posts, report)
+        logging.info(f"Dropped posts over the platform maximum: {report.extra}")
+        report = validate_posts(posts, url, platforms)
+        if report.valid:
+            return posts
+
+    logging.info(f"Repairing {len(report.failing)} of {len(posts)} posts"
+                 + (f" and requesting missing posts {report.missing}" if report.missing else "") + "...")
+    posts = [dict(post) for post in posts]
+    try:
+        with span("generate.repair"):
+            response = get_llm().invoke(_repair_prompt(posts, report, analysis, url, platforms))
+        fixes = parse_posts(getattr(response, "content", response))
+        if not isinstance(fixes, list):
+            raise ValueError("the repair response is not a JSON array")
+    except Exception as e:
+        logging.error(f"Post repair failed: {e}")
+        fixes = []
+
+    failing, added = set(report.failing), {}
+    for fix in fixes:
+        if not isinstance(fix, dict) or not isinstance(fix.get("content"), str):
+            continue
+        index, platform = fix.get("index"), fix.get("platform")
+        if isinstance(index, int) and index in failing:
+            posts[index]["content"] = fix["content"]
+            if platform in platforms:
+                posts[index]["platform"] = platform
+            failing.discard(index)
+        elif index is None and added.get(platform, 0) < report.missing.get(platform, 0):
+            added[platform] = added.get(platform, 0) + 1
+            posts.append({"platform": platform, "content": fix["content"],
+                          "scheduled_date": schedule_date_for(len(posts)), "approved": True})
+
+    report = validate_posts(posts, url, platforms)
+    for i in report.failing:
+        posts[i]["approved"] = False
+    if report.valid:
+        logging.info(f"Repaired the campaign; all {len(posts)} posts pass the platform rules.")
+    else:
+        logging.warning(f"{len(report.failing)} posts still break the platform rules and were left unapproved"
+                        + (f"; {'; '.join(report.campaign_issues())}" if report.campaign_issues() else "") + ".")
+    return posts
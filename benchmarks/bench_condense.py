@@ -0,0 +1,72 @@
+# benchmarks/bench_condense.py
+"""
+Measures the local pre-summarization (nlp.condense) on the saved pages in benchmarks/corpus.
+
+Usage:
+    python -m benchmarks.bench_condense [--budgets 1000,3000] [--repeat 3] [--json results.json]
+"""
+import sys
+import json
+import time
+import argparse
+
+from nlp.condense import condense, NUMBER_PATTERN
+from scraper.scraper import html_to_text
+from benchmarks.fixtures import load_corpus
+from benchmarks.bench_extractors import BOILERPLATE_MARKERS
+
+DEFAULT_BUDGETS = (1000, 3000)
+
+
+def bench_one(text: str, budget: int, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = condense(text, budget)
+        timings.append(time.perf_counter() - start)
+    numbers = set(NUMBER_PATTERN.findall(text))
+    return {
+        "ms": min(timings) * 1000,
+        "input_tokens": result.input_tokens,
+        "output_tokens": result.output_tokens,
+        "saved_pct": 100.0 * result.tokens_saved / max(result.input_tokens, 1),
+        "duplicate_lines": result.duplicate_lines,
+        "digits_kept": len(set(NUMBER_PATTERN.findall(result.text)) & numbers),
+        "boilerplate": sum(marker in result.text for marker in BOILERPLATE_MARKERS),
+    }
+
+
+def run(budgets=DEFAULT_BUDGETS, repeat: int = 3) -> dict:
+    texts = {doc: html_to_text(html) for doc, html in load_corpus().items()}
+    return {str(budget): {doc: bench_one(text, budget, repeat) for doc, text in texts.items()}
+            for budget in budgets}
+
+
+def print_table(results: dict):
+    print(f"{'budget':>8}  {'document':<28}{'ms':>9}{'in':>8}{'out':>7}{'saved':>8}{'dup lines':>11}"
+          f"{'boilerplate':>13}")
+    for budget, per_doc in results.items():
+        for doc in sorted(per_doc):
+            r = per_doc[doc]
+            print(f"{budget:>8}  {doc:<28}{r['ms']:>9.1f}{r['input_tokens']:>8}{r['output_tokens']:>7}"
+                  f"{r['saved_pct']:>7.1f}%{r['duplicate_lines']:>11}{r['boilerplate']:>10}/{len(BOILERPLATE_MARKERS)}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budgets", default=",".join(map(str, DEFAULT_BUDGETS)),
+                        help="Comma-separated token budgets to condense to.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="Also write the raw results to this file.")
+    args = parser.parse_args(argv)
+
+    results = run(budgets=[int(b) for b in args.budgets.split(",")], repeat=args.repeat)
+    print_table(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
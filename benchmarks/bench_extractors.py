@@ -0,0 +1,89 @@
+# benchmarks/bench_extractors.py
+"""
+Compares the HTML-to-text extractors on the saved pages in benchmarks/corpus.
+
+Usage:
+    python -m benchmarks.bench_extractors [--repeat 5] [--json results.json]
+"""
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+
+from scraper.extractors import available_extractors, get_extractor
+from benchmarks.fixtures import load_corpus
+
+ANALYSIS_BUDGET = 15000  # characters analyze_text keeps
+# Strings that only occur in page chrome (cookie banner, nav, sidebar, footer) of the corpus.
+BOILERPLATE_MARKERS = ("We use cookies", "All rights reserved", "Related posts", "Subscribe to our newsletter",
+                       "Section 1 ", "Link 11")
+
+
+def configurations() -> list:
+    """Every (label, extractor, main_content, max_chars) combination worth comparing."""
+    configs = []
+    for name in available_extractors():
+        configs.append((name, name, False, None))
+        configs.append((f"{name}+main", name, True, None))
+    configs.append(("streaming+main+budget", "streaming", True, ANALYSIS_BUDGET))
+    return configs
+
+
+def bench_one(extract, html: bytes, main_content: bool, max_chars: int, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text = extract(html, main_content=main_content, max_chars=max_chars)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    extract(html, main_content=main_content, max_chars=max_chars)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    budget = text[:ANALYSIS_BUDGET]
+    return {
+        "ms": min(timings) * 1000,
+        "peak_kib": peak / 1024,
+        "chars": len(text),
+        "boilerplate_in_budget": sum(marker in budget for marker in BOILERPLATE_MARKERS),
+    }
+
+
+def run(repeat: int = 5) -> dict:
+    corpus = load_corpus()
+    results = {}
+    for label, name, main_content, max_chars in configurations():
+        extract = get_extractor(name)
+        results[label] = {doc: bench_one(extract, html, main_content, max_chars, repeat)
+                          for doc, html in corpus.items()}
+    return results
+
+
+def print_table(results: dict):
+    docs = sorted(next(iter(results.values())))
+    print(f"{'extractor':<24}{'document':<28}{'ms':>9}{'peak KiB':>11}{'chars':>9}{'boilerplate':>13}")
+    for label, per_doc in results.items():
+        for doc in docs:
+            r = per_doc[doc]
+            print(f"{label:<24}{doc:<28}{r['ms']:>9.2f}{r['peak_kib']:>11.0f}{r['chars']:>9}"
+                  f"{r['boilerplate_in_budget']:>10}/{len(BOILERPLATE_MARKERS)}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="Also write the raw results to this file.")
+    args = parser.parse_args(argv)
+
+    results = run(repeat=args.repeat)
+    print_table(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
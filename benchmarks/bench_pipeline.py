@@ -0,0 +1,299 @@
+# benchmarks/bench_pipeline.py
+"""
+Benchmarks the scraper, analysis, generation, scheduler and the full pipeline offline.
+
+Pages come from benchmarks/corpus through a local HTTP server and every LLM call goes to a
+deterministic fake model with configurable latency, so runs are reproducible and free.
+
+Usage:
+    python -m benchmarks.bench_pipeline [--levels 1,4,16] [--urls 64] [--llm-latency 0.05]
+                                        [--json results.json] [--compare baseline.json]
+
+With --compare, exits non-zero if any throughput or latency metric moved past --threshold.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fixtures import CorpusServer, fake_llm
+from pipeline.batch import percentile, run_batch, default_stage_functions
+from scraper.scraper import scrape_text_from_url
+from scraper.async_scraper import AsyncScraper
+from nlp.analysis import analyze_text
+from agent.content_genrator import generate_campaign_content_parallel, stream_campaign_content
+from scheduler.scheduler import MockScheduler
+from telemetry.logs import configure_logging
+
+DEFAULT_LEVELS = (1, 4, 16)
+URL = "https://example.com/launch"
+# Relative change beyond which --compare flags a metric
+REGRESSION_THRESHOLD = 0.10
+
+
+def latency_stats(latencies: list, elapsed: float) -> dict:
+    """Throughput and latency percentiles (in milliseconds) for one measured batch of calls."""
+    return {
+        "calls": len(latencies),
+        "per_sec": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p90_ms": percentile(latencies, 90) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def measure_threaded(fn, items: list, concurrency: int) -> dict:
+    """Calls fn(item) for every item from `concurrency` threads and times each call."""
+    def timed_call(item):
+        started = time.perf_counter()
+        fn(item)
+        return time.perf_counter() - started
+
+    began = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(timed_call, items))
+    return latency_stats(latencies, time.perf_counter() - began)
+
+
+def bench_scrape_sync(urls: list, concurrency: int) -> dict:
+    return measure_threaded(scrape_text_from_url, urls, concurrency)
+
+
+def bench_scrape_async(urls: list, concurrency: int) -> dict:
+    async def run():
+        latencies = []
+        # Bounded like the threaded benchmarks, so latency excludes time spent queued
+        slots = asyncio.Semaphore(concurrency)
+        async with AsyncScraper(max_connections=concurrency, max_per_host=concurrency,
+                                requests_per_second=None, max_retries=0) as scraper:
+            async def timed_fetch(url):
+                async with slots:
+                    started = time.perf_counter()
+                    result = await scraper.fetch(url)
+                    latencies.append(time.perf_counter() - started)
+                    return result
+
+            began = time.perf_counter()
+            results = await asyncio.gather(*(timed_fetch(url) for url in urls))
+            elapsed = time.perf_counter() - began
+        stats = latency_stats(latencies, elapsed)
+        stats["failed"] = sum(not result.ok for result in results)
+        return stats
+
+    return asyncio.run(run())
+
+
+def bench_analysis(texts: list, concurrency: int) -> dict:
+    return measure_threaded(analyze_text, texts, concurrency)
+
+
+def bench_generation(analyses: list, concurrency: int) -> dict:
+    return measure_threaded(lambda analysis: generate_campaign_content_parallel(analysis, URL), analyses, concurrency)
+
+
+def bench_streaming_first_post(analysis: str, samples: int) -> dict:
+    """Time to the first streamed post versus the whole streamed campaign."""
+    first, total = [], []
+    for _ in range(samples):
+        started = time.perf_counter()
+        for i, _post in enumerate(stream_campaign_content(analysis, URL)):
+            if i == 0:
+                first.append(time.perf_counter() - started)
+        total.append(time.perf_counter() - started)
+    return {
+        "first_post_p50_ms": percentile(first, 50) * 1000,
+        "complete_p50_ms": percentile(total, 50) * 1000,
+    }
+
+
+def bench_end_to_end(urls: list, concurrency: int) -> dict:
+    workers = {"scrape": concurrency, "analyze": concurrency, "generate": concurrency}
+    summary = run_batch(urls, workers=workers, functions=default_stage_functions(parallel_generation=True))
+    stages = {
+        stage: {"p50_ms": s["p50"] * 1000, "p90_ms": s["p90"] * 1000, "p99_ms": s["p99"] * 1000}
+        for stage, s in summary["stages"].items()
+    }
+    return {
+        "urls_per_minute": summary["urls_per_minute"],
+        "failed": summary["failed"],
+        "prompt_tokens": summary["telemetry"]["prompt_tokens"],
+        "stages": stages,
+    }
+
+
+def bench_scheduler(rows: int, concurrency: int) -> dict:
+    """Bulk insert throughput and concurrent page reads on one shared scheduler."""
+    start = date(2025, 1, 1)
+    posts = [
+        {"platform": ("Twitter", "LinkedIn")[i % 2], "content": f"Benchmark post {i} {URL}",
+         "scheduled_date": (start + timedelta(days=i % 365)).strftime('%Y-%m-%d')}
+        for i in range(rows)
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        scheduler = MockScheduler(db_file=os.path.join(tmp, "bench.db"))
+        scheduler.initialize_db()
+        began = time.perf_counter()
+        # Near-duplicate checking is benchmarked by bench_scheduler; this measures write throughput
+        scheduler.schedule_posts_bulk(posts, dedup_policy="allow")
+        insert_elapsed = time.perf_counter() - began
+
+        offsets = [(i * 100) % rows for i in range(200)]
+        reads = measure_threaded(lambda offset: scheduler.get_scheduled_posts(limit=100, offset=offset),
+                                 offsets, concurrency)
+        scheduler.close()
+    return {"bulk_insert_rows_per_sec": rows / insert_elapsed, "page_reads": reads}
+
+
+def run(levels=DEFAULT_LEVELS, url_count: int = 64, llm_latency: float = 0.05, server_latency: float = 0.01,
+        scheduler_rows: int = 50_000) -> dict:
+    """
+    Runs every benchmark at each concurrency level.
+
+    Returns:
+        {"meta": {...}, "results": {benchmark: {"c<level>": metrics}}}.
+    """
+    results = {name: {} for name in ("scrape_sync", "scrape_async", "analysis", "generation",
+                                     "end_to_end", "scheduler")}
+    with CorpusServer(latency=server_latency) as server, fake_llm(latency=llm_latency):
+        urls = server.urls(url_count)
+        texts = [scrape_text_from_url(url) for url in urls[:len(server.corpus)]]
+        texts = [texts[i % len(texts)] + f"\n(variant {i})" for i in range(url_count)]
+        analysis = analyze_text(texts[0])
+        analyses = [analysis + f"\n(variant {i})" for i in range(url_count)]
+
+        for level in levels:
+            key = f"c{level}"
+            results["scrape_sync"][key] = bench_scrape_sync(urls, level)
+            results["scrape_async"][key] = bench_scrape_async(urls, level)
+            results["analysis"][key] = bench_analysis(texts, level)
+            results["generation"][key] = bench_generation(analyses, level)
+            results["end_to_end"][key] = bench_end_to_end(urls, level)
+            results["scheduler"][key] = bench_scheduler(scheduler_rows, level)
+        results["streaming"] = bench_streaming_first_post(analysis, samples=5)
+
+    return {"meta": run_metadata(levels, url_count, llm_latency, server_latency, scheduler_rows),
+            "results": results}
+
+
+def run_metadata(levels, url_count, llm_latency, server_latency, scheduler_rows) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(__file__), timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "levels": list(levels),
+        "urls": url_count,
+        "llm_latency": llm_latency,
+        "server_latency": server_latency,
+        "scheduler_rows": scheduler_rows,
+    }
+
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    """Flattens nested result dictionaries into {"a.b.c": number}."""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def higher_is_better(metric: str) -> bool:
+    return metric.endswith(("per_sec", "per_minute"))
+
+
+def compare(baseline: dict, current: dict, threshold: float = REGRESSION_THRESHOLD) -> list:
+    """
+    Compares two result files metric by metric.
+
+    Returns:
+        (metric, baseline, current, relative change, regressed) tuples for the timing and
+        throughput metrics present in both.
+    """
+    old, new = flatten(baseline["results"]), flatten(current["results"])
+    rows = []
+    for metric in sorted(old.keys() & new.keys()):
+        if not (higher_is_better(metric) or metric.endswith("_ms")) or not old[metric]:
+            continue
+        change = (new[metric] - old[metric]) / old[metric]
+        regressed = change < -threshold if higher_is_better(metric) else change > threshold
+        rows.append((metric, old[metric], new[metric], change, regressed))
+    return rows
+
+
+def print_results(report: dict):
+    results = report["results"]
+    print(f"{'benchmark':<14}{'level':>6}{'per sec':>11}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}")
+    for name in ("scrape_sync", "scrape_async", "analysis", "generation"):
+        for level, r in results[name].items():
+            print(f"{name:<14}{level:>6}{r['per_sec']:>11.1f}{r['p50_ms']:>10.1f}{r['p90_ms']:>10.1f}{r['p99_ms']:>10.1f}")
+    for level, r in results["scheduler"].items():
+        reads = r["page_reads"]
+        print(f"{'sched_reads':<14}{level:>6}{reads['per_sec']:>11.1f}{reads['p50_ms']:>10.2f}"
+              f"{reads['p90_ms']:>10.2f}{reads['p99_ms']:>10.2f}   bulk insert {r['bulk_insert_rows_per_sec']:.0f} rows/s")
+    for level, r in results["end_to_end"].items():
+        stages = ", ".join(f"{stage} p50 {s['p50_ms']:.0f}ms" for stage, s in r["stages"].items())
+        print(f"{'end_to_end':<14}{level:>6}  {r['urls_per_minute']:.0f} URLs/min ({stages})")
+    streaming = results["streaming"]
+    print(f"streaming: first post {streaming['first_post_p50_ms']:.0f} ms, "
+          f"complete {streaming['complete_p50_ms']:.0f} ms")
+
+
+def print_comparison(rows: list, threshold: float = REGRESSION_THRESHOLD) -> int:
+    regressions = 0
+    for metric, old, new, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        regressions += regressed
+        print(f"{metric:<52}{old:>12.2f}{new:>12.2f}{change:>+9.1%}{flag}")
+    print(f"{regressions} regression(s) beyond {threshold:.0%}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--levels", default=",".join(map(str, DEFAULT_LEVELS)),
+                        help="Comma-separated concurrency levels.")
+    parser.add_argument("--urls", type=int, default=64)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds per fake LLM call.")
+    parser.add_argument("--server-latency", type=float, default=0.01, help="Seconds per fixture page response.")
+    parser.add_argument("--scheduler-rows", type=int, default=50_000)
+    parser.add_argument("--json", help="Write the results to this file.")
+    parser.add_argument("--compare", help="A previous --json file to compare against.")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="Relative change flagged as a regression by --compare (default: 0.10).")
+    args = parser.parse_args(argv)
+
+    configure_logging(logging.WARNING)
+    levels = tuple(int(level) for level in args.levels.split(","))
+    report = run(levels, args.urls, args.llm_latency, args.server_latency, args.scheduler_rows)
+    print_results(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {baseline['meta'].get('commit') or args.compare}:")
+        if print_comparison(compare(baseline, report, args.threshold), args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
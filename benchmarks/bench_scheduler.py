@@ -0,0 +1,244 @@
+# benchmarks/bench_scheduler.py
+"""
+Benchmarks MockScheduler writes and reads on a large scheduled_posts table, and streaming
+export (every format in scheduler.transfer.FORMATS that can be written here) and import of it.
+
+Inserts skip the near-duplicate check (dedup_policy="allow"), so they measure write throughput.
+The check is measured separately: --dedup-rows posts that share hashtags and a "Learn more"
+ending are stored, and the per-post cost of checking new posts is recorded as the table grows.
+
+Slot allocation is measured separately too: --slot-posts future posts are placed into free
+slots, then the time to place one more campaign and to rebalance after a capacity cut is recorded.
+
+Usage:
+    python -m benchmarks.bench_scheduler [--rows 1000000] [--batch 10000] [--dedup-rows 1000000]
+        [--slot-posts 100000] [--json results.json]
+"""
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import tempfile
+from datetime import date, timedelta
+
+from scheduler.scheduler import MockScheduler
+from scheduler import transfer
+from scheduler.slots import SlotPolicy
+from telemetry.logs import configure_logging
+
+PLATFORMS = ("Twitter", "LinkedIn")
+STATUSES = ("scheduled", "scheduled", "scheduled", "sent", "failed")
+# Campaign-like posts: a varied body, then the hashtags and ending most posts share
+WORDS = ("deploy scale secure monitor billing storage routing caching release team project customer latency "
+         "faster cheaper reliable global edge region api sdk dashboard alerts logs traces metrics cost budget "
+         "migrate upgrade launch today week preview beta stable support docs guide").split()
+ENDINGS = (" Learn more at https://example.com/launch #AcmeCloud #DevOps",
+           " Learn more at https://example.com/blog #AcmeCloud")
+
+
+def make_posts(count: int, rng: random.Random, start: date) -> list:
+    return [
+        {
+            "platform": rng.choice(PLATFORMS),
+            "content": f"Benchmark post {rng.random():.12f} https://example.com/launch #bench",
+            "scheduled_date": (start + timedelta(days=rng.randrange(365))).strftime('%Y-%m-%d'),
+        }
+        for _ in range(count)
+    ]
+
+
+def make_campaign_posts(count: int, rng: random.Random) -> list:
+    return [{"platform": rng.choice(PLATFORMS),
+             "content": " ".join(rng.choices(WORDS, k=14)).capitalize() + "." + rng.choice(ENDINGS),
+             "scheduled_date": "2030-01-01"} for _ in range(count)]
+
+
+def timed(fn, repeat: int = 5) -> float:
+    """Returns the best wall time of `repeat` calls in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run(rows: int, batch: int, single_sample: int = 2000) -> dict:
+    rng = random.Random(7)
+    start = date(2025, 1, 1)
+    results = {"rows": rows}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with MockScheduler(db_file=os.path.join(tmp, "bench.db")) as scheduler:
+            scheduler.initialize_db()
+
+            # Per-row inserts (the old UI loop), measured on a sample
+            sample = make_posts(single_sample, rng, start)
+            began = time.perf_counter()
+            for post in sample:
+                scheduler.schedule_post(post["platform"], post["content"], post["scheduled_date"],
+                                        dedup_policy="allow")
+            elapsed = time.perf_counter() - began
+            results["single_insert_rows_per_sec"] = single_sample / elapsed
+
+            # Bulk inserts
+            inserted, bulk_elapsed = single_sample, 0.0
+            while inserted < rows:
+                posts = make_posts(min(batch, rows - inserted), rng, start)
+                began = time.perf_counter()
+                inserted += scheduler.schedule_posts_bulk(posts, dedup_policy="allow")
+                bulk_elapsed += time.perf_counter() - began
+            results["bulk_insert_rows_per_sec"] = (rows - single_sample) / bulk_elapsed if bulk_elapsed else 0.0
+
+            # Spread statuses so the status index has something to do
+            with scheduler.conn:
+                for status in STATUSES[3:]:
+                    scheduler.conn.execute(
+                        "UPDATE scheduled_posts SET status = ? WHERE id % 5 = ?", (status, STATUSES.index(status))
+                    )
+
+            mid = (start + timedelta(days=180)).strftime('%Y-%m-%d')
+            last_page = scheduler.get_scheduled_posts(start_date=mid, limit=100)
+            after = (last_page[-1]["scheduled_date"], last_page[-1]["id"])
+            queries = {
+                "first_page": lambda: scheduler.get_scheduled_posts(limit=100),
+                "date_range_page": lambda: scheduler.get_scheduled_posts(
+                    start_date=mid, end_date=(start + timedelta(days=187)).strftime('%Y-%m-%d'), limit=100),
+                "status_page": lambda: scheduler.get_scheduled_posts(status="failed", start_date=mid, limit=100),
+                "platform_page": lambda: scheduler.get_scheduled_posts(platform="LinkedIn", limit=100),
+                "offset_page_500k": lambda: scheduler.get_scheduled_posts(limit=100, offset=rows // 2),
+                "keyset_page_mid": lambda: scheduler.get_scheduled_posts(limit=100, after=after),
+                "count_status": lambda: scheduler.count_scheduled_posts(status="scheduled"),
+            }
+            results["query_ms"] = {name: timed(fn) for name, fn in queries.items()}
+            results["query_ms"]["get_all_scheduled_posts"] = timed(scheduler.get_all_scheduled_posts, repeat=1)
+
+            results["export_rows_per_sec"] = {}
+            for format in transfer.FORMATS:
+                try:
+                    stats = scheduler.export_posts(os.path.join(tmp, f"export.{format}"))
+                except ValueError:  # Parquet and Arrow need pyarrow
+                    continue
+                results["export_rows_per_sec"][format] = stats["rows_per_sec"]
+
+        with MockScheduler(db_file=os.path.join(tmp, "import.db")) as target:
+            target.initialize_db()
+            stats = target.import_posts(os.path.join(tmp, "export.csv"), dedup_policy="allow")
+            results["import_rows_per_sec"] = stats["rows_per_sec"]
+    return results
+
+
+def run_dedup(count: int, batch: int, probes: int = 500) -> dict:
+    """
+    Stores `count` campaign-like posts and, each time the table has grown tenfold, times the
+    near-duplicate check of `probes` new posts (half of them near-copies of stored posts) and
+    the bulk insert of as many with the default "reject" policy.
+    """
+    rng = random.Random(13)
+    results = {"dedup_rows": count, "dedup_check_us_per_post": {}, "dedup_insert_us_per_post": {}}
+    checkpoints = [size for size in (1_000, 10_000, 100_000, 1_000_000, 10_000_000) if size < count] + [count]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with MockScheduler(db_file=os.path.join(tmp, "dedup.db")) as scheduler:
+            scheduler.initialize_db()
+            stored, recent = 0, []
+            for checkpoint in checkpoints:
+                while stored < checkpoint:
+                    posts = make_campaign_posts(min(batch, checkpoint - stored), rng)
+                    stored += scheduler.schedule_posts_bulk(posts, dedup_policy="allow")
+                    recent = posts
+                copies = [dict(post, content=post["content"] + " Today!") for post in rng.sample(recent, probes // 2)]
+                checked = copies + make_campaign_posts(probes - len(copies), rng)
+                began = time.perf_counter()
+                flags = scheduler.find_near_duplicates(checked)
+                results["dedup_check_us_per_post"][checkpoint] = (time.perf_counter() - began) / probes * 1e6
+                results.setdefault("dedup_copies_found", {})[checkpoint] = sum(
+                    flag is not None for flag in flags[:len(copies)]) / len(copies)
+
+                began = time.perf_counter()
+                scheduler.schedule_posts_bulk(make_campaign_posts(probes, rng))
+                results["dedup_insert_us_per_post"][checkpoint] = (time.perf_counter() - began) / probes * 1e6
+                stored += probes
+    return results
+
+
+def run_slots(count: int, batch: int, campaigns: int = 20) -> dict:
+    """Fills the future with `count` allocated posts, then times campaign placement and rebalancing."""
+    rng = random.Random(11)
+    start = date.today() + timedelta(days=1)
+    results = {"slot_posts": count}
+    # Enough hourly capacity for the posts to fit within the allocation horizon
+    policy = SlotPolicy(capacity={"Twitter": 6, "LinkedIn": 4})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with MockScheduler(db_file=os.path.join(tmp, "slots.db"), slot_policy=policy) as scheduler:
+            scheduler.initialize_db()
+            placed, elapsed = 0, 0.0
+            while placed < count:
+                posts = make_posts(min(batch, count - placed), rng, start)
+                for post in posts:
+                    post["scheduled_date"] = start + timedelta(days=rng.randrange(60))
+                began = time.perf_counter()
+                placed += scheduler.schedule_posts_bulk(posts, dedup_policy="allow", allocate=True)
+                elapsed += time.perf_counter() - began
+            results["slot_fill_posts_per_sec"] = count / elapsed if elapsed else 0.0
+
+            timings = []
+            for _ in range(campaigns):
+                posts = make_posts(14, rng, start)
+                for i, post in enumerate(posts):
+                    post["platform"], post["scheduled_date"] = PLATFORMS[i % 2], start + timedelta(days=i // 2)
+                began = time.perf_counter()
+                scheduler.schedule_posts_bulk(posts, dedup_policy="allow", allocate=True)
+                timings.append(time.perf_counter() - began)
+            results["slot_campaign_ms"] = sorted(timings)[len(timings) // 2] * 1000
+
+            policy.capacity = {"Twitter": 4, "LinkedIn": 3}
+            began = time.perf_counter()
+            results["rebalance_moved"] = scheduler.rebalance()
+            results["rebalance_ms"] = (time.perf_counter() - began) * 1000
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=10_000)
+    parser.add_argument("--dedup-rows", type=int, default=1_000_000,
+                        help="Stored posts for the near-duplicate check benchmark (0 skips it).")
+    parser.add_argument("--slot-posts", type=int, default=100_000, help="Future posts for the slot benchmark (0 skips it).")
+    parser.add_argument("--json", help="Also write the raw results to this file.")
+    args = parser.parse_args(argv)
+
+    configure_logging(logging.WARNING)
+    results = run(args.rows, args.batch)
+    print(f"rows: {results['rows']}")
+    print(f"single insert: {results['single_insert_rows_per_sec']:>12.0f} rows/s")
+    print(f"bulk insert:   {results['bulk_insert_rows_per_sec']:>12.0f} rows/s")
+    for name, ms in results["query_ms"].items():
+        print(f"{name:<26}{ms:>10.2f} ms")
+    for format, rows_per_sec in results["export_rows_per_sec"].items():
+        print(f"export {format:<7}{rows_per_sec:>12.0f} rows/s")
+    print(f"import csv:    {results['import_rows_per_sec']:>12.0f} rows/s")
+    if args.dedup_rows:
+        results.update(run_dedup(args.dedup_rows, args.batch))
+        for size, check_us in results["dedup_check_us_per_post"].items():
+            print(f"dedup at {size:>9} posts: check {check_us:>8.0f} us/post, reject-insert "
+                  f"{results['dedup_insert_us_per_post'][size]:>8.0f} us/post, "
+                  f"{results['dedup_copies_found'][size]:.0%} of near-copies found")
+    if args.slot_posts:
+        results.update(run_slots(args.slot_posts, args.batch))
+        print(f"slot fill:     {results['slot_fill_posts_per_sec']:>12.0f} posts/s ({args.slot_posts} future posts)")
+        print(f"{'place 14-post campaign':<26}{results['slot_campaign_ms']:>10.2f} ms")
+        print(f"{'rebalance':<26}{results['rebalance_ms']:>10.2f} ms ({results['rebalance_moved']} moved)")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+# benchmarks/bench_startup.py
+"""
+Benchmarks the startup time of the app and CLI entry points.
+
+Each entry point is imported in a fresh interpreter under `python -X importtime`, recording its
+cumulative import time and its heaviest direct imports. The wall-clock time of a few CLI
+invocations, and of a bare interpreter for reference, is measured the same way. Every figure
+is the minimum over --repeats runs, which is the least noisy estimate for cold starts.
+
+Usage:
+    python -m benchmarks.bench_startup [--repeats 5] [--json startup.json] [--compare baseline.json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+from benchmarks.bench_pipeline import REGRESSION_THRESHOLD, compare, print_comparison, run_metadata
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Module each entry point (or CLI subcommand) has to import before doing any work
+ENTRY_POINTS = {
+    "cli": "cli",
+    "cli_scrape": "scraper.scraper",
+    "cli_analyze": "nlp.analysis",
+    "cli_generate": "agent.content_genrator",
+    "cli_schedule": "scheduler.scheduler",
+    "cli_dispatch": "scheduler.dispatcher",
+    "cli_batch": "pipeline.batch",
+    "jobs_worker": "pipeline.jobs",
+    "app": "ui.app_ui",
+}
+
+COMMANDS = {
+    "python": ["-c", "pass"],
+    "cli_help": ["cli.py", "--help"],
+    "cli_schedule_help": ["cli.py", "schedule", "--help"],
+    "cli_dispatch_help": ["cli.py", "dispatch", "--help"],
+    "cli_batch_help": ["cli.py", "batch", "--help"],
+}
+
+
+def parse_importtime(stderr: str) -> list:
+    """
+    Parses `-X importtime` output.
+
+    Returns:
+        (module, self microseconds, cumulative microseconds, depth) tuples in output order,
+        where depth 0 is a module imported directly by the command.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        prefix, cumulative_us, name = line.split("|")
+        stripped = name.lstrip(" ")
+        # Names are preceded by one space plus two per level of nesting
+        depth = (len(name) - len(stripped) - 1) // 2
+        rows.append((stripped.rstrip(), int(prefix.rsplit(":", 1)[1]), int(cumulative_us), depth))
+    return rows
+
+
+def measure_import(module: str, repeats: int = 5, top: int = 5) -> dict:
+    """Imports `module` in `repeats` fresh interpreters and reports its fastest run."""
+    best = None
+    for _ in range(repeats):
+        completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                   capture_output=True, text=True, cwd=ROOT)
+        if completed.returncode != 0:
+            return {"module": module, "error": completed.stderr.strip().splitlines()[-1]}
+        rows = parse_importtime(completed.stderr)
+        total = next(cumulative for name, _, cumulative, depth in rows if name == module and depth == 0)
+        if best is None or total < best[0]:
+            best = (total, rows)
+    total, rows = best
+    # The module's own imports are the depth-1 rows that precede it in the output
+    end = next(i for i, (name, _, _, depth) in enumerate(rows) if name == module and depth == 0)
+    start = max((i + 1 for i, (_, _, _, depth) in enumerate(rows[:end]) if depth == 0), default=0)
+    children = sorted((row for row in rows[start:end] if row[3] == 1), key=lambda row: -row[2])
+    return {
+        "module": module,
+        "import_ms": round(total / 1000, 2),
+        "heaviest": {name: round(cumulative / 1000, 2) for name, _, cumulative, _ in children[:top]},
+    }
+
+
+def measure_command(args: list, repeats: int = 5) -> dict:
+    """Runs `python <args>` `repeats` times and reports the fastest wall-clock time."""
+    times = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        completed = subprocess.run([sys.executable, *args], capture_output=True, cwd=ROOT)
+        times.append(time.perf_counter() - started)
+        if completed.returncode != 0:
+            return {"command": " ".join(args), "error": completed.stderr.decode(errors="replace").strip()}
+    return {"command": " ".join(args), "wall_ms": round(min(times) * 1000, 2)}
+
+
+def run(repeats: int = 5) -> dict:
+    """
+    Measures every entry point and command.
+
+    Returns:
+        {"meta": {...}, "results": {"imports": {entry point: metrics}, "commands": {name: metrics}}}.
+    """
+    results = {
+        "imports": {name: measure_import(module, repeats) for name, module in ENTRY_POINTS.items()},
+        "commands": {name: measure_command(args, repeats) for name, args in COMMANDS.items()},
+    }
+    meta = run_metadata((), 0, 0.0, 0.0, 0)
+    meta = {key: meta[key] for key in ("commit", "timestamp", "python", "platform")}
+    meta["repeats"] = repeats
+    return {"meta": meta, "results": results}
+
+
+def print_results(report: dict):
+    results = report["results"]
+    print(f"{'entry point':<16}{'module':<26}{'import ms':>10}   heaviest imports")
+    for name, r in results["imports"].items():
+        if "error" in r:
+            print(f"{name:<16}{r['module']:<26}{'error':>10}   {r['error']}")
+            continue
+        heaviest = ", ".join(f"{module} {ms:.0f}" for module, ms in r["heaviest"].items())
+        print(f"{name:<16}{r['module']:<26}{r['import_ms']:>10.1f}   {heaviest}")
+    print()
+    for name, r in results["commands"].items():
+        timing = f"{r['wall_ms']:>10.1f}" if "wall_ms" in r else f"{'error':>10}"
+        print(f"{name:<20}{r['command']:<30}{timing} ms")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=5, help="Fresh interpreters per measurement.")
+    parser.add_argument("--json", help="Write the results to this file.")
+    parser.add_argument("--compare", help="A previous --json file to compare against.")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="Relative change flagged as a regression by --compare (default: 0.10).")
+    args = parser.parse_args(argv)
+
+    report = run(args.repeats)
+    print_results(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {baseline['meta'].get('commit') or args.compare}:")
+        if print_comparison(compare(baseline, report, args.threshold), args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
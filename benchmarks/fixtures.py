@@ -0,0 +1,110 @@
+# benchmarks/fixtures.py
+"""
+Offline stand-ins for the network: a local HTTP server for the saved corpus and a fake LLM.
+"""
+import os
+import time
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm import registry
+from llm.fake import FakeChatModel
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "corpus")
+
+
+def load_corpus(directory: str = CORPUS_DIR) -> dict:
+    """Returns {file name: HTML bytes} for every saved page."""
+    corpus = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".html"):
+            with open(os.path.join(directory, name), "rb") as f:
+                corpus[name] = f.read()
+    return corpus
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops connections under concurrent load and adds 1s SYN retries
+    request_queue_size = 256
+
+
+class CorpusServer:
+    """
+    Serves the saved pages over HTTP on 127.0.0.1.
+
+    Any path whose first segment names a page serves that page, so /blog_post/17 and
+    /blog_post/18 are distinct URLs (no cache hits) with the same content. `latency`
+    seconds are slept before each response to stand in for a remote server.
+    """
+    def __init__(self, corpus: dict = None, latency: float = 0.0):
+        self.corpus = corpus if corpus is not None else load_corpus()
+        self.latency = latency
+        self.requests = 0
+        self._server = None
+        self._lock = threading.Lock()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                name = self.path.lstrip("/").split("/")[0].split("?")[0]
+                body = server.corpus.get(name) or server.corpus.get(f"{name}.html")
+                if server.latency:
+                    time.sleep(server.latency)
+                if body is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._server = _Server(("127.0.0.1", 0), self._handler())
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def urls(self, count: int) -> list:
+        """Returns `count` distinct URLs cycling through the corpus pages."""
+        names = [name[:-len(".html")] for name in self.corpus]
+        return [f"{self.base_url}/{names[i % len(names)]}/{i}" for i in range(count)]
+
+
+@contextmanager
+def fake_llm(latency: float = 0.0, chunk_latency: float = 0.0):
+    """Routes every get_llm() call to one FakeChatModel for the duration of the block."""
+    model = FakeChatModel(latency=latency, chunk_latency=chunk_latency, stream_chunk_size=64)
+    registry.set_llm_factory(lambda model_name, temperature: model)
+    try:
+        yield model
+    finally:
+        registry.set_llm_factory(None)
@@ -0,0 +1,231 @@
+# cache/store.py
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from telemetry.metrics import record_cache
+
+CACHE_FILE = os.getenv("CAMPAIGN_CACHE_FILE", "cache.db")
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid")
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalizes a URL so trivially different spellings share a cache entry.
+    Lowercases the scheme and host, drops default ports, fragments and
+    tracking parameters, and sorts the query string.
+    """
+    url = url.strip()
+    if not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and not ((scheme == "http" and parts.port == 80) or (scheme == "https" and parts.port == 443)):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(TRACKING_PARAMS)
+    )
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+def text_hash(text: str) -> str:
+    """Returns a SHA-256 hex digest of the text with whitespace runs collapsed."""
+    normalized = " ".join(text.split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def make_key(*parts) -> str:
+    """Builds a content-addressed cache key from any JSON-serializable parts."""
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    A persistent SQLite cache for scraped pages and LLM results.
+
+    Entries expire after a TTL and the store is kept under `max_bytes`
+    by evicting the least recently used entries.
+    """
+    def __init__(self, db_file=CACHE_FILE, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_bytes: int = DEFAULT_MAX_BYTES, bypass: bool = None):
+        self.db_file = db_file
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        if bypass is None:
+            bypass = os.getenv("CAMPAIGN_CACHE_BYPASS", "").lower() in ("1", "true", "yes")
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._total_bytes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_file, check_same_thread=False)
+            with self._conn:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("""
+                    CREATE TABLE IF NOT EXISTS cache_entries (
+                        namespace TEXT NOT NULL,
+                        key TEXT NOT NULL,
+                        value TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        created_at REAL NOT NULL,
+                        accessed_at REAL NOT NULL,
+                        PRIMARY KEY (namespace, key)
+                    )
+                """)
+                self._conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_cache_entries_accessed ON cache_entries (accessed_at)"
+                )
+            row = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()
+            self._total_bytes = row[0]
+        return self._conn
+
+    def close(self):
+        """Closes the underlying database connection."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def get(self, namespace: str, key: str, ttl_seconds: float = None):
+        """
+        Looks up a cached value.
+
+        Args:
+            namespace: The kind of entry, e.g. "page" or "analysis".
+            key: The content-addressed key from make_key().
+            ttl_seconds: Optional TTL overriding the cache default for this lookup.
+
+        Returns:
+            The cached value, or None on a miss, an expired entry or when bypassing.
+        """
+        if self.bypass:
+            return None
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value, size, created_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                record_cache(namespace, hit=False)
+                return None
+            value, size, created_at = row
+            if ttl is not None and now - created_at > ttl:
+                with conn:
+                    conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key))
+                self._total_bytes -= size
+                self.misses += 1
+                record_cache(namespace, hit=False)
+                return None
+            with conn:
+                conn.execute(
+                    "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                    (now, namespace, key)
+                )
+            self.hits += 1
+        record_cache(namespace, hit=True)
+        return json.loads(value)
+
+    def set(self, namespace: str, key: str, value):
+        """Stores a JSON-serializable value, evicting old entries if the cache is over its size limit."""
+        if self.bypass:
+            return
+        payload = json.dumps(value)
+        size = len(payload.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                old = conn.execute(
+                    "SELECT size FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key)
+                ).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries (namespace, key, value, size, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (namespace, key, payload, size, now, now)
+                )
+            self._total_bytes += size - (old[0] if old else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Deletes least recently used entries until the cache fits in max_bytes."""
+        target = int(self.max_bytes * 0.9)
+        with conn:
+            rows = conn.execute(
+                "SELECT namespace, key, size FROM cache_entries ORDER BY accessed_at ASC"
+            )
+            doomed = []
+            for namespace, key, size in rows:
+                if self._total_bytes <= target:
+                    break
+                doomed.append((namespace, key))
+                self._total_bytes -= size
+            conn.executemany("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", doomed)
+        self.evictions += len(doomed)
+        logging.info(f"Evicted {len(doomed)} cache entries to stay under {self.max_bytes} bytes.")
+
+    def get_or_compute(self, namespace: str, key: str, compute, ttl_seconds: float = None):
+        """
+        Returns the cached value for a key, or calls `compute()` and caches its result.
+        Falsy results (the modules' way of signalling failure) are not cached.
+        """
+        value = self.get(namespace, key, ttl_seconds=ttl_seconds)
+        if value is not None:
+            return value
+        value = compute()
+        if value:
+            self.set(namespace, key, value)
+        return value
+
+    def clear(self):
+        """Removes every cache entry."""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM cache_entries")
+            self._total_bytes = 0
+
+    def stats(self) -> dict:
+        """Returns hit/miss/eviction counters and the current size of the cache."""
+        with self._lock:
+            self._connection()
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+                "bytes": self._total_bytes,
+                "bypass": self.bypass,
+            }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> ResultCache:
+    """Returns the process-wide cache shared by the UI and the batch pipeline."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResultCache()
+        return _default_cache
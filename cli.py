@@ -0,0 +1,235 @@
+# cli.py
+"""
+Command-line entry point for the campaign pipeline, one subcommand per step.
+
+Only argparse is imported up front; each subcommand imports what it needs when it runs,
+so `python cli.py --help` or `python cli.py schedule` never load langchain or the parsers.
+
+Usage:
+    python cli.py scrape https://example.com/post > page.txt
+    python cli.py analyze page.txt > analysis.txt
+    python cli.py generate analysis.txt --url https://example.com/post > posts.json
+    python cli.py schedule posts.json
+    python cli.py regenerate https://example.com/post --platform LinkedIn
+    python cli.py export posts.parquet --status sent
+    python cli.py import posts.csv
+    python cli.py dispatch --once
+    python cli.py batch -f urls.txt -o results.jsonl
+    python cli.py crawl --add https://example.com/sitemap.xml --once
+"""
+import sys
+import json
+import argparse
+
+# Subcommands that hand their arguments to an existing module's own CLI
+DELEGATED = {
+    "dispatch": ("scheduler.dispatcher", "Publish due scheduled posts (see `dispatch --help`)."),
+    "batch": ("pipeline.batch", "Run the whole pipeline over many URLs (see `batch --help`)."),
+    "crawl": ("pipeline.feeds", "Generate campaigns for new pages on watched sitemaps and feeds (see `crawl --help`)."),
+}
+
+
+def _read(path: str) -> str:
+    if path == "-":
+        return sys.stdin.read()
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def _cache(args):
+    if args.no_cache:
+        return None
+    from cache.store import get_default_cache
+    return get_default_cache()
+
+
+def _load_env():
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv()
+
+
+def cmd_scrape(args) -> int:
+    from scraper.scraper import scrape_text_from_url
+    text = scrape_text_from_url(args.url, cache=_cache(args), extractor=args.extractor,
+                                main_content=args.main_content, max_chars=args.max_chars)
+    if not text:
+        return 1
+    print(text)
+    return 0
+
+
+def cmd_analyze(args) -> int:
+    _load_env()
+    from nlp.analysis import analyze_text, analyze_text_chunked, CONDENSE_TOKENS
+    text = _read(args.file)
+    if args.chunked:
+        analysis = analyze_text_chunked(text, cache=_cache(args))["analysis"]
+    else:
+        budget = args.condense_tokens
+        if budget is None:
+            budget = CONDENSE_TOKENS if args.condense else 0
+        analysis = analyze_text(text, cache=_cache(args), condense_tokens=budget)
+    if not analysis or analysis.startswith("Error"):
+        print(analysis or "Error: analysis returned nothing.", file=sys.stderr)
+        return 1
+    print(analysis)
+    return 0
+
+
+def cmd_generate(args) -> int:
+    _load_env()
+    from agent.content_genrator import generate_campaign_content, generate_campaign_content_parallel
+    analysis = _read(args.file)
+    generate = generate_campaign_content_parallel if args.parallel else generate_campaign_content
+    posts = generate(analysis, args.url, cache=_cache(args))
+    if not posts:
+        return 1
+    json.dump(posts, sys.stdout, indent=2, default=str)
+    print()
+    return 0
+
+
+def cmd_schedule(args) -> int:
+    from scheduler.scheduler import get_scheduler
+    posts = json.loads(_read(args.file))
+    if args.approved_only:
+        posts = [post for post in posts if post.get("approved", True)]
+    scheduled = get_scheduler(args.db).schedule_posts_bulk(posts, allocate=not args.exact_times)
+    print(f"Scheduled {scheduled} of {len(posts)} posts.", file=sys.stderr)
+    return 0 if scheduled == len(posts) else 1
+
+
+def cmd_regenerate(args) -> int:
+    _load_env()
+    from scheduler.scheduler import get_scheduler
+    from pipeline.campaigns import regenerate_campaign, default_functions, FAILED
+    result = regenerate_campaign(args.url, scheduler=get_scheduler(args.db), platforms=args.platform,
+                                 force=args.force, functions=default_functions(_cache(args)))
+    json.dump(result, sys.stdout, indent=2)
+    print()
+    return 1 if result["status"] == FAILED else 0
+
+
+def cmd_export(args) -> int:
+    from scheduler.scheduler import get_scheduler
+    try:
+        stats = get_scheduler(args.db).export_posts(
+            args.file, format=args.format, start_date=args.start_date, end_date=args.end_date, status=args.status,
+            platform=args.platform, campaign_id=args.campaign, batch_size=args.batch_size)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    if stats is None:
+        return 1
+    print(f"Exported {stats['rows']} posts in {stats['seconds']:.2f}s ({stats['rows_per_sec']:.0f} rows/s).",
+          file=sys.stderr)
+    return 0
+
+
+def cmd_import(args) -> int:
+    from scheduler.scheduler import get_scheduler
+    try:
+        stats = get_scheduler(args.db).import_posts(args.file, format=args.format, dedup_policy=args.dedup_policy,
+                                                    allocate=args.allocate, batch_size=args.batch_size)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    print(f"Imported {stats['imported']} of {stats['rows']} posts in {stats['seconds']:.2f}s "
+          f"({stats['rows_per_sec']:.0f} rows/s): {stats['rejected']} near-duplicates, "
+          f"{stats['invalid']} invalid.", file=sys.stderr)
+    return 1 if stats["error"] else 0
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="cli.py", description="Scrape, analyze, generate, schedule and dispatch campaign posts.")
+    subcommands = parser.add_subparsers(dest="command", metavar="COMMAND", required=True)
+
+    scrape = subcommands.add_parser("scrape", help="Print the text of a web page.")
+    scrape.add_argument("url")
+    scrape.add_argument("--extractor", default="auto",
+                        help="HTML-to-text backend: auto, selectolax, lxml, html.parser or streaming.")
+    scrape.add_argument("--main-content", action="store_true", help="Keep only the main article body.")
+    scrape.add_argument("--max-chars", type=int, help="Stop after this many characters of text.")
+    scrape.set_defaults(handler=cmd_scrape)
+
+    analyze = subcommands.add_parser("analyze", help="Print the marketing analysis of scraped text.")
+    analyze.add_argument("file", nargs="?", default="-", help="Text file to analyze (default: stdin).")
+    analyze.add_argument("--chunked", action="store_true",
+                         help="Analyze the full document with token-aware chunking instead of truncating it.")
+    analyze.add_argument("--condense", action="store_true",
+                         help="Condense the text locally (nlp.condense) before analysis to send fewer prompt tokens.")
+    analyze.add_argument("--condense-tokens", type=int,
+                         help="Token budget for --condense, which it implies "
+                              "(default: nlp.analysis.CONDENSE_TOKENS; 0 disables condensing).")
+    analyze.set_defaults(handler=cmd_analyze)
+
+    generate = subcommands.add_parser("generate", help="Print campaign posts for an analysis as JSON.")
+    generate.add_argument("file", nargs="?", default="-", help="Analysis file (default: stdin).")
+    generate.add_argument("--url", required=True, help="The URL the posts should link to.")
+    generate.add_argument("--parallel", action="store_true",
+                          help="Generate each platform's posts with a separate concurrent LLM request.")
+    generate.set_defaults(handler=cmd_generate)
+
+    schedule = subcommands.add_parser("schedule", help="Schedule posts from a JSON file written by `generate`.")
+    schedule.add_argument("file", nargs="?", default="-", help="JSON list of posts (default: stdin).")
+    schedule.add_argument("--db", help="SQLite database file (default: CAMPAIGN_DB_FILE or campaign.db).")
+    schedule.add_argument("--approved-only", action="store_true", help="Skip posts marked \"approved\": false.")
+    schedule.add_argument("--exact-times", action="store_true",
+                          help="Schedule posts at their given dates instead of the first free slot on or after them.")
+    schedule.set_defaults(handler=cmd_schedule)
+
+    regenerate = subcommands.add_parser("regenerate", help="Regenerate a URL's campaign if its page changed.")
+    regenerate.add_argument("url")
+    regenerate.add_argument("--platform", action="append",
+                            help="Regenerate only this platform's posts, even if the page is unchanged (repeatable).")
+    regenerate.add_argument("--force", action="store_true", help="Regenerate every platform even if the page is unchanged.")
+    regenerate.add_argument("--db", help="SQLite database file (default: CAMPAIGN_DB_FILE or campaign.db).")
+    regenerate.set_defaults(handler=cmd_regenerate)
+
+    export = subcommands.add_parser("export", help="Stream scheduled posts to a Parquet, Arrow, CSV or JSONL file.")
+    export.add_argument("file", help="Output file; the extension picks the format unless --format is given.")
+    export.add_argument("--start-date", help="Only posts on or after this date.")
+    export.add_argument("--end-date", help="Only posts on or before this date.")
+    export.add_argument("--status", help="Only posts with this status, e.g. sent.")
+    export.add_argument("--platform", help="Only posts for this platform.")
+    export.add_argument("--campaign", type=int, help="Only posts of this campaign id.")
+    export.set_defaults(handler=cmd_export)
+
+    import_ = subcommands.add_parser("import", help="Schedule the posts in a Parquet, Arrow, CSV or JSONL file.")
+    import_.add_argument("file", help="Input file with platform, content and scheduled_date columns.")
+    import_.add_argument("--dedup-policy", default="reject", choices=("reject", "merge", "allow"),
+                         help="What to do with near-duplicates of stored posts (default: reject).")
+    import_.add_argument("--allocate", action="store_true",
+                         help="Place each post in the first free slot on or after its date.")
+    import_.set_defaults(handler=cmd_import)
+
+    for command in (export, import_):
+        command.add_argument("--format", choices=("csv", "jsonl", "parquet", "arrow"))
+        command.add_argument("--batch-size", type=int, default=10_000, help="Rows per batch (default: 10000).")
+        command.add_argument("--db", help="SQLite database file (default: CAMPAIGN_DB_FILE or campaign.db).")
+
+    for command in (scrape, analyze, generate, regenerate):
+        command.add_argument("--no-cache", action="store_true", help="Bypass the on-disk result cache.")
+
+    for name, (_, help_text) in DELEGATED.items():
+        subcommands.add_parser(name, help=help_text, add_help=False)
+    return parser
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] in DELEGATED:
+        import importlib
+        module = importlib.import_module(DELEGATED[argv[0]][0])
+        return module.main(argv[1:])
+
+    args = build_arg_parser().parse_args(argv)
+    from telemetry.logs import configure_logging
+    configure_logging()
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+# llm/fake.py
+import re
+import json
+import time
+import asyncio
+import threading
+from typing import Any, Callable, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import Field, PrivateAttr
+
+PLATFORMS = ("Twitter", "LinkedIn")
+
+
+def default_response(prompt: str) -> str:
+    """
+    Returns a deterministic, plausible response for the app's prompts:
+    a JSON array of posts for generation prompts and a five-section analysis otherwise.
+    """
+    if "JSON" in prompt:
+        url_match = re.search(r"https?://\S+", prompt)
+        url = url_match.group(0) if url_match else "https://example.com"
+        requested = [p for p in PLATFORMS if f"for {p}" in prompt] or list(PLATFORMS)
+        posts = []
+        for platform in requested:
+            for i in range(5):
+                posts.append({
+                    "platform": platform,
+                    "content": f"{platform} post {i + 1}: see what's new at {url} #launch",
+                    "scheduled_date": "2025-01-01",
+                })
+        return json.dumps(posts)
+    return (
+        "1. **Core Theme/Message**: A faster, simpler release.\n"
+        "2. **Key Value Propositions**: Speed; simplicity; reliability.\n"
+        "3. **Target Audience**: Developers.\n"
+        "4. **Key Statistics or Data Points**: 40% faster.\n"
+        "5. **Tone of Voice**: Enthusiastic."
+    )
+
+
+class FakeRateLimitError(Exception):
+    """Shaped like OpenAI's RateLimitError: a status_code and the response headers."""
+    def __init__(self, retry_after: Optional[float] = None, status_code: int = 429):
+        super().__init__(f"Error code: {status_code} - rate limit reached")
+        self.status_code = status_code
+        self.headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+
+
+def _usage(prompt: str, text: str) -> dict:
+    """Approximate usage metadata (about four characters per token) so token accounting can be tested offline."""
+    input_tokens, output_tokens = (len(prompt) + 3) // 4, (len(text) + 3) // 4
+    return {"input_tokens": input_tokens, "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens}
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    A deterministic offline chat model.
+
+    Answers with `responses` in order (cycling), or with `responder(prompt)`, or with
+    default_response(prompt). `latency` seconds are slept per call, blocking for sync calls
+    and with asyncio.sleep for async ones, so concurrency can be measured without the network.
+    Streaming yields the response in `stream_chunk_size` pieces, `chunk_latency` seconds apart.
+    The first `rate_limited_calls` calls raise FakeRateLimitError (HTTP 429), with a Retry-After
+    of `retry_after` seconds if it is set.
+    """
+    responses: List[str] = Field(default_factory=list)
+    responder: Optional[Callable[[str], str]] = None
+    latency: float = 0.0
+    stream_chunk_size: int = 8
+    chunk_latency: float = 0.0
+    prompts: List[str] = Field(default_factory=list)
+    rate_limited_calls: int = 0
+    retry_after: Optional[float] = None
+    rejected: int = 0
+    _index: int = PrivateAttr(default=0)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    @property
+    def call_count(self) -> int:
+        return len(self.prompts)
+
+    def _respond(self, messages: List[BaseMessage]) -> ChatResult:
+        prompt = "\n".join(str(m.content) for m in messages)
+        with self._lock:
+            if self.rejected < self.rate_limited_calls:
+                self.rejected += 1
+                raise FakeRateLimitError(self.retry_after)
+            self.prompts.append(prompt)
+            if self.responses:
+                text = self.responses[self._index % len(self.responses)]
+                self._index += 1
+            elif self.responder is not None:
+                text = self.responder(prompt)
+            else:
+                text = default_response(prompt)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text, usage_metadata=_usage(prompt, text)))])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._respond(messages)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._respond(messages)
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        if self.latency:
+            time.sleep(self.latency)
+        message = self._respond(messages).generations[0].message
+        text = message.content
+        for i in range(0, len(text), self.stream_chunk_size):
+            if self.chunk_latency and i:
+                time.sleep(self.chunk_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=text[i:i + self.stream_chunk_size]))
+        # Like OpenAI with stream_usage, report the usage once at the end of the stream
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=message.usage_metadata))
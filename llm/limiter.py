@@ -0,0 +1,420 @@
+# llm/limiter.py
+"""
+A request scheduler shared by every chat model handed out by llm.registry.
+
+Each model has two token buckets, requests and tokens per minute, kept in the scheduler's
+SQLite database so that every UI session, batch run and crawler process on the machine draws
+from the same budget. A call reserves one request and its estimated tokens before it is sent,
+and the token estimate is corrected from the reported usage afterwards. Callers that have to
+wait queue by priority, then by arrival: interactive requests go ahead of batch jobs, even
+across processes. Rate-limit and server errors are retried with jittered exponential backoff,
+and a Retry-After from the API pauses every process using that model until it has passed.
+"""
+import os
+import time
+import uuid
+import random
+import asyncio
+import logging
+import contextvars
+from dataclasses import dataclass
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from pydantic import ConfigDict
+from scheduler.storage import SQLiteStorage, StorageBackend
+from telemetry.metrics import record_retry, record_span
+
+PRIORITIES = {"interactive": 0, "batch": 10}
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF_BASE = 1.0
+DEFAULT_BACKOFF_MAX = 60.0
+# Completion tokens reserved for a call that does not set max_tokens
+DEFAULT_COMPLETION_TOKENS = 1000
+# A waiting caller re-checks the buckets at least this often and is dropped from the queue
+# when it has not done so for WAITER_TTL seconds (e.g. its process died)
+POLL_SECONDS = 0.5
+WAITER_TTL = 10.0
+
+LIMITER_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS llm_rate_limits (
+        model TEXT PRIMARY KEY,
+        requests REAL NOT NULL,
+        tokens REAL NOT NULL,
+        updated_at REAL NOT NULL,
+        blocked_until REAL NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS llm_rate_waiters (
+        id TEXT PRIMARY KEY,
+        model TEXT NOT NULL,
+        priority INTEGER NOT NULL,
+        enqueued_at REAL NOT NULL,
+        expires_at REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_llm_rate_waiters_queue ON llm_rate_waiters (model, priority, enqueued_at)",
+)
+
+_default_priority = "interactive"
+_priority = contextvars.ContextVar("llm_priority", default=None)
+
+
+def set_default_priority(name: str):
+    """Sets the priority of this process's LLM calls, e.g. "batch" for headless runs."""
+    global _default_priority
+    if name not in PRIORITIES:
+        raise ValueError(f"Unknown priority {name!r}; expected one of {', '.join(PRIORITIES)}.")
+    _default_priority = name
+
+
+@contextmanager
+def request_priority(name: str):
+    """Runs the LLM calls made in this context (and tasks started from it) at the given priority."""
+    if name not in PRIORITIES:
+        raise ValueError(f"Unknown priority {name!r}; expected one of {', '.join(PRIORITIES)}.")
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> str:
+    return _priority.get() or _default_priority
+
+
+@dataclass(frozen=True)
+class RateLimits:
+    """Per-model limits; None leaves that dimension unlimited."""
+    requests_per_minute: Optional[float] = None
+    tokens_per_minute: Optional[float] = None
+
+    @classmethod
+    def from_env(cls) -> "RateLimits":
+        """Reads CAMPAIGN_LLM_RPM and CAMPAIGN_LLM_TPM."""
+        def read(name):
+            value = os.getenv(name)
+            return float(value) if value else None
+        return cls(read("CAMPAIGN_LLM_RPM"), read("CAMPAIGN_LLM_TPM"))
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.requests_per_minute or self.tokens_per_minute)
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute buckets per model, shared through SQLite.
+
+    Every check runs in one write transaction, so processes sharing the database never
+    overspend a bucket. A single call larger than the whole token bucket waits for a full bucket.
+    """
+    def __init__(self, limits: RateLimits, db_file: str = None, storage: StorageBackend = None, clock=time.time):
+        if storage is None:
+            from scheduler.scheduler import DB_FILE
+            storage = SQLiteStorage(db_file or DB_FILE)
+        self.limits = limits
+        self.storage = storage
+        self.clock = clock
+        self._ready = False
+
+    def initialize_db(self):
+        """Creates the limiter tables."""
+        if self._ready:
+            return
+        with self.storage.write_transaction() as conn:
+            for statement in LIMITER_SCHEMA:
+                conn.execute(statement)
+        self._ready = True
+
+    def _refilled(self, conn, model: str, now: float) -> tuple:
+        """The model's (requests, tokens, blocked_until) after refilling the buckets up to `now`."""
+        rpm, tpm = self.limits.requests_per_minute, self.limits.tokens_per_minute
+        row = conn.execute("SELECT requests, tokens, updated_at, blocked_until FROM llm_rate_limits WHERE model = ?",
+                           (model,)).fetchone()
+        if row is None:
+            return float(rpm or 0), float(tpm or 0), 0.0
+        elapsed = max(now - row["updated_at"], 0.0)
+        requests = min(rpm, row["requests"] + elapsed * rpm / 60.0) if rpm else 0.0
+        tokens = min(tpm, row["tokens"] + elapsed * tpm / 60.0) if tpm else 0.0
+        return requests, tokens, row["blocked_until"]
+
+    @staticmethod
+    def _save(conn, model: str, requests: float, tokens: float, now: float, blocked_until: float):
+        conn.execute(
+            "INSERT INTO llm_rate_limits (model, requests, tokens, updated_at, blocked_until) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (model) DO UPDATE SET requests = excluded.requests, tokens = excluded.tokens, "
+            "updated_at = excluded.updated_at, blocked_until = excluded.blocked_until",
+            (model, requests, tokens, now, blocked_until)
+        )
+
+    def try_acquire(self, model: str, tokens: int, priority: str = "interactive", waiter_id: str = None,
+                    enqueued_at: float = None) -> float:
+        """
+        Takes one request and `tokens` tokens from the model's buckets if they are available and
+        no caller queued ahead (higher priority, or the same priority and earlier) is waiting.
+
+        Args:
+            model: The model the call is for.
+            tokens: The estimated tokens of the call.
+            priority: A key of PRIORITIES.
+            waiter_id: Identifies this caller in the queue while it waits.
+            enqueued_at: When this caller first asked; it keeps its place in the queue.
+
+        Returns:
+            0 if the call may go ahead, otherwise the seconds until it is worth asking again.
+        """
+        self.initialize_db()
+        rpm, tpm = self.limits.requests_per_minute, self.limits.tokens_per_minute
+        now = self.clock()
+        waiter_id = waiter_id or uuid.uuid4().hex
+        enqueued_at = now if enqueued_at is None else enqueued_at
+        rank = PRIORITIES[priority]
+        with self.storage.write_transaction() as conn:
+            conn.execute("DELETE FROM llm_rate_waiters WHERE expires_at < ?", (now,))
+            ahead = conn.execute(
+                "SELECT 1 FROM llm_rate_waiters WHERE model = ? AND id != ? "
+                "AND (priority < ? OR (priority = ? AND enqueued_at < ?)) LIMIT 1",
+                (model, waiter_id, rank, rank, enqueued_at)
+            ).fetchone()
+            requests, available, blocked_until = self._refilled(conn, model, now)
+            needed = min(tokens, tpm) if tpm else 0
+            wait = max(blocked_until - now, 0.0)
+            if rpm and requests < 1:
+                wait = max(wait, (1 - requests) * 60.0 / rpm)
+            if tpm and available < needed:
+                wait = max(wait, (needed - available) * 60.0 / tpm)
+            if not ahead and wait <= 0:
+                self._save(conn, model, requests - 1 if rpm else 0.0, available - tokens if tpm else 0.0,
+                           now, blocked_until)
+                conn.execute("DELETE FROM llm_rate_waiters WHERE id = ?", (waiter_id,))
+                return 0.0
+            self._save(conn, model, requests, available, now, blocked_until)
+            conn.execute(
+                "INSERT INTO llm_rate_waiters (id, model, priority, enqueued_at, expires_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET expires_at = excluded.expires_at",
+                (waiter_id, model, rank, enqueued_at, now + WAITER_TTL)
+            )
+        if ahead:
+            # Whoever is ahead may be served at any moment, so check again soon
+            return min(wait, POLL_SECONDS) if wait > 0 else POLL_SECONDS
+        return wait
+
+    def leave(self, waiter_id: str):
+        """Removes a caller that gave up waiting from the queue."""
+        with self.storage.write_transaction() as conn:
+            conn.execute("DELETE FROM llm_rate_waiters WHERE id = ?", (waiter_id,))
+
+    def acquire(self, model: str, tokens: int, priority: str = None) -> float:
+        """
+        Blocks until a call of `tokens` estimated tokens may be sent.
+
+        Returns:
+            The seconds spent waiting.
+        """
+        priority = priority or current_priority()
+        waiter_id, started = uuid.uuid4().hex, self.clock()
+        try:
+            while True:
+                wait = self.try_acquire(model, tokens, priority, waiter_id, started)
+                if wait <= 0:
+                    return self.clock() - started
+                time.sleep(min(wait, POLL_SECONDS))
+        except BaseException:
+            self.leave(waiter_id)
+            raise
+
+    async def aacquire(self, model: str, tokens: int, priority: str = None) -> float:
+        """Like acquire, but runs its transactions in a worker thread and sleeps without blocking the event loop."""
+        priority = priority or current_priority()
+        waiter_id, started = uuid.uuid4().hex, self.clock()
+        try:
+            while True:
+                wait = await asyncio.to_thread(self.try_acquire, model, tokens, priority, waiter_id, started)
+                if wait <= 0:
+                    return self.clock() - started
+                await asyncio.sleep(min(wait, POLL_SECONDS))
+        except BaseException:
+            # Shielded, so a cancelled caller still leaves the queue
+            await asyncio.shield(asyncio.to_thread(self.leave, waiter_id))
+            raise
+
+    def settle(self, model: str, estimated: int, actual: int):
+        """Corrects the token bucket once a call's real usage is known; unused tokens are returned."""
+        if not self.limits.tokens_per_minute or estimated == actual:
+            return
+        self.initialize_db()
+        now = self.clock()
+        with self.storage.write_transaction() as conn:
+            requests, tokens, blocked_until = self._refilled(conn, model, now)
+            tokens = min(self.limits.tokens_per_minute, tokens + estimated - actual)
+            self._save(conn, model, requests, tokens, now, blocked_until)
+
+    def block(self, model: str, seconds: float):
+        """Holds back every call for the model, in every process, for `seconds` (e.g. a Retry-After)."""
+        self.initialize_db()
+        now = self.clock()
+        with self.storage.write_transaction() as conn:
+            requests, tokens, blocked_until = self._refilled(conn, model, now)
+            self._save(conn, model, requests, tokens, now, max(blocked_until, now + seconds))
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff: a random delay in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def status_code(error: Exception) -> Optional[int]:
+    """The HTTP status of an API error (OpenAI's APIStatusError or anything shaped like it)."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Parses the retry-after-ms or numeric Retry-After header of an API error, if present."""
+    headers = getattr(error, "headers", None) or getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(name) or headers.get(name.title())
+        if value is not None:
+            try:
+                return max(0.0, float(value) * scale)
+            except ValueError:
+                continue
+    return None
+
+
+def estimate_tokens(messages: List[BaseMessage], completion_tokens: int = DEFAULT_COMPLETION_TOKENS) -> int:
+    """Prompt tokens (about four characters each) plus the completion tokens the call may use."""
+    characters = sum(len(str(message.content)) for message in messages)
+    return (characters + 3) // 4 + completion_tokens
+
+
+def failed_call_usage(error: Exception) -> Optional[int]:
+    """
+    The tokens a failed call is settled at: 0 for a 429, which the API rejected before doing any
+    work, and None (keep the estimate) for anything else, which may have consumed tokens.
+    """
+    return 0 if status_code(error) == 429 else None
+
+
+def _usage_tokens(message) -> Optional[int]:
+    usage = getattr(message, "usage_metadata", None)
+    return usage.get("total_tokens") if usage else None
+
+
+class RateLimitedChatModel(BaseChatModel):
+    """
+    Wraps a chat model so every call goes through a RateLimiter and is retried on rate-limit
+    and server errors. A streamed call is only retried if it failed before its first chunk.
+    """
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    model: Any
+    model_name: str
+    limiter: Optional[Any] = None
+    max_retries: int = DEFAULT_MAX_RETRIES
+    backoff_base: float = DEFAULT_BACKOFF_BASE
+    backoff_max: float = DEFAULT_BACKOFF_MAX
+
+    @property
+    def _llm_type(self) -> str:
+        return f"rate-limited-{self.model._llm_type}"
+
+    def _estimate(self, messages, kwargs) -> int:
+        completion = kwargs.get("max_tokens") or getattr(self.model, "max_tokens", None) or DEFAULT_COMPLETION_TOKENS
+        return estimate_tokens(messages, completion)
+
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """The seconds to wait before retrying after `error`, or None if it should be raised."""
+        if attempt >= self.max_retries or status_code(error) not in RETRYABLE_STATUS:
+            return None
+        delay = retry_after_seconds(error)
+        if delay is None:
+            delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+        elif self.limiter is not None and status_code(error) == 429:
+            self.limiter.block(self.model_name, delay)
+        record_retry("llm")
+        logging.warning(f"LLM call to {self.model_name} failed with status {status_code(error)}; "
+                        f"retrying in {delay:.2f}s (attempt {attempt + 1} of {self.max_retries}).")
+        return delay
+
+    def _acquire(self, estimate: int):
+        if self.limiter is not None:
+            waited = self.limiter.acquire(self.model_name, estimate)
+            if waited > 0:
+                record_span("llm.rate_limit_wait", waited, model=self.model_name)
+
+    def _settle(self, estimate: int, actual: Optional[int]):
+        if self.limiter is not None:
+            self.limiter.settle(self.model_name, estimate, estimate if actual is None else actual)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs) -> ChatResult:
+        estimate = self._estimate(messages, kwargs)
+        for attempt in range(self.max_retries + 1):
+            self._acquire(estimate)
+            try:
+                result = self.model._generate(messages, stop=stop, **kwargs)
+            except Exception as e:
+                self._settle(estimate, failed_call_usage(e))
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            self._settle(estimate, sum(_usage_tokens(g.message) or 0 for g in result.generations) or None)
+            return result
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs) -> ChatResult:
+        estimate = self._estimate(messages, kwargs)
+        for attempt in range(self.max_retries + 1):
+            if self.limiter is not None:
+                waited = await self.limiter.aacquire(self.model_name, estimate)
+                if waited > 0:
+                    record_span("llm.rate_limit_wait", waited, model=self.model_name)
+            try:
+                result = await self.model._agenerate(messages, stop=stop, **kwargs)
+            except Exception as e:
+                # The limiter's transactions run in a worker thread, off the event loop
+                await asyncio.to_thread(self._settle, estimate, failed_call_usage(e))
+                delay = await asyncio.to_thread(self._retry_delay, e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            await asyncio.to_thread(self._settle, estimate,
+                                    sum(_usage_tokens(g.message) or 0 for g in result.generations) or None)
+            return result
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        estimate = self._estimate(messages, kwargs)
+        for attempt in range(self.max_retries + 1):
+            self._acquire(estimate)
+            usage, started = None, False
+            try:
+                for chunk in self.model._stream(messages, stop=stop, **kwargs):
+                    started = True
+                    usage = _usage_tokens(chunk.message) or usage
+                    yield chunk
+            except Exception as e:
+                self._settle(estimate, usage if started else failed_call_usage(e))
+                delay = None if started else self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            self._settle(estimate, usage)
+            return
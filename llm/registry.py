@@ -0,0 +1,127 @@
+# llm/registry.py
+import os
+import logging
+import threading
+
+HTTP_MAX_CONNECTIONS = 50
+HTTP_MAX_KEEPALIVE = 20
+HTTP_TIMEOUT_SECONDS = 120.0
+
+_lock = threading.Lock()
+_clients = {}
+_http_client = None
+_factory = None
+_limiter = None
+
+
+def get_http_client():
+    """Returns the process-wide pooled httpx.Client shared by every LLM client."""
+    global _http_client
+    with _lock:
+        if _http_client is None:
+            import httpx
+            _http_client = httpx.Client(
+                timeout=HTTP_TIMEOUT_SECONDS,
+                limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS,
+                                    max_keepalive_connections=HTTP_MAX_KEEPALIVE),
+            )
+        return _http_client
+
+
+def _create_openai_llm(model_name: str, temperature: float):
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(
+        temperature=temperature,
+        model_name=model_name,
+        openai_api_key=os.getenv("OPENAI_API_KEY"),
+        http_client=get_http_client(),
+        stream_usage=True,
+        # Retries go through the shared rate limiter (llm.limiter) instead
+        max_retries=0,
+    )
+
+
+def get_rate_limiter():
+    """
+    Returns the process-wide RateLimiter, created from CAMPAIGN_LLM_RPM and CAMPAIGN_LLM_TPM
+    on first use, or None when neither limit is set.
+    """
+    global _limiter
+    with _lock:
+        if _limiter is None:
+            from llm.limiter import RateLimiter, RateLimits
+            limits = RateLimits.from_env()
+            _limiter = RateLimiter(limits) if limits.enabled else False
+        return _limiter or None
+
+
+def set_rate_limiter(limiter):
+    """
+    Replaces the rate limiter used by the chat models created from now on; previously created
+    clients are cleared. Pass None to read the limits from the environment again.
+
+    Args:
+        limiter: A llm.limiter.RateLimiter, or None.
+    """
+    global _limiter
+    with _lock:
+        _limiter = limiter
+        _clients.clear()
+
+
+def get_llm(model_name: str, temperature: float):
+    """
+    Returns the shared chat model for a (model, temperature) pair, creating it on first use.
+
+    Args:
+        model_name: The OpenAI model name, e.g. "gpt-4o".
+        temperature: The sampling temperature.
+
+    Returns:
+        A LangChain chat model with token-usage tracking attached, whose calls are scheduled
+        by the shared rate limiter and retried on rate-limit and server errors (see
+        llm.limiter). Repeated calls return the same instance.
+    """
+    key = (model_name, float(temperature))
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    with _lock:
+        client = _clients.get(key)
+        factory = _factory or _create_openai_llm
+    if client is None:
+        # Imported here so that importing the registry does not pull in langchain_core
+        from telemetry.callbacks import TokenUsageCallback
+        from llm.limiter import RateLimitedChatModel
+        model = RateLimitedChatModel(model=factory(model_name, float(temperature)), model_name=model_name,
+                                     limiter=get_rate_limiter())
+        client = model.with_config(callbacks=[TokenUsageCallback(model_name)])
+        with _lock:
+            client = _clients.setdefault(key, client)
+        logging.info(f"Created LLM client for {model_name} (temperature={temperature}).")
+    return client
+
+
+def set_llm_factory(factory):
+    """
+    Replaces how chat models are created, e.g. with a fake model for tests or offline runs.
+    Clears previously created clients. Pass None to restore the OpenAI factory.
+
+    Args:
+        factory: A callable taking (model_name, temperature) and returning a chat model.
+    """
+    global _factory
+    with _lock:
+        _factory = factory
+        _clients.clear()
+
+
+def reset_llm_registry():
+    """Drops every cached client and closes the shared HTTP client."""
+    global _http_client, _limiter
+    with _lock:
+        _clients.clear()
+        _limiter = None
+        if _http_client is not None:
+            _http_client.close()
+            _http_client = None
@@ -1,32 +1,19 @@
-import os
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
-from langchain.schema.output_parser import StrOutputParser
+import functools
 import logging
+from cache.store import make_key, text_hash
+from llm import registry as llm_registry
+from telemetry.metrics import span, record_tokens_saved
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+MODEL_NAME = "gpt-4o"
+TEMPERATURE = 0.7
+MAX_INPUT_CHARS = 15000  # Approx. 4k tokens
+# Token budget for the local pre-summarization (nlp.condense) when a caller asks for it
+CONDENSE_TOKENS = 3000
+CHUNK_TOKENS = 3000
+CHUNK_OVERLAP_TOKENS = 200
+CHUNK_CONCURRENCY = 4
 
-def get_llm():
-    """Initializes and returns the ChatOpenAI model."""
-    return ChatOpenAI(temperature=0.7, model_name="gpt-4o", openai_api_key=os.getenv("OPENAI_API_KEY"))
-
-def analyze_text(scraped_text: str) -> str:
-    """
-    Analyzes scraped text to extract key themes, value propositions, and statistics.
-
-    Args:
-        scraped_text: The text content from the webpage.
-
-    Returns:
-        A structured analysis of the text.
-    """
-    if not scraped_text:
-        logging.warning("Analysis skipped: input text is empty.")
-        return ""
-
-    logging.info("Starting text analysis...")
-
-    analysis_template = """
+ANALYSIS_TEMPLATE = """
     You are an expert marketing analyst. Your task is to analyze the following text from a product announcement or blog post and extract key information for a social media campaign.
 
     Please extract the following:
@@ -46,19 +33,280 @@ def analyze_text(scraped_text: str) -> str:
     ANALYSIS:
     """
 
-    prompt = ChatPromptTemplate.from_template(analysis_template)
+CHUNK_ANALYSIS_TEMPLATE = """
+    You are an expert marketing analyst. The following is part {part} of {total} of a longer product announcement or blog post.
+
+    Extract from this part only:
+    1.  **Core Theme/Message**: The main message of this part.
+    2.  **Key Value Propositions**: Benefits or features highlighted, and the problems they solve.
+    3.  **Target Audience**: Who this part is written for.
+    4.  **Key Statistics or Data Points**: Every number, percentage, or concrete data point, verbatim.
+    5.  **Tone of Voice**: The tone of this part.
+
+    Be concise. Write "None" for anything this part does not mention.
+
+    ---
+    TEXT PART {part} OF {total}:
+    {text}
+    ---
+
+    PARTIAL ANALYSIS:
+    """
+
+REDUCE_TEMPLATE = """
+    You are an expert marketing analyst. Below are analyses of consecutive parts of one long product announcement or blog post.
+    Merge them into a single analysis of the whole document for a social media campaign.
+
+    Use exactly these sections:
+    1.  **Core Theme/Message**: What is the single most important message of the whole text?
+    2.  **Key Value Propositions**: List 3-5 unique benefits or features highlighted. What problems do they solve for the user?
+    3.  **Target Audience**: Who is this announcement for? (e.g., developers, marketers, general consumers).
+    4.  **Key Statistics or Data Points**: Keep every distinct number, percentage, or concrete data point; drop duplicates.
+    5.  **Tone of Voice**: Describe the tone of the original text (e.g., formal, casual, technical, enthusiastic).
+
+    Provide the output in a clear, structured format.
+
+    ---
+    PARTIAL ANALYSES:
+    {analyses}
+    ---
+
+    ANALYSIS:
+    """
+
+@functools.lru_cache(maxsize=None)
+def _get_encoder(model_name: str):
+    """Returns a tiktoken encoder for the model, or None if tiktoken or its data is unavailable."""
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logging.warning(f"tiktoken unavailable ({e}); estimating tokens as characters / 4.")
+        return None
+
+def count_tokens(text: str, model_name: str = MODEL_NAME) -> int:
+    """Counts tokens with tiktoken when available, otherwise estimates ~4 characters per token."""
+    encoder = _get_encoder(model_name)
+    if encoder is None:
+        return (len(text) + 3) // 4
+    return len(encoder.encode(text, disallowed_special=()))
+
+def _split_oversized(paragraph: str, chunk_tokens: int) -> list:
+    """Splits a paragraph that alone exceeds the chunk budget on word boundaries."""
+    pieces, current, current_tokens = [], [], 0
+    for word in paragraph.split(" "):
+        tokens = count_tokens(word + " ")
+        if current and current_tokens + tokens > chunk_tokens:
+            pieces.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(word)
+        current_tokens += tokens
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+def split_into_chunks(text: str, chunk_tokens: int = CHUNK_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS) -> list:
+    """
+    Splits text into token-bounded chunks on paragraph (line) boundaries.
+
+    Args:
+        text: The text to split.
+        chunk_tokens: Maximum tokens per chunk.
+        overlap_tokens: Trailing paragraphs worth up to this many tokens are repeated at the start
+            of the next chunk, so facts that span a boundary are not lost.
+
+    Returns:
+        A list of chunk strings.
+    """
+    if overlap_tokens >= chunk_tokens:
+        raise ValueError("overlap_tokens must be smaller than chunk_tokens.")
+
+    paragraphs = []
+    for paragraph in (p.strip() for p in text.split("\n")):
+        if not paragraph:
+            continue
+        tokens = count_tokens(paragraph)
+        if tokens > chunk_tokens:
+            paragraphs.extend((piece, count_tokens(piece)) for piece in _split_oversized(paragraph, chunk_tokens))
+        else:
+            paragraphs.append((paragraph, tokens))
+
+    chunks, current, current_tokens = [], [], 0
+    for paragraph, tokens in paragraphs:
+        if current and current_tokens + tokens > chunk_tokens:
+            chunks.append("\n".join(p for p, _ in current))
+            # Carry the tail of the previous chunk forward as overlap
+            overlap, overlap_total = [], 0
+            for prev, prev_tokens in reversed(current):
+                if overlap_total + prev_tokens > overlap_tokens or overlap_total + prev_tokens + tokens > chunk_tokens:
+                    break
+                overlap.insert(0, (prev, prev_tokens))
+                overlap_total += prev_tokens
+            current, current_tokens = overlap, overlap_total
+        current.append((paragraph, tokens))
+        current_tokens += tokens
+    if current:
+        chunks.append("\n".join(p for p, _ in current))
+    return chunks
+
+def get_llm():
+    """Returns the shared chat model used for analysis."""
+    return llm_registry.get_llm(MODEL_NAME, TEMPERATURE)
+
+def condense_for_analysis(scraped_text: str, token_budget: int = CONDENSE_TOKENS) -> str:
+    """
+    Returns the text analyze_text sends: the condensed text (see nlp.condense) within
+    `token_budget`, or the first MAX_INPUT_CHARS characters when the budget is 0.
+    Tokens saved against sending the truncated text are logged and recorded.
+    """
+    truncated = scraped_text[:MAX_INPUT_CHARS]
+    if not token_budget:
+        return truncated
+    from nlp.condense import condense
+    with span("analyze.condense"):
+        condensed = condense(scraped_text, token_budget)
+    text = condensed.text[:MAX_INPUT_CHARS]
+    saved = count_tokens(truncated) - count_tokens(text)
+    if saved > 0:
+        record_tokens_saved("condense", saved)
+    logging.info(f"Condensed {condensed.input_tokens} tokens of text to {condensed.output_tokens} "
+                 f"({condensed.duplicate_lines} duplicate lines dropped, {max(saved, 0)} prompt tokens saved).")
+    return text
+
+def analyze_text(scraped_text: str, cache=None, condense_tokens: int = 0) -> str:
+    """
+    Analyzes scraped text to extract key themes, value propositions, and statistics.
+
+    Args:
+        scraped_text: The text content from the webpage.
+        cache: Optional ResultCache. Analyses are keyed by the hash of the text sent, prompt, model and temperature.
+        condense_tokens: Token budget of the local pre-summarization, e.g. CONDENSE_TOKENS.
+            The default of 0 sends the first MAX_INPUT_CHARS characters unchanged.
+
+    Returns:
+        A structured analysis of the text.
+    """
+    if not scraped_text:
+        logging.warning("Analysis skipped: input text is empty.")
+        return ""
+
+    if condense_tokens:
+        scraped_text = condense_for_analysis(scraped_text, condense_tokens)
+
+    if cache is not None:
+        key = make_key(text_hash(scraped_text[:MAX_INPUT_CHARS]), ANALYSIS_TEMPLATE, MODEL_NAME, TEMPERATURE)
+        cached = cache.get("analysis", key)
+        if cached is not None:
+            logging.info("Using cached text analysis.")
+            return cached
+        analysis = analyze_text(scraped_text, condense_tokens=0)
+        if analysis and "Error" not in analysis:
+            cache.set("analysis", key, analysis)
+        return analysis
+
+    logging.info("Starting text analysis...")
+
+    # langchain is imported on first use so importing this module stays cheap
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.output_parsers import StrOutputParser
+    prompt = ChatPromptTemplate.from_template(ANALYSIS_TEMPLATE)
     llm = get_llm()
     
     analysis_chain = prompt | llm | StrOutputParser()
     
     try:
         # Truncate text to avoid exceeding token limits, focusing on the most relevant part
-        max_length = 15000  # Approx. 4k tokens
-        truncated_text = scraped_text[:max_length]
+        truncated_text = scraped_text[:MAX_INPUT_CHARS]
 
-        response = analysis_chain.invoke({"text": truncated_text})
+        with span("analyze"):
+            response = analysis_chain.invoke({"text": truncated_text})
         logging.info("Successfully completed text analysis.")
         return response
     except Exception as e:
         logging.error(f"An error occurred during text analysis: {e}")
         return "Error: Could not analyze the text."
+
+def analyze_text_chunked(scraped_text: str, chunk_tokens: int = CHUNK_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+                         max_concurrency: int = CHUNK_CONCURRENCY, cache=None) -> dict:
+    """
+    Analyzes text of any length with a token-aware map-reduce.
+
+    Short documents take the single-call path. Longer ones are split into overlapping chunks on
+    paragraph boundaries, the chunks are analyzed concurrently, and a reduce call merges the partial
+    analyses into the same five-section structure analyze_text produces.
+
+    Args:
+        scraped_text: The text content from the webpage.
+        chunk_tokens: Maximum tokens of source text per chunk.
+        overlap_tokens: Tokens of overlap between consecutive chunks.
+        max_concurrency: Maximum number of chunk analyses in flight at once.
+        cache: Optional ResultCache.
+
+    Returns:
+        A dictionary with "analysis" (the text, or an "Error: ..." string), "chunks" (number of
+        chunks analyzed), "failed_chunks" (chunk analyses that failed and are missing from the
+        merge) and "tokens_sent" (prompt tokens sent to the LLM in total). Analyses with failed
+        chunks are not cached, so the next call tries the whole document again.
+    """
+    if not scraped_text:
+        logging.warning("Analysis skipped: input text is empty.")
+        return {"analysis": "", "chunks": 0, "failed_chunks": 0, "tokens_sent": 0}
+
+    if cache is not None:
+        key = make_key(text_hash(scraped_text), CHUNK_ANALYSIS_TEMPLATE, REDUCE_TEMPLATE, ANALYSIS_TEMPLATE,
+                       MODEL_NAME, TEMPERATURE, chunk_tokens, overlap_tokens)
+        cached = cache.get("analysis_chunked", key)
+        if cached is not None:
+            logging.info("Using cached chunked text analysis.")
+            return dict(cached, failed_chunks=0, tokens_sent=0)
+        result = analyze_text_chunked(scraped_text, chunk_tokens, overlap_tokens, max_concurrency)
+        if result["analysis"] and "Error" not in result["analysis"] and not result["failed_chunks"]:
+            cache.set("analysis_chunked", key, result)
+        return result
+
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.output_parsers import StrOutputParser
+    llm = get_llm()
+    total_tokens = count_tokens(scraped_text)
+
+    try:
+        if total_tokens <= chunk_tokens:
+            # Fast path: the whole document fits in one call
+            prompt = ChatPromptTemplate.from_template(ANALYSIS_TEMPLATE)
+            tokens_sent = count_tokens(prompt.format(text=scraped_text))
+            with span("analyze"):
+                analysis = (prompt | llm | StrOutputParser()).invoke({"text": scraped_text})
+            logging.info(f"Successfully completed text analysis in one call ({tokens_sent} prompt tokens).")
+            return {"analysis": analysis, "chunks": 1, "failed_chunks": 0, "tokens_sent": tokens_sent}
+
+        chunks = split_into_chunks(scraped_text, chunk_tokens, overlap_tokens)
+        logging.info(f"Starting chunked text analysis: {total_tokens} tokens in {len(chunks)} chunks...")
+
+        map_prompt = ChatPromptTemplate.from_template(CHUNK_ANALYSIS_TEMPLATE)
+        inputs = [{"text": chunk, "part": i + 1, "total": len(chunks)} for i, chunk in enumerate(chunks)]
+        tokens_sent = sum(count_tokens(map_prompt.format(**item)) for item in inputs)
+        with span("analyze.map"):
+            partials = (map_prompt | llm | StrOutputParser()).batch(
+                inputs, config={"max_concurrency": max_concurrency}, return_exceptions=True
+            )
+        failed = [p for p in partials if isinstance(p, Exception)]
+        partials = [p for p in partials if not isinstance(p, Exception)]
+        if failed:
+            logging.warning(f"{len(failed)} of {len(chunks)} chunk analyses failed: {failed[0]}")
+        if not partials:
+            raise failed[0]
+
+        reduce_prompt = ChatPromptTemplate.from_template(REDUCE_TEMPLATE)
+        analyses = "\n\n".join(f"--- Part {i + 1} ---\n{p}" for i, p in enumerate(partials))
+        tokens_sent += count_tokens(reduce_prompt.format(analyses=analyses))
+        with span("analyze.reduce"):
+            analysis = (reduce_prompt | llm | StrOutputParser()).invoke({"analyses": analyses})
+
+        logging.info(f"Successfully completed chunked text analysis ({tokens_sent} prompt tokens sent).")
+        return {"analysis": analysis, "chunks": len(chunks), "failed_chunks": len(failed), "tokens_sent": tokens_sent}
+    except Exception as e:
+        logging.error(f"An error occurred during chunked text analysis: {e}")
+        return {"analysis": "Error: Could not analyze the text.", "chunks": 0, "failed_chunks": 0, "tokens_sent": 0}
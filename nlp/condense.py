@@ -0,0 +1,228 @@
+# nlp/condense.py
+"""
+Local extractive pre-summarization of scraped text, run before the analysis prompt.
+
+Scraped pages still carry repeated navigation, legal footers and duplicate paragraphs. This
+stage drops exact and near-duplicate lines, scores the remaining sentences with a
+position-biased TextRank over TF-IDF vectors (NumPy only, no model calls), and keeps the best
+sentences that fit a token budget, in their original order. Sentences with numbers are taken
+first, so the statistics the analysis asks for survive.
+"""
+import re
+import logging
+from dataclasses import dataclass
+import numpy as np
+from nlp.analysis import count_tokens
+
+DEFAULT_TOKEN_BUDGET = 3000
+# Lines sharing at least this fraction of their words (Jaccard) with an earlier line are dropped
+NEAR_DUPLICATE_THRESHOLD = 0.8
+LINE_BLOCK = 512
+DAMPING = 0.85
+TEXTRANK_ITERATIONS = 50
+# Sentences with numbers are kept first, but take at most this share of the budget
+NUMERIC_BUDGET_SHARE = 0.5
+# Sentences past this many are not scored (the similarity matrix grows with its square)
+MAX_SENTENCES = 3000
+# Shorter unpunctuated lines (menu items, buttons, headings) are not candidates
+MIN_FRAGMENT_WORDS = 6
+# Share of the random jump spread evenly; the rest favors earlier sentences
+UNIFORM_JUMP = 0.5
+
+WORD_PATTERN = re.compile(r"\w+")
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+(?=[\"'“(\[]?[A-Z0-9])")
+SENTENCE_END = re.compile(r"[.!?:;][\"')\]”]*$")
+NUMBER_PATTERN = re.compile(r"\d")
+
+
+@dataclass
+class CondensedText:
+    """The condensed text of one document and what condensing it saved."""
+    text: str
+    input_tokens: int
+    output_tokens: int
+    duplicate_lines: int = 0
+    sentences: int = 0
+    kept_sentences: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.input_tokens - self.output_tokens
+
+
+def _vocabulary(token_lists: list) -> tuple:
+    """
+    Maps the words that occur in at least two of the lists to columns; words in only one list
+    cannot make two lists similar, so they are left out of the pairwise products.
+
+    Returns:
+        (columns by word, document frequency of every word).
+    """
+    frequency = {}
+    for tokens in token_lists:
+        for word in set(tokens):
+            frequency[word] = frequency.get(word, 0) + 1
+    shared = sorted(word for word, count in frequency.items() if count > 1)
+    return {word: i for i, word in enumerate(shared)}, frequency
+
+
+def _presence_matrix(token_lists: list, columns: dict) -> np.ndarray:
+    matrix = np.zeros((len(token_lists), len(columns)), dtype=np.float32)
+    for row, tokens in enumerate(token_lists):
+        for word in set(tokens):
+            column = columns.get(word)
+            if column is not None:
+                matrix[row, column] = 1.0
+    return matrix
+
+
+def dedupe_lines(lines: list, threshold: float = NEAR_DUPLICATE_THRESHOLD) -> list:
+    """
+    Drops blank lines, exact repeats (ignoring case and punctuation) and lines whose word set
+    is a near-duplicate of an earlier kept line.
+
+    Returns:
+        The kept lines, stripped, in their original order.
+    """
+    candidates, seen = [], set()
+    for line in lines:
+        line = line.strip()
+        words = WORD_PATTERN.findall(line.lower())
+        key = " ".join(words)
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        candidates.append((line, words))
+    if len(candidates) < 2:
+        return [line for line, _ in candidates]
+
+    word_lists = [words for _, words in candidates]
+    columns, _ = _vocabulary(word_lists)
+    presence = _presence_matrix(word_lists, columns)
+    sizes = np.array([len(set(words)) for words in word_lists], dtype=np.float32)
+    keep = np.zeros(len(candidates), dtype=bool)
+    # Each block of lines is compared with every line before its end, so memory stays
+    # at LINE_BLOCK rows of similarities however long the page is
+    for start in range(0, len(candidates), LINE_BLOCK):
+        end = min(start + LINE_BLOCK, len(candidates))
+        shared = presence[start:end] @ presence[:end].T
+        jaccard = shared / (sizes[start:end, None] + sizes[None, :end] - shared)
+        for i in range(start, end):
+            keep[i] = not np.any(jaccard[i - start, :i][keep[:i]] >= threshold)
+    return [line for (line, _), kept in zip(candidates, keep) if kept]
+
+
+def split_sentences(line: str) -> list:
+    return [sentence for sentence in SENTENCE_BOUNDARY.split(line) if sentence.strip()]
+
+
+def is_fragment(sentence: str) -> bool:
+    """True for short unpunctuated text such as navigation links, buttons and headings."""
+    return not SENTENCE_END.search(sentence.strip()) and len(WORD_PATTERN.findall(sentence)) < MIN_FRAGMENT_WORDS
+
+
+def textrank(token_lists: list, damping: float = DAMPING, iterations: int = TEXTRANK_ITERATIONS) -> np.ndarray:
+    """
+    Scores sentences by TextRank over the cosine similarity of their TF-IDF vectors.
+
+    Half of the random jump favors earlier sentences (weight 1/sqrt(position)), since pages
+    usually lead with their main message; the other half is spread evenly.
+
+    Returns:
+        One score per sentence; the scores sum to 1.
+    """
+    count = len(token_lists)
+    if count == 0:
+        return np.zeros(0)
+    columns, frequency = _vocabulary(token_lists)
+    idf = {word: np.log((1 + count) / (1 + df)) + 1.0 for word, df in frequency.items()}
+    weights = np.zeros((count, len(columns)), dtype=np.float32)
+    norms = np.zeros(count)
+    for row, tokens in enumerate(token_lists):
+        counts = {}
+        for word in tokens:
+            counts[word] = counts.get(word, 0) + 1
+        # The norm covers every word, the matrix only the shared ones
+        norms[row] = np.sqrt(sum((tf * idf[word]) ** 2 for word, tf in counts.items()))
+        for word, tf in counts.items():
+            column = columns.get(word)
+            if column is not None:
+                weights[row, column] = tf * idf[word]
+    weights /= np.maximum(norms, 1e-12)[:, None]
+    similarity = weights @ weights.T
+    np.fill_diagonal(similarity, 0.0)
+    totals = similarity.sum(axis=1, keepdims=True)
+    # A sentence similar to nothing spreads its score evenly
+    transition = np.divide(similarity, totals, out=np.full_like(similarity, 1.0 / count), where=totals > 0)
+
+    jump = 1.0 / np.sqrt(np.arange(1, count + 1))
+    jump = UNIFORM_JUMP / count + (1 - UNIFORM_JUMP) * jump / jump.sum()
+    scores = jump.copy()
+    for _ in range(iterations):
+        updated = (1 - damping) * jump + damping * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < 1e-7:
+            return updated
+        scores = updated
+    return scores
+
+
+def condense(text: str, token_budget: int = DEFAULT_TOKEN_BUDGET) -> CondensedText:
+    """
+    Shrinks scraped text to at most `token_budget` tokens of its most important sentences.
+
+    Duplicate lines are always removed. If what is left fits the budget it is returned whole;
+    otherwise navigation-like fragments are dropped, sentences with numbers are taken first (best TextRank score first, up to
+    NUMERIC_BUDGET_SHARE of the budget), then the rest by score, and the chosen sentences are
+    joined back in document order, one line per source line.
+
+    Args:
+        text: The scraped text, one paragraph per line.
+        token_budget: The most tokens the result may have.
+
+    Returns:
+        A CondensedText with the text and its token counts before and after.
+    """
+    if not text:
+        return CondensedText(text="", input_tokens=0, output_tokens=0)
+    input_tokens = count_tokens(text)
+    raw_lines = [line for line in text.split("\n") if line.strip()]
+    lines = dedupe_lines(raw_lines)
+    deduped = "\n".join(lines)
+    duplicate_lines = len(raw_lines) - len(lines)
+    deduped_tokens = count_tokens(deduped)
+    if deduped_tokens <= token_budget:
+        return CondensedText(deduped, input_tokens, deduped_tokens, duplicate_lines)
+
+    sentences = [(line_number, sentence) for line_number, line in enumerate(lines)
+                 for sentence in split_sentences(line) if not is_fragment(sentence)][:MAX_SENTENCES]
+    scores = textrank([WORD_PATTERN.findall(sentence.lower()) for _, sentence in sentences])
+    costs = [count_tokens(sentence) + 1 for _, sentence in sentences]
+    numeric = [bool(NUMBER_PATTERN.search(sentence)) for _, sentence in sentences]
+    ranked = np.argsort(-scores, kind="stable")
+
+    chosen, used = set(), 0
+    numeric_budget = int(token_budget * NUMERIC_BUDGET_SHARE)
+    for i in ranked:
+        if numeric[i] and used + costs[i] <= numeric_budget:
+            chosen.add(i)
+            used += costs[i]
+    for i in ranked:
+        if i not in chosen and used + costs[i] <= token_budget:
+            chosen.add(i)
+            used += costs[i]
+
+    kept_lines, current_line = [], None
+    for i in sorted(chosen):
+        line_number, sentence = sentences[i]
+        if line_number == current_line:
+            kept_lines[-1] += " " + sentence
+        else:
+            kept_lines.append(sentence)
+            current_line = line_number
+    # Only sentences longer than the whole budget: fall back to the head of the text
+    condensed = "\n".join(kept_lines) if kept_lines else deduped[:token_budget * 4]
+    result = CondensedText(condensed, input_tokens, count_tokens(condensed), duplicate_lines,
+                           len(sentences), len(chosen))
+    logging.debug(f"Condensed {input_tokens} tokens to {result.output_tokens}: dropped {duplicate_lines} duplicate "
+                  f"lines and kept {len(chosen)} of {len(sentences)} sentences.")
+    return result
@@ -0,0 +1,387 @@
+# pipeline/batch.py
+import sys
+import math
+import json
+import time
+import asyncio
+import logging
+import argparse
+import functools
+import contextvars
+from dataclasses import dataclass, field, asdict
+from concurrent.futures import ThreadPoolExecutor
+from telemetry.logs import configure_logging
+from telemetry.metrics import configure_exporters, record_run
+
+STAGES = ("scrape", "analyze", "generate")
+DEFAULT_WORKERS = {"scrape": 16, "analyze": 4, "generate": 4}
+
+
+class StageError(Exception):
+    """Raised when a pipeline stage produces no usable output for a URL."""
+
+
+@dataclass
+class BatchResult:
+    """The outcome of running one URL through the pipeline."""
+    url: str
+    analysis: str = ""
+    posts: list = field(default_factory=list)
+    error: str = ""
+    failed_stage: str = ""
+    timings: dict = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return not self.error
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def percentile(values: list, pct: float) -> float:
+    """Returns the nearest-rank percentile of `values` (0.0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class PipelineStats:
+    """
+    Collects per-stage latencies and success counts for a batch run.
+    """
+    def __init__(self):
+        self.started_at = None
+        self.finished_at = None
+        self.latencies = {stage: [] for stage in STAGES}
+        self.succeeded = 0
+        self.failed = 0
+        self.failures_by_stage = {stage: 0 for stage in STAGES}
+
+    def start(self):
+        self.started_at = time.perf_counter()
+
+    def finish(self):
+        self.finished_at = time.perf_counter()
+
+    def record_stage(self, stage: str, seconds: float):
+        self.latencies[stage].append(seconds)
+
+    def record_result(self, result: BatchResult):
+        if result.ok:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+            self.failures_by_stage[result.failed_stage] += 1
+
+    def summary(self) -> dict:
+        """
+        Summarizes throughput and latency for the run.
+
+        Returns:
+            A dictionary with URL counts, URLs/min and p50/p90/p99 latencies (in seconds) per stage.
+        """
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        elapsed = (end - self.started_at) if self.started_at is not None else 0.0
+        total = self.succeeded + self.failed
+        stages = {}
+        for stage, values in self.latencies.items():
+            stages[stage] = {
+                "count": len(values),
+                "failed": self.failures_by_stage[stage],
+                "mean": sum(values) / len(values) if values else 0.0,
+                "p50": percentile(values, 50),
+                "p90": percentile(values, 90),
+                "p99": percentile(values, 99),
+            }
+        return {
+            "urls": total,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "elapsed_seconds": elapsed,
+            "urls_per_minute": (total / elapsed * 60.0) if elapsed > 0 else 0.0,
+            "stages": stages,
+        }
+
+
+def default_stage_functions(cache=None, chunked: bool = False, parallel_generation: bool = False) -> dict:
+    """
+    Imports the real stage functions lazily so the pipeline can be driven with stubs.
+
+    Args:
+        cache: Optional ResultCache passed through to every stage.
+        chunked: Use the token-aware map-reduce analysis instead of the truncating single call.
+        parallel_generation: Request each platform's posts concurrently instead of in one completion.
+    """
+    from scraper.scraper import scrape_text_from_url
+    from nlp.analysis import analyze_text, analyze_text_chunked
+    from agent.content_genrator import generate_campaign_content, generate_campaign_content_parallel
+
+    def analyze_chunked(text):
+        return analyze_text_chunked(text, cache=cache)["analysis"]
+
+    return {
+        "scrape": functools.partial(scrape_text_from_url, cache=cache),
+        "analyze": analyze_chunked if chunked else functools.partial(analyze_text, cache=cache),
+        "generate": functools.partial(
+            generate_campaign_content_parallel if parallel_generation else generate_campaign_content, cache=cache
+        ),
+    }
+
+
+def _make_steps(functions: dict) -> dict:
+    """
+    Wraps the stage functions so each one takes (result, payload) and returns the next payload.
+    The existing stage functions signal failure with empty values rather than exceptions,
+    so those are turned into StageError here.
+    """
+    def scrape(result, _payload):
+        text = functions["scrape"](result.url)
+        if not text:
+            raise StageError("no text could be scraped")
+        return text
+
+    def analyze(result, text):
+        analysis = functions["analyze"](text)
+        if not analysis or "Error" in analysis:
+            raise StageError("analysis failed")
+        result.analysis = analysis
+        return analysis
+
+    def generate(result, analysis):
+        posts = functions["generate"](analysis, result.url)
+        if not posts:
+            raise StageError("content generation failed")
+        result.posts = posts
+        return posts
+
+    return {"scrape": scrape, "analyze": analyze, "generate": generate}
+
+
+async def iter_batch(urls, workers: dict = None, stats: PipelineStats = None, functions: dict = None):
+    """
+    Runs scrape -> analyze -> generate over many URLs as a bounded-concurrency pipeline.
+
+    Each stage has its own worker limit and a bounded input queue, so a slow stage applies
+    back-pressure instead of buffering thousands of scraped pages in memory. A failure on one
+    URL is recorded on its result and does not stop the others.
+
+    Args:
+        urls: An iterable of URLs. It is consumed lazily.
+        workers: Optional per-stage worker limits, e.g. {"scrape": 32, "analyze": 8}.
+        stats: Optional PipelineStats that receives per-stage latencies.
+        functions: Optional overrides for the "scrape", "analyze" and "generate" callables.
+
+    Yields:
+        BatchResult objects in completion order.
+    """
+    limits = dict(DEFAULT_WORKERS)
+    limits.update(workers or {})
+    for stage in STAGES:
+        if limits[stage] < 1:
+            raise ValueError(f"Worker limit for stage '{stage}' must be at least 1.")
+
+    stage_functions = functions if functions is not None else {}
+    if any(stage not in stage_functions for stage in STAGES):
+        stage_functions = {**default_stage_functions(), **stage_functions}
+    steps = _make_steps(stage_functions)
+    stats = stats if stats is not None else PipelineStats()
+    if stats.started_at is None:
+        stats.start()
+
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=sum(limits[stage] for stage in STAGES),
+                                  thread_name_prefix="pipeline")
+    queues = {stage: asyncio.Queue(maxsize=limits[stage] * 2) for stage in STAGES}
+    output = asyncio.Queue()
+    done = object()
+
+    async def feed():
+        for url in urls:
+            url = url.strip()
+            if url:
+                await queues["scrape"].put((BatchResult(url=url), None))
+        for _ in range(limits["scrape"]):
+            await queues["scrape"].put(None)
+
+    async def worker(index: int):
+        stage = STAGES[index]
+        next_queue = queues[STAGES[index + 1]] if index + 1 < len(STAGES) else None
+        while True:
+            item = await queues[stage].get()
+            if item is None:
+                return
+            result, payload = item
+            started = time.perf_counter()
+            try:
+                # Run in this task's context so telemetry is attributed to the active run
+                payload = await loop.run_in_executor(
+                    executor, functools.partial(contextvars.copy_context().run, steps[stage], result, payload)
+                )
+            except Exception as e:
+                result.error = str(e) or e.__class__.__name__
+                result.failed_stage = stage
+                logging.warning(f"Pipeline stage '{stage}' failed for {result.url}: {result.error}")
+            elapsed = time.perf_counter() - started
+            result.timings[stage] = elapsed
+            stats.record_stage(stage, elapsed)
+
+            if result.ok and next_queue is not None:
+                await next_queue.put((result, payload))
+            else:
+                stats.record_result(result)
+                await output.put(result)
+
+    async def run_stage(index: int):
+        stage = STAGES[index]
+        await asyncio.gather(*(worker(index) for _ in range(limits[stage])))
+        if index + 1 < len(STAGES):
+            next_stage = STAGES[index + 1]
+            for _ in range(limits[next_stage]):
+                await queues[next_stage].put(None)
+        else:
+            await output.put(done)
+
+    tasks = [asyncio.ensure_future(feed())]
+    tasks += [asyncio.ensure_future(run_stage(i)) for i in range(len(STAGES))]
+    try:
+        while True:
+            item = await output.get()
+            if item is done:
+                break
+            yield item
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+        stats.finish()
+
+
+def run_batch(urls, workers: dict = None, on_result=None, functions: dict = None) -> dict:
+    """
+    Synchronous wrapper around iter_batch.
+
+    Args:
+        urls: An iterable of URLs.
+        workers: Optional per-stage worker limits.
+        on_result: Optional callback invoked with each BatchResult as soon as it finishes.
+        functions: Optional overrides for the stage callables.
+
+    Returns:
+        The throughput summary from PipelineStats.summary(), with the run's token usage,
+        cost, cache and retry counts under "telemetry".
+    """
+    stats = PipelineStats()
+
+    async def consume():
+        async for result in iter_batch(urls, workers=workers, stats=stats, functions=functions):
+            if on_result is not None:
+                on_result(result)
+
+    with record_run() as run:
+        asyncio.run(consume())
+    summary = stats.summary()
+    summary["telemetry"] = run.summary()
+    return summary
+
+
+def read_urls(path: str):
+    """Yields URLs from a file (or stdin for "-"), skipping blank lines and # comments."""
+    handle = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        for line in handle:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+
+def format_summary(summary: dict) -> str:
+    """Renders a summary dictionary as a short human-readable report."""
+    lines = [
+        f"URLs: {summary['urls']} (succeeded: {summary['succeeded']}, failed: {summary['failed']})",
+        f"Elapsed: {summary['elapsed_seconds']:.1f}s, throughput: {summary['urls_per_minute']:.1f} URLs/min",
+    ]
+    for stage, s in summary["stages"].items():
+        lines.append(
+            f"  {stage:<9} n={s['count']:<6} failed={s['failed']:<5} "
+            f"p50={s['p50']:.2f}s p90={s['p90']:.2f}s p99={s['p99']:.2f}s"
+        )
+    telemetry = summary.get("telemetry")
+    if telemetry:
+        lines.append(
+            f"LLM: {telemetry['llm_calls']} calls, {telemetry['prompt_tokens']} prompt + "
+            f"{telemetry['completion_tokens']} completion tokens (~${telemetry['cost_usd']:.4f}); "
+            f"cache: {telemetry['cache_hits']} hits / {telemetry['cache_misses']} misses; "
+            f"retries: {telemetry['retries']}"
+        )
+    return "\n".join(lines)
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Run the campaign pipeline over many URLs.")
+    parser.add_argument("urls", nargs="*", help="URLs to process.")
+    parser.add_argument("-f", "--file", action="append", default=[],
+                        help="File with one URL per line ('-' for stdin). May be repeated.")
+    parser.add_argument("-o", "--output", default="-",
+                        help="Where to write JSONL results as they finish (default: stdout).")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Bypass the on-disk page/analysis/campaign cache.")
+    parser.add_argument("--chunked", action="store_true",
+                        help="Analyze full documents with token-aware chunking instead of truncating them.")
+    parser.add_argument("--parallel-generation", action="store_true",
+                        help="Generate each platform's posts with a separate concurrent LLM request.")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this port while running.")
+    parser.add_argument("--metrics-file", help="Append spans and the run summary to this JSONL file.")
+    for stage in STAGES:
+        parser.add_argument(f"--{stage}-workers", type=int, default=DEFAULT_WORKERS[stage],
+                            help=f"Concurrent {stage} workers (default: {DEFAULT_WORKERS[stage]}).")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_arg_parser().parse_args(argv)
+    configure_logging()
+    configure_exporters(port=args.metrics_port, jsonl_path=args.metrics_file)
+    from llm.limiter import set_default_priority
+    # Headless runs queue behind interactive sessions for the shared LLM rate limits
+    set_default_priority("batch")
+
+    def sources():
+        yield from args.urls
+        for path in args.file:
+            yield from read_urls(path)
+
+    if not args.urls and not args.file:
+        print("Error: no URLs given. Pass URLs or --file.", file=sys.stderr)
+        return 2
+
+    workers = {stage: getattr(args, f"{stage}_workers") for stage in STAGES}
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        def write(result: BatchResult):
+            out.write(json.dumps(result.to_dict()) + "\n")
+            out.flush()
+
+        cache = None
+        if not args.no_cache:
+            from cache.store import get_default_cache
+            cache = get_default_cache()
+        functions = default_stage_functions(cache=cache, chunked=args.chunked,
+                                            parallel_generation=args.parallel_generation)
+        summary = run_batch(sources(), workers=workers, on_result=write, functions=functions)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print(format_summary(summary), file=sys.stderr)
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
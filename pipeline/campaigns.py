@@ -0,0 +1,102 @@
+# pipeline/campaigns.py
+"""
+Incremental regeneration of a campaign.
+
+A campaign is everything scheduled from one source URL. Regenerating it re-scrapes the page
+and compares the text hash with the one stored for the campaign: if the page has not changed,
+nothing is sent to the LLM. If it has, the page is re-analyzed and every platform regenerated;
+requesting specific platforms regenerates only those from the stored analysis. New posts
+replace the campaign's posts that have not gone out yet, leaving other campaigns alone, and
+are placed into the next free time slots.
+"""
+import logging
+import functools
+
+UNCHANGED = "unchanged"
+REGENERATED = "regenerated"
+FAILED = "failed"
+
+
+def default_functions(cache=None) -> dict:
+    """
+    The real scrape/analyze/generate callables, imported lazily so tests can pass stubs.
+
+    The page is always fetched fresh, since its hash decides whether anything changed. Analysis
+    may come from `cache`; generation never does, so regenerating yields new posts.
+    """
+    from scraper.scraper import scrape_text_from_url
+    from nlp.analysis import analyze_text
+    from agent.content_genrator import generate_campaign_content_parallel
+    return {
+        "scrape": scrape_text_from_url,
+        "analyze": functools.partial(analyze_text, cache=cache),
+        "generate": generate_campaign_content_parallel,
+    }
+
+
+def regenerate_campaign(url: str, scheduler=None, platforms=None, force: bool = False,
+                        functions: dict = None, dedup_policy: str = "reject") -> dict:
+    """
+    Regenerates the campaign for a URL if its page changed, or only the given platforms.
+
+    Args:
+        url: The campaign's source page.
+        scheduler: The scheduler holding the campaign (default: get_scheduler()).
+        platforms: Regenerate only these platforms, even if the page is unchanged.
+        force: Regenerate every platform even if the page is unchanged.
+        functions: Optional overrides for the "scrape", "analyze" and "generate" callables;
+            "generate" is called as generate(analysis, url, platforms).
+        dedup_policy: How new posts resembling already-sent ones are handled (see DEDUP_POLICIES).
+
+    Returns:
+        A dictionary with "campaign_id", "status" (unchanged, regenerated or failed),
+        "platforms" (those regenerated), "scheduled" (posts scheduled) and "error".
+    """
+    from cache.store import text_hash
+    from agent.content_genrator import PLATFORMS
+    if scheduler is None:
+        from scheduler.scheduler import get_scheduler
+        scheduler = get_scheduler()
+    functions = functions if functions is not None else {}
+    if any(step not in functions for step in ("scrape", "analyze", "generate")):
+        functions = {**default_functions(), **functions}
+    campaign = scheduler.get_campaign(url=url)
+    result = {"campaign_id": campaign["id"] if campaign else None, "status": FAILED,
+              "platforms": [], "scheduled": 0, "error": ""}
+
+    text = functions["scrape"](url)
+    if not text:
+        result["error"] = "no text could be scraped"
+        return result
+    digest = text_hash(text)
+    changed = campaign is None or campaign["content_hash"] != digest or not campaign["analysis"]
+    if not changed and not force and not platforms:
+        logging.info(f"{url} is unchanged since its campaign was generated; nothing to regenerate.")
+        result["status"] = UNCHANGED
+        return result
+
+    if changed or force:
+        analysis = functions["analyze"](text)
+        if not analysis or "Error" in analysis:
+            result["error"] = "analysis failed"
+            return result
+    else:
+        analysis = campaign["analysis"]
+    # A changed page invalidates every platform's posts, not just the requested ones
+    targets = tuple(platforms) if platforms and not changed else tuple(PLATFORMS)
+
+    posts = functions["generate"](analysis, url, targets)
+    if not posts:
+        result["error"] = "content generation failed"
+        return result
+    campaign_id = scheduler.save_campaign(url, digest, analysis)
+    if campaign_id is None:
+        result["error"] = "the campaign could not be saved"
+        return result
+    result.update(
+        campaign_id=campaign_id, status=REGENERATED, platforms=list(targets),
+        scheduled=scheduler.replace_campaign_posts(campaign_id, posts, platforms=targets, dedup_policy=dedup_policy,
+                                                   allocate=True),
+    )
+    logging.info(f"Regenerated {', '.join(targets)} for {url}: {result['scheduled']} posts scheduled.")
+    return result
@@ -0,0 +1,126 @@
+# pipeline/feeds.py
+"""
+Launches campaigns automatically for new posts on the sitemaps and RSS/Atom feeds being watched.
+
+Each poll fetches the registered feeds, downloads only the pages that are new or whose lastmod
+changed since they were last seen (scraper.crawler), and regenerates each page's campaign
+(pipeline.campaigns), which analyzes it, generates posts and schedules them into free slots.
+A page whose text turns out unchanged costs no LLM calls.
+
+Usage:
+    python cli.py crawl --add https://blog.example.com/sitemap.xml --once
+    python cli.py crawl --interval 900
+"""
+import sys
+import json
+import asyncio
+import argparse
+from telemetry.logs import configure_logging
+from telemetry.metrics import configure_exporters, record_run
+
+DEFAULT_INTERVAL = 900.0
+DEFAULT_LIMIT = 100
+DEFAULT_WORKERS = 4
+
+
+def campaign_processor(scheduler, cache=None, dedup_policy: str = "reject"):
+    """
+    Returns a crawler callback that regenerates the campaign of each page it is given.
+
+    The crawler has already downloaded the page, so its text is used instead of scraping again.
+    """
+    from pipeline.campaigns import regenerate_campaign, default_functions, FAILED
+    functions = default_functions(cache)
+
+    def process(url: str, text: str) -> bool:
+        result = regenerate_campaign(url, scheduler, functions={**functions, "scrape": lambda _url: text},
+                                     dedup_policy=dedup_policy)
+        return result["status"] != FAILED
+
+    return process
+
+
+async def crawl_forever(crawler, process, interval: float = DEFAULT_INTERVAL, limit: int = DEFAULT_LIMIT,
+                        workers: int = DEFAULT_WORKERS, stop_event: asyncio.Event = None):
+    """Crawls every `interval` seconds, or again straight away while pages are still pending."""
+    stop_event = stop_event or asyncio.Event()
+    while not stop_event.is_set():
+        stats = await crawler.crawl(process, limit=limit, workers=workers)
+        if stats["processed"] + stats["failed_pages"] + stats["blocked_pages"] >= limit:
+            continue
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+def main(argv=None) -> int:
+    from scheduler.scheduler import DB_FILE
+    parser = argparse.ArgumentParser(description="Generate campaigns for new pages on watched sitemaps and feeds.")
+    parser.add_argument("--db", default=DB_FILE, help=f"SQLite database file (default: {DB_FILE}).")
+    parser.add_argument("--add", action="append", default=[], metavar="FEED_URL",
+                        help="Watch this sitemap, sitemap index, RSS or Atom feed (repeatable).")
+    parser.add_argument("--remove", action="append", default=[], metavar="FEED_URL", help="Stop watching a feed.")
+    parser.add_argument("--backfill", action="store_true",
+                        help="Also process the pages newly added feeds already list (default: only later ones).")
+    parser.add_argument("--list", action="store_true", help="Print the watched feeds and page counts, then exit.")
+    parser.add_argument("--once", action="store_true", help="Crawl once and exit.")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL,
+                        help=f"Seconds between polls (default: {DEFAULT_INTERVAL:.0f}).")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT, help="Most pages processed per poll.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Pages processed at once.")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the on-disk result cache.")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this port.")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    from scraper.crawler import CrawlFrontier, FeedCrawler
+    frontier = CrawlFrontier(args.db)
+    for url in args.add:
+        frontier.add_feed(url, backfill=args.backfill)
+    for url in args.remove:
+        frontier.remove_feed(url)
+    if args.list:
+        print(json.dumps({"feeds": frontier.feeds(), "pages": frontier.counts()}, indent=2))
+        return 0
+    if not frontier.feeds():
+        print("Error: no feeds are being watched. Add one with --add.", file=sys.stderr)
+        return 2
+
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+    configure_exporters(port=args.metrics_port)
+    from llm.limiter import set_default_priority
+    # Headless runs queue behind interactive sessions for the shared LLM rate limits
+    set_default_priority("batch")
+    from scheduler.scheduler import get_scheduler
+    cache = None
+    if not args.no_cache:
+        from cache.store import get_default_cache
+        cache = get_default_cache()
+    process = campaign_processor(get_scheduler(args.db), cache)
+
+    async def run():
+        crawler = FeedCrawler(frontier)
+        try:
+            if args.once:
+                return await crawler.crawl(process, limit=args.limit, workers=args.workers)
+            await crawl_forever(crawler, process, args.interval, args.limit, args.workers)
+        finally:
+            await crawler.close()
+
+    try:
+        with record_run():
+            stats = asyncio.run(run())
+    except KeyboardInterrupt:
+        return 0
+    if stats is not None:
+        print(json.dumps(stats, indent=2))
+    return 1 if stats and (stats["failed"] or stats["failed_pages"]) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
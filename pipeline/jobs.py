@@ -0,0 +1,434 @@
+# pipeline/jobs.py
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timedelta
+from scheduler.storage import SQLiteStorage, StorageBackend
+from pipeline.batch import STAGES, BatchResult, StageError, _make_steps, default_stage_functions
+from telemetry.metrics import record_run
+
+JOB_STATUSES = ("queued", "running", "done", "failed")
+ACTIVE_STATUSES = ("queued", "running")
+DEFAULT_JOB_WORKERS = 2
+DEFAULT_LEASE_SECONDS = 300
+# Claims a job may use up before a job that keeps killing its worker is failed instead of run again
+MAX_JOB_ATTEMPTS = 3
+
+# What each finished stage leaves behind for the next one when a job resumes
+STAGE_OUTPUT_COLUMNS = {"scrape": "scraped_text", "analyze": "analysis"}
+
+# The stage a job is on, given the last one it finished
+_NEXT_STAGE_SQL = "CASE WHEN stage IS NULL THEN '{}' {} END".format(
+    STAGES[0], " ".join(f"WHEN stage = '{done}' THEN '{next_}'" for done, next_ in zip(STAGES, STAGES[1:]))
+)
+
+
+class LostClaimError(Exception):
+    """Raised when a worker writes to a job it no longer holds, e.g. after its lease expired and another worker took it."""
+
+
+def _timestamp(value: datetime = None) -> str:
+    return (value or datetime.now()).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def dedup_key(url: str, options: dict) -> str:
+    """The key that identifies duplicate submissions: the normalized URL plus the job options."""
+    from cache.store import normalize_url, make_key
+    return make_key(normalize_url(url), json.dumps(options, sort_keys=True))
+
+
+class JobStore:
+    """
+    A persistent job queue stored in the scheduler's SQLite database.
+
+    Each job records the last pipeline stage it finished along with that stage's output,
+    so a job interrupted by a restart resumes from there instead of starting over.
+    """
+    def __init__(self, db_file: str = None, storage: StorageBackend = None):
+        if storage is None:
+            from scheduler.scheduler import DB_FILE
+            storage = SQLiteStorage(db_file or DB_FILE)
+        self.storage = storage
+        self._ready = False
+
+    @property
+    def conn(self):
+        return self.storage.connection()
+
+    def initialize_db(self):
+        """Creates the jobs table and its indexes, which are part of the scheduler's schema migrations."""
+        if self._ready:
+            return
+        from scheduler.scheduler import MockScheduler
+        MockScheduler(storage=self.storage).initialize_db()
+        self._ready = self.storage.schema_ready
+
+    def submit(self, url: str, options: dict = None) -> tuple:
+        """
+        Queues a pipeline run for a URL, unless the same URL and options are already in flight.
+
+        Args:
+            url: The page to scrape.
+            options: JSON-serializable job options, e.g. {"use_cache": True, "chunked": False}.
+
+        Returns:
+            A (job_id, created) tuple; `created` is False when an in-flight job was reused.
+        """
+        self.initialize_db()
+        options = options or {}
+        key = dedup_key(url, options)
+        with self.storage.write_transaction() as conn:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE dedup_key = ? AND status IN ('queued', 'running')", (key,)
+            ).fetchone()
+            if row:
+                logging.info(f"Reusing in-flight job {row['id']} for {url}")
+                return row['id'], False
+            job_id = uuid.uuid4().hex
+            now = _timestamp()
+            conn.execute(
+                "INSERT INTO jobs (id, url, dedup_key, options, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, url, key, json.dumps(options), now, now)
+            )
+        logging.info(f"Queued job {job_id} for {url}")
+        return job_id, True
+
+    @staticmethod
+    def _row_to_job(row) -> dict:
+        job = dict(row)
+        job['options'] = json.loads(job['options'] or '{}')
+        job['posts'] = json.loads(job['posts']) if job['posts'] else []
+        job['metrics'] = json.loads(job['metrics']) if job['metrics'] else {}
+        done = STAGES.index(job['stage']) + 1 if job['stage'] else 0
+        job['progress'] = 1.0 if job['status'] == 'done' else done / len(STAGES)
+        return job
+
+    def get(self, job_id: str) -> dict:
+        """Returns a job as a dictionary (with a 0-1 `progress`), or None if it does not exist."""
+        self.initialize_db()
+        row = self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def list_jobs(self, status: str = None, limit: int = 50) -> list:
+        """Returns the most recent jobs, optionally filtered by status."""
+        self.initialize_db()
+        if status is not None:
+            rows = self.conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?", (status, limit)
+            )
+        else:
+            rows = self.conn.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,))
+        return [self._row_to_job(row) for row in rows.fetchall()]
+
+    def claim(self, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS, now: datetime = None,
+              max_attempts: int = MAX_JOB_ATTEMPTS) -> dict:
+        """
+        Atomically claims the oldest queued job, or a running job whose worker stopped
+        heartbeating more than `lease_seconds` ago (e.g. after a crash or restart).
+
+        Every claim counts as an attempt. An abandoned job that has already been claimed
+        `max_attempts` times is marked failed instead, so a job that keeps crashing its
+        worker is not retried forever.
+
+        Returns:
+            The claimed job, or None if there is nothing to do.
+        """
+        self.initialize_db()
+        now = now or datetime.now()
+        cutoff = _timestamp(now - timedelta(seconds=lease_seconds))
+        stamp = _timestamp(now)
+        with self.conn:
+            abandoned = self.conn.execute(
+                f"""
+                UPDATE jobs
+                SET status = 'failed', failed_stage = {_NEXT_STAGE_SQL},
+                    error = 'Gave up after ' || attempts || ' attempts', updated_at = ?
+                WHERE status = 'running' AND heartbeat_at < ? AND attempts >= ?
+                RETURNING id
+                """,
+                (stamp, cutoff, max_attempts)
+            ).fetchall()
+            for job in abandoned:
+                logging.error(f"Job {job['id']} failed after {max_attempts} attempts")
+            row = self.conn.execute(
+                """
+                UPDATE jobs
+                SET status = 'running', claimed_by = ?, heartbeat_at = ?, updated_at = ?, attempts = attempts + 1
+                WHERE id = (
+                    SELECT id FROM jobs
+                    WHERE status = 'queued' OR (status = 'running' AND heartbeat_at < ?)
+                    ORDER BY created_at ASC
+                    LIMIT 1
+                )
+                RETURNING *
+                """,
+                (worker_id, stamp, stamp, cutoff)
+            ).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def _update_claimed(self, job_id: str, worker_id: str, assignments: str, params: tuple):
+        """
+        Updates a running job only while `worker_id` still holds it.
+
+        Raises:
+            LostClaimError: If the job was reclaimed by another worker or is no longer running.
+        """
+        with self.conn:
+            cursor = self.conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ? AND claimed_by = ? AND status = 'running'",
+                (*params, job_id, worker_id)
+            )
+        if cursor.rowcount == 0:
+            raise LostClaimError(f"Job {job_id} is no longer claimed by {worker_id}")
+
+    def heartbeat(self, job_id: str, worker_id: str):
+        """Refreshes the heartbeat of a job `worker_id` is running, so its lease does not expire."""
+        self._update_claimed(job_id, worker_id, "heartbeat_at = ?", (_timestamp(),))
+
+    def record_stage(self, job_id: str, worker_id: str, stage: str, output=None):
+        """
+        Saves a finished stage (and its output, if the next stage needs it) and refreshes the heartbeat.
+        The hash of the scraped text is kept after the text is dropped, for the job's campaign.
+        """
+        stamp = _timestamp()
+        column = STAGE_OUTPUT_COLUMNS.get(stage)
+        if stage == "scrape" and output:
+            from cache.store import text_hash
+            self._update_claimed(job_id, worker_id,
+                                 "stage = ?, scraped_text = ?, content_hash = ?, heartbeat_at = ?, updated_at = ?",
+                                 (stage, output, text_hash(output), stamp, stamp))
+        elif column:
+            self._update_claimed(job_id, worker_id, f"stage = ?, {column} = ?, heartbeat_at = ?, updated_at = ?",
+                                 (stage, output, stamp, stamp))
+        else:
+            self._update_claimed(job_id, worker_id, "stage = ?, heartbeat_at = ?, updated_at = ?",
+                                 (stage, stamp, stamp))
+
+    def complete(self, job_id: str, worker_id: str, posts: list, metrics: dict = None):
+        """
+        Marks a job done with its generated posts and run metrics.
+        Scraped text is dropped to keep the table small.
+        """
+        stamp = _timestamp()
+        self._update_claimed(
+            job_id, worker_id,
+            "status = 'done', stage = ?, posts = ?, metrics = ?, scraped_text = NULL, error = NULL, "
+            "heartbeat_at = ?, updated_at = ?",
+            (STAGES[-1], json.dumps(posts, default=str), json.dumps(metrics or {}), stamp, stamp)
+        )
+
+    def record_partial_posts(self, job_id: str, worker_id: str, posts: list):
+        """Saves the posts generated so far, so pollers can preview a campaign while it streams."""
+        stamp = _timestamp()
+        self._update_claimed(job_id, worker_id, "posts = ?, heartbeat_at = ?, updated_at = ?",
+                             (json.dumps(posts, default=str), stamp, stamp))
+
+    def fail(self, job_id: str, worker_id: str, stage: str, error: str, metrics: dict = None):
+        """Marks a job failed at `stage`."""
+        self._update_claimed(job_id, worker_id, "status = 'failed', failed_stage = ?, error = ?, metrics = ?, "
+                             "updated_at = ?", (stage, error, json.dumps(metrics or {}), _timestamp()))
+
+
+class JobHeartbeat:
+    """
+    Refreshes a claimed job's heartbeat from a background thread while a stage runs,
+    so long scrapes and LLM calls do not outlive the lease.
+    """
+    def __init__(self, store: JobStore, job_id: str, worker_id: str, interval: float):
+        self.store = store
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.interval = interval
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._beat, name=f"{worker_id}-heartbeat", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _beat(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.store.heartbeat(self.job_id, self.worker_id)
+            except LostClaimError:
+                logging.warning(f"Job {self.job_id} was reclaimed while {self.worker_id} was running it")
+                self.lost.set()
+                return
+            except sqlite3.Error as e:
+                logging.error(f"Error refreshing the heartbeat of job {self.job_id}: {e}")
+
+
+def job_stage_functions(store: JobStore, job: dict) -> dict:
+    """
+    Builds the stage callables for a job from its options. Unless parallel generation is
+    requested, posts are streamed and saved to the job as each one is parsed, then the ones
+    that break their platform's rules are repaired.
+    """
+    options = job['options']
+    cache = None
+    if options.get("use_cache", True):
+        from cache.store import get_default_cache
+        cache = get_default_cache()
+    parallel = options.get("parallel_generation", False)
+    functions = default_stage_functions(cache=cache, chunked=options.get("chunked", False),
+                                        parallel_generation=parallel)
+    if not parallel:
+        from agent.content_genrator import stream_campaign_content
+        from agent.validation import repair_posts
+
+        def generate(analysis, url):
+            posts = []
+            for post in stream_campaign_content(analysis, url, cache=cache):
+                posts.append(post)
+                store.record_partial_posts(job['id'], job['claimed_by'], posts)
+            return repair_posts(posts, analysis, url) if posts else posts
+
+        functions["generate"] = generate
+    return functions
+
+
+def run_job(store: JobStore, job: dict, functions: dict = None, lease_seconds: float = DEFAULT_LEASE_SECONDS):
+    """
+    Runs the remaining stages of a claimed job, saving progress after each one.
+    The run's timings, token usage and cache hits are saved with the job's outcome.
+
+    The job's heartbeat is refreshed every third of the lease while a stage runs. If another
+    worker has taken the job over in the meantime, the run stops without writing anything more.
+
+    Args:
+        store: The JobStore the job was claimed from.
+        job: The claimed job dictionary.
+        functions: Optional overrides for the "scrape", "analyze" and "generate" callables.
+            By default they are built from the job's options.
+        lease_seconds: The lease the job was claimed with.
+    """
+    if functions is None:
+        functions = job_stage_functions(store, job)
+    steps = _make_steps(functions)
+    result = BatchResult(url=job['url'], analysis=job['analysis'] or "")
+
+    start = STAGES.index(job['stage']) + 1 if job['stage'] else 0
+    payload = None
+    if start > 0:
+        payload = job[STAGE_OUTPUT_COLUMNS[STAGES[start - 1]]]
+        logging.info(f"Resuming job {job['id']} after stage '{job['stage']}'")
+
+    worker_id = job['claimed_by']
+    try:
+        with record_run() as run:
+            for stage in STAGES[start:]:
+                try:
+                    with JobHeartbeat(store, job['id'], worker_id, lease_seconds / 3):
+                        payload = steps[stage](result, payload)
+                except LostClaimError:
+                    raise
+                except Exception as e:
+                    error = str(e) or e.__class__.__name__
+                    if not isinstance(e, StageError):
+                        logging.exception(f"Job {job['id']} crashed in stage '{stage}'")
+                    store.fail(job['id'], worker_id, stage, error, metrics=run.summary())
+                    return
+                if stage == STAGES[-1]:
+                    store.complete(job['id'], worker_id, payload, metrics=run.summary())
+                else:
+                    store.record_stage(job['id'], worker_id, stage, payload)
+    except LostClaimError as e:
+        logging.warning(f"Abandoning job {job['id']}: {e}")
+        return
+    logging.info(f"Job {job['id']} finished for {job['url']}")
+
+
+class JobWorkerPool:
+    """
+    A pool of background threads that claim and run jobs from a JobStore.
+
+    Threads suit this workload: the stages spend their time waiting on HTTP and the LLM API.
+    Several pools (in one or more processes) can share a database; claims are atomic.
+    """
+    def __init__(self, store: JobStore, workers: int = DEFAULT_JOB_WORKERS, poll_interval: float = 0.5,
+                 lease_seconds: float = DEFAULT_LEASE_SECONDS, functions: dict = None):
+        if workers < 1:
+            raise ValueError("A job pool needs at least one worker.")
+        self.store = store
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.functions = functions
+        self.worker_id = f"jobs-{uuid.uuid4().hex[:8]}"
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._threads = []
+
+    @property
+    def running(self) -> bool:
+        return any(thread.is_alive() for thread in self._threads)
+
+    def start(self):
+        """Starts the worker threads. Calling it on a running pool does nothing."""
+        if self.running:
+            return
+        self.store.initialize_db()
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._work, name=f"{self.worker_id}-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        logging.info(f"Started {self.workers} job workers ({self.worker_id}).")
+
+    def notify(self):
+        """Wakes idle workers so a newly submitted job starts without waiting for the next poll."""
+        self._wake.set()
+
+    def submit(self, url: str, options: dict = None) -> tuple:
+        """Queues a job (see JobStore.submit) and wakes the workers."""
+        job = self.store.submit(url, options)
+        self.notify()
+        return job
+
+    def stop(self, timeout: float = None):
+        """Stops the workers after their current job."""
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _work(self):
+        name = threading.current_thread().name
+        while not self._stop.is_set():
+            try:
+                job = self.store.claim(name, lease_seconds=self.lease_seconds)
+            except sqlite3.Error as e:
+                logging.error(f"Error claiming job: {e}")
+                job = None
+            if job is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            try:
+                run_job(self.store, job, functions=self.functions, lease_seconds=self.lease_seconds)
+            except Exception:
+                # The job keeps its claim; once the lease runs out it is retried or, past
+                # MAX_JOB_ATTEMPTS, failed by the next claim
+                logging.exception(f"Worker {name} crashed running job {job['id']}")
+
+
+def wait_for_job(store: JobStore, job_id: str, timeout: float = None, poll_interval: float = 0.2) -> dict:
+    """Polls until a job is done or failed (or the timeout passes) and returns its latest state."""
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    while True:
+        job = store.get(job_id)
+        if job is None or job['status'] not in ACTIVE_STATUSES:
+            return job
+        if deadline is not None and time.monotonic() >= deadline:
+            return job
+        time.sleep(poll_interval)
@@ -0,0 +1,82 @@
+# scheduler/adapters.py
+import asyncio
+import itertools
+
+
+class PublishError(Exception):
+    """
+    Raised by an adapter when a post could not be published.
+
+    Attributes:
+        retryable: False for permanent failures (e.g. content rejected) that should not be retried.
+        retry_after: Optional seconds the platform asked us to wait before retrying.
+    """
+    def __init__(self, message: str, retryable: bool = True, retry_after: float = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class PlatformAdapter:
+    """
+    Base class for publishing posts to a social platform.
+
+    Subclasses implement `publish` and may override the default rate limit.
+    """
+    platform = None
+    requests_per_second = 1.0
+    burst = 1
+
+    async def publish(self, post: dict) -> str:
+        """
+        Publishes one post.
+
+        Args:
+            post: A dictionary with at least "id", "platform" and "content".
+
+        Returns:
+            The platform's identifier for the published post.
+
+        Raises:
+            PublishError: If publishing failed.
+        """
+        raise NotImplementedError
+
+
+class MockAdapter(PlatformAdapter):
+    """
+    A local adapter that records posts instead of publishing them.
+
+    Args:
+        platform: The platform name this adapter serves.
+        latency: Seconds each publish takes.
+        fail_ids: Post ids that fail with a retryable error, as {id: number_of_failures}.
+        reject_ids: Post ids that fail permanently.
+        requests_per_second: Rate limit the dispatcher applies to this adapter.
+    """
+    def __init__(self, platform: str, latency: float = 0.0, fail_ids: dict = None, reject_ids=(),
+                 requests_per_second: float = 50.0, burst: int = 10):
+        self.platform = platform
+        self.latency = latency
+        self.fail_ids = dict(fail_ids or {})
+        self.reject_ids = set(reject_ids)
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.published = []
+        self._ids = itertools.count(1)
+
+    async def publish(self, post: dict) -> str:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if post["id"] in self.reject_ids:
+            raise PublishError("content rejected by platform", retryable=False)
+        if self.fail_ids.get(post["id"], 0) > 0:
+            self.fail_ids[post["id"]] -= 1
+            raise PublishError("temporary platform error")
+        self.published.append(post)
+        return f"{self.platform.lower()}-{next(self._ids)}"
+
+
+def mock_adapters(**kwargs) -> dict:
+    """Returns MockAdapters for the platforms the app generates posts for."""
+    return {platform: MockAdapter(platform, **kwargs) for platform in ("Twitter", "LinkedIn")}
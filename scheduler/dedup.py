@@ -0,0 +1,308 @@
+# scheduler/dedup.py
+"""
+Near-duplicate detection for post content.
+
+Each post is reduced to a set of word shingles and a MinHash signature. The signature is
+split into bands (locality-sensitive hashing); each band hashes to one key stored in the
+post_fingerprints table, which is a posting list of post ids per key. Posts sharing a band
+key are candidates, and candidates are confirmed with the exact Jaccard similarity of their
+shingle hashes, stored per post in post_shingles so stored content is never re-shingled.
+
+Posts that share only boilerplate (hashtags, a "Learn more at <url>" ending) collide in a
+few very common keys. A lookup therefore reads at most MAX_POSTS_PER_KEY of the newest posts
+of each key and scores at most MAX_CANDIDATES, preferring the posts that share the most
+bands, so its cost does not grow with the number of stored posts.
+"""
+import re
+import zlib
+import struct
+import collections
+import functools
+import itertools
+import hashlib
+import logging
+import unicodedata
+
+SHINGLE_SIZE = 2
+NUM_PERM = 48
+BANDS = 12
+ROWS = NUM_PERM // BANDS
+# Jaccard similarity at or above which two posts are near-duplicates. With 12 bands of 4 rows,
+# pairs at 0.7 become candidates 96% of the time, and unrelated posts (< 0.2) almost never do.
+DEFAULT_THRESHOLD = 0.7
+
+# A lookup reads at most this many posts (the newest) per band key, and confirms at most
+# MAX_CANDIDATES of them, the ones sharing the most bands with the new post first
+MAX_POSTS_PER_KEY = 32
+MAX_CANDIDATES = 64
+
+# Each post's shingle hashes (see Fingerprint.packed), created with the band key table
+SHINGLES_TABLE = "CREATE TABLE IF NOT EXISTS post_shingles (post_id INTEGER PRIMARY KEY, hashes BLOB NOT NULL)"
+
+# How many existing posts the backfill fingerprints at once
+BACKFILL_CHUNK_SIZE = 5000
+
+# Posts in these states never went out and do not block new ones
+IGNORED_STATUSES = ("failed",)
+
+URL_PATTERN = re.compile(r"https?://\S+|www\.\S+")
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def _seed(name: str, i: int) -> int:
+    return int.from_bytes(hashlib.blake2b(f"{name}{i}".encode(), digest_size=8).digest(), "little")
+
+
+# NUM_PERM multiply-shift hash functions ((a*x + b) mod 2^64) >> 32 stand in for random
+# permutations of the 32-bit shingle hashes, and one multiplier per row plus a salt per band
+# combine a band's values into its key. All are derived from fixed strings, not a RNG,
+# because stored band keys depend on them.
+_PERMUTATIONS = (
+    tuple(_seed("minhash-a", i) | 1 for i in range(NUM_PERM)),
+    tuple(_seed("minhash-b", i) for i in range(NUM_PERM)),
+)
+_BAND_MULTIPLIERS = tuple(_seed("band-row", i) | 1 for i in range(ROWS))
+_BAND_SALTS = tuple(_seed("band", i) for i in range(BANDS))
+
+
+def _words(text: str) -> list:
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    return WORD_PATTERN.findall(URL_PATTERN.sub(" ", text))
+
+
+def normalize_text(text: str) -> str:
+    """Lowercases, drops links and punctuation, and collapses whitespace."""
+    return " ".join(_words(text))
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> frozenset:
+    """Returns the set of `size`-word shingles of the normalized text (single words for shorter texts)."""
+    words = _words(text)
+    if len(words) < size:
+        return frozenset(words)
+    return frozenset(map(" ".join, zip(*(words[i:] for i in range(size)))))
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    """Returns |a & b| / |a | b|, or 0.0 when both sets are empty."""
+    if not a and not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+@functools.lru_cache(maxsize=None)
+def _constants():
+    # numpy is only needed when posts are scheduled, so it is not imported with the module
+    import numpy as np
+    as_array = functools.partial(np.array, dtype=np.uint64)
+    return (np, as_array(_PERMUTATIONS[0])[:, None], as_array(_PERMUTATIONS[1])[:, None],
+            as_array(_BAND_MULTIPLIERS), as_array(_BAND_SALTS))
+
+
+def shingle_hashes(shingle_set) -> frozenset:
+    """The 32-bit hashes of a set of shingles, which the signatures and stored shingle sets are built from."""
+    return frozenset(map(zlib.crc32, map(str.encode, shingle_set)))
+
+
+def minhash_signatures(hash_sets: list):
+    """
+    Computes the MinHash signatures of non-empty sets of shingle hashes in one vectorized pass.
+
+    Returns:
+        A (len(hash_sets), NUM_PERM) uint64 numpy array.
+    """
+    np, a, b, _, _ = _constants()
+    lengths = [len(hash_set) for hash_set in hash_sets]
+    hashes = np.fromiter(itertools.chain.from_iterable(hash_sets), dtype=np.uint64, count=sum(lengths))
+    # One row per hash function; uint64 arithmetic wraps, which is the mod 2^64 of the family
+    values = (a * hashes + b) >> np.uint64(32)
+    starts = np.cumsum([0] + lengths[:-1])
+    return np.minimum.reduceat(values, starts, axis=1).T
+
+
+def band_keys(signatures) -> list:
+    """Hashes each band of each signature to a signed 64-bit key (SQLite INTEGER range)."""
+    np, _, _, multipliers, salts = _constants()
+    bands = signatures.reshape(len(signatures), BANDS, ROWS)
+    keys = (bands * multipliers).sum(axis=2, dtype=np.uint64) + salts
+    # splitmix64 finalizer, so keys spread evenly over the index
+    keys ^= keys >> np.uint64(30)
+    keys *= np.uint64(0xBF58476D1CE4E5B9)
+    keys ^= keys >> np.uint64(27)
+    keys *= np.uint64(0x94D049BB133111EB)
+    keys ^= keys >> np.uint64(31)
+    return keys.view(np.int64).tolist()
+
+
+class Fingerprint:
+    """
+    The shingle hashes and LSH band keys of one post's content (no keys for content without
+    words). Similarity is measured on the hashes, which is what is stored for each post.
+    """
+    __slots__ = ("shingles", "keys")
+
+    def __init__(self, shingle_set: frozenset, keys: list):
+        self.shingles = shingle_set
+        self.keys = keys
+
+    def packed(self) -> bytes:
+        """The shingle hashes as sorted little-endian uint32s, as stored in post_shingles."""
+        return struct.pack(f"<{len(self.shingles)}I", *sorted(self.shingles))
+
+
+def unpack_shingles(blob: bytes) -> frozenset:
+    """The shingle hashes of a post_shingles row."""
+    return frozenset(struct.unpack(f"<{len(blob) // 4}I", blob))
+
+
+def fingerprint_many(contents: list) -> list:
+    """Fingerprints many posts, hashing all of their shingles together (much faster than one by one)."""
+    fingerprints = [Fingerprint(shingle_hashes(shingles(content)), []) for content in contents]
+    hashed = [fingerprint for fingerprint in fingerprints if fingerprint.shingles]
+    if hashed:
+        for fingerprint, keys in zip(hashed, band_keys(minhash_signatures([f.shingles for f in hashed]))):
+            fingerprint.keys = keys
+    return fingerprints
+
+
+class BatchIndex:
+    """
+    An in-memory LSH index over the posts of one batch, so posts are checked against earlier
+    posts of the same batch before the batch's keys are written.
+    """
+    def __init__(self):
+        self._buckets = {}
+        self._entries = []
+
+    def add(self, post: dict, fingerprint: Fingerprint):
+        """Adds a post (any dict, returned by find) under its fingerprint."""
+        self._entries.append((post, fingerprint))
+        for key in fingerprint.keys:
+            self._buckets.setdefault(key, []).append(len(self._entries) - 1)
+
+    def find(self, fingerprint: Fingerprint, threshold: float = DEFAULT_THRESHOLD):
+        """Returns the (post, similarity) of the most similar added post at or above the threshold, or None."""
+        best = None
+        candidates = {i for key in fingerprint.keys for i in self._buckets.get(key, ())}
+        for i in sorted(candidates):
+            post, other = self._entries[i]
+            similarity = jaccard(fingerprint.shingles, other.shingles)
+            if similarity >= threshold and (best is None or similarity > best[1]):
+                best = (post, similarity)
+        return best
+
+
+def find_duplicate(conn, fingerprint: Fingerprint, threshold: float = DEFAULT_THRESHOLD):
+    """
+    Finds the stored post most similar to a fingerprint.
+
+    Args:
+        conn: A connection to the scheduler database.
+        fingerprint: The fingerprint of the new content.
+        threshold: Minimum Jaccard similarity to count as a near-duplicate.
+
+    Returns:
+        A (post row, similarity) pair for the best match at or above the threshold, or None.
+    """
+    if not fingerprint.keys:
+        return None
+    # Each key's posting list is read newest first through the primary key, never past MAX_POSTS_PER_KEY
+    shared = collections.Counter()
+    for key in set(fingerprint.keys):
+        shared.update(row[0] for row in conn.execute(
+            "SELECT post_id FROM post_fingerprints WHERE band_key = ? ORDER BY post_id DESC LIMIT ?",
+            (key, MAX_POSTS_PER_KEY)
+        ))
+    if not shared:
+        return None
+    candidates = [post_id for post_id, _ in sorted(shared.items(), key=lambda item: (-item[1], -item[0]))]
+    candidates = candidates[:MAX_CANDIDATES]
+    placeholders = ",".join("?" * len(candidates))
+    ignored = ",".join("?" * len(IGNORED_STATUSES))
+    rows = conn.execute(
+        f"SELECT p.id, p.platform, p.content, p.scheduled_date, p.status, s.hashes FROM scheduled_posts p "
+        f"LEFT JOIN post_shingles s ON s.post_id = p.id "
+        f"WHERE p.id IN ({placeholders}) AND p.status NOT IN ({ignored})",
+        [*candidates, *IGNORED_STATUSES]
+    ).fetchall()
+    best = None
+    for row in rows:
+        # Posts indexed before shingle sets were stored are shingled from their content
+        stored = unpack_shingles(row["hashes"]) if row["hashes"] is not None else \
+            shingle_hashes(shingles(row["content"]))
+        similarity = jaccard(fingerprint.shingles, stored)
+        if similarity >= threshold and (best is None or similarity > best[1]):
+            best = (row, similarity)
+    return best
+
+
+def _key_rows(entries: list) -> list:
+    # Sorted, so B-tree writes walk the index in order instead of jumping around it
+    return sorted((key, post_id) for post_id, fingerprint in entries for key in fingerprint.keys)
+
+
+def index_posts(conn, entries: list):
+    """Stores the band keys and shingle hashes of (post id, Fingerprint) pairs, inside the caller's transaction."""
+    conn.executemany("INSERT OR IGNORE INTO post_fingerprints (band_key, post_id) VALUES (?, ?)", _key_rows(entries))
+    conn.executemany("INSERT OR REPLACE INTO post_shingles (post_id, hashes) VALUES (?, ?)",
+                     [(post_id, fingerprint.packed()) for post_id, fingerprint in entries])
+
+
+def unindex_posts(conn, entries: list):
+    """
+    Removes the band keys and shingle hashes of (post id, Fingerprint) pairs, where each
+    fingerprint is of the content the post had when it was indexed. Deleting by primary key
+    avoids a second index on post_id.
+    """
+    conn.executemany("DELETE FROM post_fingerprints WHERE band_key = ? AND post_id = ?", _key_rows(entries))
+    conn.executemany("DELETE FROM post_shingles WHERE post_id = ?", [(post_id,) for post_id, _ in entries])
+
+
+def backfill_fingerprints(cursor, chunk_size: int = BACKFILL_CHUNK_SIZE):
+    """
+    Indexes every post that has no band keys or no stored shingle hashes yet (used by the schema
+    migrations). Posts are read and fingerprinted `chunk_size` at a time, so memory stays flat
+    on large tables.
+    """
+    # A second cursor streams the posts while `cursor` writes their keys
+    rows = cursor.connection.execute(
+        "SELECT id, content FROM scheduled_posts "
+        "WHERE id NOT IN (SELECT post_id FROM post_shingles) OR id NOT IN (SELECT post_id FROM post_fingerprints)"
+    )
+    indexed = 0
+    while True:
+        chunk = rows.fetchmany(chunk_size)
+        if not chunk:
+            break
+        fingerprints = fingerprint_many([row[1] for row in chunk])
+        index_posts(cursor, [(row[0], fingerprint) for row, fingerprint in zip(chunk, fingerprints)])
+        indexed += len(chunk)
+    if indexed:
+        logging.info(f"Indexed {indexed} existing posts for near-duplicate detection.")
+
+
+def flag_duplicates(conn, posts: list, threshold: float = DEFAULT_THRESHOLD) -> list:
+    """
+    Checks generated posts against the stored posts and against each other.
+
+    Args:
+        conn: A connection to the scheduler database.
+        posts: Dictionaries with "content".
+        threshold: Minimum Jaccard similarity to count as a near-duplicate.
+
+    Returns:
+        One entry per post: None, or a dict with "similarity" and either "post_id" (a stored
+        post) or "index" (an earlier post in the same list).
+    """
+    flags, batch = [], BatchIndex()
+    for i, fingerprint in enumerate(fingerprint_many([post.get("content") or "" for post in posts])):
+        flag = None
+        stored = find_duplicate(conn, fingerprint, threshold)
+        if stored is not None:
+            flag = {"post_id": stored[0]["id"], "similarity": round(stored[1], 3)}
+        earlier = batch.find(fingerprint, threshold)
+        if earlier is not None and (flag is None or earlier[1] > flag["similarity"]):
+            flag = {"index": earlier[0]["index"], "similarity": round(earlier[1], 3)}
+        flags.append(flag)
+        batch.add({"index": i}, fingerprint)
+    return flags
@@ -0,0 +1,229 @@
+# scheduler/dispatcher.py
+import os
+import sys
+import time
+import random
+import socket
+import sqlite3
+import asyncio
+import logging
+import argparse
+from datetime import datetime, timedelta
+
+from scheduler.scheduler import MockScheduler, DB_FILE
+from scheduler.adapters import PublishError, mock_adapters
+from telemetry.logs import configure_logging
+from telemetry.metrics import configure_exporters, record_retry, span, REGISTRY
+
+
+class TokenBucket:
+    """An asyncio token bucket: `rate` tokens per second with up to `burst` saved up."""
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.rate or self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class DispatchStats:
+    """Counters and due-to-sent latencies for a dispatcher."""
+    def __init__(self):
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.latencies = []
+
+    def summary(self) -> dict:
+        ordered = sorted(self.latencies)
+
+        def pct(p):
+            return ordered[min(len(ordered) - 1, int(p / 100.0 * len(ordered)))] if ordered else 0.0
+
+        return {"sent": self.sent, "retried": self.retried, "failed": self.failed,
+                "latency_p50": pct(50), "latency_p99": pct(99)}
+
+
+class Dispatcher:
+    """
+    Publishes due posts from the scheduled_posts table.
+
+    Each cycle releases stale claims, claims a batch of due posts (scheduled -> sending),
+    publishes them concurrently through per-platform adapters under per-platform rate
+    limits, and records each outcome (sent, retry later, or failed) as soon as it is known.
+    Several dispatchers can share one database: claiming is atomic, so a post is only handed
+    to one of them, and its lease is renewed while the batch is still running.
+    """
+    def __init__(self, scheduler: MockScheduler, adapters: dict, worker_id: str = None,
+                 batch_size: int = 100, poll_interval: float = 5.0, max_attempts: int = 5,
+                 backoff_base: float = 30.0, backoff_max: float = 3600.0, lease_seconds: float = 300.0,
+                 max_concurrency: int = 20):
+        self.scheduler = scheduler
+        self.adapters = adapters
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease_seconds = lease_seconds
+        self.max_concurrency = max_concurrency
+        self.stats = DispatchStats()
+        self._buckets = {
+            platform: TokenBucket(adapter.requests_per_second, adapter.burst)
+            for platform, adapter in adapters.items()
+        }
+
+    def _retry_delay(self, attempts: int, error: PublishError) -> float:
+        if error.retry_after is not None:
+            return error.retry_after
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** (attempts - 1))))
+
+    async def _publish(self, post: dict, semaphore: asyncio.Semaphore):
+        """
+        Publishes one claimed post and records the outcome.
+
+        Database errors are logged rather than raised, so one post cannot abort the batch; the
+        post keeps its claim and is picked up again once the lease goes stale.
+
+        Returns:
+            True if the post was sent, False if it failed, None if it was not attempted or its
+            outcome could not be recorded.
+        """
+        try:
+            return await self._publish_post(post, semaphore)
+        except sqlite3.Error as e:
+            logging.error(f"Could not record the outcome of post {post['id']}: {e}")
+            return None
+
+    async def _publish_post(self, post: dict, semaphore: asyncio.Semaphore):
+        adapter = self.adapters.get(post["platform"])
+        if adapter is None:
+            await asyncio.to_thread(self.scheduler.mark_post_failed, self.worker_id, post["id"],
+                                    f"No adapter for platform {post['platform']}")
+            self.stats.failed += 1
+            return None
+        async with semaphore:
+            await self._buckets[post["platform"]].acquire()
+            try:
+                with span("dispatch.publish", platform=post["platform"]):
+                    external_id = await adapter.publish(post)
+            except Exception as e:
+                error = e if isinstance(e, PublishError) else PublishError(str(e))
+                if error.retryable and post["attempts"] < self.max_attempts:
+                    retry_at = datetime.now() + timedelta(seconds=self._retry_delay(post["attempts"], error))
+                    await asyncio.to_thread(self.scheduler.mark_post_failed, self.worker_id, post["id"],
+                                            str(error), retry_at=retry_at)
+                    self.stats.retried += 1
+                    record_retry("dispatch")
+                    logging.warning(f"Post {post['id']} failed (attempt {post['attempts']}), retrying at {retry_at}: {error}")
+                else:
+                    await asyncio.to_thread(self.scheduler.mark_post_failed, self.worker_id, post["id"], str(error))
+                    self.stats.failed += 1
+                    REGISTRY.inc("dispatch_posts_total", platform=post["platform"], result="failed")
+                    logging.error(f"Post {post['id']} failed permanently: {error}")
+                return False
+
+        sent_at = datetime.now()
+        # Recorded straight away, so a crash or a slow batch cannot get the post published twice
+        recorded = await asyncio.to_thread(self.scheduler.mark_posts_sent, self.worker_id,
+                                           [(post["id"], external_id, sent_at)])
+        if not recorded:
+            logging.error(f"Post {post['id']} was published as {external_id} after {self.worker_id} lost its claim.")
+        due_at = datetime.fromisoformat(post["scheduled_date"])
+        self.stats.latencies.append((sent_at - due_at).total_seconds())
+        self.stats.sent += 1
+        REGISTRY.inc("dispatch_posts_total", platform=post["platform"], result="sent")
+        return True
+
+    async def _renew_claims(self):
+        """Renews this worker's leases every third of `lease_seconds` until cancelled."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await asyncio.to_thread(self.scheduler.renew_claims, self.worker_id)
+            except sqlite3.Error as e:
+                logging.error(f"Dispatcher {self.worker_id} could not renew its claims: {e}")
+
+    async def run_once(self, now: datetime = None) -> int:
+        """
+        Runs one claim-and-publish cycle.
+
+        Returns:
+            The number of posts claimed in this cycle.
+        """
+        # The database calls run in worker threads so they never stall adapters mid-publish
+        try:
+            await asyncio.to_thread(self.scheduler.release_stale_claims, self.lease_seconds, now=now)
+            posts = await asyncio.to_thread(self.scheduler.claim_due_posts, self.worker_id,
+                                            limit=self.batch_size, now=now)
+        except sqlite3.Error as e:
+            logging.error(f"Dispatcher {self.worker_id} could not claim posts: {e}")
+            return 0
+        if not posts:
+            return 0
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        renewer = asyncio.create_task(self._renew_claims())
+        try:
+            await asyncio.gather(*(self._publish(post, semaphore) for post in posts))
+        finally:
+            renewer.cancel()
+        logging.info(f"Dispatcher {self.worker_id} processed {len(posts)} posts.")
+        return len(posts)
+
+    async def run_forever(self, stop_event: asyncio.Event = None):
+        """Dispatches continuously, sleeping `poll_interval` whenever nothing is due."""
+        stop_event = stop_event or asyncio.Event()
+        logging.info(f"Dispatcher {self.worker_id} started.")
+        while not stop_event.is_set():
+            claimed = await self.run_once()
+            if claimed < self.batch_size:
+                try:
+                    await asyncio.wait_for(stop_event.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        logging.info(f"Dispatcher {self.worker_id} stopped: {self.stats.summary()}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Publish due scheduled posts (with mock platform adapters).")
+    parser.add_argument("--db", default=DB_FILE, help=f"SQLite database file (default: {DB_FILE}).")
+    parser.add_argument("--worker-id", help="Identifier recorded on claimed posts.")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--poll-interval", type=float, default=5.0)
+    parser.add_argument("--once", action="store_true", help="Run a single cycle and exit.")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this port.")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    configure_exporters(port=args.metrics_port)
+    with MockScheduler(db_file=args.db) as scheduler:
+        scheduler.initialize_db()
+        dispatcher = Dispatcher(scheduler, mock_adapters(), worker_id=args.worker_id,
+                                batch_size=args.batch_size, poll_interval=args.poll_interval)
+        try:
+            if args.once:
+                asyncio.run(dispatcher.run_once())
+            else:
+                asyncio.run(dispatcher.run_forever())
+        except KeyboardInterrupt:
+            pass
+        print(dispatcher.stats.summary())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
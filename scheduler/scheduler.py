@@ -1,18 +1,149 @@
 # scheduler/scheduler.py
+import os
+import re
 import sqlite3
+import time
 import logging
-from datetime import datetime
+import threading
+from datetime import date, datetime, timedelta
+from scheduler.storage import SQLiteStorage, StorageBackend
+from scheduler import dedup, slots, transfer
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-DB_FILE = "campaign.db"
+DB_FILE = os.environ.get("CAMPAIGN_DB_FILE", "campaign.db")
+DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+TIMESTAMP_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}(:\d{2})?$")
+
+INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_scheduled_posts_date ON scheduled_posts (scheduled_date)",
+    "CREATE INDEX IF NOT EXISTS idx_scheduled_posts_status_date ON scheduled_posts (status, scheduled_date)",
+    "CREATE INDEX IF NOT EXISTS idx_scheduled_posts_platform_date ON scheduled_posts (platform, scheduled_date)",
+)
+
+POST_COLUMNS = "id, platform, content, scheduled_date, status, campaign_id"
+CAMPAIGN_COLUMNS = "id, url, content_hash, analysis, created_at, updated_at"
+
+# Schema changes after the original table, applied in order and tracked with PRAGMA user_version.
+MIGRATIONS = (
+    # 1: dispatch bookkeeping
+    (
+        "ALTER TABLE scheduled_posts ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE scheduled_posts ADD COLUMN next_attempt_at TEXT",
+        "ALTER TABLE scheduled_posts ADD COLUMN claimed_by TEXT",
+        "ALTER TABLE scheduled_posts ADD COLUMN claimed_at TEXT",
+        "ALTER TABLE scheduled_posts ADD COLUMN sent_at TEXT",
+        "ALTER TABLE scheduled_posts ADD COLUMN external_id TEXT",
+        "ALTER TABLE scheduled_posts ADD COLUMN last_error TEXT",
+        "CREATE INDEX IF NOT EXISTS idx_scheduled_posts_claimed ON scheduled_posts (status, claimed_at)",
+    ),
+    # 2: near-duplicate index (LSH band keys of each post's MinHash signature)
+    (
+        "CREATE TABLE IF NOT EXISTS post_fingerprints ("
+        " band_key INTEGER NOT NULL, post_id INTEGER NOT NULL, PRIMARY KEY (band_key, post_id)"
+        ") WITHOUT ROWID",
+        dedup.SHINGLES_TABLE,
+        dedup.backfill_fingerprints,
+    ),
+    # 3: campaigns (one per source URL) and the campaign each post belongs to
+    (
+        """
+        CREATE TABLE IF NOT EXISTS campaigns (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            url TEXT NOT NULL UNIQUE,
+            content_hash TEXT,
+            analysis TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+        """,
+        "ALTER TABLE scheduled_posts ADD COLUMN campaign_id INTEGER REFERENCES campaigns (id)",
+        "CREATE INDEX IF NOT EXISTS idx_scheduled_posts_campaign ON scheduled_posts (campaign_id, platform, status)",
+    ),
+    # 4: per-platform hourly slots with their remaining capacity, kept current by triggers
+    slots.SCHEMA,
+    # 5: the persistent pipeline job queue (pipeline.jobs), as first released
+    (
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            url TEXT NOT NULL,
+            dedup_key TEXT NOT NULL,
+            options TEXT NOT NULL DEFAULT '{}',
+            status TEXT NOT NULL DEFAULT 'queued',
+            stage TEXT,
+            scraped_text TEXT,
+            analysis TEXT,
+            posts TEXT,
+            error TEXT,
+            failed_stage TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            claimed_by TEXT,
+            heartbeat_at TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at)",
+        # At most one queued/running job per URL and option set, across threads and processes
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_active_dedup ON jobs (dedup_key) "
+        "WHERE status IN ('queued', 'running')",
+    ),
+    # 6: each job's run metrics and the hash of its scraped text
+    (
+        "ALTER TABLE jobs ADD COLUMN metrics TEXT",
+        "ALTER TABLE jobs ADD COLUMN content_hash TEXT",
+    ),
+    # 7: each post's shingle hashes, so duplicate lookups do not re-shingle stored posts
+    (
+        dedup.SHINGLES_TABLE,
+        dedup.backfill_fingerprints,
+    ),
+)
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+# What schedule_post / schedule_posts_bulk do with a near-duplicate of a stored post:
+# "reject" skips it, "merge" replaces the content of a still-scheduled post on the same
+# platform (and otherwise skips it), "allow" inserts it anyway.
+DEDUP_POLICIES = ("reject", "merge", "allow")
+
+def _timestamp(value: datetime = None) -> str:
+    """Formats a local datetime the way the scheduler stores timestamps."""
+    return (value or datetime.now()).strftime('%Y-%m-%d %H:%M:%S')
+
+def normalize_date(value) -> str:
+    """
+    Returns a scheduled date as a "YYYY-MM-DD" string, or a scheduled time as "YYYY-MM-DD HH:MM:SS".
+
+    Args:
+        value: A "YYYY-MM-DD" or "YYYY-MM-DD HH:MM[:SS]" string, or a date/datetime-like object
+            with strftime. Datetimes at midnight are kept as plain dates.
+
+    Raises:
+        ValueError: If the value is not a valid date or time.
+    """
+    if hasattr(value, "strftime"):
+        if getattr(value, "hour", 0) or getattr(value, "minute", 0) or getattr(value, "second", 0):
+            return value.strftime(slots.TIMESTAMP_FORMAT)
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, str) and TIMESTAMP_PATTERN.match(value):
+        return datetime.fromisoformat(value).strftime(slots.TIMESTAMP_FORMAT)
+    if not isinstance(value, str) or not DATE_PATTERN.match(value):
+        raise ValueError(f"Invalid date format: {value!r}. Use YYYY-MM-DD or YYYY-MM-DD HH:MM:SS.")
+    date.fromisoformat(value)
+    return value
 
 class MockScheduler:
     """
     A mock scheduler that uses SQLite to store and manage scheduled posts.
+
+    An instance is safe to share between threads: each thread gets its own pooled
+    connection from the storage backend. `slot_policy` sets the per-platform hourly capacity
+    and blackout windows used when posts are placed into time slots.
     """
-    def __init__(self, db_file=DB_FILE):
+    def __init__(self, db_file=DB_FILE, storage: StorageBackend = None, slot_policy: slots.SlotPolicy = None):
         self.db_file = db_file
-        self.conn = None
+        self.storage = storage if storage is not None else SQLiteStorage(db_file)
+        self.slot_policy = slot_policy if slot_policy is not None else slots.SlotPolicy()
 
     def __enter__(self):
         self.connect()
@@ -21,29 +152,38 @@ class MockScheduler:
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.close()
 
+    @property
+    def conn(self):
+        """The calling thread's database connection."""
+        return self.storage.connection()
+
     def connect(self):
         """Establishes a connection to the SQLite database."""
         try:
-            self.conn = sqlite3.connect(self.db_file)
-            self.conn.row_factory = sqlite3.Row
-            logging.info(f"Connected to database: {self.db_file}")
+            self.storage.connection()
         except sqlite3.Error as e:
             logging.error(f"Database connection error: {e}")
             raise
 
     def close(self):
-        """Closes the database connection."""
-        if self.conn:
-            self.conn.close()
-            logging.info("Database connection closed.")
+        """Closes the database connections."""
+        self.storage.close()
 
     def initialize_db(self):
-        """Creates the scheduled_posts table if it doesn't exist."""
-        if not self.conn:
-            self.connect()
+        """
+        Creates the scheduled_posts table and applies pending migrations.
+
+        Only the first call per storage backend does any work when the schema is current,
+        and concurrent initializers (threads or processes) are serialized by the write lock.
+        """
+        if self.storage.schema_ready:
+            return
         try:
-            with self.conn:
-                cursor = self.conn.cursor()
+            if self.conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION:
+                self.storage.schema_ready = True
+                return
+            with self.storage.write_transaction() as conn:
+                cursor = conn.cursor()
                 cursor.execute("""
                     CREATE TABLE IF NOT EXISTS scheduled_posts (
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -54,35 +194,116 @@ class MockScheduler:
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                     )
                 """)
-                logging.info("Database initialized successfully.")
+                for index in INDEXES:
+                    cursor.execute(index)
+                self._apply_migrations(cursor)
+            self.storage.schema_ready = True
+            logging.info("Database initialized successfully.")
         except sqlite3.Error as e:
             logging.error(f"Error initializing database: {e}")
 
-    def schedule_post(self, platform: str, content: str, scheduled_date: str):
+    @staticmethod
+    def _apply_migrations(cursor: sqlite3.Cursor):
+        """Applies every migration newer than the database's user_version."""
+        version = cursor.execute("PRAGMA user_version").fetchone()[0]
+        for number, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+            for statement in statements:
+                # Steps that need Python (e.g. backfills) are callables taking the cursor
+                if callable(statement):
+                    statement(cursor)
+                else:
+                    cursor.execute(statement)
+            cursor.execute(f"PRAGMA user_version = {number}")
+            logging.info(f"Applied scheduler schema migration {number}.")
+
+    @staticmethod
+    def _insert_posts(conn, rows: list, policy: str, threshold: float, campaign_id: int = None,
+                      slot_policy: slots.SlotPolicy = None) -> list:
+        """
+        Inserts validated (platform, content, date) rows inside the caller's write transaction,
+        checking each against the stored posts and the earlier rows of the batch. New posts
+        belong to `campaign_id`; merged posts keep their campaign. With a `slot_policy`, each
+        new post goes into the first free slot at or after its date instead of at the date itself.
+
+        Returns:
+            One (post id, outcome) pair per row: outcome is "inserted", "merged" or "rejected",
+            and the id is the new post, the post merged into, or the duplicate.
+        """
+        results, new_ids = [], set()
+        fingerprints = {}  # post id -> fingerprint of its final content, indexed once at the end
+        replaced = {}      # stored post id -> the content it was indexed under, for merged posts
+        batch = dedup.BatchIndex()
+        for (platform, content, scheduled_date), fingerprint in zip(
+                rows, dedup.fingerprint_many([content for _, content, _ in rows])):
+            match = None
+            if policy != "allow":
+                match = dedup.find_duplicate(conn, fingerprint, threshold)
+                earlier = batch.find(fingerprint, threshold)
+                if earlier is not None and (match is None or earlier[1] > match[1]):
+                    match = earlier
+            if match is not None:
+                existing, similarity = match
+                if policy == "merge" and existing["status"] == "scheduled" and existing["platform"] == platform:
+                    conn.execute("UPDATE scheduled_posts SET content = ? WHERE id = ?", (content, existing["id"]))
+                    if existing["id"] not in new_ids:
+                        replaced.setdefault(existing["id"], existing["content"])
+                    fingerprints[existing["id"]] = fingerprint
+                    batch.add({"id": existing["id"], "platform": platform, "status": "scheduled",
+                               "content": content}, fingerprint)
+                    results.append((existing["id"], "merged"))
+                    continue
+                logging.warning(f"Skipped {platform} post: {similarity:.0%} similar to post {existing['id']} "
+                                f"({existing['platform']}, {existing['status']}).")
+                results.append((existing["id"], "rejected"))
+                continue
+            if slot_policy is not None:
+                scheduled_date = slots.allocate(conn, platform, slot_policy, slots.parse_timestamp(scheduled_date))
+            post_id = conn.execute(
+                "INSERT INTO scheduled_posts (platform, content, scheduled_date, campaign_id) "
+                "VALUES (?, ?, ?, ?) RETURNING id",
+                (platform, content, scheduled_date, campaign_id)
+            ).fetchone()[0]
+            fingerprints[post_id] = fingerprint
+            new_ids.add(post_id)
+            batch.add({"id": post_id, "platform": platform, "status": "scheduled", "content": content},
+                      fingerprint)
+            results.append((post_id, "inserted"))
+        # The batch's keys are written together once every row has been checked
+        dedup.unindex_posts(conn, list(zip(replaced, dedup.fingerprint_many(list(replaced.values())))))
+        dedup.index_posts(conn, list(fingerprints.items()))
+        return results
+
+    def schedule_post(self, platform: str, content: str, scheduled_date: str, dedup_policy: str = "reject",
+                      threshold: float = dedup.DEFAULT_THRESHOLD):
         """
-        Saves a post to the database.
+        Saves a post to the database unless it near-duplicates a stored post.
 
         Args:
             platform: The social media platform (e.g., "Twitter").
             content: The text of the post.
-            scheduled_date: The date for the post in "YYYY-MM-DD" format.
+            scheduled_date: The date for the post in "YYYY-MM-DD" (or "YYYY-MM-DD HH:MM:SS") format.
+            dedup_policy: One of DEDUP_POLICIES.
+            threshold: Jaccard similarity at which two posts count as near-duplicates.
+
+        Returns:
+            The id of the new (or merged-into) post, or None if it was rejected or invalid.
         """
-        if not self.conn:
-            self.connect()
+        if dedup_policy not in DEDUP_POLICIES:
+            raise ValueError(f"Unknown dedup policy {dedup_policy!r}; expected one of {DEDUP_POLICIES}.")
         try:
-            # Validate date format
-            datetime.strptime(scheduled_date, '%Y-%m-%d')
-            with self.conn:
-                cursor = self.conn.cursor()
-                cursor.execute(
-                    "INSERT INTO scheduled_posts (platform, content, scheduled_date) VALUES (?, ?, ?)",
-                    (platform, content, scheduled_date)
-                )
-            logging.info(f"Scheduled post for {platform} on {scheduled_date}")
+            scheduled_date = normalize_date(scheduled_date)
+            with self.storage.write_transaction() as conn:
+                [(post_id, outcome)] = self._insert_posts(conn, [(platform, content, scheduled_date)],
+                                                          dedup_policy, threshold)
+            if outcome == "rejected":
+                return None
+            logging.info(f"Scheduled post for {platform} on {scheduled_date} ({outcome})")
+            return post_id
         except ValueError:
             logging.error(f"Invalid date format for scheduling: {scheduled_date}. Use YYYY-MM-DD.")
         except sqlite3.Error as e:
             logging.error(f"Error scheduling post: {e}")
+        return None
             
     def get_all_scheduled_posts(self) -> list:
         """
@@ -91,8 +312,6 @@ class MockScheduler:
         Returns:
             A list of dictionaries representing the scheduled posts.
         """
-        if not self.conn:
-            self.connect()
         try:
             with self.conn:
                 cursor = self.conn.cursor()
@@ -102,3 +321,492 @@ class MockScheduler:
         except sqlite3.Error as e:
             logging.error(f"Error retrieving scheduled posts: {e}")
             return []
+
+    @staticmethod
+    def _validate_posts(posts: list) -> tuple:
+        """Returns the (platform, content, date) rows of valid posts and one message per invalid post."""
+        rows, errors = [], []
+        for i, post in enumerate(posts):
+            try:
+                platform, content = post['platform'], post['content']
+                if not platform or not content:
+                    raise ValueError("platform and content are required")
+                rows.append((platform, content, normalize_date(post['scheduled_date'])))
+            except (KeyError, TypeError, ValueError) as e:
+                errors.append(f"row {i}: {e}")
+        return rows, errors
+
+    def schedule_posts_bulk(self, posts: list, dedup_policy: str = "reject",
+                            threshold: float = dedup.DEFAULT_THRESHOLD, campaign_id: int = None,
+                            allocate: bool = False) -> int:
+        """
+        Validates and saves many posts in a single transaction.
+
+        Every row is validated before anything is written, so either all valid posts are
+        scheduled or none are. Near-duplicates of stored posts, or of earlier posts in the
+        same batch, are handled by `dedup_policy`.
+
+        Args:
+            posts: Dictionaries with "platform", "content" and "scheduled_date"
+                ("YYYY-MM-DD" or "YYYY-MM-DD HH:MM:SS" string, or a date-like object).
+            dedup_policy: One of DEDUP_POLICIES.
+            threshold: Jaccard similarity at which two posts count as near-duplicates.
+            campaign_id: The campaign the new posts belong to, if any.
+            allocate: Treat each date as the earliest time for the post and place it in the
+                first slot with room under the scheduler's slot policy.
+
+        Returns:
+            The number of posts inserted or merged (0 if any row was invalid or no slot was free).
+        """
+        if dedup_policy not in DEDUP_POLICIES:
+            raise ValueError(f"Unknown dedup policy {dedup_policy!r}; expected one of {DEDUP_POLICIES}.")
+        rows, errors = self._validate_posts(posts)
+        if errors:
+            logging.error(f"Rejected bulk schedule of {len(posts)} posts; invalid rows: {'; '.join(errors[:10])}")
+            return 0
+        try:
+            outcomes = {"inserted": 0, "merged": 0, "rejected": 0}
+            # The write lock is held from the start so concurrent batches cannot both insert a duplicate
+            with self.storage.write_transaction() as conn:
+                for _, outcome in self._insert_posts(conn, rows, dedup_policy, threshold, campaign_id,
+                                                     self.slot_policy if allocate else None):
+                    outcomes[outcome] += 1
+            logging.info(f"Scheduled {len(rows)} posts in one transaction: {outcomes['inserted']} inserted, "
+                         f"{outcomes['merged']} merged, {outcomes['rejected']} rejected as near-duplicates.")
+            return outcomes["inserted"] + outcomes["merged"]
+        except (sqlite3.Error, ValueError) as e:
+            logging.error(f"Error bulk scheduling posts: {e}")
+            return 0
+
+    def find_near_duplicates(self, posts: list, threshold: float = dedup.DEFAULT_THRESHOLD) -> list:
+        """
+        Flags posts that near-duplicate a stored post or an earlier post in the list, without writing.
+
+        Returns:
+            One entry per post: None, or a dict with "similarity" and either "post_id" (a stored
+            post) or "index" (an earlier post in the list). All None if the lookup fails.
+        """
+        try:
+            return dedup.flag_duplicates(self.conn, posts, threshold)
+        except sqlite3.Error as e:
+            logging.error(f"Error checking posts for near-duplicates: {e}")
+            return [None] * len(posts)
+
+    def save_campaign(self, url: str, content_hash: str = None, analysis: str = None) -> int:
+        """
+        Creates the campaign for a URL, or updates its content hash and analysis.
+
+        Args:
+            url: The source page; trivially different spellings of a URL share a campaign.
+            content_hash: Hash of the scraped text the campaign was generated from.
+            analysis: The analysis the posts were generated from.
+
+        Returns:
+            The campaign id, or None if it could not be saved.
+        """
+        from cache.store import normalize_url
+        stamp = _timestamp()
+        try:
+            with self.conn:
+                return self.conn.execute(
+                    "INSERT INTO campaigns (url, content_hash, analysis, created_at, updated_at) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (url) DO UPDATE SET content_hash = excluded.content_hash, "
+                    "analysis = excluded.analysis, updated_at = excluded.updated_at RETURNING id",
+                    (normalize_url(url), content_hash, analysis, stamp, stamp)
+                ).fetchone()[0]
+        except sqlite3.Error as e:
+            logging.error(f"Error saving campaign for {url}: {e}")
+            return None
+
+    def get_campaign(self, url: str = None, campaign_id: int = None) -> dict:
+        """Returns a campaign by URL or id, or None if there is none."""
+        try:
+            if campaign_id is None:
+                from cache.store import normalize_url
+                row = self.conn.execute(f"SELECT {CAMPAIGN_COLUMNS} FROM campaigns WHERE url = ?",
+                                        (normalize_url(url),)).fetchone()
+            else:
+                row = self.conn.execute(f"SELECT {CAMPAIGN_COLUMNS} FROM campaigns WHERE id = ?",
+                                        (campaign_id,)).fetchone()
+            return dict(row) if row else None
+        except sqlite3.Error as e:
+            logging.error(f"Error retrieving campaign: {e}")
+            return None
+
+    def list_campaigns(self, limit: int = 100, offset: int = 0) -> list:
+        """Returns campaigns, most recently updated first, with their number of posts per status."""
+        try:
+            campaigns = [dict(row) for row in self.conn.execute(
+                f"SELECT {CAMPAIGN_COLUMNS} FROM campaigns ORDER BY updated_at DESC, id DESC LIMIT ? OFFSET ?",
+                (limit, offset)
+            )]
+            for campaign in campaigns:
+                campaign["posts"] = dict(self.conn.execute(
+                    "SELECT status, COUNT(*) FROM scheduled_posts WHERE campaign_id = ? GROUP BY status",
+                    (campaign["id"],)
+                ).fetchall())
+            return campaigns
+        except sqlite3.Error as e:
+            logging.error(f"Error listing campaigns: {e}")
+            return []
+
+    def replace_campaign_posts(self, campaign_id: int, posts: list, platforms=None, dedup_policy: str = "reject",
+                               threshold: float = dedup.DEFAULT_THRESHOLD, allocate: bool = False) -> int:
+        """
+        Replaces a campaign's not-yet-sent posts with new ones in one transaction.
+
+        Posts that are sending or sent are kept (and new near-copies of them are handled by
+        `dedup_policy`); other campaigns are untouched.
+
+        Args:
+            campaign_id: The campaign whose posts are replaced.
+            posts: The new posts, as for schedule_posts_bulk.
+            platforms: Only replace the posts of these platforms (default: all of them).
+            dedup_policy: One of DEDUP_POLICIES.
+            threshold: Jaccard similarity at which two posts count as near-duplicates.
+            allocate: Place the new posts into free slots, as for schedule_posts_bulk. The
+                replaced posts' slots are freed first.
+
+        Returns:
+            The number of new posts scheduled (0 if any row was invalid, leaving the old ones in place).
+        """
+        if dedup_policy not in DEDUP_POLICIES:
+            raise ValueError(f"Unknown dedup policy {dedup_policy!r}; expected one of {DEDUP_POLICIES}.")
+        rows, errors = self._validate_posts(posts)
+        if errors:
+            logging.error(f"Rejected replacement of campaign {campaign_id}; invalid rows: {'; '.join(errors[:10])}")
+            return 0
+        clauses, params = ["campaign_id = ?", "status = 'scheduled'"], [campaign_id]
+        if platforms:
+            clauses.append(f"platform IN ({','.join('?' * len(platforms))})")
+            params.extend(platforms)
+        try:
+            with self.storage.write_transaction() as conn:
+                old = conn.execute(f"DELETE FROM scheduled_posts WHERE {' AND '.join(clauses)} RETURNING id, content",
+                                   params).fetchall()
+                dedup.unindex_posts(conn, list(zip([row[0] for row in old],
+                                                   dedup.fingerprint_many([row[1] for row in old]))))
+                results = self._insert_posts(conn, rows, dedup_policy, threshold, campaign_id,
+                                             self.slot_policy if allocate else None)
+            scheduled = sum(outcome != "rejected" for _, outcome in results)
+            logging.info(f"Replaced {len(old)} scheduled posts of campaign {campaign_id} with {scheduled} new ones.")
+            return scheduled
+        except (sqlite3.Error, ValueError) as e:
+            logging.error(f"Error replacing posts of campaign {campaign_id}: {e}")
+            return 0
+
+    @staticmethod
+    def _build_filters(start_date=None, end_date=None, status=None, platform=None, campaign_id=None) -> tuple:
+        clauses, params = [], []
+        if start_date is not None:
+            clauses.append("scheduled_date >= ?")
+            params.append(normalize_date(start_date))
+        if end_date is not None:
+            end = normalize_date(end_date)
+            if DATE_PATTERN.match(end):
+                # Posts at any time on the end date are included
+                clauses.append("scheduled_date < ?")
+                params.append((date.fromisoformat(end) + timedelta(days=1)).isoformat())
+            else:
+                clauses.append("scheduled_date <= ?")
+                params.append(end)
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if platform is not None:
+            clauses.append("platform = ?")
+            params.append(platform)
+        if campaign_id is not None:
+            clauses.append("campaign_id = ?")
+            params.append(campaign_id)
+        return clauses, params
+
+    def get_scheduled_posts(self, start_date=None, end_date=None, status: str = None, platform: str = None,
+                            limit: int = 100, offset: int = 0, after: tuple = None, campaign_id: int = None) -> list:
+        """
+        Retrieves one page of scheduled posts, filtered and ordered by date in SQL.
+
+        Args:
+            start_date: Only posts on or after this date (inclusive).
+            end_date: Only posts on or before this date (inclusive).
+            status: Only posts with this status, e.g. "scheduled".
+            platform: Only posts for this platform.
+            limit: Maximum number of posts to return.
+            offset: Number of matching posts to skip (simple paging).
+            after: Keyset paging: a (scheduled_date, id) pair from the last row of the previous
+                page. Cheaper than a large offset on big tables.
+            campaign_id: Only posts of this campaign.
+
+        Returns:
+            A list of dictionaries representing the scheduled posts.
+        """
+        try:
+            clauses, params = self._build_filters(start_date, end_date, status, platform, campaign_id)
+            if after is not None:
+                # Written as a range on scheduled_date so SQLite can seek the index
+                clauses.append("scheduled_date >= ? AND (scheduled_date > ? OR id > ?)")
+                params.extend([after[0], after[0], after[1]])
+            where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+            cursor = self.conn.execute(
+                f"SELECT {POST_COLUMNS} FROM scheduled_posts {where} "
+                f"ORDER BY scheduled_date ASC, id ASC LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            )
+            return [dict(row) for row in cursor.fetchall()]
+        except (sqlite3.Error, ValueError) as e:
+            logging.error(f"Error retrieving scheduled posts: {e}")
+            return []
+
+    def count_scheduled_posts(self, start_date=None, end_date=None, status: str = None, platform: str = None,
+                              campaign_id: int = None) -> int:
+        """Counts the posts matching the same filters as get_scheduled_posts."""
+        try:
+            clauses, params = self._build_filters(start_date, end_date, status, platform, campaign_id)
+            where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+            return self.conn.execute(f"SELECT COUNT(*) FROM scheduled_posts {where}", params).fetchone()[0]
+        except (sqlite3.Error, ValueError) as e:
+            logging.error(f"Error counting scheduled posts: {e}")
+            return 0
+
+    def export_posts(self, path: str, format: str = None, start_date=None, end_date=None, status: str = None,
+                     platform: str = None, campaign_id: int = None,
+                     batch_size: int = transfer.BATCH_SIZE) -> dict:
+        """
+        Streams the posts matching the get_scheduled_posts filters to a file, a batch at a time.
+
+        Args:
+            path: The file to write: .parquet, .arrow, .csv or .jsonl (see transfer.FORMATS).
+            format: The format, if the extension does not say.
+            batch_size: Rows fetched from the cursor and written at a time.
+
+        Returns:
+            A dictionary with "rows", "seconds" and "rows_per_sec", or None if the export failed.
+
+        Raises:
+            ValueError: If the format is unknown or needs pyarrow and it is not installed.
+        """
+        format = transfer.resolve_format(path, format)
+        try:
+            clauses, params = self._build_filters(start_date, end_date, status, platform, campaign_id)
+            where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+            stats = transfer.export_rows(self.conn, path, where, params, format, batch_size)
+        except (sqlite3.Error, OSError, ValueError) as e:
+            logging.error(f"Error exporting scheduled posts to {path}: {e}")
+            return None
+        logging.info(f"Exported {stats['rows']} posts to {path} in {stats['seconds']:.2f}s "
+                     f"({stats['rows_per_sec']:.0f} rows/s).")
+        return stats
+
+    def import_posts(self, path: str, format: str = None, dedup_policy: str = "reject",
+                     threshold: float = dedup.DEFAULT_THRESHOLD, campaign_id: int = None,
+                     allocate: bool = False, batch_size: int = transfer.BATCH_SIZE) -> dict:
+        """
+        Schedules the posts in a file written elsewhere (or by export_posts), a batch at a time.
+
+        Each batch is validated and inserted in its own write transaction, with the same
+        near-duplicate handling as schedule_posts_bulk. Unlike schedule_posts_bulk, invalid rows
+        are skipped rather than failing the import, and a failure part-way keeps the batches
+        already written. Only platform, content and scheduled_date are read; imported posts are
+        new scheduled posts.
+
+        Args:
+            path: A .parquet, .arrow, .csv or .jsonl file.
+            format: The format, if the extension does not say.
+            dedup_policy: One of DEDUP_POLICIES.
+            threshold: Jaccard similarity at which two posts count as near-duplicates.
+            campaign_id: The campaign the imported posts belong to, if any.
+            allocate: Place each post in the first free slot on or after its date.
+            batch_size: Rows read and inserted at a time.
+
+        Returns:
+            A dictionary with "rows" (read), "seconds", "rows_per_sec", "imported" (inserted or
+            merged), "rejected" (near-duplicates), "invalid" and "error" (empty unless it failed).
+
+        Raises:
+            ValueError: If the format or dedup policy is unknown.
+        """
+        if dedup_policy not in DEDUP_POLICIES:
+            raise ValueError(f"Unknown dedup policy {dedup_policy!r}; expected one of {DEDUP_POLICIES}.")
+        format = transfer.resolve_format(path, format)
+        began = time.perf_counter()
+        read, counts, error = 0, {"inserted": 0, "merged": 0, "rejected": 0, "invalid": 0}, ""
+        try:
+            for batch in transfer.read_batches(path, format, batch_size):
+                read += len(batch)
+                rows, errors = self._validate_posts(batch)
+                if errors:
+                    counts["invalid"] += len(errors)
+                    logging.warning(f"Skipped {len(errors)} invalid rows of {path}: {'; '.join(errors[:10])}")
+                if not rows:
+                    continue
+                with self.storage.write_transaction() as conn:
+                    for _, outcome in self._insert_posts(conn, rows, dedup_policy, threshold, campaign_id,
+                                                         self.slot_policy if allocate else None):
+                        counts[outcome] += 1
+        except (sqlite3.Error, OSError, ValueError) as e:
+            error = str(e)
+            logging.error(f"Error importing posts from {path} after {read} rows: {e}")
+        stats = transfer.rate(read, time.perf_counter() - began)
+        stats.update(imported=counts["inserted"] + counts["merged"], rejected=counts["rejected"],
+                     invalid=counts["invalid"], error=error)
+        logging.info(f"Imported {stats['imported']} of {read} posts from {path} in {stats['seconds']:.2f}s "
+                     f"({stats['rows_per_sec']:.0f} rows/s).")
+        return stats
+
+    def rebalance(self, start: datetime = None, platforms=None) -> int:
+        """
+        Moves still-scheduled future posts out of slots that are over capacity or blacked out
+        under the current slot policy, and rebuilds the free-slot index for it. Call this after
+        changing the policy; posts that already fit stay where they are.
+
+        Args:
+            start: Only posts at or after this time (default: now; earlier times are ignored).
+            platforms: Only these platforms (default: all).
+
+        Returns:
+            The number of posts moved.
+        """
+        now = datetime.now()
+        start = max(start or now, now)
+        try:
+            with self.storage.write_transaction() as conn:
+                return slots.rebalance(conn, self.slot_policy, start, platforms)
+        except (sqlite3.Error, ValueError) as e:
+            logging.error(f"Error rebalancing scheduled posts: {e}")
+            return 0
+
+    def claim_due_posts(self, worker_id: str, limit: int = 100, now: datetime = None) -> list:
+        """
+        Atomically claims posts that are due, moving them from 'scheduled' to 'sending'.
+
+        The select and the status change happen in one UPDATE ... RETURNING statement,
+        so concurrent workers (threads or processes) never claim the same post.
+
+        Args:
+            worker_id: An identifier for the claiming worker.
+            limit: Maximum number of posts to claim.
+            now: The current time (defaults to datetime.now()).
+
+        Returns:
+            The claimed posts as dictionaries, including their attempt count.
+        """
+        now = now or datetime.now()
+        stamp = _timestamp(now)
+        try:
+            with self.conn:
+                cursor = self.conn.execute(
+                    """
+                    UPDATE scheduled_posts
+                    SET status = 'sending', claimed_by = ?, claimed_at = ?, attempts = attempts + 1
+                    WHERE id IN (
+                        SELECT id FROM scheduled_posts
+                        WHERE status = 'scheduled' AND scheduled_date <= ?
+                          AND (next_attempt_at IS NULL OR next_attempt_at <= ?)
+                        ORDER BY scheduled_date ASC, id ASC
+                        LIMIT ?
+                    )
+                    RETURNING id, platform, content, scheduled_date, attempts
+                    """,
+                    (worker_id, stamp, stamp, stamp, limit)
+                )
+                return [dict(row) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            logging.error(f"Error claiming due posts: {e}")
+            return []
+
+    def mark_posts_sent(self, worker_id: str, results: list) -> int:
+        """
+        Records successful sends of posts the worker still holds the claim on.
+
+        Args:
+            worker_id: The worker that claimed the posts.
+            results: (post_id, external_id, sent_at) tuples; sent_at is a datetime.
+
+        Returns:
+            The number of posts marked sent; posts whose claim was lost are left alone.
+        """
+        if not results:
+            return 0
+        with self.conn:
+            cursor = self.conn.executemany(
+                "UPDATE scheduled_posts SET status = 'sent', external_id = ?, sent_at = ?, last_error = NULL "
+                "WHERE id = ? AND status = 'sending' AND claimed_by = ?",
+                [(external_id, _timestamp(sent_at), post_id, worker_id) for post_id, external_id, sent_at in results]
+            )
+        return cursor.rowcount
+
+    def mark_post_failed(self, worker_id: str, post_id: int, error: str, retry_at: datetime = None) -> bool:
+        """
+        Records a failed send of a post the worker still holds the claim on. With `retry_at` the
+        post goes back to 'scheduled' and becomes claimable again at that time; otherwise it is
+        marked 'failed'.
+
+        Returns:
+            False if the worker no longer held the claim, so nothing was changed.
+        """
+        with self.conn:
+            if retry_at is not None:
+                cursor = self.conn.execute(
+                    "UPDATE scheduled_posts SET status = 'scheduled', next_attempt_at = ?, last_error = ?, "
+                    "claimed_by = NULL, claimed_at = NULL WHERE id = ? AND status = 'sending' AND claimed_by = ?",
+                    (_timestamp(retry_at), error, post_id, worker_id)
+                )
+            else:
+                cursor = self.conn.execute(
+                    "UPDATE scheduled_posts SET status = 'failed', last_error = ? "
+                    "WHERE id = ? AND status = 'sending' AND claimed_by = ?",
+                    (error, post_id, worker_id)
+                )
+        return cursor.rowcount > 0
+
+    def renew_claims(self, worker_id: str, now: datetime = None) -> int:
+        """
+        Extends the lease on every post the worker is still sending, so release_stale_claims
+        does not hand them to another worker while they are in flight.
+
+        Returns:
+            The number of claims renewed.
+        """
+        with self.conn:
+            cursor = self.conn.execute(
+                "UPDATE scheduled_posts SET claimed_at = ? WHERE status = 'sending' AND claimed_by = ?",
+                (_timestamp(now), worker_id)
+            )
+        return cursor.rowcount
+
+    def release_stale_claims(self, lease_seconds: float, now: datetime = None) -> int:
+        """
+        Returns posts stuck in 'sending' longer than `lease_seconds` (e.g. after a worker crash)
+        to 'scheduled' so another worker can pick them up.
+
+        Returns:
+            The number of posts released.
+        """
+        cutoff = _timestamp((now or datetime.now()) - timedelta(seconds=lease_seconds))
+        with self.conn:
+            cursor = self.conn.execute(
+                "UPDATE scheduled_posts SET status = 'scheduled', claimed_by = NULL, claimed_at = NULL "
+                "WHERE status = 'sending' AND claimed_at < ?",
+                (cutoff,)
+            )
+        if cursor.rowcount:
+            logging.warning(f"Released {cursor.rowcount} stale claims older than {lease_seconds}s.")
+        return cursor.rowcount
+
+
+_shared_schedulers = {}
+_shared_lock = threading.Lock()
+
+def get_scheduler(db_file: str = None) -> MockScheduler:
+    """
+    Returns the process-wide scheduler for a database file, initializing its schema once.
+    UI sessions and background workers should share this instead of opening their own.
+    """
+    db_file = db_file or DB_FILE
+    with _shared_lock:
+        scheduler = _shared_schedulers.get(db_file)
+        if scheduler is None:
+            scheduler = MockScheduler(db_file=db_file)
+            scheduler.initialize_db()
+            _shared_schedulers[db_file] = scheduler
+        return scheduler
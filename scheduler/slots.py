@@ -0,0 +1,245 @@
+# scheduler/slots.py
+"""
+Time-slot allocation for scheduled posts.
+
+Time is divided into one-hour slots per platform, each holding at most that platform's
+per-hour capacity. Open slots (those outside quiet hours and blackout windows) are
+materialized in the post_slots table a few weeks ahead, with the number of posts they can
+still take; triggers on scheduled_posts keep that count current on every insert, delete
+and reschedule. Finding the next free slot is then a single seek on a partial index of the
+slots with room left, however many posts are already scheduled.
+"""
+import logging
+import functools
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta
+
+SLOT = timedelta(hours=1)
+SLOT_FORMAT = '%Y-%m-%d %H:00:00'
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+# Posts per platform per hour; platforms not listed get SlotPolicy.default_capacity
+DEFAULT_CAPACITY = {"Twitter": 4, "LinkedIn": 1}
+DEFAULT_QUIET_HOURS = ((time(22), time(7)),)
+# How far ahead open slots are materialized at a time, and the furthest allocation looks
+HORIZON_DAYS = 28
+MAX_HORIZON_DAYS = 5 * 366
+
+# The slot of a stored scheduled_date, in SQL; date-only values fall in the midnight slot
+_SQL_SLOT = "strftime('%Y-%m-%d %H:00:00', {})"
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS post_slots ("
+    " platform TEXT NOT NULL, slot_start TEXT NOT NULL, capacity INTEGER NOT NULL, remaining INTEGER NOT NULL,"
+    " PRIMARY KEY (platform, slot_start)"
+    ") WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS idx_post_slots_free ON post_slots (platform, slot_start) WHERE remaining > 0",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS post_slots_on_insert AFTER INSERT ON scheduled_posts BEGIN
+        UPDATE post_slots SET remaining = remaining - 1
+        WHERE platform = NEW.platform AND slot_start = {_SQL_SLOT.format("NEW.scheduled_date")};
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS post_slots_on_delete AFTER DELETE ON scheduled_posts BEGIN
+        UPDATE post_slots SET remaining = remaining + 1
+        WHERE platform = OLD.platform AND slot_start = {_SQL_SLOT.format("OLD.scheduled_date")};
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS post_slots_on_move AFTER UPDATE OF platform, scheduled_date ON scheduled_posts
+    WHEN OLD.platform IS NOT NEW.platform OR OLD.scheduled_date IS NOT NEW.scheduled_date BEGIN
+        UPDATE post_slots SET remaining = remaining + 1
+        WHERE platform = OLD.platform AND slot_start = {_SQL_SLOT.format("OLD.scheduled_date")};
+        UPDATE post_slots SET remaining = remaining - 1
+        WHERE platform = NEW.platform AND slot_start = {_SQL_SLOT.format("NEW.scheduled_date")};
+    END
+    """,
+)
+
+
+def floor_slot(value: datetime) -> datetime:
+    """The start of the slot containing `value`."""
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def ceil_slot(value: datetime) -> datetime:
+    """The start of the first slot that begins at or after `value`."""
+    start = floor_slot(value)
+    return start if start == value else start + SLOT
+
+
+def parse_timestamp(value: str) -> datetime:
+    """Parses a stored scheduled_date ("YYYY-MM-DD" or "YYYY-MM-DD HH:MM:SS")."""
+    return datetime.fromisoformat(value)
+
+
+@dataclass
+class SlotPolicy:
+    """
+    Where and how densely posts may be placed.
+
+    Attributes:
+        capacity: Posts per hour for each platform.
+        default_capacity: Posts per hour for platforms missing from `capacity`.
+        quiet_hours: Daily (start, end) local times with no posts; a window may wrap midnight.
+        blackouts: (start, end) datetime ranges with no posts, e.g. a holiday or an outage.
+    """
+    capacity: dict = field(default_factory=lambda: dict(DEFAULT_CAPACITY))
+    default_capacity: int = 1
+    quiet_hours: tuple = DEFAULT_QUIET_HOURS
+    blackouts: tuple = ()
+
+    def capacity_for(self, platform: str) -> int:
+        return self.capacity.get(platform, self.default_capacity)
+
+    def is_open(self, slot_start: datetime) -> bool:
+        """Whether any part of the slot is free of quiet hours and blackouts."""
+        hour = slot_start.time()
+        for start, end in self.quiet_hours:
+            if (start <= hour < end) if start <= end else (hour >= start or hour < end):
+                return False
+        slot_end = slot_start + SLOT
+        return not any(start < slot_end and slot_start < end for start, end in self.blackouts)
+
+    def open_slots(self, start: datetime, end: datetime):
+        """Yields the open slot starts in [start, end)."""
+        slot = ceil_slot(start)
+        while slot < end:
+            if self.is_open(slot):
+                yield slot
+            slot += SLOT
+
+
+def extend_slots(conn, platform: str, policy: SlotPolicy, until: datetime, now: datetime = None) -> int:
+    """
+    Materializes the platform's open slots up to `until`, continuing from the last hour covered
+    (slots are kept contiguous, so an hour with no row is closed or in the past). Posts already
+    scheduled in those hours count against their capacity.
+
+    Returns:
+        The number of slots added.
+    """
+    begin = _covered_until(conn, platform, now or datetime.now())
+    if begin >= until:
+        return 0
+    used = dict(conn.execute(
+        f"SELECT {_SQL_SLOT.format('scheduled_date')}, COUNT(*) FROM scheduled_posts "
+        f"WHERE platform = ? AND scheduled_date >= ? AND scheduled_date < ? GROUP BY 1",
+        (platform, begin.strftime(SLOT_FORMAT), until.strftime(SLOT_FORMAT))
+    ).fetchall())
+    capacity = policy.capacity_for(platform)
+    rows = []
+    for slot in policy.open_slots(begin, until):
+        key = slot.strftime(SLOT_FORMAT)
+        rows.append((platform, key, capacity, capacity - used.get(key, 0)))
+    # A closed last hour marks how far the slots were materialized even if none of them is open
+    last = (until - SLOT).strftime(SLOT_FORMAT)
+    if not rows or rows[-1][1] != last:
+        rows.append((platform, last, 0, -used.get(last, 0)))
+    conn.executemany(
+        "INSERT OR IGNORE INTO post_slots (platform, slot_start, capacity, remaining) VALUES (?, ?, ?, ?)", rows
+    )
+    return len(rows)
+
+
+def _covered_until(conn, platform: str, now: datetime) -> datetime:
+    """The first hour after the platform's materialized slots (or the current hour)."""
+    last = conn.execute("SELECT MAX(slot_start) FROM post_slots WHERE platform = ?", (platform,)).fetchone()[0]
+    begin = floor_slot(now)
+    return max(begin, parse_timestamp(last) + SLOT) if last is not None else begin
+
+
+def slot_time(slot_start: datetime, capacity: int, index: int) -> datetime:
+    """The time of the index-th post in a slot, spreading `capacity` posts evenly over the hour."""
+    return slot_start + SLOT * (min(index, capacity - 1) / capacity)
+
+
+def allocate(conn, platform: str, policy: SlotPolicy, earliest: datetime, now: datetime = None) -> str:
+    """
+    Finds the first free slot for a platform at or after `earliest` (and not in the past).
+
+    The caller inserts the post with the returned time inside the same write transaction;
+    the insert trigger then takes the place out of the slot.
+
+    Returns:
+        The post's "YYYY-MM-DD HH:MM:SS" timestamp.
+
+    Raises:
+        ValueError: If no slot is free within MAX_HORIZON_DAYS, e.g. when every hour is blacked out.
+    """
+    now = now or datetime.now()
+    start = ceil_slot(max(earliest, now))
+    while True:
+        row = conn.execute(
+            # Without the hint SQLite walks the primary key through every full slot on the way
+            "SELECT slot_start, capacity, remaining FROM post_slots INDEXED BY idx_post_slots_free "
+            "WHERE platform = ? AND slot_start >= ? AND remaining > 0 ORDER BY slot_start LIMIT 1",
+            (platform, start.strftime(SLOT_FORMAT))
+        ).fetchone()
+        if row is not None:
+            slot_start, capacity, remaining = row
+            return slot_time(parse_timestamp(slot_start), capacity, capacity - remaining).strftime(TIMESTAMP_FORMAT)
+        frontier = max(start, _covered_until(conn, platform, now))
+        if frontier - now > timedelta(days=MAX_HORIZON_DAYS):
+            raise ValueError(f"No free {platform} slot within {MAX_HORIZON_DAYS} days of {start}.")
+        extend_slots(conn, platform, policy, frontier + timedelta(days=HORIZON_DAYS), now)
+
+
+def rebalance(conn, policy: SlotPolicy, start: datetime, platforms=None) -> int:
+    """
+    Re-fits the still-scheduled posts from `start` on to the policy, inside the caller's write transaction.
+
+    Each open slot keeps its earliest posts up to capacity; posts over capacity, or in quiet
+    hours and blackouts, move to the next free slot after their own, so posts keep their order
+    and only the ones that have to move do. The slots are then rebuilt from the current policy.
+
+    Returns:
+        The number of posts moved.
+    """
+    begin = ceil_slot(start)
+    stamp = begin.strftime(SLOT_FORMAT)
+    if platforms is None:
+        platforms = sorted({row[0] for row in conn.execute(
+            "SELECT DISTINCT platform FROM scheduled_posts WHERE status = 'scheduled' AND scheduled_date >= ?",
+            (stamp,)
+        )} | set(policy.capacity))
+    moves = []
+    is_open = functools.lru_cache(maxsize=None)(policy.is_open)
+    for platform in platforms:
+        capacity = policy.capacity_for(platform)
+        used, overflow = {}, []
+        hour, slot = None, None
+        for post_id, scheduled_date in conn.execute(
+                "SELECT id, scheduled_date FROM scheduled_posts "
+                "WHERE platform = ? AND scheduled_date >= ? AND status = 'scheduled' ORDER BY scheduled_date, id",
+                (platform, stamp)):
+            # Rows come in time order, so the slot is only parsed when the hour changes
+            if scheduled_date[:13] != hour:
+                hour, slot = scheduled_date[:13], floor_slot(parse_timestamp(scheduled_date))
+            if is_open(slot) and used.get(slot, 0) < capacity:
+                used[slot] = used.get(slot, 0) + 1
+            else:
+                overflow.append((post_id, slot))
+        # Overflow is in time order, so the search for a free slot never needs to go back
+        cursor = begin
+        for post_id, slot in overflow:
+            cursor = max(cursor, slot + SLOT)
+            while capacity < 1 or not is_open(cursor) or used.get(cursor, 0) >= capacity:
+                cursor += SLOT
+                if cursor - begin > timedelta(days=MAX_HORIZON_DAYS):
+                    raise ValueError(f"No free {platform} slot within {MAX_HORIZON_DAYS} days of {begin}.")
+            moves.append((slot_time(cursor, capacity, used.get(cursor, 0)).strftime(TIMESTAMP_FORMAT), post_id))
+            used[cursor] = used.get(cursor, 0) + 1
+        conn.execute(
+            "DELETE FROM post_slots WHERE platform = ? AND slot_start >= ?", (platform, stamp)
+        )
+    conn.executemany("UPDATE scheduled_posts SET scheduled_date = ? WHERE id = ?", moves)
+    for platform in platforms:
+        last = conn.execute(
+            "SELECT MAX(scheduled_date) FROM scheduled_posts WHERE platform = ? AND status = 'scheduled'", (platform,)
+        ).fetchone()[0]
+        until = max(begin, parse_timestamp(last) if last else begin) + timedelta(days=HORIZON_DAYS)
+        extend_slots(conn, platform, policy, until, now=begin)
+    if moves:
+        logging.info(f"Rebalanced {len(moves)} scheduled posts from {begin}.")
+    return len(moves)
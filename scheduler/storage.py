@@ -0,0 +1,110 @@
+# scheduler/storage.py
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+
+DEFAULT_BUSY_TIMEOUT_MS = 10000
+
+# Applied to every connection: WAL lets readers run alongside the writer, NORMAL sync is
+# durable in WAL mode, and a larger page cache and mmap keep hot index pages in memory.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+)
+
+
+class StorageBackend:
+    """
+    The interface the scheduler uses to reach its database.
+
+    Implementations hand out DB-API connections that are safe to use from the calling
+    thread, and must accept the scheduler's SQL (SQLite dialect, "?" placeholders).
+    A server database can be plugged in by implementing this interface.
+    """
+    def connection(self):
+        """Returns a connection owned by the calling thread."""
+        raise NotImplementedError
+
+    @contextmanager
+    def write_transaction(self):
+        """Yields a connection inside a transaction that holds the write lock from the start."""
+        raise NotImplementedError
+
+    def close(self):
+        """Closes every connection the backend has opened."""
+        raise NotImplementedError
+
+
+class SQLiteStorage(StorageBackend):
+    """
+    A thread-safe SQLite backend with one pooled connection per thread.
+
+    Connections are opened on first use in each thread and reused afterwards, so there is
+    no reconnect cost per request. Connections of threads that have exited are closed the
+    next time a new one is opened. A busy timeout makes writers wait for the lock instead
+    of failing with "database is locked".
+    """
+    def __init__(self, db_file: str, busy_timeout_ms: int = DEFAULT_BUSY_TIMEOUT_MS):
+        self.db_file = db_file
+        self.busy_timeout_ms = busy_timeout_ms
+        self.schema_ready = False
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = {}
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_file, timeout=self.busy_timeout_ms / 1000.0, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+        conn = self._open()
+        thread = threading.current_thread()
+        with self._lock:
+            self._prune_dead_threads()
+            self._connections[thread.ident] = (thread, conn)
+        self._local.conn = conn
+        logging.info(f"Connected to database: {self.db_file}")
+        return conn
+
+    def _prune_dead_threads(self):
+        for ident, (thread, conn) in list(self._connections.items()):
+            if not thread.is_alive():
+                conn.close()
+                del self._connections[ident]
+
+    @contextmanager
+    def write_transaction(self):
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+
+    def close(self):
+        with self._lock:
+            for thread, conn in self._connections.values():
+                conn.close()
+            self._connections.clear()
+            self.schema_ready = False
+        self._local = threading.local()
+        logging.info("Database connection closed.")
+
+    @property
+    def open_connections(self) -> int:
+        with self._lock:
+            return len(self._connections)
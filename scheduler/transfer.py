@@ -0,0 +1,163 @@
+# scheduler/transfer.py
+"""
+Streaming export and import of scheduled posts.
+
+Rows move in fixed-size batches in both directions: exports step one SELECT with fetchmany
+and write each batch as it arrives (a Parquet row group, an Arrow record batch, or a chunk of
+CSV/JSONL lines), and imports read the file a batch at a time. Memory use depends on the batch
+size, not on the size of the table or file. Parquet and Arrow need pyarrow; CSV and JSONL
+only use the standard library.
+"""
+import csv
+import json
+import time
+import functools
+import itertools
+import contextlib
+
+BATCH_SIZE = 10_000
+# Every column an export writes, with its Arrow type name
+EXPORT_COLUMNS = (
+    ("id", "int64"), ("platform", "string"), ("content", "string"), ("scheduled_date", "string"),
+    ("status", "string"), ("campaign_id", "int64"), ("created_at", "string"), ("attempts", "int64"),
+    ("sent_at", "string"), ("external_id", "string"),
+)
+# The fields an import reads; other columns (e.g. those of an export) are ignored
+IMPORT_FIELDS = ("platform", "content", "scheduled_date")
+EXTENSIONS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".parquet": "parquet",
+              ".arrow": "arrow", ".feather": "arrow"}
+FORMATS = ("csv", "jsonl", "parquet", "arrow")
+
+
+@functools.lru_cache(maxsize=None)
+def _pyarrow():
+    """Returns the pyarrow module, or None if it is not installed."""
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+        return pyarrow
+    except ImportError:
+        return None
+
+
+def resolve_format(path: str, format: str = None) -> str:
+    """
+    Returns the file format to use: `format` if given, otherwise the one implied by the extension.
+
+    Raises:
+        ValueError: If the format is unknown, or needs pyarrow and it is not installed.
+    """
+    if format is None:
+        suffix = path[path.rfind("."):].lower() if "." in path else ""
+        format = EXTENSIONS.get(suffix)
+        if format is None:
+            raise ValueError(f"Cannot tell the format of {path!r}; pass one of {FORMATS}.")
+    if format not in FORMATS:
+        raise ValueError(f"Unknown format {format!r}; expected one of {FORMATS}.")
+    if format in ("parquet", "arrow") and _pyarrow() is None:
+        raise ValueError(f"Writing or reading {format} files requires pyarrow (pip install pyarrow).")
+    return format
+
+
+def rate(rows: int, seconds: float) -> dict:
+    """The rows moved, the wall time and the resulting rows/sec of an export or import."""
+    return {"rows": rows, "seconds": seconds, "rows_per_sec": rows / seconds if seconds else 0.0}
+
+
+@contextlib.contextmanager
+def _writer(path: str, format: str):
+    """Yields a function that appends one batch of EXPORT_COLUMNS tuples to the file."""
+    names = [name for name, _ in EXPORT_COLUMNS]
+    if format in ("csv", "jsonl"):
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            if format == "csv":
+                writer = csv.writer(f)
+                writer.writerow(names)
+                yield writer.writerows
+            else:
+                yield lambda batch: f.writelines(
+                    json.dumps(dict(zip(names, row)), ensure_ascii=False) + "\n" for row in batch)
+        return
+    pa = _pyarrow()
+    schema = pa.schema([(name, getattr(pa, kind)()) for name, kind in EXPORT_COLUMNS])
+
+    def to_batch(rows):
+        return pa.RecordBatch.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(zip(*rows), schema)], schema=schema)
+
+    if format == "parquet":
+        with pa.parquet.ParquetWriter(path, schema) as writer:
+            yield lambda rows: writer.write_batch(to_batch(rows))
+    else:
+        with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+            yield lambda rows: writer.write_batch(to_batch(rows))
+
+
+def export_rows(conn, path: str, where: str = "", params=(), format: str = None,
+                batch_size: int = BATCH_SIZE) -> dict:
+    """
+    Streams the scheduled_posts rows matching `where` to a file, in id order.
+
+    Args:
+        conn: The database connection to read with.
+        path: The file to write; its extension picks the format unless `format` is given.
+        where: An optional "WHERE ..." clause, with its `params`.
+        format: One of FORMATS.
+        batch_size: Rows fetched and written at a time.
+
+    Returns:
+        rate() of the export.
+    """
+    format = resolve_format(path, format)
+    began = time.perf_counter()
+    exported = 0
+    cursor = conn.execute(
+        f"SELECT {', '.join(name for name, _ in EXPORT_COLUMNS)} FROM scheduled_posts {where} ORDER BY id", params
+    )
+    try:
+        with _writer(path, format) as write:
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                write([tuple(row) for row in batch])
+                exported += len(batch)
+    finally:
+        cursor.close()
+    return rate(exported, time.perf_counter() - began)
+
+
+def _batched(records, size: int):
+    records = iter(records)
+    while batch := list(itertools.islice(records, size)):
+        yield batch
+
+
+def read_batches(path: str, format: str = None, batch_size: int = BATCH_SIZE):
+    """
+    Yields the posts in a CSV, JSONL, Parquet or Arrow file as lists of at most `batch_size`
+    dictionaries with the IMPORT_FIELDS that are present.
+    """
+    format = resolve_format(path, format)
+    if format in ("csv", "jsonl"):
+        with open(path, encoding="utf-8", newline="") as f:
+            records = csv.DictReader(f) if format == "csv" else (json.loads(line) for line in f if line.strip())
+            for batch in _batched(records, batch_size):
+                yield [{key: record[key] for key in IMPORT_FIELDS if key in record} for record in batch]
+        return
+    pa = _pyarrow()
+    if format == "parquet":
+        parquet = pa.parquet.ParquetFile(path)
+        columns = [name for name in IMPORT_FIELDS if name in parquet.schema_arrow.names]
+        for batch in parquet.iter_batches(batch_size=batch_size, columns=columns):
+            yield batch.to_pylist()
+        return
+    with pa.memory_map(path) as source:
+        reader = pa.ipc.open_file(source)
+        columns = [name for name in IMPORT_FIELDS if name in reader.schema.names]
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i).select(columns)
+            for offset in range(0, batch.num_rows, batch_size):
+                yield batch.slice(offset, batch_size).to_pylist()
+
@@ -0,0 +1,303 @@
+# scraper/async_scraper.py
+import time
+import random
+import asyncio
+import logging
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+import httpx
+
+from scraper.scraper import html_to_text, DEFAULT_HEADERS
+from telemetry.metrics import span, record_span, record_retry
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# httpcore trace events timed as scrape phases. DNS resolution happens inside connect_tcp.
+TRACE_SPANS = {
+    "connection.connect_tcp": "scrape.connect",
+    "connection.start_tls": "scrape.tls",
+    "http11.receive_response_headers": "scrape.wait",
+    "http2.receive_response_headers": "scrape.wait",
+}
+
+
+@dataclass
+class FetchResult:
+    """The outcome of fetching and extracting one URL."""
+    url: str
+    status: int = 0
+    text: str = ""
+    etag: str = None
+    last_modified: str = None
+    not_modified: bool = False
+    truncated: bool = False
+    attempts: int = 0
+    bytes_read: int = 0
+    error: str = ""
+    body: bytes = b""
+
+    @property
+    def ok(self) -> bool:
+        return not self.error
+
+
+class ValidatorStore:
+    """
+    Remembers ETag/Last-Modified validators and the extracted text per URL,
+    so a 304 response can be answered from the previous download.
+    """
+    def __init__(self):
+        self._entries = {}
+
+    def get(self, url: str):
+        """Returns (etag, last_modified, text) for a URL, or None."""
+        return self._entries.get(url)
+
+    def put(self, url: str, etag: str, last_modified: str, text: str):
+        if etag or last_modified:
+            self._entries[url] = (etag, last_modified, text)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class HostLimiter:
+    """
+    Caps concurrent requests to one host and spaces request starts
+    so that no more than `rate` requests per second are sent to it.
+    """
+    def __init__(self, max_concurrency: int, rate: float):
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        if self.interval:
+            async with self._lock:
+                now = time.monotonic()
+                wait = self._next_start - now
+                self._next_start = max(now, self._next_start) + self.interval
+            if wait > 0:
+                await asyncio.sleep(wait)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.semaphore.release()
+
+
+def normalize_scrape_url(url: str) -> str:
+    """Adds the https:// scheme the same way scrape_text_from_url does."""
+    if not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+    return url
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff: a random delay in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def _retry_after_seconds(response: httpx.Response):
+    """Parses a numeric Retry-After header, if present."""
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+class AsyncScraper:
+    """
+    An asyncio scraping engine with pooled keep-alive connections,
+    per-host concurrency and rate limits, retries with jittered backoff,
+    a response size cap and conditional GETs.
+
+    Usage:
+        async with AsyncScraper() as scraper:
+            results = await scraper.fetch_many(urls)
+    """
+    def __init__(self, max_connections: int = 100, max_per_host: int = 4,
+                 requests_per_second: float = 5.0, timeout: float = 10.0,
+                 max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 10.0,
+                 max_bytes: int = 5_000_000, validators: ValidatorStore = None,
+                 headers: dict = None, transport: httpx.AsyncBaseTransport = None):
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.requests_per_second = requests_per_second
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_bytes = max_bytes
+        self.validators = validators if validators is not None else ValidatorStore()
+        self.headers = dict(DEFAULT_HEADERS, **(headers or {}))
+        self.transport = transport
+        self.client = None
+        self._hosts = {}
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def open(self):
+        """Creates the pooled HTTP client."""
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                transport=self.transport,
+            )
+
+    async def close(self):
+        """Closes the pooled HTTP client and its connections."""
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def _limiter_for(self, url: str) -> HostLimiter:
+        host = urlsplit(url).netloc.lower()
+        limiter = self._hosts.get(host)
+        if limiter is None:
+            limiter = HostLimiter(self.max_per_host, self.requests_per_second)
+            self._hosts[host] = limiter
+        return limiter
+
+    async def _read_capped(self, response: httpx.Response, result: FetchResult) -> bytes:
+        """Reads the body up to max_bytes, marking the result as truncated if it is cut off."""
+        declared = response.headers.get("Content-Length")
+        if declared and declared.isdigit() and int(declared) > self.max_bytes:
+            result.truncated = True
+        body = bytearray()
+        async for chunk in response.aiter_bytes():
+            remaining = self.max_bytes - len(body)
+            if len(chunk) >= remaining:
+                body.extend(chunk[:remaining])
+                result.truncated = result.truncated or len(chunk) > remaining
+                break
+            body.extend(chunk)
+        result.bytes_read = len(body)
+        return bytes(body)
+
+    @staticmethod
+    def _phase_tracer():
+        """Returns an httpx trace hook that records connect, TLS and time-to-first-byte spans."""
+        started = {}
+
+        async def trace(event_name: str, info: dict):
+            phase, _, state = event_name.rpartition(".")
+            name = TRACE_SPANS.get(phase)
+            if name is None:
+                return
+            if state == "started":
+                started[phase] = time.perf_counter()
+            elif phase in started:
+                record_span(name, time.perf_counter() - started.pop(phase))
+
+        return trace
+
+    async def fetch(self, url: str, extract: bool = True, conditional: bool = None) -> FetchResult:
+        """
+        Fetches one URL and extracts its text.
+
+        Args:
+            url: The URL to fetch. A missing scheme defaults to https://.
+            extract: Extract the page's text. If False, the raw response is returned in
+                `body` instead (e.g. for feeds and robots.txt).
+            conditional: Send the validators stored for the URL, so an unchanged page is
+                answered with 304. Defaults to `extract`: extracted text is kept and returned
+                again on a 304, but raw bodies are not, so a raw fetch is only conditional when
+                the caller handles `not_modified` itself (its `body` is then empty).
+
+        Returns:
+            A FetchResult. Failures are reported in `error` rather than raised.
+        """
+        with span("scrape"):
+            return await self._fetch(url, extract, extract if conditional is None else conditional)
+
+    async def _fetch(self, url: str, extract: bool = True, conditional: bool = True) -> FetchResult:
+        if self.client is None:
+            await self.open()
+        url = normalize_scrape_url(url)
+        result = FetchResult(url=url)
+        cached = self.validators.get(url) if conditional else None
+        headers = {}
+        if cached:
+            etag, last_modified, _ = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        limiter = self._limiter_for(url)
+        for attempt in range(self.max_retries + 1):
+            result.attempts = attempt + 1
+            delay = None
+            try:
+                async with limiter:
+                    async with self.client.stream("GET", url, headers=headers,
+                                                  extensions={"trace": self._phase_tracer()}) as response:
+                        result.status = response.status_code
+                        if response.status_code == 304 and cached:
+                            result.not_modified = True
+                            result.etag, result.last_modified, result.text = cached
+                            result.error = ""
+                            return result
+                        if response.status_code in RETRYABLE_STATUS:
+                            result.error = f"HTTP {response.status_code}"
+                            delay = _retry_after_seconds(response)
+                        elif response.status_code >= 400:
+                            result.error = f"HTTP {response.status_code}"
+                            logging.error(f"Error scraping URL {url}: {result.error}")
+                            return result
+                        else:
+                            with span("scrape.download"):
+                                body = await self._read_capped(response, result)
+                            result.etag = response.headers.get("ETag")
+                            result.last_modified = response.headers.get("Last-Modified")
+                            result.error = ""
+            except httpx.HTTPError as e:
+                result.error = f"{e.__class__.__name__}: {e}"
+
+            if not result.error:
+                break
+            if attempt < self.max_retries:
+                if delay is None:
+                    delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+                record_retry("scrape")
+                logging.warning(f"Retrying {url} in {delay:.2f}s after {result.error}")
+                await asyncio.sleep(min(delay, self.backoff_max))
+        else:
+            logging.error(f"Error scraping URL {url} after {result.attempts} attempts: {result.error}")
+            return result
+
+        if not extract:
+            # Raw bodies are not kept, so there would be nothing to answer a later 304 with
+            result.body = body
+            return result
+        with span("scrape.parse"):
+            result.text = await asyncio.to_thread(html_to_text, body)
+        if not result.text:
+            logging.warning(f"No text content found at {url}")
+        self.validators.put(url, result.etag, result.last_modified, result.text)
+        logging.info(f"Successfully scraped content from {url}. Length: {len(result.text)} characters.")
+        return result
+
+    async def scrape(self, url: str) -> str:
+        """Async counterpart of scrape_text_from_url: returns the text or an empty string."""
+        result = await self.fetch(url)
+        return result.text if result.ok else ""
+
+    async def fetch_many(self, urls) -> list:
+        """Fetches many URLs concurrently, returning FetchResults in input order."""
+        return await asyncio.gather(*(self.fetch(url) for url in urls))
@@ -0,0 +1,532 @@
+# scraper/crawler.py
+"""
+Discovers new and changed pages from sitemaps and RSS/Atom feeds.
+
+The crawl frontier lives in the scheduler's SQLite database. crawl_feeds holds every feed
+(the registered ones and the child sitemaps of sitemap indexes) with its HTTP validators, so
+an unchanged feed costs one conditional GET answered with 304, and a child sitemap whose
+lastmod in the index has not changed is not fetched at all. crawl_urls is the seen-set:
+one row per page with the lastmod it was last listed with. A page is pending when it is new
+or its lastmod changed, and only pending pages are downloaded. robots.txt is cached per host
+in crawl_robots for a day; while a host's robots.txt cannot be fetched, its pages stay pending.
+"""
+import io
+import gzip
+import time
+import asyncio
+import logging
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from urllib.parse import urljoin, urlsplit
+from urllib.robotparser import RobotFileParser
+
+from scheduler.storage import SQLiteStorage, StorageBackend
+from scraper.async_scraper import AsyncScraper
+
+CRAWL_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS crawl_feeds (
+        url TEXT PRIMARY KEY,
+        parent TEXT,
+        kind TEXT,
+        lastmod TEXT,
+        etag TEXT,
+        last_modified TEXT,
+        backfill INTEGER NOT NULL DEFAULT 0,
+        polled_at TEXT,
+        error TEXT,
+        created_at TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS crawl_urls (
+        url TEXT PRIMARY KEY,
+        feed_url TEXT NOT NULL,
+        lastmod TEXT,
+        state TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        error TEXT,
+        discovered_at TEXT NOT NULL,
+        processed_at TEXT
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_crawl_urls_pending ON crawl_urls (discovered_at) WHERE state = 'pending'",
+    "CREATE TABLE IF NOT EXISTS crawl_robots (origin TEXT PRIMARY KEY, body TEXT NOT NULL, fetched_at TEXT NOT NULL)",
+)
+
+# Page states: "seen" pages were already listed when their feed was first polled and are not
+# processed unless they change; "failed" pages gave up after MAX_ATTEMPTS; "blocked" pages
+# are disallowed by robots.txt.
+URL_STATES = ("pending", "done", "failed", "blocked", "seen")
+MAX_ATTEMPTS = 3
+ROBOTS_TTL = timedelta(days=1)
+# How long a crawler waits before asking again for a robots.txt that could not be fetched
+ROBOTS_RETRY = timedelta(minutes=5)
+# The sitemap protocol allows 50 MB uncompressed per file
+MAX_FEED_BYTES = 50_000_000
+# How many levels of sitemap indexes are followed
+MAX_INDEX_DEPTH = 3
+
+
+def _timestamp(value: datetime = None) -> str:
+    return (value or datetime.now()).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _local(tag: str) -> str:
+    """An element's tag without its XML namespace."""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _child_text(element, *names):
+    """The text of the first child with one of the given local names (in order of preference)."""
+    children = {}
+    for child in element:
+        children.setdefault(_local(child.tag), child)
+    for name in names:
+        child = children.get(name)
+        if child is not None and child.text and child.text.strip():
+            return child.text.strip()
+    return None
+
+
+def _atom_link(entry):
+    for child in entry:
+        if _local(child.tag) == "link" and child.get("rel", "alternate") == "alternate" and child.get("href"):
+            return child.get("href").strip()
+    return None
+
+
+def parse_feed(body: bytes, base_url: str = "") -> tuple:
+    """
+    Parses a sitemap, sitemap index, RSS or Atom document (gzipped or not).
+
+    Returns:
+        A (kind, entries) tuple: kind is "sitemapindex", "sitemap", "rss" or "atom", and entries
+        are (url, lastmod) pairs (child sitemaps for an index, pages otherwise). lastmod is None
+        when the document does not give one.
+
+    Raises:
+        ValueError: If the document is not XML or not one of those formats.
+    """
+    if body[:2] == b"\x1f\x8b":
+        try:
+            with gzip.GzipFile(fileobj=io.BytesIO(body)) as f:
+                body = f.read(MAX_FEED_BYTES)
+        except (OSError, EOFError) as e:
+            raise ValueError(f"Invalid gzip data: {e}") from e
+    try:
+        root = ET.fromstring(body)
+    except ET.ParseError as e:
+        raise ValueError(f"Invalid XML: {e}") from e
+    kind = _local(root.tag)
+    entries = []
+    if kind in ("urlset", "sitemapindex"):
+        for item in root:
+            loc = _child_text(item, "loc")
+            if loc:
+                entries.append((urljoin(base_url, loc), _child_text(item, "lastmod")))
+        return ("sitemap" if kind == "urlset" else "sitemapindex"), entries
+    if kind in ("rss", "RDF"):
+        for item in root.iter():
+            if _local(item.tag) != "item":
+                continue
+            link = _child_text(item, "link") or item.get("{http://www.w3.org/1999/02/22-rdf-syntax-ns#}about")
+            if link:
+                entries.append((urljoin(base_url, link), _child_text(item, "updated", "pubDate", "date")))
+        return "rss", entries
+    if kind == "feed":
+        for entry in root:
+            if _local(entry.tag) == "entry":
+                link = _atom_link(entry)
+                if link:
+                    entries.append((urljoin(base_url, link), _child_text(entry, "updated", "published")))
+        return "atom", entries
+    raise ValueError(f"Not a sitemap or feed: <{kind}>")
+
+
+class CrawlFrontier:
+    """
+    The persistent crawl state (feeds, seen pages and robots.txt) in the scheduler's database.
+    """
+    def __init__(self, db_file: str = None, storage: StorageBackend = None):
+        if storage is None:
+            from scheduler.scheduler import DB_FILE
+            storage = SQLiteStorage(db_file or DB_FILE)
+        self.storage = storage
+        self._ready = False
+
+    @property
+    def conn(self):
+        return self.storage.connection()
+
+    def initialize_db(self):
+        """Creates the crawl tables and indexes."""
+        if self._ready:
+            return
+        with self.storage.write_transaction() as conn:
+            for statement in CRAWL_SCHEMA:
+                conn.execute(statement)
+        self._ready = True
+
+    def add_feed(self, url: str, backfill: bool = False) -> bool:
+        """
+        Registers a sitemap, sitemap index, RSS or Atom feed to poll.
+
+        Args:
+            url: The feed's URL.
+            backfill: Process the pages the feed already lists on its first poll. By default
+                they are only recorded as seen, and only pages added or changed later are processed.
+
+        Returns:
+            True if the feed is new, False if it was already registered.
+        """
+        from cache.store import normalize_url
+        self.initialize_db()
+        with self.storage.write_transaction() as conn:
+            added = conn.execute(
+                "INSERT INTO crawl_feeds (url, backfill, created_at) VALUES (?, ?, ?) ON CONFLICT (url) DO NOTHING",
+                (normalize_url(url), int(backfill), _timestamp())
+            ).rowcount
+        return bool(added)
+
+    def remove_feed(self, url: str) -> bool:
+        """Stops polling a registered feed (and the child sitemaps found through it)."""
+        from cache.store import normalize_url
+        self.initialize_db()
+        url = normalize_url(url)
+        with self.storage.write_transaction() as conn:
+            removed = conn.execute("DELETE FROM crawl_feeds WHERE url = ? AND parent IS NULL", (url,)).rowcount
+            conn.execute("DELETE FROM crawl_feeds WHERE parent = ?", (url,))
+        return bool(removed)
+
+    def feeds(self) -> list:
+        """The registered feeds (not child sitemaps) with their last poll's outcome."""
+        self.initialize_db()
+        return [dict(row) for row in self.conn.execute(
+            "SELECT url, kind, etag, last_modified, backfill, polled_at, error FROM crawl_feeds "
+            "WHERE parent IS NULL ORDER BY created_at, url"
+        )]
+
+    def _feed_rows(self, conn, urls: list) -> dict:
+        rows = {}
+        for start in range(0, len(urls), 500):
+            chunk = urls[start:start + 500]
+            for row in conn.execute(
+                    f"SELECT url, lastmod, etag, last_modified, polled_at FROM crawl_feeds "
+                    f"WHERE url IN ({', '.join('?' * len(chunk))})", chunk):
+                rows[row["url"]] = dict(row)
+        return rows
+
+    def record_polls(self, polls: list, robots: dict = None) -> tuple:
+        """
+        Stores the outcome of polling feeds in one write transaction: each feed's validators
+        and error, the pages they list, and the child sitemaps of the indexes among them.
+
+        Args:
+            polls: FeedPoll objects.
+            robots: robots.txt bodies fetched meanwhile, by origin.
+
+        Returns:
+            A (new pending pages, child FeedPolls to fetch next) tuple. Children are the
+            sitemaps of an index that are new, have no lastmod, or whose lastmod changed.
+        """
+        from cache.store import normalize_url
+        now = _timestamp()
+        children = []
+        with self.storage.write_transaction() as conn:
+            pending_before = conn.execute("SELECT COUNT(*) FROM crawl_urls WHERE state = 'pending'").fetchone()[0]
+            self._save_robots(conn, robots, now)
+            for poll in polls:
+                # polled_at is the last successful poll, so a feed that has never been read is
+                # still polled as a baseline, and a child's new lastmod is kept only once it was read
+                if poll.status not in ("updated", "not_modified"):
+                    conn.execute("UPDATE crawl_feeds SET error = ? WHERE url = ?", (poll.error, poll.url))
+                    continue
+                if poll.depth:
+                    conn.execute("UPDATE crawl_feeds SET lastmod = ? WHERE url = ?", (poll.lastmod, poll.url))
+                if poll.status == "not_modified":
+                    conn.execute("UPDATE crawl_feeds SET polled_at = ?, error = NULL WHERE url = ?", (now, poll.url))
+                    continue
+                conn.execute(
+                    "UPDATE crawl_feeds SET kind = ?, etag = ?, last_modified = ?, polled_at = ?, error = NULL "
+                    "WHERE url = ?", (poll.kind, poll.etag, poll.last_modified, now, poll.url)
+                )
+                if poll.kind == "sitemapindex":
+                    children.extend(self._record_children(conn, poll, now))
+                    continue
+                state = "seen" if poll.baseline else "pending"
+                # A known page becomes pending again only when it is listed with a different lastmod
+                conn.executemany(
+                    "INSERT INTO crawl_urls (url, feed_url, lastmod, state, discovered_at) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (url) DO UPDATE SET lastmod = excluded.lastmod, state = 'pending', attempts = 0, "
+                    "error = NULL, discovered_at = excluded.discovered_at "
+                    "WHERE excluded.lastmod IS NOT NULL AND crawl_urls.lastmod IS NOT excluded.lastmod",
+                    [(normalize_url(url), poll.url, lastmod, state, now) for url, lastmod in poll.entries]
+                )
+            pending_after = conn.execute("SELECT COUNT(*) FROM crawl_urls WHERE state = 'pending'").fetchone()[0]
+        return pending_after - pending_before, children
+
+    def _record_children(self, conn, poll, now: str) -> list:
+        from cache.store import normalize_url
+        listed = {}
+        for url, lastmod in poll.entries:
+            listed[normalize_url(url)] = lastmod
+        known = self._feed_rows(conn, list(listed))
+        children = []
+        for url, lastmod in listed.items():
+            row = known.get(url)
+            if row is not None and row["polled_at"] and lastmod is not None and row["lastmod"] == lastmod:
+                continue
+            children.append(FeedPoll(url=url, baseline=poll.baseline, depth=poll.depth + 1, lastmod=lastmod,
+                                     etag=row["etag"] if row else None,
+                                     last_modified=row["last_modified"] if row else None))
+        conn.executemany(
+            "INSERT INTO crawl_feeds (url, parent, created_at) VALUES (?, ?, ?) ON CONFLICT (url) DO NOTHING",
+            [(url, poll.url, now) for url in listed]
+        )
+        return children
+
+    def pending(self, limit: int = 100) -> list:
+        """The pages waiting to be processed, oldest discovery first."""
+        self.initialize_db()
+        return [dict(row) for row in self.conn.execute(
+            "SELECT url, feed_url, lastmod, attempts FROM crawl_urls INDEXED BY idx_crawl_urls_pending "
+            "WHERE state = 'pending' ORDER BY discovered_at LIMIT ?", (limit,)
+        )]
+
+    def finish(self, outcomes: list, robots: dict = None):
+        """
+        Records processed pages in one write transaction.
+
+        Args:
+            outcomes: (url, state, error) tuples with state "done", "failed", "blocked" or
+                "pending". Failed pages stay pending until they have failed MAX_ATTEMPTS times;
+                pending ones were not tried and keep their attempt count.
+            robots: robots.txt bodies fetched meanwhile, by origin.
+        """
+        now = _timestamp()
+        with self.storage.write_transaction() as conn:
+            self._save_robots(conn, robots, now)
+            conn.executemany(
+                "UPDATE crawl_urls SET attempts = attempts + (? != 'pending'), error = ?, processed_at = ?, "
+                "state = CASE WHEN ? != 'failed' THEN ? WHEN attempts + 1 >= ? THEN 'failed' ELSE 'pending' END "
+                "WHERE url = ?",
+                [(state, error or None, now, state, state, MAX_ATTEMPTS, url) for url, state, error in outcomes]
+            )
+
+    def counts(self) -> dict:
+        """The number of known pages in each state."""
+        self.initialize_db()
+        counts = dict.fromkeys(URL_STATES, 0)
+        counts.update(self.conn.execute("SELECT state, COUNT(*) FROM crawl_urls GROUP BY state").fetchall())
+        return counts
+
+    def cached_robots(self, origin: str, max_age: timedelta = ROBOTS_TTL):
+        """A host's cached robots.txt, or None if it was never fetched or is older than `max_age`."""
+        self.initialize_db()
+        row = self.conn.execute(
+            "SELECT body FROM crawl_robots WHERE origin = ? AND fetched_at >= ?",
+            (origin, _timestamp(datetime.now() - max_age))
+        ).fetchone()
+        return row["body"] if row else None
+
+    @staticmethod
+    def _save_robots(conn, robots: dict, now: str):
+        if robots:
+            conn.executemany(
+                "INSERT INTO crawl_robots (origin, body, fetched_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (origin) DO UPDATE SET body = excluded.body, fetched_at = excluded.fetched_at",
+                [(origin, body, now) for origin, body in robots.items()]
+            )
+
+
+class RobotsCache:
+    """
+    robots.txt rules per host for one crawler: parsed once per origin and kept for `ttl`, read
+    from the frontier while fresh and fetched otherwise. Concurrent checks for the same host
+    share one fetch. A missing robots.txt (4xx) allows everything; an unreachable one (5xx,
+    429, network errors) leaves the host's URLs undecided, and is asked for again after
+    ROBOTS_RETRY.
+    """
+    def __init__(self, frontier: CrawlFrontier, scraper: AsyncScraper, ttl: timedelta = ROBOTS_TTL):
+        self.frontier = frontier
+        self.scraper = scraper
+        self.ttl = ttl
+        self._parsers = {}  # origin -> (task loading its parser, monotonic expiry)
+        self._fetched = {}
+
+    async def allowed(self, url: str):
+        """
+        Whether robots.txt lets the scraper's user agent fetch the URL.
+
+        Returns:
+            True or False, or None while the host's robots.txt cannot be fetched.
+        """
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        task, expires = self._parsers.get(origin, (None, 0.0))
+        if task is None or time.monotonic() >= expires:
+            task = asyncio.ensure_future(self._load(origin))
+            self._parsers[origin] = (task, time.monotonic() + self.ttl.total_seconds())
+        parser = await task
+        if parser is None:
+            current, expires = self._parsers.get(origin, (None, 0.0))
+            if current is task:
+                self._parsers[origin] = (task, min(expires, time.monotonic() + ROBOTS_RETRY.total_seconds()))
+            return None
+        return parser.can_fetch(self.scraper.headers.get("User-Agent", "*"), url)
+
+    async def _load(self, origin: str):
+        parser = RobotFileParser()
+        body = self.frontier.cached_robots(origin, self.ttl)
+        if body is None:
+            # Never conditional: a 304 carries no body to parse, and the stored one has expired
+            result = await self.scraper.fetch(f"{origin}/robots.txt", extract=False, conditional=False)
+            if result.ok:
+                body = result.body.decode("utf-8", errors="replace")
+            elif 400 <= result.status < 500 and result.status != 429:
+                body = ""
+            else:
+                logging.warning(f"robots.txt of {origin} is unavailable ({result.error}); retrying the host later.")
+                return None
+            self._fetched[origin] = body
+        parser.parse(body.splitlines())
+        return parser
+
+    def take_fetched(self) -> dict:
+        """The robots.txt bodies fetched since the last call, to be stored in the frontier."""
+        fetched, self._fetched = self._fetched, {}
+        return fetched
+
+
+@dataclass
+class FeedPoll:
+    """One feed to fetch in a poll, and what came of it."""
+    url: str
+    etag: str = None
+    last_modified: str = None
+    baseline: bool = False
+    depth: int = 0
+    lastmod: str = None
+    status: str = ""
+    kind: str = None
+    entries: list = field(default_factory=list)
+    error: str = ""
+
+
+class FeedCrawler:
+    """
+    Polls the frontier's feeds and hands the pages that are new or changed to a callback.
+
+    Usage:
+        crawler = FeedCrawler(CrawlFrontier(db_file))
+        summary = await crawler.crawl(lambda url, text: ...)
+    """
+    def __init__(self, frontier: CrawlFrontier, scraper: AsyncScraper = None):
+        self.frontier = frontier
+        self.scraper = scraper if scraper is not None else AsyncScraper(max_bytes=MAX_FEED_BYTES)
+        self.robots = RobotsCache(frontier, self.scraper)
+
+    async def close(self):
+        await self.scraper.close()
+
+    async def _poll_feed(self, poll: FeedPoll) -> FeedPoll:
+        allowed = await self.robots.allowed(poll.url)
+        if allowed is None:
+            poll.status, poll.error = "failed", "robots.txt unavailable"
+            return poll
+        if not allowed:
+            poll.status, poll.error = "blocked", "disallowed by robots.txt"
+            return poll
+        # The stored validators make this a conditional GET
+        self.scraper.validators.put(poll.url, poll.etag, poll.last_modified, "")
+        result = await self.scraper.fetch(poll.url, extract=False, conditional=True)
+        if result.not_modified:
+            poll.status = "not_modified"
+            return poll
+        if not result.ok or result.truncated:
+            poll.status, poll.error = "failed", result.error or "feed is larger than the size limit"
+            return poll
+        try:
+            poll.kind, poll.entries = await asyncio.to_thread(parse_feed, result.body, poll.url)
+        except ValueError as e:
+            poll.status, poll.error = "failed", str(e)
+            logging.warning(f"Could not parse feed {poll.url}: {e}")
+            return poll
+        poll.status, poll.etag, poll.last_modified = "updated", result.etag, result.last_modified
+        return poll
+
+    async def poll(self) -> dict:
+        """
+        Fetches every registered feed (and the changed child sitemaps of indexes) and records
+        the pages they list. Pages already seen with the same lastmod are not touched.
+
+        Returns:
+            A dictionary with "feeds" fetched, "not_modified", "failed", "blocked",
+            "new_pages" (newly pending) and "seconds".
+        """
+        began = time.perf_counter()
+        stats = {"feeds": 0, "not_modified": 0, "failed": 0, "blocked": 0, "new_pages": 0}
+        polls = [FeedPoll(url=feed["url"], etag=feed["etag"], last_modified=feed["last_modified"],
+                          baseline=feed["polled_at"] is None and not feed["backfill"])
+                 for feed in self.frontier.feeds()]
+        while polls:
+            polls = await asyncio.gather(*(self._poll_feed(poll) for poll in polls))
+            new_pages, children = self.frontier.record_polls(polls, self.robots.take_fetched())
+            stats["feeds"] += len(polls)
+            stats["new_pages"] += new_pages
+            for poll in polls:
+                if poll.status != "updated":
+                    stats[poll.status] += 1
+            polls = [child for child in children if child.depth <= MAX_INDEX_DEPTH]
+        stats["seconds"] = time.perf_counter() - began
+        logging.info(f"Polled {stats['feeds']} feeds in {stats['seconds']:.2f}s: {stats['not_modified']} unchanged, "
+                     f"{stats['failed']} failed, {stats['new_pages']} new or changed pages.")
+        return stats
+
+    async def crawl(self, process, limit: int = 100, workers: int = 4) -> dict:
+        """
+        Polls the feeds, then downloads up to `limit` pending pages and passes each one's text
+        to `process(url, text)`, which runs in a worker thread and returns True on success.
+
+        Args:
+            process: The callback for each new or changed page, e.g. campaign generation.
+            limit: The most pages processed in this call; the rest stay pending.
+            workers: How many `process` calls run at once.
+
+        Returns:
+            poll()'s statistics plus "processed", "failed_pages", "blocked_pages" and
+            "deferred_pages" (left pending because robots.txt was unavailable), with
+            "seconds" covering the whole call.
+        """
+        began = time.perf_counter()
+        self.frontier.initialize_db()
+        stats = await self.poll()
+        semaphore = asyncio.Semaphore(workers)
+
+        async def handle(page):
+            url = page["url"]
+            allowed = await self.robots.allowed(url)
+            if allowed is None:
+                return url, "pending", "robots.txt unavailable"
+            if not allowed:
+                return url, "blocked", "disallowed by robots.txt"
+            result = await self.scraper.fetch(url)
+            if not result.ok or not result.text:
+                return url, "failed", result.error or "no text could be scraped"
+            async with semaphore:
+                try:
+                    ok = await asyncio.to_thread(process, url, result.text)
+                except Exception as e:
+                    logging.warning(f"Processing {url} failed: {e}")
+                    return url, "failed", str(e) or e.__class__.__name__
+            return url, "done" if ok else "failed", "" if ok else "processing failed"
+
+        outcomes = await asyncio.gather(*(handle(page) for page in self.frontier.pending(limit)))
+        self.frontier.finish(outcomes, self.robots.take_fetched())
+        states = [state for _, state, _ in outcomes]
+        stats.update(processed=states.count("done"), failed_pages=states.count("failed"),
+                     blocked_pages=states.count("blocked"), deferred_pages=states.count("pending"))
+        stats["seconds"] = time.perf_counter() - began
+        return stats
@@ -0,0 +1,322 @@
+# scraper/extractors.py
+import re
+import codecs
+import logging
+import functools
+from html.parser import HTMLParser
+
+
+# The parser libraries are imported on first use, so importing the scraper stays cheap.
+@functools.lru_cache(maxsize=None)
+def _selectolax_parser():
+    """Returns selectolax's parser class (lexbor when available), or None if it is not installed."""
+    try:
+        from selectolax.lexbor import LexborHTMLParser
+        return LexborHTMLParser
+    except ImportError:
+        try:
+            from selectolax.parser import HTMLParser as ModestParser
+            return ModestParser
+        except ImportError:
+            return None
+
+
+@functools.lru_cache(maxsize=None)
+def _lxml_html():
+    """Returns the lxml.html module, or None if lxml is not installed."""
+    try:
+        import lxml.html
+        return lxml.html
+    except ImportError:
+        return None
+
+# Elements that never carry readable text.
+NON_TEXT_TAGS = ("script", "style", "noscript", "template", "svg", "iframe")
+# Elements that are almost always page chrome rather than the article itself.
+BOILERPLATE_TAGS = ("nav", "header", "footer", "aside", "form")
+BOILERPLATE_PATTERN = re.compile(
+    r"cookie|consent|gdpr|banner|navbar|menu|breadcrumb|sidebar|footer|subscribe|newsletter|"
+    r"share|social|popup|modal|advert|promo|related|comment",
+    re.IGNORECASE,
+)
+MAIN_CONTENT_SELECTORS = ("article", "main", "[role=main]")
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+
+def clean_text(text: str) -> str:
+    """Strips each line, splits on double spaces and drops empty phrases, as the scraper always has."""
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return '\n'.join(chunk for chunk in chunks if chunk)
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    if max_chars is None or len(text) <= max_chars:
+        return text
+    cut = text.rfind("\n", 0, max_chars)
+    return text[:cut if cut > 0 else max_chars]
+
+
+def _is_boilerplate_attrs(attrs) -> bool:
+    """True when an element's id or class looks like a cookie banner, menu, footer, etc."""
+    for name, value in attrs:
+        if name in ("id", "class") and value and BOILERPLATE_PATTERN.search(value):
+            return True
+    return False
+
+
+# --- BeautifulSoup (html.parser) backend: the original behavior --------------------------
+
+def _extract_bs4(content, main_content: bool = False, max_chars: int = None) -> str:
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(content, 'html.parser')
+
+    # Remove script and style elements
+    for script_or_style in soup(['script', 'style']):
+        script_or_style.decompose()
+
+    root = soup
+    if main_content:
+        for element in soup(list(NON_TEXT_TAGS) + list(BOILERPLATE_TAGS)):
+            element.decompose()
+        for element in soup.find_all(lambda tag: tag.attrs is not None and _is_boilerplate_attrs(
+                (k, " ".join(v) if isinstance(v, list) else v) for k, v in tag.attrs.items())):
+            element.decompose()
+        root = _main_node_bs4(soup) or soup
+
+    return _truncate(clean_text(root.get_text()), max_chars)
+
+
+def _main_node_bs4(soup):
+    for selector in MAIN_CONTENT_SELECTORS:
+        node = soup.select_one(selector)
+        if node is not None and len(node.get_text(strip=True)) > 200:
+            return node
+    best, best_score = None, 0.0
+    for node in soup.find_all(["div", "section", "td"]):
+        paragraphs = node.find_all("p", recursive=False)
+        text_len = sum(len(p.get_text(strip=True)) for p in paragraphs)
+        if not text_len:
+            continue
+        link_len = sum(len(a.get_text(strip=True)) for p in paragraphs for a in p.find_all("a"))
+        score = text_len * (1.0 - link_len / text_len)
+        if score > best_score:
+            best, best_score = node, score
+    return best
+
+
+# --- lxml backend -------------------------------------------------------------------------
+
+def _extract_lxml(content, main_content: bool = False, max_chars: int = None) -> str:
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    document = _lxml_html().fromstring(content)
+    for element in document.iter("script", "style"):
+        element.drop_tree()
+
+    root = document
+    if main_content:
+        for element in list(document.iter(*(NON_TEXT_TAGS + BOILERPLATE_TAGS))):
+            element.drop_tree()
+        for element in list(document.xpath("//*[@id or @class]")):
+            if element.getparent() is not None and _is_boilerplate_attrs(element.attrib.items()):
+                element.drop_tree()
+        root = _main_node_lxml(document)
+
+    return _truncate(clean_text(root.text_content()), max_chars)
+
+
+def _main_node_lxml(document):
+    for xpath in ("//article", "//main", "//*[@role='main']"):
+        nodes = document.xpath(xpath)
+        if nodes and len(nodes[0].text_content().strip()) > 200:
+            return nodes[0]
+    best, best_score = document, 0.0
+    for node in document.iter("div", "section", "td"):
+        paragraphs = [child for child in node if child.tag == "p"]
+        text_len = sum(len(p.text_content().strip()) for p in paragraphs)
+        if not text_len:
+            continue
+        link_len = sum(len(a.text_content().strip()) for p in paragraphs for a in p.iter("a"))
+        score = text_len * (1.0 - link_len / text_len)
+        if score > best_score:
+            best, best_score = node, score
+    return best
+
+
+# --- selectolax backend -------------------------------------------------------------------
+
+def _extract_selectolax(content, main_content: bool = False, max_chars: int = None) -> str:
+    tree = _selectolax_parser()(content)
+    tree.strip_tags(["script", "style"])
+
+    # The whole document, so the <title> is kept as the other backends keep it
+    root = tree.root
+    if main_content:
+        tree.strip_tags(list(NON_TEXT_TAGS + BOILERPLATE_TAGS))
+        for node in tree.css("[id], [class]"):
+            if _is_boilerplate_attrs(node.attributes.items()):
+                node.decompose()
+        root = _main_node_selectolax(tree) or root
+
+    # Text nodes are joined as they appear, so inline elements stay on their block's line
+    text = root.text(separator="") if root is not None else ""
+    return _truncate(clean_text(text), max_chars)
+
+
+def _main_node_selectolax(tree):
+    for selector in MAIN_CONTENT_SELECTORS:
+        node = tree.css_first(selector)
+        if node is not None and len(node.text(strip=True)) > 200:
+            return node
+    best, best_score = None, 0.0
+    for node in tree.css("div, section, td"):
+        paragraphs = [child for child in node.iter() if child.tag == "p"]
+        text_len = sum(len(p.text(strip=True)) for p in paragraphs)
+        if not text_len:
+            continue
+        link_len = sum(len(a.text(strip=True)) for p in paragraphs for a in p.css("a"))
+        score = text_len * (1.0 - link_len / text_len)
+        if score > best_score:
+            best, best_score = node, score
+    return best
+
+
+# --- Streaming backend --------------------------------------------------------------------
+
+class StreamingTextParser(HTMLParser):
+    """
+    An incremental HTML-to-text parser built on the standard library.
+    It never builds a tree, and it stops accepting input once `max_chars`
+    characters of text have been collected.
+    """
+    BLOCK_TAGS = {"p", "div", "section", "article", "main", "li", "ul", "ol", "br", "tr", "td", "th",
+                  "h1", "h2", "h3", "h4", "h5", "h6", "title", "pre", "blockquote", "table", "dd", "dt"}
+
+    def __init__(self, main_content: bool = False, max_chars: int = None):
+        super().__init__(convert_charrefs=True)
+        self.main_content = main_content
+        self.max_chars = max_chars
+        self.parts = []
+        self.collected = 0
+        self.done = False
+        self._skip_stack = []
+
+    def _skipping(self) -> bool:
+        return bool(self._skip_stack)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_TAGS:
+            if tag == "br":
+                self.parts.append("\n")
+            return
+        skip = tag in NON_TEXT_TAGS
+        if self.main_content and not skip:
+            skip = tag in BOILERPLATE_TAGS or _is_boilerplate_attrs(attrs)
+        if self._skip_stack:
+            self._skip_stack.append(tag)
+        elif skip:
+            self._skip_stack.append(tag)
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if self._skip_stack:
+            # Pop back to the matching open tag; tolerates unclosed children.
+            if tag in self._skip_stack:
+                while self._skip_stack and self._skip_stack.pop() != tag:
+                    pass
+            return
+        if tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if self._skipping() or self.done:
+            return
+        self.parts.append(data)
+        self.collected += len(data.strip())
+        if self.max_chars is not None and self.collected >= self.max_chars:
+            self.done = True
+
+    def text(self) -> str:
+        return _truncate(clean_text("".join(self.parts)), self.max_chars)
+
+
+STREAM_CHUNK_SIZE = 16384
+
+
+def _extract_streaming(content, main_content: bool = False, max_chars: int = None) -> str:
+    # Feed in-memory documents in chunks too, so parsing can stop as soon as the budget is met
+    chunks = (content[i:i + STREAM_CHUNK_SIZE] for i in range(0, len(content), STREAM_CHUNK_SIZE))
+    return extract_streaming(chunks, main_content=main_content, max_chars=max_chars)
+
+
+def extract_streaming(chunks, main_content: bool = False, max_chars: int = None, encoding: str = None) -> str:
+    """
+    Extracts text from an iterable of HTML chunks, stopping early once `max_chars` is reached.
+
+    Args:
+        chunks: An iterable of bytes or str chunks, e.g. response.iter_content().
+        main_content: Skip navigation, headers, footers and banner-like elements.
+        max_chars: Stop reading once this many characters of text have been collected.
+        encoding: Encoding used to decode byte chunks (defaults to utf-8).
+
+    Returns:
+        The extracted text.
+    """
+    parser = StreamingTextParser(main_content=main_content, max_chars=max_chars)
+    decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    for chunk in chunks:
+        if isinstance(chunk, bytes):
+            chunk = decoder.decode(chunk)
+        parser.feed(chunk)
+        if parser.done:
+            break
+    else:
+        parser.feed(decoder.decode(b"", final=True))
+        parser.close()
+    return parser.text()
+
+
+EXTRACTORS = {
+    "html.parser": _extract_bs4,
+    "lxml": _extract_lxml,
+    "selectolax": _extract_selectolax,
+    "streaming": _extract_streaming,
+}
+
+
+def available_extractors() -> list:
+    """Returns the names of the extractor backends whose dependencies are installed."""
+    names = ["html.parser", "streaming"]
+    if _lxml_html() is not None:
+        names.append("lxml")
+    if _selectolax_parser() is not None:
+        names.append("selectolax")
+    return names
+
+
+def get_extractor(name: str = "auto"):
+    """
+    Resolves an extractor backend by name.
+
+    Args:
+        name: "auto", "selectolax", "lxml", "html.parser" or "streaming". "auto" picks the
+            fastest installed backend and falls back to BeautifulSoup's html.parser.
+
+    Returns:
+        A callable taking (content, main_content=False, max_chars=None) and returning text.
+    """
+    if name == "auto":
+        if _selectolax_parser() is not None:
+            name = "selectolax"
+        elif _lxml_html() is not None:
+            name = "lxml"
+        else:
+            name = "html.parser"
+    if name not in EXTRACTORS:
+        raise ValueError(f"Unknown extractor '{name}'. Choose from: auto, {', '.join(EXTRACTORS)}.")
+    if name not in available_extractors():
+        logging.warning(f"Extractor '{name}' is not installed; falling back to html.parser.")
+        name = "html.parser"
+    return EXTRACTORS[name]
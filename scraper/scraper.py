@@ -1,40 +1,93 @@
-import requests
-from bs4 import BeautifulSoup
+import time
 import logging
+from cache.store import make_key, normalize_url
+from scraper.extractors import get_extractor, extract_streaming, STREAM_CHUNK_SIZE
+from telemetry.metrics import span, record_span
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
 
-def scrape_text_from_url(url: str) -> str:
+def html_to_text(content, extractor: str = "auto", main_content: bool = False, max_chars: int = None) -> str:
+    """
+    Extracts readable text from an HTML document.
+
+    Args:
+        content: The raw HTML as bytes or str.
+        extractor: Backend name ("auto", "selectolax", "lxml", "html.parser" or "streaming").
+        main_content: Drop navigation, footers and banners and keep the main article body.
+        max_chars: Optional cap on the returned text.
+
+    Returns:
+        The visible text, one non-empty phrase per line.
+    """
+    return get_extractor(extractor)(content, main_content=main_content, max_chars=max_chars)
+
+PAGE_TTL_SECONDS = 6 * 3600
+
+
+def __getattr__(name):
+    # requests takes ~100ms to import, so it is loaded on the first scrape rather than with the module
+    if name == "requests":
+        import requests
+        return requests
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def scrape_text_from_url(url: str, cache=None, extractor: str = "auto", main_content: bool = False,
+                         max_chars: int = None) -> str:
     """
     Scrapes the main text content from a given URL.
 
     Args:
         url: The URL of the webpage to scrape.
+        cache: Optional ResultCache. Pages scraped within PAGE_TTL_SECONDS are served from it.
+        extractor: HTML-to-text backend; "streaming" also stops the download once max_chars is reached.
+        main_content: Keep only the main article body, dropping navigation, footers and banners.
+        max_chars: Optional cap on the amount of text collected.
 
     Returns:
         The extracted text content, or an empty string if scraping fails.
     """
     if not url.startswith(('http://', 'https://')):
         url = 'https://' + url
-        
+
+    if cache is not None:
+        key = make_key(normalize_url(url), main_content, max_chars)
+        cached = cache.get("page", key, ttl_seconds=PAGE_TTL_SECONDS)
+        if cached is not None:
+            logging.info(f"Using cached content for {url}.")
+            return cached
+        text = scrape_text_from_url(url, extractor=extractor, main_content=main_content, max_chars=max_chars)
+        if text:
+            cache.set("page", key, text)
+        return text
+
+    import requests
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()  # Raises an HTTPError for bad responses (4XX or 5XX)
-
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        # Remove script and style elements
-        for script_or_style in soup(['script', 'style']):
-            script_or_style.decompose()
-
-        # Get text and clean it up
-        text = soup.get_text()
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = '\n'.join(chunk for chunk in chunks if chunk)
+        with span("scrape"):
+            if extractor == "streaming":
+                # Parse while downloading and stop reading the body once enough text is collected
+                with requests.get(url, headers=DEFAULT_HEADERS, timeout=10, stream=True) as response:
+                    response.raise_for_status()
+                    record_span("scrape.request", response.elapsed.total_seconds())
+                    with span("scrape.download_parse"):
+                        text = extract_streaming(response.iter_content(chunk_size=STREAM_CHUNK_SIZE),
+                                                 main_content=main_content, max_chars=max_chars,
+                                                 encoding=response.encoding)
+            else:
+                started = time.perf_counter()
+                response = requests.get(url, headers=DEFAULT_HEADERS, timeout=10)
+                response.raise_for_status()  # Raises an HTTPError for bad responses (4XX or 5XX)
+                # elapsed covers DNS, connect and waiting for the headers; the rest is the body download
+                fetched = time.perf_counter() - started
+                headers_at = min(response.elapsed.total_seconds(), fetched)
+                record_span("scrape.request", headers_at)
+                record_span("scrape.download", fetched - headers_at)
+
+                with span("scrape.parse"):
+                    text = html_to_text(response.content, extractor=extractor, main_content=main_content,
+                                        max_chars=max_chars)
 
         if not text:
             logging.warning(f"No text content found at {url}")
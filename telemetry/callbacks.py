@@ -0,0 +1,49 @@
+# telemetry/callbacks.py
+import time
+from langchain_core.callbacks import BaseCallbackHandler
+from telemetry.metrics import record_span, record_tokens
+
+
+def _usage(response) -> tuple:
+    """Extracts (prompt, completion) token counts from an LLMResult, or (0, 0) if none were reported."""
+    prompt = completion = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                prompt += usage.get("input_tokens", 0)
+                completion += usage.get("output_tokens", 0)
+    if not prompt and not completion:
+        token_usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt = token_usage.get("prompt_tokens", 0)
+        completion = token_usage.get("completion_tokens", 0)
+    return prompt, completion
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """
+    Records the latency and token usage of every call made through a chat model.
+
+    Runs inline in the calling thread so calls are attributed to the caller's run.
+    """
+    run_inline = True
+
+    def __init__(self, model: str):
+        self.model = model
+        self._started = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            record_span("llm", time.perf_counter() - started, model=self.model)
+        prompt, completion = _usage(response)
+        record_tokens(self.model, prompt, completion)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._started.pop(run_id, None)
@@ -0,0 +1,21 @@
+# telemetry/logs.py
+import os
+import logging
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+def configure_logging(level=None):
+    """
+    Configures the root logger for an entry point (CLI, UI or worker).
+
+    Library modules only log; they never configure handlers themselves. Calling this more
+    than once keeps the first configuration.
+
+    Args:
+        level: A logging level or name. Defaults to CAMPAIGN_LOG_LEVEL, or INFO.
+    """
+    level = level or os.environ.get("CAMPAIGN_LOG_LEVEL", "INFO")
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+    logging.basicConfig(level=level, format=LOG_FORMAT)
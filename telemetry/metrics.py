@@ -0,0 +1,370 @@
+# telemetry/metrics.py
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+
+METRIC_PREFIX = "campaign"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# USD per million (prompt, completion) tokens, used for cost estimates only.
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+ENABLED = os.environ.get("CAMPAIGN_METRICS_DISABLED", "").lower() not in ("1", "true", "yes")
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Returns the estimated USD cost of a call, or 0.0 for models without a known price."""
+    prompt_price, completion_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+class Histogram:
+    """A cumulative-bucket histogram in the Prometheus style."""
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Process-wide counters and histograms keyed by name and labels.
+
+    Updates take one lock and a dict lookup, cheap enough to leave on in production.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple:
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def counter_value(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(self._key(name, labels), 0.0)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render_prometheus(self) -> str:
+        """Renders every metric in the Prometheus text exposition format."""
+        def fmt_labels(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            escaped = (f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                       for k, v in pairs)
+            return "{" + ",".join(escaped) + "}"
+
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, (h.buckets, list(h.counts), h.sum, h.count)) for key, h in self._histograms.items()
+            )
+        lines, typed = [], set()
+        for (name, labels), value in counters:
+            full = f"{METRIC_PREFIX}_{name}"
+            if full not in typed:
+                lines.append(f"# TYPE {full} counter")
+                typed.add(full)
+            lines.append(f"{full}{fmt_labels(labels)} {value:g}")
+        for (name, labels), (buckets, counts, total, count) in histograms:
+            full = f"{METRIC_PREFIX}_{name}"
+            if full not in typed:
+                lines.append(f"# TYPE {full} histogram")
+                typed.add(full)
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{full}_bucket{fmt_labels(labels, [('le', f'{bound:g}')])} {cumulative}")
+            lines.append(f"{full}_bucket{fmt_labels(labels, [('le', '+Inf')])} {count}")
+            lines.append(f"{full}_sum{fmt_labels(labels)} {total:.6f}")
+            lines.append(f"{full}_count{fmt_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+class RunMetrics:
+    """
+    Everything recorded while one workflow run (a UI job or a batch) was active.
+    Shared by the threads of the run, so updates are locked.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.perf_counter()
+        self.spans = {}
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.retries = 0
+        self.tokens_saved = 0
+
+    def add_span(self, name: str, seconds: float):
+        with self._lock:
+            self.spans.setdefault(name, []).append(seconds)
+
+    def add_tokens(self, prompt_tokens: int, completion_tokens: int, cost: float):
+        with self._lock:
+            self.llm_calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.cost_usd += cost
+
+    def add_cache(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+
+    def add_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def add_tokens_saved(self, tokens: int):
+        with self._lock:
+            self.tokens_saved += tokens
+
+    def summary(self) -> dict:
+        """
+        Summarizes the run.
+
+        Returns:
+            A JSON-serializable dictionary with total seconds per span, token counts,
+            estimated cost, cache hits/misses, retries and prompt tokens saved by condensing.
+        """
+        with self._lock:
+            return {
+                "elapsed_seconds": round(time.perf_counter() - self.started_at, 4),
+                "spans": {name: {"count": len(values), "seconds": round(sum(values), 4)}
+                          for name, values in self.spans.items()},
+                "llm_calls": self.llm_calls,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "cost_usd": round(self.cost_usd, 6),
+                "cache_hits": self.cache_hits,
+                "cache_misses": self.cache_misses,
+                "retries": self.retries,
+                "tokens_saved": self.tokens_saved,
+            }
+
+
+_current_run = contextvars.ContextVar("campaign_run", default=None)
+_sinks = []
+_sinks_lock = threading.Lock()
+
+
+def current_run():
+    """Returns the RunMetrics of the active run in this context, or None."""
+    return _current_run.get()
+
+
+@contextmanager
+def record_run():
+    """
+    Collects the spans, tokens, cache lookups and retries of a run into a RunMetrics.
+
+    Work done in other threads is attributed to the run when those threads are started
+    with the caller's context (contextvars.copy_context().run), as the pipeline does.
+    """
+    run = RunMetrics()
+    token = _current_run.set(run)
+    try:
+        yield run
+    finally:
+        _current_run.reset(token)
+        _emit({"type": "run", **run.summary()})
+
+
+def _emit(event: dict):
+    if not _sinks:
+        return
+    event.setdefault("ts", time.time())
+    with _sinks_lock:
+        for sink in _sinks:
+            sink.write(event)
+
+
+def record_span(name: str, seconds: float, **labels):
+    """Records an already measured duration, e.g. a phase timed by an HTTP client hook."""
+    if not ENABLED:
+        return
+    REGISTRY.observe("span_seconds", seconds, span=name, **labels)
+    run = _current_run.get()
+    if run is not None:
+        run.add_span(name, seconds)
+    if _sinks:
+        _emit({"type": "span", "name": name, "seconds": round(seconds, 6), **labels})
+
+
+@contextmanager
+def span(name: str, **labels):
+    """Times the enclosed block as span `name`, including when it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - started, **labels)
+
+
+def record_tokens(model: str, prompt_tokens: int, completion_tokens: int):
+    """Counts one LLM call's token usage and estimated cost."""
+    if not ENABLED:
+        return
+    cost = estimate_cost(model, prompt_tokens, completion_tokens)
+    REGISTRY.inc("llm_calls_total", model=model)
+    REGISTRY.inc("llm_prompt_tokens_total", prompt_tokens, model=model)
+    REGISTRY.inc("llm_completion_tokens_total", completion_tokens, model=model)
+    REGISTRY.inc("llm_cost_usd_total", cost, model=model)
+    run = _current_run.get()
+    if run is not None:
+        run.add_tokens(prompt_tokens, completion_tokens, cost)
+
+
+def record_cache(namespace: str, hit: bool):
+    """Counts a cache lookup."""
+    if not ENABLED:
+        return
+    REGISTRY.inc("cache_requests_total", namespace=namespace, result="hit" if hit else "miss")
+    run = _current_run.get()
+    if run is not None:
+        run.add_cache(hit)
+
+
+def record_retry(operation: str):
+    """Counts a retried operation, e.g. "scrape" or "dispatch"."""
+    if not ENABLED:
+        return
+    REGISTRY.inc("retries_total", operation=operation)
+    run = _current_run.get()
+    if run is not None:
+        run.add_retry()
+
+
+def record_tokens_saved(stage: str, tokens: int):
+    """Counts prompt tokens a local pre-processing stage kept from being sent, e.g. "condense"."""
+    if not ENABLED:
+        return
+    REGISTRY.inc("prompt_tokens_saved_total", tokens, stage=stage)
+    run = _current_run.get()
+    if run is not None:
+        run.add_tokens_saved(tokens)
+
+
+class JsonlSink:
+    """Appends spans and run summaries to a JSON Lines file."""
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+
+    def write(self, event: dict):
+        self._file.write(json.dumps(event) + "\n")
+
+    def close(self):
+        self._file.close()
+
+
+def add_sink(sink):
+    with _sinks_lock:
+        _sinks.append(sink)
+
+
+def remove_sink(sink):
+    with _sinks_lock:
+        if sink in _sinks:
+            _sinks.remove(sink)
+
+
+_server = None
+
+
+def _metrics_handler():
+    # http.server is only imported by processes that actually export metrics
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = REGISTRY.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return MetricsHandler
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1"):
+    """Serves the registry at http://host:port/metrics from a daemon thread. Only one server is started."""
+    global _server
+    if _server is None:
+        from http.server import ThreadingHTTPServer
+        _server = ThreadingHTTPServer((host, port), _metrics_handler())
+        threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        logging.info(f"Serving Prometheus metrics at http://{host}:{_server.server_port}/metrics")
+    return _server
+
+
+_configured = False
+
+
+def configure_exporters(port: int = None, jsonl_path: str = None):
+    """
+    Starts the configured exporters once per process.
+
+    Args:
+        port: Serve Prometheus metrics on this port (default: CAMPAIGN_METRICS_PORT, if set).
+        jsonl_path: Append spans and run summaries here (default: CAMPAIGN_METRICS_FILE, if set).
+    """
+    global _configured
+    if _configured:
+        return
+    _configured = True
+    port = port if port is not None else os.environ.get("CAMPAIGN_METRICS_PORT")
+    jsonl_path = jsonl_path or os.environ.get("CAMPAIGN_METRICS_FILE")
+    if port:
+        start_metrics_server(int(port))
+    if jsonl_path:
+        add_sink(JsonlSink(jsonl_path))
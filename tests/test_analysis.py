@@ -0,0 +1,92 @@
+# tests/test_analysis.py
+from unittest.mock import patch
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.runnables import Runnable
+from cache.store import ResultCache
+from nlp.analysis import split_into_chunks, count_tokens, analyze_text_chunked
+
+LONG_TEXT = "\n".join(f"Paragraph {i}: the release improves throughput by {i}% for teams of every size." for i in range(200))
+
+
+def test_split_into_chunks_respects_budget_and_boundaries():
+    """Chunks stay under the token budget and never cut a paragraph in half."""
+    chunks = split_into_chunks(LONG_TEXT, chunk_tokens=300, overlap_tokens=40)
+    paragraphs = set(LONG_TEXT.split("\n"))
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert count_tokens(chunk) <= 300
+        assert all(line in paragraphs for line in chunk.split("\n"))
+
+
+def test_split_into_chunks_overlaps_and_covers_everything():
+    """Consecutive chunks share trailing paragraphs and together cover the whole text."""
+    chunks = split_into_chunks(LONG_TEXT, chunk_tokens=300, overlap_tokens=40)
+
+    first_tail = chunks[0].split("\n")[-1]
+    assert first_tail in chunks[1].split("\n")
+    assert chunks[1].split("\n")[0] in chunks[0].split("\n")
+    covered = {line for chunk in chunks for line in chunk.split("\n")}
+    assert covered == set(LONG_TEXT.split("\n"))
+
+
+def test_split_into_chunks_splits_oversized_paragraphs():
+    """A single paragraph larger than the budget is split on word boundaries."""
+    chunks = split_into_chunks(" ".join(["word"] * 2000), chunk_tokens=200, overlap_tokens=0)
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= 200 for chunk in chunks)
+
+
+@patch('nlp.analysis.get_llm')
+def test_short_text_uses_single_call(mock_get_llm):
+    """Documents that fit in one chunk skip the map-reduce."""
+    llm = FakeListChatModel(responses=["Core Theme: short"])
+    mock_get_llm.return_value = llm
+
+    result = analyze_text_chunked("A short announcement.", chunk_tokens=1000)
+
+    assert result["analysis"] == "Core Theme: short"
+    assert result["chunks"] == 1
+    assert result["tokens_sent"] > 0
+
+
+@patch('nlp.analysis.get_llm')
+def test_long_text_maps_then_reduces(mock_get_llm):
+    """Long documents get one call per chunk plus one merge call."""
+    chunks = split_into_chunks(LONG_TEXT, chunk_tokens=300, overlap_tokens=40)
+    responses = [f"Partial {i}" for i in range(len(chunks))] + ["Merged analysis"]
+    mock_get_llm.return_value = FakeListChatModel(responses=responses)
+
+    result = analyze_text_chunked(LONG_TEXT, chunk_tokens=300, overlap_tokens=40, max_concurrency=1)
+
+    assert result["analysis"] == "Merged analysis"
+    assert result["chunks"] == len(chunks)
+    assert result["tokens_sent"] > count_tokens(LONG_TEXT)
+
+
+class FlakyChatModel(FakeListChatModel):
+    """Fails the analysis of the second chunk."""
+    # FakeListChatModel.batch ignores return_exceptions; real chat models go through Runnable.batch
+    batch = Runnable.batch
+
+    def _call(self, messages, *args, **kwargs):
+        if "TEXT PART 2 OF" in messages[0].content:
+            raise RuntimeError("rate limited")
+        return super()._call(messages, *args, **kwargs)
+
+
+@patch('nlp.analysis.get_llm')
+def test_partial_analysis_is_not_cached(mock_get_llm, tmp_path):
+    """A merge that is missing failed chunks is returned with a count of them, but not cached."""
+    chunks = split_into_chunks(LONG_TEXT, chunk_tokens=300, overlap_tokens=40)
+    mock_get_llm.return_value = FlakyChatModel(responses=[f"Partial {i}" for i in range(len(chunks) - 1)] + ["Merged"])
+    cache = ResultCache(db_file=str(tmp_path / "cache.db"))
+
+    result = analyze_text_chunked(LONG_TEXT, chunk_tokens=300, overlap_tokens=40, max_concurrency=1, cache=cache)
+    assert result["analysis"] == "Merged"
+    assert (result["chunks"], result["failed_chunks"]) == (len(chunks), 1)
+
+    mock_get_llm.return_value = FakeListChatModel(responses=["Partial"] * len(chunks) + ["Complete"])
+    result = analyze_text_chunked(LONG_TEXT, chunk_tokens=300, overlap_tokens=40, max_concurrency=1, cache=cache)
+    assert (result["analysis"], result["failed_chunks"]) == ("Complete", 0)
+    assert analyze_text_chunked(LONG_TEXT, chunk_tokens=300, overlap_tokens=40, cache=cache)["analysis"] == "Complete"
@@ -0,0 +1,148 @@
+# tests/test_async_scraper.py
+import asyncio
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import pytest
+from scraper.async_scraper import AsyncScraper
+
+PAGE = b"<html><body><script>x()</script><p>Hello from the stub server.</p></body></html>"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        path = self.path.split("?")[0]
+        with server.lock:
+            server.hits[path] = server.hits.get(path, 0) + 1
+            server.client_ports.add(self.client_address[1])
+            hits = server.hits[path]
+
+        if path == "/page":
+            if self.headers.get("If-None-Match") == '"v1"':
+                self._send(304)
+            else:
+                self._send(200, PAGE, {"ETag": '"v1"', "Content-Type": "text/html"})
+        elif path == "/flaky":
+            if hits < 3:
+                self._send(503)
+            else:
+                self._send(200, PAGE)
+        elif path == "/big":
+            self._send(200, b"<p>" + b"a" * 50_000 + b"</p>")
+        else:
+            self._send(404)
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.lock = threading.Lock()
+    server.hits = {}
+    server.client_ports = set()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_and_conditional_get(stub_server):
+    """A second fetch sends If-None-Match and reuses the cached text on 304."""
+    server, base = stub_server
+
+    async def run():
+        async with AsyncScraper(requests_per_second=0) as scraper:
+            first = await scraper.fetch(f"{base}/page")
+            second = await scraper.fetch(f"{base}/page")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first.status == 200
+    assert first.text == "Hello from the stub server."
+    assert first.etag == '"v1"'
+    assert second.status == 304
+    assert second.not_modified
+    assert second.text == first.text
+
+
+def test_raw_fetches_are_not_conditional_by_default(stub_server):
+    """A raw fetch always returns the body, since no body is kept to answer a 304 with."""
+    server, base = stub_server
+
+    async def run():
+        async with AsyncScraper(requests_per_second=0) as scraper:
+            await scraper.fetch(f"{base}/page")
+            raw = [await scraper.fetch(f"{base}/page", extract=False) for _ in range(2)]
+            conditional = await scraper.fetch(f"{base}/page", extract=False, conditional=True)
+        return raw, conditional
+
+    raw, conditional = asyncio.run(run())
+    assert [(result.status, result.body) for result in raw] == [(200, PAGE)] * 2
+    assert conditional.not_modified and conditional.body == b""
+
+
+def test_retries_with_backoff(stub_server):
+    """Retryable status codes are retried until the server recovers."""
+    server, base = stub_server
+
+    async def run():
+        async with AsyncScraper(requests_per_second=0, backoff_base=0.01, max_retries=3) as scraper:
+            return await scraper.fetch(f"{base}/flaky")
+
+    result = asyncio.run(run())
+    assert result.ok
+    assert result.attempts == 3
+    assert server.hits["/flaky"] == 3
+
+
+def test_http_error_is_not_retried(stub_server):
+    """Client errors are reported once without retrying."""
+    server, base = stub_server
+
+    async def run():
+        async with AsyncScraper(requests_per_second=0, backoff_base=0.01) as scraper:
+            return await scraper.fetch(f"{base}/missing"), await scraper.scrape(f"{base}/missing")
+
+    result, text = asyncio.run(run())
+    assert result.error == "HTTP 404"
+    assert text == ""
+    assert server.hits["/missing"] == 2
+
+
+def test_response_size_cap(stub_server):
+    """Bodies larger than max_bytes are cut off and flagged."""
+    server, base = stub_server
+
+    async def run():
+        async with AsyncScraper(requests_per_second=0, max_bytes=1_000) as scraper:
+            return await scraper.fetch(f"{base}/big")
+
+    result = asyncio.run(run())
+    assert result.truncated
+    assert result.bytes_read == 1_000
+
+
+def test_keep_alive_and_per_host_limit(stub_server):
+    """Many requests to one host share a small number of pooled connections."""
+    server, base = stub_server
+
+    async def run():
+        async with AsyncScraper(requests_per_second=0, max_per_host=2) as scraper:
+            return await scraper.fetch_many([f"{base}/page?{i}" for i in range(10)])
+
+    results = asyncio.run(run())
+    assert all(r.ok for r in results)
+    assert len(server.client_ports) <= 2
@@ -0,0 +1,81 @@
+# tests/test_batch.py
+import time
+import threading
+from pipeline.batch import run_batch, percentile, PipelineStats
+
+
+def make_functions(fail_urls=(), delay=0.0, tracker=None):
+    """Builds stub stage functions that never touch the network or the LLM."""
+    def scrape(url):
+        if tracker is not None:
+            with tracker["lock"]:
+                tracker["active"] += 1
+                tracker["peak"] = max(tracker["peak"], tracker["active"])
+        time.sleep(delay)
+        if tracker is not None:
+            with tracker["lock"]:
+                tracker["active"] -= 1
+        return "" if url in fail_urls else f"text for {url}"
+
+    def analyze(text):
+        return f"analysis of {text}"
+
+    def generate(analysis, url):
+        return [{"platform": "Twitter", "content": f"Post about {url}", "scheduled_date": "2025-10-27"}]
+
+    return {"scrape": scrape, "analyze": analyze, "generate": generate}
+
+
+def test_run_batch_processes_all_urls():
+    """Every URL should come out with posts and the summary should count them."""
+    results = []
+    urls = [f"https://example.com/{i}" for i in range(20)]
+    summary = run_batch(urls, functions=make_functions(), on_result=results.append)
+
+    assert len(results) == 20
+    assert {r.url for r in results} == set(urls)
+    assert all(r.ok and r.posts for r in results)
+    assert summary["succeeded"] == 20
+    assert summary["failed"] == 0
+    assert summary["stages"]["generate"]["count"] == 20
+
+
+def test_run_batch_failure_does_not_stop_others():
+    """A URL that fails to scrape is reported without affecting the rest."""
+    results = []
+    urls = ["https://ok.com/1", "https://bad.com", "https://ok.com/2"]
+    summary = run_batch(urls, functions=make_functions(fail_urls={"https://bad.com"}),
+                        on_result=results.append)
+
+    failed = [r for r in results if not r.ok]
+    assert len(failed) == 1
+    assert failed[0].url == "https://bad.com"
+    assert failed[0].failed_stage == "scrape"
+    assert summary["succeeded"] == 2
+    assert summary["stages"]["scrape"]["failed"] == 1
+    assert summary["stages"]["analyze"]["count"] == 2
+
+
+def test_run_batch_respects_stage_worker_limit():
+    """No more scrape calls run at once than the configured worker limit."""
+    tracker = {"lock": threading.Lock(), "active": 0, "peak": 0}
+    urls = [f"https://example.com/{i}" for i in range(12)]
+    run_batch(urls, workers={"scrape": 3},
+              functions=make_functions(delay=0.02, tracker=tracker))
+
+    assert 1 < tracker["peak"] <= 3
+
+
+def test_percentile_and_stats_summary():
+    """Percentiles use nearest rank and the summary reports throughput."""
+    assert percentile([], 50) == 0.0
+    assert percentile([1, 2, 3, 4], 50) == 2
+    assert percentile([1, 2, 3, 4], 99) == 4
+
+    stats = PipelineStats()
+    stats.start()
+    stats.record_stage("scrape", 0.5)
+    stats.finish()
+    summary = stats.summary()
+    assert summary["stages"]["scrape"]["p50"] == 0.5
+    assert summary["urls"] == 0
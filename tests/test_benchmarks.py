@@ -0,0 +1,47 @@
+# tests/test_benchmarks.py
+import urllib.request
+from benchmarks.fixtures import CorpusServer
+from benchmarks import bench_pipeline
+
+
+def test_corpus_server_serves_distinct_urls_for_each_page():
+    """Every generated URL resolves to a saved page."""
+    with CorpusServer() as server:
+        urls = server.urls(6)
+        assert len(set(urls)) == 6
+        body = urllib.request.urlopen(urls[5]).read()
+        assert body in server.corpus.values()
+        assert server.requests == 1
+
+
+def test_pipeline_benchmark_runs_offline_and_compares():
+    """A tiny run covers every benchmark, and comparing a run with itself finds no regressions."""
+    report = bench_pipeline.run(levels=(2,), url_count=4, llm_latency=0.0, server_latency=0.0,
+                                scheduler_rows=500)
+    results = report["results"]
+
+    assert set(results) == {"scrape_sync", "scrape_async", "analysis", "generation", "end_to_end",
+                            "scheduler", "streaming"}
+    assert results["scrape_async"]["c2"]["failed"] == 0
+    assert results["end_to_end"]["c2"]["failed"] == 0
+    assert results["end_to_end"]["c2"]["urls_per_minute"] > 0
+
+    rows = bench_pipeline.compare(report, report)
+    assert rows and not any(regressed for *_, regressed in rows)
+
+
+def test_compare_flags_slower_latency_and_lower_throughput():
+    """Regressions are judged in the right direction for each kind of metric."""
+    old = {"results": {"a": {"per_sec": 100.0, "p50_ms": 10.0}}}
+    new = {"results": {"a": {"per_sec": 80.0, "p50_ms": 9.0}}}
+    flagged = {metric: regressed for metric, _, _, _, regressed in bench_pipeline.compare(old, new)}
+    assert flagged == {"a.per_sec": True, "a.p50_ms": False}
+
+
+def test_parse_importtime_reads_nesting_depth():
+    """-X importtime lines become (module, self us, cumulative us, depth) rows."""
+    from benchmarks.bench_startup import parse_importtime
+    stderr = ("import time: self [us] | cumulative | imported package\n"
+              "import time:       120 |        120 |   _json\n"
+              "import time:       900 |       1020 | json\n")
+    assert parse_importtime(stderr) == [("_json", 120, 120, 1), ("json", 900, 1020, 0)]
@@ -0,0 +1,74 @@
+# tests/test_cache.py
+import pytest
+from unittest.mock import patch
+from cache.store import ResultCache, normalize_url, make_key
+from nlp.analysis import analyze_text
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResultCache(db_file=str(tmp_path / "cache.db"))
+    yield cache
+    cache.close()
+
+
+def test_normalize_url():
+    """Equivalent spellings of a URL normalize to the same key."""
+    assert normalize_url("Example.com/blog?b=2&a=1#top") == "https://example.com/blog?a=1&b=2"
+    assert normalize_url("https://EXAMPLE.com:443/blog?utm_source=x&a=1") == "https://example.com/blog?a=1"
+    assert normalize_url("http://example.com:8080") == "http://example.com:8080/"
+
+
+def test_get_set_and_counters(cache):
+    """Values round-trip through the cache and hits/misses are counted."""
+    key = make_key("https://example.com/", "prompt", "gpt-4o", 0.7)
+    assert cache.get("analysis", key) is None
+    cache.set("analysis", key, {"text": "cached"})
+    assert cache.get("analysis", key) == {"text": "cached"}
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_ttl_expiry(cache):
+    """Entries older than the TTL are treated as misses."""
+    cache.set("page", "k", "text")
+    assert cache.get("page", "k", ttl_seconds=-1) is None
+    assert cache.get("page", "k") is None
+
+
+def test_lru_eviction(tmp_path):
+    """The least recently used entries are evicted when the cache is over its size limit."""
+    cache = ResultCache(db_file=str(tmp_path / "small.db"), max_bytes=300)
+    cache.set("page", "a", "x" * 100)
+    cache.set("page", "b", "x" * 100)
+    cache.get("page", "a")
+    cache.set("page", "c", "x" * 100)
+
+    assert cache.get("page", "b") is None
+    assert cache.get("page", "a") is not None
+    assert cache.stats()["evictions"] >= 1
+    cache.close()
+
+
+def test_bypass(tmp_path):
+    """A bypassing cache never stores or returns anything."""
+    cache = ResultCache(db_file=str(tmp_path / "bypass.db"), bypass=True)
+    cache.set("page", "k", "text")
+    assert cache.get("page", "k") is None
+    cache.close()
+
+
+@patch('nlp.analysis.get_llm')
+def test_analyze_text_uses_cache(mock_get_llm, cache):
+    """A repeated analysis of the same text does not call the LLM again."""
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+    mock_get_llm.return_value = FakeListChatModel(responses=["Core Theme: caching"])
+
+    first = analyze_text("Some product announcement.", cache=cache)
+    second = analyze_text("Some   product announcement.", cache=cache)
+
+    assert first == second == "Core Theme: caching"
+    assert mock_get_llm.call_count == 1
+    assert cache.stats()["hits"] == 1
@@ -0,0 +1,130 @@
+# tests/test_campaigns.py
+import sqlite3
+from datetime import date, timedelta
+import pytest
+from pipeline.campaigns import regenerate_campaign, UNCHANGED, REGENERATED, FAILED
+from scheduler.scheduler import MockScheduler, SCHEMA_VERSION
+
+URL = "https://acme.example/launch"
+TONES = {"Twitter": "Big news, folks: ship faster than ever",
+         "LinkedIn": "We are proud to share a milestone for our customers"}
+
+
+@pytest.fixture
+def scheduler(tmp_path):
+    scheduler = MockScheduler(db_file=str(tmp_path / "campaigns.db"))
+    scheduler.initialize_db()
+    yield scheduler
+    scheduler.close()
+
+
+class StubPipeline:
+    """Scrape/analyze/generate stubs that count LLM calls and write distinct posts on every call."""
+    def __init__(self, page="Acme Cloud deploys apps in seconds."):
+        self.page = page
+        self.llm_calls = 0
+
+    def scrape(self, url):
+        return self.page
+
+    def analyze(self, text):
+        self.llm_calls += 1
+        return f"Analysis of: {text}"
+
+    def generate(self, analysis, url, platforms):
+        self.llm_calls += 1
+        return [{"platform": platform, "content": f"{TONES[platform]} #{self.llm_calls} {analysis} {url}",
+                 "scheduled_date": date.today() + timedelta(days=1)} for platform in platforms]
+
+    @property
+    def functions(self):
+        return {"scrape": self.scrape, "analyze": self.analyze, "generate": self.generate}
+
+
+def contents(scheduler, **filters):
+    return sorted(p["content"] for p in scheduler.get_scheduled_posts(**filters))
+
+
+def test_unchanged_page_makes_no_llm_calls(scheduler):
+    """A second run over the same page text is skipped before analysis."""
+    stub = StubPipeline()
+    first = regenerate_campaign(URL, scheduler, functions=stub.functions)
+    assert first["status"] == REGENERATED and first["scheduled"] == 2
+    assert stub.llm_calls == 2
+
+    second = regenerate_campaign(URL + "?utm_source=x", scheduler, functions=stub.functions)
+    assert second == {"campaign_id": first["campaign_id"], "status": UNCHANGED, "platforms": [],
+                      "scheduled": 0, "error": ""}
+    assert stub.llm_calls == 2
+    assert scheduler.count_scheduled_posts(campaign_id=first["campaign_id"]) == 2
+
+
+def test_changed_page_replaces_only_unsent_posts_of_that_campaign(scheduler):
+    """New posts replace the campaign's scheduled posts; sent posts and other campaigns stay."""
+    stub = StubPipeline()
+    campaign_id = regenerate_campaign(URL, scheduler, functions=stub.functions)["campaign_id"]
+    other = StubPipeline("Unrelated hiring news from the Berlin office.")
+    other_id = regenerate_campaign("https://acme.example/jobs", scheduler, functions=other.functions)["campaign_id"]
+    [sent] = scheduler.get_scheduled_posts(platform="Twitter", campaign_id=campaign_id)
+    scheduler.conn.execute("UPDATE scheduled_posts SET status = 'sent' WHERE id = ?", (sent["id"],))
+    scheduler.conn.commit()
+
+    stub.page = "Acme Cloud now deploys apps in milliseconds, with a new free tier."
+    result = regenerate_campaign(URL, scheduler, functions=stub.functions)
+    assert result["status"] == REGENERATED and result["platforms"] == ["Twitter", "LinkedIn"]
+    assert stub.llm_calls == 4
+    assert scheduler.count_scheduled_posts(campaign_id=campaign_id, status="scheduled") == 2
+    assert scheduler.get_scheduled_posts(status="sent")[0]["content"] == sent["content"]
+    assert scheduler.count_scheduled_posts(campaign_id=other_id) == 2
+    assert scheduler.get_campaign(campaign_id=campaign_id)["analysis"] == f"Analysis of: {stub.page}"
+
+
+def test_platform_regeneration_reuses_the_stored_analysis(scheduler):
+    """Asking for one platform regenerates just its posts, without re-analyzing the page."""
+    stub = StubPipeline()
+    campaign_id = regenerate_campaign(URL, scheduler, functions=stub.functions)["campaign_id"]
+    twitter_before = contents(scheduler, platform="Twitter")
+
+    result = regenerate_campaign(URL, scheduler, platforms=["LinkedIn"], functions=stub.functions)
+    assert result["platforms"] == ["LinkedIn"] and result["scheduled"] == 1
+    assert stub.llm_calls == 3
+    assert contents(scheduler, platform="Twitter") == twitter_before
+    assert contents(scheduler, platform="LinkedIn") == [f"{TONES['LinkedIn']} #3 Analysis of: {stub.page} {URL}"]
+    assert scheduler.count_scheduled_posts(campaign_id=campaign_id) == 2
+
+
+def test_failed_generation_keeps_the_scheduled_posts(scheduler):
+    """If the LLM returns nothing, the existing posts and stored hash are left alone."""
+    stub = StubPipeline()
+    regenerate_campaign(URL, scheduler, functions=stub.functions)
+    before = contents(scheduler)
+
+    stub.page = "A rewritten page."
+    result = regenerate_campaign(URL, scheduler, functions={**stub.functions, "generate": lambda *args: []})
+    assert result["status"] == FAILED and result["error"] == "content generation failed"
+    assert contents(scheduler) == before
+    assert regenerate_campaign(URL, scheduler, functions=stub.functions)["status"] == REGENERATED
+
+
+def test_migration_adds_campaigns_to_existing_posts(tmp_path):
+    """Posts scheduled before campaigns existed keep working and have no campaign."""
+    path = str(tmp_path / "old.db")
+    old = MockScheduler(db_file=path)
+    old.initialize_db()
+    old.schedule_posts_bulk([{"platform": "Twitter", "content": "Before campaigns", "scheduled_date": "2030-01-01"}])
+    old.close()
+    conn = sqlite3.connect(path)
+    conn.execute("DROP TABLE campaigns")
+    conn.execute("DROP INDEX idx_scheduled_posts_campaign")
+    conn.execute("ALTER TABLE scheduled_posts DROP COLUMN campaign_id")
+    conn.execute("DROP TABLE jobs")
+    conn.execute("PRAGMA user_version = 2")
+    conn.commit()
+    conn.close()
+
+    upgraded = MockScheduler(db_file=path)
+    upgraded.initialize_db()
+    assert upgraded.conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    assert upgraded.get_scheduled_posts()[0]["campaign_id"] is None
+    assert upgraded.list_campaigns() == []
+    upgraded.close()
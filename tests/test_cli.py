@@ -0,0 +1,44 @@
+# tests/test_cli.py
+import os
+import sys
+import json
+import subprocess
+import pytest
+import cli
+from scheduler.scheduler import MockScheduler
+
+HEAVY_MODULES = ("langchain", "langchain_core", "streamlit", "pandas", "bs4", "requests", "lxml", "httpx")
+
+
+@pytest.mark.parametrize("module", ["cli", "scheduler.scheduler", "scraper.scraper", "nlp.analysis",
+                                    "agent.content_genrator", "llm.registry"])
+def test_entry_point_imports_stay_light(module):
+    """Importing an entry point or a step's module does not load the heavy libraries it uses later."""
+    code = f"import sys, {module}; print(sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(cli.__file__))).stdout
+    assert output.strip() == "[]"
+
+
+def test_schedule_command_bulk_inserts_posts(tmp_path, capsys):
+    """`cli.py schedule` reads generated posts and skips unapproved ones when asked."""
+    db = str(tmp_path / "cli.db")
+    posts = [
+        {"platform": "Twitter", "content": "Launch day!", "scheduled_date": "2030-01-01", "approved": True},
+        {"platform": "LinkedIn", "content": "Draft", "scheduled_date": "2030-01-02", "approved": False},
+    ]
+    path = tmp_path / "posts.json"
+    path.write_text(json.dumps(posts))
+
+    assert cli.main(["schedule", str(path), "--db", db, "--approved-only"]) == 0
+    assert "Scheduled 1 of 1 posts" in capsys.readouterr().err
+    assert [p["content"] for p in MockScheduler(db).get_scheduled_posts()] == ["Launch day!"]
+
+
+def test_delegated_commands_forward_their_arguments(monkeypatch):
+    """`cli.py batch ...` hands everything after the subcommand to the batch CLI."""
+    from pipeline import batch
+    seen = []
+    monkeypatch.setattr(batch, "main", lambda argv: seen.append(argv) or 0)
+    assert cli.main(["batch", "-f", "urls.txt", "--no-cache"]) == 0
+    assert seen == [["-f", "urls.txt", "--no-cache"]]
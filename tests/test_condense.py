@@ -0,0 +1,82 @@
+# tests/test_condense.py
+import random
+import pytest
+from llm import registry
+from llm.fake import FakeChatModel
+from nlp.analysis import analyze_text, count_tokens
+from nlp.condense import condense, dedupe_lines, textrank
+from telemetry.metrics import record_run
+
+WORDS = ("caching routing logging billing storage alerting tracing deploys staging production regional internal "
+         "partner teams configure projects review scale secure migrate observe budget release plan").split()
+FILLER = [" ".join(random.Random(i).sample(WORDS, 8)).capitalize() + "." for i in range(40)]
+PAGE = "\n".join(["Home", "Pricing", "Docs",
+                  "Acme Cloud 2.0 deploys any app in seconds and scales it without configuration.",
+                  *FILLER,
+                  "Cold starts dropped from 900 ms to 120 ms, and 4,000 teams migrated in the first week.",
+                  "Acme Cloud 2.0 deploys any app in seconds and scales it without configuration!",
+                  "Subscribe to our newsletter"])
+
+
+def test_dedupe_lines_drops_exact_and_near_repeats():
+    """Repeats differing only in case, punctuation or a word are dropped; distinct lines stay in order."""
+    lines = ["Free tier for hobby projects and small teams today.", "FREE tier for hobby projects and small teams today!",
+             "A free tier for hobby projects and small teams today.", "Enterprise plans include SSO.", "", "  "]
+    assert dedupe_lines(lines) == ["Free tier for hobby projects and small teams today.",
+                                   "Enterprise plans include SSO."]
+
+
+def test_textrank_scores_central_sentences_higher():
+    """A sentence sharing words with many others outranks an unrelated one at the same position."""
+    sentences = [s.split() for s in ("billing export runs nightly", "the weather was pleasant",
+                                     "billing export supports csv", "billing export retries failures")]
+    scores = textrank(sentences)
+    assert scores.sum() == pytest.approx(1.0)
+    assert scores[2] > scores[1]
+
+
+def test_condense_respects_budget_and_keeps_statistics():
+    """Long pages shrink to the budget, keeping numeric sentences and dropping nav fragments and repeats."""
+    result = condense(PAGE, token_budget=150)
+    assert result.output_tokens <= 150 < result.input_tokens
+    assert result.duplicate_lines == 1 and result.tokens_saved > 0
+    assert "Cold starts dropped from 900 ms to 120 ms" in result.text
+    assert "Pricing" not in result.text and "Subscribe" not in result.text
+    kept = result.text.split("\n")
+    assert all(line in PAGE for line in kept)
+    assert kept == sorted(kept, key=PAGE.index)
+
+
+def test_condense_returns_short_text_whole():
+    """Text already within the budget only loses its duplicate lines."""
+    result = condense("Launch day.\nWe ship the new API.\nLaunch day.", token_budget=100)
+    assert result.text == "Launch day.\nWe ship the new API."
+    assert (result.duplicate_lines, result.kept_sentences) == (1, 0)
+
+
+def test_analyze_text_sends_condensed_text_and_records_savings():
+    """The analysis prompt carries the condensed page, and the tokens saved show up in the run summary."""
+    prompts = []
+    model = FakeChatModel(responder=lambda prompt: prompts.append(prompt) or "Core Theme: launch")
+    registry.set_llm_factory(lambda model_name, temperature: model)
+    try:
+        with record_run() as run:
+            assert analyze_text(PAGE, condense_tokens=150) == "Core Theme: launch"
+    finally:
+        registry.set_llm_factory(None)
+    [prompt] = prompts
+    assert "Cold starts dropped" in prompt and "Subscribe to our newsletter" not in prompt
+    assert run.summary()["tokens_saved"] >= count_tokens(PAGE) - 150 - 10
+
+
+def test_analyze_text_does_not_condense_unless_asked():
+    """Without a budget the prompt carries the page as scraped, repeats and navigation included."""
+    prompts = []
+    model = FakeChatModel(responder=lambda prompt: prompts.append(prompt) or "Core Theme: launch")
+    registry.set_llm_factory(lambda model_name, temperature: model)
+    try:
+        assert analyze_text(PAGE) == "Core Theme: launch"
+    finally:
+        registry.set_llm_factory(None)
+    [prompt] = prompts
+    assert PAGE in prompt
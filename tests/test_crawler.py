@@ -0,0 +1,221 @@
+# tests/test_crawler.py
+import gzip
+import asyncio
+import time
+import threading
+from datetime import timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import pytest
+from scraper.async_scraper import AsyncScraper
+from scraper.crawler import CrawlFrontier, FeedCrawler, RobotsCache, parse_feed, MAX_ATTEMPTS
+
+RSS = b"""<?xml version="1.0"?><rss version="2.0"><channel><title>Blog</title>
+<item><title>One</title><link>https://blog.example/one</link><pubDate>Mon, 05 Oct 2026 09:00:00 GMT</pubDate></item>
+<item><title>Two</title><link>/two</link></item></channel></rss>"""
+ATOM = b"""<feed xmlns="http://www.w3.org/2005/Atom"><entry><link rel="self" href="/self"/>
+<link href="https://blog.example/atom-post"/><updated>2026-10-05T09:00:00Z</updated></entry></feed>"""
+
+
+def urlset(*pages) -> bytes:
+    items = "".join(f"<url><loc>{loc}</loc><lastmod>{lastmod}</lastmod></url>" for loc, lastmod in pages)
+    return f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{items}</urlset>'.encode()
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.hits[self.path] = server.hits.get(self.path, 0) + 1
+            body = server.files.get(self.path)
+            status = server.statuses.get((self.headers.get("Host", "").split(":")[0], self.path))
+        if status is not None:
+            self.send_response(status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        etag = f'"{hash(body)}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def site(tmp_path):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FeedHandler)
+    server.lock = threading.Lock()
+    server.hits = {}
+    server.files = {}
+    server.statuses = {}  # (host name, path) -> forced status code
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def page(text: str) -> bytes:
+    return f"<html><body><p>{text}</p></body></html>".encode()
+
+
+def crawl(db_file, process, **kwargs) -> dict:
+    async def run():
+        crawler = FeedCrawler(CrawlFrontier(db_file),
+                              AsyncScraper(requests_per_second=0, max_retries=0, timeout=5))
+        try:
+            return await crawler.crawl(process, **kwargs)
+        finally:
+            await crawler.close()
+    return asyncio.run(run())
+
+
+def test_parse_feed_reads_sitemaps_rss_and_atom():
+    """Every supported format yields absolute page URLs and their lastmod, gzipped or not."""
+    sitemap = urlset(("https://blog.example/a", "2026-10-01"))
+    assert parse_feed(sitemap) == ("sitemap", [("https://blog.example/a", "2026-10-01")])
+    assert parse_feed(gzip.compress(sitemap)) == parse_feed(sitemap)
+    assert parse_feed(RSS, "https://blog.example/feed") == ("rss", [
+        ("https://blog.example/one", "Mon, 05 Oct 2026 09:00:00 GMT"), ("https://blog.example/two", None)])
+    assert parse_feed(ATOM, "https://blog.example/feed") == ("atom", [("https://blog.example/atom-post",
+                                                                        "2026-10-05T09:00:00Z")])
+    with pytest.raises(ValueError):
+        parse_feed(b"<html><body>Not a feed</body></html>")
+
+
+def test_only_new_and_changed_pages_are_downloaded(site, tmp_path):
+    """The first poll records a baseline; later polls fetch just the pages added or updated since."""
+    server, base = site
+    db = str(tmp_path / "crawl.db")
+    server.files.update({"/old": page("An old post"), "/sitemap.xml": urlset((f"{base}/old", "2026-01-01"))})
+    CrawlFrontier(db).add_feed(f"{base}/sitemap.xml")
+    processed = []
+
+    def process(url, text):
+        processed.append((url, text))
+        return True
+
+    first = crawl(db, process)
+    assert (first["feeds"], first["new_pages"], first["processed"]) == (1, 0, 0)
+    assert "/old" not in server.hits
+
+    server.files.update({"/new": page("A new post"), "/sitemap.xml": urlset(
+        (f"{base}/old", "2026-02-01"), (f"{base}/new", "2026-10-01"))})
+    second = crawl(db, process)
+    assert (second["new_pages"], second["processed"]) == (2, 2)
+    assert sorted(processed) == [(f"{base}/new", "A new post"), (f"{base}/old", "An old post")]
+
+    hits = dict(server.hits)
+    third = crawl(db, process)
+    assert (third["not_modified"], third["processed"]) == (1, 0)
+    assert server.hits["/sitemap.xml"] == hits["/sitemap.xml"] + 1
+    assert {path: n for path, n in server.hits.items() if path != "/sitemap.xml"} == \
+        {path: n for path, n in hits.items() if path != "/sitemap.xml"}
+    assert server.hits["/robots.txt"] == 1
+
+
+def test_sitemap_index_skips_unchanged_children_and_respects_robots(site, tmp_path):
+    """Child sitemaps are fetched only when their lastmod changes, and robots.txt rules are obeyed."""
+    server, base = site
+    db = str(tmp_path / "crawl.db")
+    server.files.update({
+        "/robots.txt": b"User-agent: *\nDisallow: /private\n",
+        "/index.xml": (f'<sitemapindex><sitemap><loc>{base}/posts.xml</loc><lastmod>2026-10-01</lastmod></sitemap>'
+                       f'<sitemap><loc>{base}/rss</loc></sitemap></sitemapindex>').encode(),
+        "/posts.xml": urlset((f"{base}/launch", "2026-10-01"), (f"{base}/private/draft", "2026-10-01")),
+        "/rss": RSS.replace(b"https://blog.example/one", f"{base}/feed-post".encode()),
+        "/launch": page("Launch post"), "/feed-post": page("Feed post"), "/private/draft": page("Draft"),
+    })
+    frontier = CrawlFrontier(db)
+    frontier.add_feed(f"{base}/index.xml", backfill=True)
+    processed = []
+    stats = crawl(db, lambda url, text: processed.append(url) or True)
+    assert (stats["feeds"], stats["processed"], stats["blocked_pages"]) == (3, 2, 1)
+    assert sorted(processed) == [f"{base}/feed-post", f"{base}/launch"]
+    assert "/private/draft" not in server.hits
+    assert frontier.counts()["blocked"] == 1
+    # /two from the RSS feed does not exist on the server
+    assert frontier.counts()["pending"] == 1
+
+    server.files["/index.xml"] = server.files["/index.xml"] + b" "
+    stats = crawl(db, lambda url, text: True)
+    assert stats["feeds"] == 2 and server.hits["/posts.xml"] == 1 and server.hits["/rss"] == 2
+    assert server.hits["/robots.txt"] == 1
+
+
+def test_unavailable_robots_txt_defers_pages_without_blocking_them(site, tmp_path):
+    """While a host's robots.txt answers 503, its pages stay pending with no attempt counted."""
+    server, base = site
+    db = str(tmp_path / "crawl.db")
+    other = base.replace("127.0.0.1", "localhost")
+    server.files.update({"/feed.xml": urlset((f"{other}/post", "2026-10-01")), "/post": page("A post")})
+    server.statuses[("localhost", "/robots.txt")] = 503
+    frontier = CrawlFrontier(db)
+    frontier.add_feed(f"{base}/feed.xml", backfill=True)
+    processed = []
+
+    stats = crawl(db, lambda url, text: processed.append(url) or True)
+    assert (stats["deferred_pages"], stats["blocked_pages"], stats["failed_pages"]) == (1, 0, 0)
+    assert [page["attempts"] for page in frontier.pending()] == [0]
+    assert frontier.counts()["blocked"] == 0 and not processed
+
+    del server.statuses[("localhost", "/robots.txt")]
+    assert crawl(db, lambda url, text: processed.append(url) or True)["processed"] == 1
+    assert processed == [f"{other}/post"] and frontier.counts()["done"] == 1
+
+
+def test_expired_robots_txt_is_fetched_again_in_full(site, tmp_path):
+    """A refetch after the TTL never sends validators, so a 304 cannot turn the rules into allow-all."""
+    server, base = site
+    server.files["/robots.txt"] = b"User-agent: *\nDisallow: /private\n"
+    frontier = CrawlFrontier(str(tmp_path / "crawl.db"))
+    frontier.initialize_db()
+
+    async def run():
+        async with AsyncScraper(requests_per_second=0, max_retries=0, timeout=5) as scraper:
+            robots = RobotsCache(frontier, scraper, ttl=timedelta(seconds=0.05))
+            before = await robots.allowed(f"{base}/private/a")
+            frontier.finish([], robots.take_fetched())
+            frontier.conn.execute("UPDATE crawl_robots SET fetched_at = '2000-01-01 00:00:00'")
+            frontier.conn.commit()
+            time.sleep(0.1)
+            after = await robots.allowed(f"{base}/private/a")
+            return before, after, robots.take_fetched()
+
+    before, after, fetched = asyncio.run(run())
+    assert server.hits["/robots.txt"] == 2
+    assert (before, after) == (False, False)
+    assert list(fetched.values()) == ["User-agent: *\nDisallow: /private\n"]
+
+
+def test_failed_pages_are_retried_then_given_up(site, tmp_path):
+    """A page whose processing fails stays pending until it has failed MAX_ATTEMPTS times."""
+    server, base = site
+    db = str(tmp_path / "crawl.db")
+    server.files.update({"/feed.xml": urlset((f"{base}/post", "2026-10-01")), "/post": page("A post")})
+    frontier = CrawlFrontier(db)
+    frontier.add_feed(f"{base}/feed.xml", backfill=True)
+
+    def fail(url, text):
+        raise RuntimeError("LLM unavailable")
+
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        assert crawl(db, fail)["failed_pages"] == 1
+        assert frontier.counts()["pending"] == (0 if attempt == MAX_ATTEMPTS else 1)
+    assert frontier.counts()["failed"] == 1
+    assert crawl(db, fail)["failed_pages"] == 0
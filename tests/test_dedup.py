@@ -0,0 +1,137 @@
+# tests/test_dedup.py
+import random
+import sqlite3
+import pytest
+from scheduler import dedup
+from scheduler.scheduler import MockScheduler, MIGRATIONS, SCHEMA_VERSION
+
+DAY = "2030-01-01"
+LAUNCH = ("Meet Acme Cloud: deploy any app in seconds with zero config, automatic scaling "
+          "and built-in monitoring. Try it free today! https://acme.example/launch #AcmeCloud")
+LAUNCH_REWORDED = ("Meet Acme Cloud: deploy any app in seconds with zero config, automatic scaling "
+                   "and built-in monitoring. Try it free today!! https://acme.example/launch?ref=li #AcmeCloud #DevOps")
+UNRELATED = "Our team is hiring backend engineers in Berlin. Come build the future of payments with us."
+
+
+@pytest.fixture
+def scheduler(tmp_path):
+    scheduler = MockScheduler(db_file=str(tmp_path / "dedup.db"))
+    scheduler.initialize_db()
+    yield scheduler
+    scheduler.close()
+
+
+def post(content, platform="Twitter", day=DAY):
+    return {"platform": platform, "content": content, "scheduled_date": day}
+
+
+def test_shingles_ignore_case_punctuation_and_links():
+    """Formatting and tracking links do not change a post's shingles."""
+    assert dedup.shingles("Try it FREE today!! https://a.example/x?utm=1") == dedup.shingles("try it free today")
+    assert dedup.jaccard(dedup.shingles(LAUNCH), dedup.shingles(LAUNCH_REWORDED)) >= dedup.DEFAULT_THRESHOLD
+    assert dedup.jaccard(dedup.shingles(LAUNCH), dedup.shingles(UNRELATED)) == 0.0
+
+
+def test_near_duplicates_share_a_band_key():
+    """Similar posts collide in at least one LSH band; unrelated posts do not."""
+    launch, reworded, unrelated = dedup.fingerprint_many([LAUNCH, LAUNCH_REWORDED, UNRELATED])
+    assert len(launch.keys) == dedup.BANDS
+    assert set(launch.keys) & set(reworded.keys)
+    assert not set(launch.keys) & set(unrelated.keys)
+    assert dedup.fingerprint_many(["!!!"])[0].keys == []
+
+
+def test_bulk_schedule_rejects_near_duplicates(scheduler):
+    """Repeats of stored posts and of earlier posts in the same batch are skipped, across platforms."""
+    assert scheduler.schedule_posts_bulk([post(LAUNCH)]) == 1
+    assert scheduler.schedule_posts_bulk([
+        post(LAUNCH_REWORDED, platform="LinkedIn"),
+        post(UNRELATED),
+        post(UNRELATED + " Apply now!", platform="LinkedIn"),
+    ]) == 1
+    assert sorted(p["content"] for p in scheduler.get_all_scheduled_posts()) == sorted([LAUNCH, UNRELATED])
+    assert scheduler.schedule_post("Twitter", LAUNCH, DAY) is None
+
+
+def test_merge_policy_updates_the_scheduled_post(scheduler):
+    """With "merge", a regenerated post replaces its scheduled near-copy instead of stacking on it."""
+    scheduler.schedule_posts_bulk([post(LAUNCH)])
+    assert scheduler.schedule_posts_bulk([post(LAUNCH_REWORDED)], dedup_policy="merge") == 1
+
+    [stored] = scheduler.get_all_scheduled_posts()
+    assert stored["content"] == LAUNCH_REWORDED
+    assert scheduler.find_near_duplicates([post(LAUNCH_REWORDED)])[0]["post_id"] == stored["id"]
+    keys = scheduler.conn.execute("SELECT COUNT(*) FROM post_fingerprints").fetchone()[0]
+    assert keys == len(set(dedup.fingerprint_many([LAUNCH_REWORDED])[0].keys))
+
+
+def test_failed_posts_and_allow_policy_do_not_block(scheduler):
+    """A post that failed to send can be scheduled again, and "allow" skips the check."""
+    scheduler.schedule_posts_bulk([post(LAUNCH)])
+    scheduler.conn.execute("UPDATE scheduled_posts SET status = 'failed'")
+    scheduler.conn.commit()
+    assert scheduler.schedule_posts_bulk([post(LAUNCH)]) == 1
+    assert scheduler.schedule_posts_bulk([post(LAUNCH)], dedup_policy="allow") == 1
+    with pytest.raises(ValueError):
+        scheduler.schedule_posts_bulk([post(LAUNCH)], dedup_policy="skip")
+
+
+def test_find_near_duplicates_flags_without_writing(scheduler):
+    """Generated posts are flagged against stored posts and against earlier generated posts."""
+    scheduler.schedule_posts_bulk([post(UNRELATED)])
+    flags = scheduler.find_near_duplicates([post(LAUNCH), post(LAUNCH_REWORDED), post(UNRELATED)])
+
+    assert flags[0] is None
+    assert flags[1]["index"] == 0 and flags[1]["similarity"] >= dedup.DEFAULT_THRESHOLD
+    assert flags[2] == {"post_id": 1, "similarity": 1.0}
+    assert scheduler.count_scheduled_posts() == 1
+
+
+def test_migration_indexes_existing_posts(tmp_path):
+    """Upgrading a database created before the dedup index backfills it."""
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE scheduled_posts (id INTEGER PRIMARY KEY AUTOINCREMENT, platform TEXT NOT NULL, "
+                 "content TEXT NOT NULL, scheduled_date TEXT NOT NULL, status TEXT NOT NULL DEFAULT 'scheduled', "
+                 "created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+    for statement in MIGRATIONS[0]:
+        conn.execute(statement)
+    conn.execute("INSERT INTO scheduled_posts (platform, content, scheduled_date) VALUES ('Twitter', ?, ?)",
+                 (LAUNCH, DAY))
+    conn.execute("PRAGMA user_version = 1")
+    conn.commit()
+    conn.close()
+
+    upgraded = MockScheduler(db_file=path)
+    upgraded.initialize_db()
+    assert upgraded.conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    assert upgraded.find_near_duplicates([post(LAUNCH_REWORDED)])[0]["post_id"] == 1
+    assert upgraded.schedule_post("LinkedIn", LAUNCH_REWORDED, DAY) is None
+    upgraded.close()
+
+
+def test_backfill_streams_posts_in_chunks(scheduler):
+    """Posts are fingerprinted a chunk at a time, and every unindexed post ends up indexed."""
+    scheduler.schedule_posts_bulk([post(f"{UNRELATED} Role number {i} of many.", day=f"2030-01-{i + 1:02d}")
+                                   for i in range(5)], dedup_policy="allow")
+    with scheduler.conn:
+        scheduler.conn.execute("DELETE FROM post_fingerprints")
+        dedup.backfill_fingerprints(scheduler.conn.cursor(), chunk_size=2)
+    indexed = scheduler.conn.execute("SELECT COUNT(DISTINCT post_id) FROM post_fingerprints").fetchone()[0]
+    assert indexed == 5
+
+
+def test_lookup_reads_a_bounded_number_of_posts_per_key(scheduler, monkeypatch):
+    """Posts sharing only boilerplate fill common keys; an old near-copy is still found through its rarer keys."""
+    rng = random.Random(3)
+    words = UNRELATED.lower().replace(".", "").split() + LAUNCH.lower().split()[:20]
+    ending = " Learn more at https://acme.example/launch #AcmeCloud #DevOps"
+    bodies = [" ".join(rng.sample(words, 12)) + ending for _ in range(300)]
+    scheduler.schedule_posts_bulk([post(body) for body in bodies], dedup_policy="allow")
+    monkeypatch.setattr(dedup, "MAX_POSTS_PER_KEY", 4)
+    monkeypatch.setattr(dedup, "MAX_CANDIDATES", 8)
+
+    [flag] = scheduler.find_near_duplicates([post(bodies[5] + " Today!")])
+    assert flag["post_id"] == 6
+    assert scheduler.find_near_duplicates([post("Completely different words about a new office opening" + ending)]) \
+        == [None]
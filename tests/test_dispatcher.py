@@ -0,0 +1,178 @@
+# tests/test_dispatcher.py
+import time
+import sqlite3
+import asyncio
+import threading
+import pytest
+from datetime import datetime, timedelta
+from scheduler.scheduler import MockScheduler
+from scheduler.adapters import MockAdapter
+from scheduler.dispatcher import Dispatcher, TokenBucket
+
+TODAY = datetime.now().strftime('%Y-%m-%d')
+TOMORROW = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
+
+
+@pytest.fixture
+def db_file(tmp_path):
+    path = str(tmp_path / "dispatch.db")
+    with MockScheduler(db_file=path) as scheduler:
+        scheduler.initialize_db()
+    return path
+
+
+@pytest.fixture
+def scheduler(db_file):
+    scheduler = MockScheduler(db_file=db_file)
+    scheduler.connect()
+    yield scheduler
+    scheduler.close()
+
+
+def adapters(**kwargs):
+    return {"Twitter": MockAdapter("Twitter", **kwargs), "LinkedIn": MockAdapter("LinkedIn", **kwargs)}
+
+
+def test_dispatch_sends_only_due_posts(scheduler):
+    """Due posts are published and marked sent; future posts are left alone."""
+    scheduler.schedule_posts_bulk([
+        {"platform": "Twitter", "content": "due", "scheduled_date": TODAY},
+        {"platform": "LinkedIn", "content": "due too", "scheduled_date": TODAY},
+        {"platform": "Twitter", "content": "later", "scheduled_date": TOMORROW},
+    ])
+    dispatcher = Dispatcher(scheduler, adapters(), worker_id="w1")
+    assert asyncio.run(dispatcher.run_once()) == 2
+
+    statuses = {p['content']: p['status'] for p in scheduler.get_all_scheduled_posts()}
+    assert statuses == {"due": "sent", "due too": "sent", "later": "scheduled"}
+    assert dispatcher.stats.sent == 2
+    assert dispatcher.stats.latencies and all(l >= 0 for l in dispatcher.stats.latencies)
+
+
+def test_concurrent_workers_never_double_claim(db_file, scheduler):
+    """Workers on separate connections claim disjoint sets of posts."""
+    scheduler.schedule_posts_bulk([
+        {"platform": "Twitter", "content": f"post {i}", "scheduled_date": TODAY} for i in range(200)
+    ])
+    claimed = []
+    lock = threading.Lock()
+
+    def worker(name):
+        with MockScheduler(db_file=db_file) as own:
+            while True:
+                batch = own.claim_due_posts(name, limit=7)
+                if not batch:
+                    return
+                with lock:
+                    claimed.extend(p['id'] for p in batch)
+
+    threads = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(claimed) == 200
+    assert len(set(claimed)) == 200
+
+
+def test_retry_then_permanent_failure(scheduler):
+    """Retryable errors are retried with backoff; rejected posts fail immediately."""
+    scheduler.schedule_posts_bulk([
+        {"platform": "Twitter", "content": "flaky", "scheduled_date": TODAY},
+        {"platform": "Twitter", "content": "rejected", "scheduled_date": TODAY},
+    ])
+    flaky_id, rejected_id = [p['id'] for p in scheduler.get_all_scheduled_posts()]
+    twitter = MockAdapter("Twitter", fail_ids={flaky_id: 1}, reject_ids={rejected_id})
+    dispatcher = Dispatcher(scheduler, {"Twitter": twitter}, backoff_base=0.0)
+
+    asyncio.run(dispatcher.run_once())
+    statuses = {p['content']: p['status'] for p in scheduler.get_all_scheduled_posts()}
+    assert statuses == {"flaky": "scheduled", "rejected": "failed"}
+
+    asyncio.run(dispatcher.run_once(now=datetime.now() + timedelta(seconds=1)))
+    statuses = {p['content']: p['status'] for p in scheduler.get_all_scheduled_posts()}
+    assert statuses["flaky"] == "sent"
+    assert dispatcher.stats.retried == 1
+    assert dispatcher.stats.failed == 1
+
+
+def test_stale_claims_are_released(scheduler):
+    """Posts left in 'sending' by a crashed worker become claimable after the lease."""
+    scheduler.schedule_posts_bulk([{"platform": "Twitter", "content": "orphan", "scheduled_date": TODAY}])
+    assert len(scheduler.claim_due_posts("crashed")) == 1
+    assert scheduler.claim_due_posts("other") == []
+
+    later = datetime.now() + timedelta(minutes=10)
+    assert scheduler.release_stale_claims(lease_seconds=60, now=later) == 1
+    assert len(scheduler.claim_due_posts("other", now=later)) == 1
+
+
+def test_worker_that_lost_its_claim_cannot_record_an_outcome(scheduler):
+    """Once a released post is claimed by another worker, the first worker's updates change nothing."""
+    scheduler.schedule_posts_bulk([{"platform": "Twitter", "content": "slow", "scheduled_date": TODAY}])
+    [post] = scheduler.claim_due_posts("w1")
+    later = datetime.now() + timedelta(minutes=10)
+    scheduler.release_stale_claims(lease_seconds=60, now=later)
+    assert len(scheduler.claim_due_posts("w2", now=later)) == 1
+
+    assert scheduler.mark_posts_sent("w1", [(post["id"], "tw-1", datetime.now())]) == 0
+    assert not scheduler.mark_post_failed("w1", post["id"], "timeout")
+    stored = scheduler.conn.execute("SELECT status, claimed_by FROM scheduled_posts").fetchone()
+    assert tuple(stored) == ("sending", "w2")
+    assert scheduler.mark_posts_sent("w2", [(post["id"], "tw-2", datetime.now())]) == 1
+
+
+def test_long_batches_keep_their_claims(scheduler):
+    """A batch that outlasts the lease renews it, so a second dispatcher never publishes its posts again."""
+    scheduler.schedule_posts_bulk([{"platform": "Twitter", "content": f"post {i}", "scheduled_date": TODAY}
+                                   for i in range(2)])
+    slow = MockAdapter("Twitter", requests_per_second=0.4, burst=1)
+    other = MockAdapter("Twitter")
+
+    async def run():
+        first = Dispatcher(scheduler, {"Twitter": slow}, worker_id="w1", lease_seconds=1.5)
+        second = Dispatcher(scheduler, {"Twitter": other}, worker_id="w2", lease_seconds=1.5)
+        batch = asyncio.create_task(first.run_once())
+        await asyncio.sleep(2.2)
+        await second.run_once()
+        await batch
+
+    asyncio.run(run())
+    assert len(slow.published) == 2 and other.published == []
+    assert {p["status"] for p in scheduler.get_all_scheduled_posts()} == {"sent"}
+
+
+def test_database_errors_do_not_abort_the_batch(scheduler, monkeypatch):
+    """A post whose outcome cannot be written is logged and skipped; the rest of the batch is recorded."""
+    scheduler.schedule_posts_bulk([{"platform": "Twitter", "content": f"post {i}", "scheduled_date": TODAY}
+                                   for i in range(3)])
+    record = scheduler.mark_posts_sent
+    calls = []
+
+    def flaky(worker_id, results):
+        calls.append(threading.get_ident())
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return record(worker_id, results)
+
+    monkeypatch.setattr(scheduler, "mark_posts_sent", flaky)
+    dispatcher = Dispatcher(scheduler, adapters(), worker_id="w1")
+    assert asyncio.run(dispatcher.run_once()) == 3
+
+    statuses = sorted(p["status"] for p in scheduler.get_all_scheduled_posts())
+    assert statuses == ["sending", "sent", "sent"]
+    assert dispatcher.stats.sent == 2
+    assert threading.get_ident() not in calls
+
+
+def test_token_bucket_limits_rate():
+    """The token bucket spaces acquisitions once the burst is used up."""
+    async def run():
+        bucket = TokenBucket(rate=50, burst=1)
+        start = time.perf_counter()
+        for _ in range(6):
+            await bucket.acquire()
+        return time.perf_counter() - start
+
+    assert asyncio.run(run()) >= 0.09
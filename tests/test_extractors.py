@@ -0,0 +1,79 @@
+# tests/test_extractors.py
+import pytest
+from scraper.extractors import get_extractor, available_extractors, extract_streaming
+
+PAGE = """
+<html>
+    <head><title>Launch</title><script>track()</script></head>
+    <body>
+        <div id="cookie-consent">We use cookies. Accept all</div>
+        <header><nav><a href="/">Home</a><a href="/docs">Docs</a></nav></header>
+        <div class="layout">
+            <div class="content">
+                <p>Our <strong>new release</strong> makes pipelines <a href="/bench">40% faster</a> for every customer.</p>
+                <p>Streaming responses now start in under a second on average.</p>
+                <p>Upgrading takes one command and keeps existing configuration intact.</p>
+            </div>
+            <div class="sidebar"><p><a href="/a">Related post one</a></p></div>
+        </div>
+        <footer>Copyright Example Corp. All rights reserved.</footer>
+    </body>
+</html>
+"""
+
+
+@pytest.mark.parametrize("name", available_extractors())
+def test_full_text_keeps_everything(name):
+    """Without main-content detection every backend returns the page chrome too."""
+    text = get_extractor(name)(PAGE)
+    assert "40% faster" in text
+    assert "All rights reserved" in text
+    assert "track()" not in text
+
+
+def test_every_backend_extracts_the_same_text():
+    """All installed backends keep the title and keep inline elements on their paragraph's line."""
+    texts = {name: get_extractor(name)(PAGE) for name in available_extractors()}
+    expected = texts["html.parser"]
+    assert expected.startswith("Launch\n")
+    assert "Our new release makes pipelines 40% faster for every customer." in expected.split("\n")
+    assert texts == dict.fromkeys(texts, expected)
+
+
+@pytest.mark.parametrize("name", available_extractors())
+def test_main_content_drops_boilerplate(name):
+    """Main-content mode drops navigation, cookie banners, sidebars and footers."""
+    text = get_extractor(name)(PAGE, main_content=True)
+    assert "40% faster" in text
+    assert "Upgrading takes one command" in text
+    for boilerplate in ("We use cookies", "Docs", "Related post one", "All rights reserved"):
+        assert boilerplate not in text
+
+
+def test_streaming_stops_at_budget():
+    """The streaming parser stops consuming chunks once enough text is collected."""
+    consumed = []
+
+    def chunks():
+        for i in range(1000):
+            consumed.append(i)
+            yield f"<p>Paragraph number {i} with some filler text.</p>".encode("utf-8")
+
+    text = extract_streaming(chunks(), max_chars=500)
+    assert len(text) <= 500
+    assert text.startswith("Paragraph number 0")
+    assert len(consumed) < 50
+
+
+def test_streaming_handles_split_multibyte_characters():
+    """Byte chunks that split a UTF-8 character are decoded correctly."""
+    data = "<p>Café launch — now live</p>".encode("utf-8")
+    chunks = [data[i:i + 3] for i in range(0, len(data), 3)]
+    assert extract_streaming(chunks) == "Café launch — now live"
+
+
+def test_get_extractor_rejects_unknown_names():
+    """Unknown backends raise, and auto always resolves to something installed."""
+    with pytest.raises(ValueError):
+        get_extractor("regex")
+    assert callable(get_extractor("auto"))
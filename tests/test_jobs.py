@@ -0,0 +1,209 @@
+# tests/test_jobs.py
+import time
+import sqlite3
+import threading
+import pytest
+from datetime import datetime, timedelta
+from pipeline.jobs import JobStore, JobWorkerPool, LostClaimError, MAX_JOB_ATTEMPTS, run_job, wait_for_job
+from scheduler.scheduler import MockScheduler, SCHEMA_VERSION
+
+URL = "https://example.com/launch"
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = JobStore(db_file=str(tmp_path / "jobs.db"))
+    yield store
+    store.storage.close()
+
+
+def stub_functions(calls, fail_stage=None):
+    def stage(name, value):
+        def run(*args):
+            calls.append(name)
+            if name == fail_stage:
+                return [] if name == "generate" else ""
+            return value
+        return run
+    return {
+        "scrape": stage("scrape", "Page text"),
+        "analyze": stage("analyze", "Core Theme: speed"),
+        "generate": stage("generate", [{"platform": "Twitter", "content": "Hi", "scheduled_date": "2025-01-01"}]),
+    }
+
+
+def test_submit_deduplicates_in_flight_urls(store):
+    """The same URL and options share one job while it is queued or running."""
+    first, created = store.submit(URL, {"chunked": False})
+    assert created
+    assert store.submit(URL + "?utm_source=feed#top", {"chunked": False}) == (first, False)
+    assert store.submit(URL, {"chunked": True})[1]
+
+    job = store.claim("w1")
+    run_job(store, job, functions=stub_functions([]))
+    assert store.get(first)["status"] == "done"
+    assert store.submit(URL, {"chunked": False})[1]
+
+
+def test_jobs_table_from_before_metrics_is_migrated(tmp_path):
+    """A database whose jobs table predates the metrics columns gains them through the scheduler migrations."""
+    path = str(tmp_path / "old.db")
+    old = MockScheduler(db_file=path)
+    old.initialize_db()
+    old.close()
+    conn = sqlite3.connect(path)
+    conn.execute("DROP TABLE jobs")
+    conn.execute("CREATE TABLE jobs (id TEXT PRIMARY KEY, url TEXT NOT NULL, dedup_key TEXT NOT NULL, "
+                 "options TEXT NOT NULL DEFAULT '{}', status TEXT NOT NULL DEFAULT 'queued', stage TEXT, "
+                 "scraped_text TEXT, analysis TEXT, posts TEXT, error TEXT, failed_stage TEXT, "
+                 "attempts INTEGER NOT NULL DEFAULT 0, claimed_by TEXT, heartbeat_at TEXT, "
+                 "created_at TEXT NOT NULL, updated_at TEXT NOT NULL)")
+    conn.execute("INSERT INTO jobs (id, url, dedup_key, created_at, updated_at) VALUES ('old', ?, 'k', '', '')", (URL,))
+    conn.execute("PRAGMA user_version = 4")
+    conn.commit()
+    conn.close()
+
+    store = JobStore(db_file=path)
+    try:
+        assert store.get("old")["metrics"] == {}
+        assert store.conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        run_job(store, store.claim("w1"), functions=stub_functions([]))
+        assert store.get("old")["status"] == "done"
+    finally:
+        store.storage.close()
+
+
+def test_run_job_saves_results_and_progress(store):
+    """A finished job carries the analysis, posts and full progress."""
+    job_id, _ = store.submit(URL)
+    run_job(store, store.claim("w1"), functions=stub_functions([]))
+
+    job = store.get(job_id)
+    assert job["status"] == "done"
+    assert job["progress"] == 1.0
+    assert job["analysis"] == "Core Theme: speed"
+    assert job["posts"][0]["content"] == "Hi"
+    assert job["metrics"]["elapsed_seconds"] >= 0
+
+
+def test_interrupted_job_resumes_after_last_finished_stage(store):
+    """A job whose worker died after scraping is reclaimed after the lease and skips the scrape."""
+    job_id, _ = store.submit(URL)
+    job = store.claim("crashed")
+    store.record_stage(job_id, "crashed", "scrape", "Saved page text")
+    assert store.get(job_id)["progress"] == pytest.approx(1 / 3)
+    assert store.claim("other") is None
+
+    resumed = store.claim("other", lease_seconds=60, now=datetime.now() + timedelta(minutes=5))
+    assert resumed["id"] == job_id and resumed["attempts"] == 2
+    calls = []
+    functions = stub_functions(calls)
+    seen = []
+    functions["analyze"] = lambda text: seen.append(text) or "Core Theme: speed"
+    run_job(store, resumed, functions=functions)
+
+    assert seen == ["Saved page text"]
+    assert "scrape" not in calls
+    assert store.get(job_id)["status"] == "done"
+
+
+def test_reclaimed_job_is_abandoned_by_its_old_worker(store):
+    """Once another worker takes a job over, the first worker's writes are refused and its run stops."""
+    job_id, _ = store.submit(URL)
+    stale = store.claim("slow")
+    store.claim("other", lease_seconds=60, now=datetime.now() + timedelta(minutes=5))
+    with pytest.raises(LostClaimError):
+        store.record_stage(job_id, "slow", "scrape", "Old page text")
+
+    calls = []
+    run_job(store, stale, functions=stub_functions(calls))
+    job = store.get(job_id)
+    assert calls == ["scrape"]
+    assert (job["status"], job["stage"], job["claimed_by"]) == ("running", None, "other")
+
+
+def test_heartbeat_is_refreshed_while_a_stage_runs(store):
+    """A stage that outlasts the lease keeps its job, because the heartbeat is refreshed meanwhile."""
+    job_id, _ = store.submit(URL)
+    job = store.claim("w1", lease_seconds=1.5)
+    stolen = []
+    functions = stub_functions([])
+    analyze = functions["analyze"]
+
+    def slow_analyze(text):
+        time.sleep(3.2)
+        stolen.append(store.claim("w2", lease_seconds=1.5))
+        return analyze(text)
+
+    functions["analyze"] = slow_analyze
+    run_job(store, job, functions=functions, lease_seconds=1.5)
+    assert stolen == [None]
+    assert store.get(job_id)["status"] == "done"
+
+
+def test_failed_stage_is_recorded(store):
+    """A stage that produces nothing fails the job and names the stage."""
+    job_id, _ = store.submit(URL)
+    run_job(store, store.claim("w1"), functions=stub_functions([], fail_stage="analyze"))
+    job = store.get(job_id)
+    assert job["status"] == "failed"
+    assert job["failed_stage"] == "analyze"
+
+
+def test_worker_pool_runs_jobs_in_background(store):
+    """Submitting returns immediately; the pool's threads run the jobs."""
+    gate = threading.Event()
+    calls = []
+    functions = stub_functions(calls)
+    scrape = functions["scrape"]
+    functions["scrape"] = lambda url: gate.wait(5) and scrape(url)
+
+    pool = JobWorkerPool(store, workers=2, poll_interval=0.05, functions=functions)
+    pool.start()
+    try:
+        ids = [pool.submit(f"{URL}/{i}")[0] for i in range(4)]
+        assert store.get(ids[0])["status"] in ("queued", "running")
+        gate.set()
+        jobs = [wait_for_job(store, job_id, timeout=5) for job_id in ids]
+    finally:
+        pool.stop(timeout=5)
+
+    assert [job["status"] for job in jobs] == ["done"] * 4
+    assert not pool.running
+
+
+def test_worker_survives_a_crashing_job(store, monkeypatch):
+    """An error escaping a job is logged; the worker thread carries on with the next job."""
+    record_stage = store.record_stage
+
+    def flaky(job_id, worker_id, stage, output=None):
+        if store.get(job_id)["url"].endswith("/broken"):
+            raise sqlite3.OperationalError("disk I/O error")
+        return record_stage(job_id, worker_id, stage, output)
+
+    monkeypatch.setattr(store, "record_stage", flaky)
+    pool = JobWorkerPool(store, workers=1, poll_interval=0.05, functions=stub_functions([]))
+    pool.start()
+    try:
+        broken, _ = pool.submit(f"{URL}/broken")
+        healthy, _ = pool.submit(f"{URL}/healthy")
+        assert wait_for_job(store, healthy, timeout=5)["status"] == "done"
+        assert pool.running
+    finally:
+        pool.stop(timeout=5)
+    assert store.get(broken)["status"] == "running"
+
+
+def test_job_that_keeps_crashing_its_worker_is_failed(store):
+    """An abandoned job is reclaimed until it has used up its attempts, then marked failed."""
+    job_id, _ = store.submit(URL)
+    now = datetime.now()
+    for attempt in range(1, MAX_JOB_ATTEMPTS + 1):
+        job = store.claim(f"w{attempt}", lease_seconds=60, now=now)
+        assert job["id"] == job_id and job["attempts"] == attempt
+        now += timedelta(minutes=5)
+
+    assert store.claim("last", lease_seconds=60, now=now) is None
+    job = store.get(job_id)
+    assert (job["status"], job["failed_stage"]) == ("failed", "scrape")
+    assert job["error"] == f"Gave up after {MAX_JOB_ATTEMPTS} attempts"
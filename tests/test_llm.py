@@ -0,0 +1,76 @@
+# tests/test_llm.py
+import time
+import asyncio
+import pytest
+from llm import registry
+from llm.fake import FakeChatModel
+from agent.content_genrator import generate_campaign_content_parallel, agenerate_campaign_content
+
+URL = "https://example.com/launch"
+
+
+@pytest.fixture
+def fake_llm():
+    """Routes every get_llm() call to one shared fake model with 0.2s latency."""
+    model = FakeChatModel(latency=0.2)
+    registry.set_llm_factory(lambda model_name, temperature: model)
+    yield model
+    registry.set_llm_factory(None)
+
+
+def test_registry_reuses_clients_per_model_and_temperature():
+    """Clients are created once per (model, temperature) key."""
+    created = []
+
+    def factory(model_name, temperature):
+        created.append((model_name, temperature))
+        return FakeChatModel()
+
+    registry.set_llm_factory(factory)
+    try:
+        first = registry.get_llm("gpt-4o", 0.7)
+        assert registry.get_llm("gpt-4o", 0.7) is first
+        assert registry.get_llm("gpt-4o", 0.8) is not first
+        assert created == [("gpt-4o", 0.7), ("gpt-4o", 0.8)]
+    finally:
+        registry.set_llm_factory(None)
+
+
+def test_http_client_is_shared():
+    """Every OpenAI client is built on the same pooled HTTP client."""
+    assert registry.get_http_client() is registry.get_http_client()
+
+
+def test_parallel_generation_merges_platforms(fake_llm):
+    """One request per platform runs concurrently and the posts are merged and scheduled."""
+    start = time.perf_counter()
+    posts = generate_campaign_content_parallel("Core Theme: speed", URL)
+    elapsed = time.perf_counter() - start
+
+    assert fake_llm.call_count == 2
+    assert elapsed < 0.35
+    assert {p['platform'] for p in posts} == {"Twitter", "LinkedIn"}
+    assert all(URL in p['content'] and p['approved'] for p in posts)
+    assert all('scheduled_date' in p for p in posts)
+
+
+def test_async_generation_uses_abatch(fake_llm):
+    """The async variant also issues the platform requests concurrently."""
+    start = time.perf_counter()
+    posts = asyncio.run(agenerate_campaign_content("Core Theme: speed", URL, platforms=("Twitter",)))
+
+    assert time.perf_counter() - start < 0.35
+    assert posts and all(p['platform'] == "Twitter" for p in posts)
+
+
+def test_parallel_generation_keeps_successful_platforms():
+    """A malformed response for one platform does not discard the other's posts."""
+    model = FakeChatModel(responder=lambda prompt: "not json" if "for LinkedIn" in prompt
+                          else '[{"platform": "Twitter", "content": "Hi ' + URL + '"}]')
+    registry.set_llm_factory(lambda model_name, temperature: model)
+    try:
+        posts = generate_campaign_content_parallel("Core Theme: speed", URL)
+    finally:
+        registry.set_llm_factory(None)
+
+    assert [p['platform'] for p in posts] == ["Twitter"]
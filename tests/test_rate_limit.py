@@ -0,0 +1,121 @@
+# tests/test_rate_limit.py
+import asyncio
+import pytest
+from llm import registry
+from llm.fake import FakeChatModel, FakeRateLimitError
+from llm.limiter import RateLimiter, RateLimits, RateLimitedChatModel, request_priority
+from nlp.analysis import analyze_text
+from telemetry.metrics import record_run
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def limiter(tmp_path, clock, rpm=None, tpm=None):
+    return RateLimiter(RateLimits(rpm, tpm), db_file=str(tmp_path / "limits.db"), clock=clock)
+
+
+def test_buckets_refill_over_time_and_settle_to_actual_usage(tmp_path, clock):
+    """Requests and estimated tokens are taken up front; unused tokens are returned once usage is known."""
+    limits = limiter(tmp_path, clock, rpm=2, tpm=1000)
+    assert limits.try_acquire("gpt-4o", 400, waiter_id="a") == 0
+    assert limits.try_acquire("gpt-4o", 400, waiter_id="b") == 0
+    assert limits.try_acquire("gpt-4o", 100, waiter_id="c") == pytest.approx(30.0)
+    clock.now += 30
+    assert limits.try_acquire("gpt-4o", 900, waiter_id="c") == pytest.approx(12.0)
+    limits.settle("gpt-4o", 400, 100)
+    assert limits.try_acquire("gpt-4o", 900, waiter_id="c") == 0
+    # Each model has its own buckets
+    assert limits.try_acquire("gpt-4o-mini", 900, waiter_id="d") == 0
+
+
+def test_interactive_requests_go_ahead_of_batch_across_processes(tmp_path, clock):
+    """Two limiters on one database share the budget, and a waiting interactive call is served first."""
+    ui, batch = limiter(tmp_path, clock, rpm=6), limiter(tmp_path, clock, rpm=6)
+    while batch.try_acquire("gpt-4o", 10, "batch", "job-1") == 0:
+        pass
+    asked = clock.now
+    assert ui.try_acquire("gpt-4o", 10, "interactive", "ui-1", asked) == pytest.approx(10.0)
+    clock.now += 1
+    assert batch.try_acquire("gpt-4o", 10, "batch", "job-2", asked + 1) > 0
+    clock.now += 4
+    assert ui.try_acquire("gpt-4o", 10, "interactive", "ui-1", asked) > 0
+    clock.now += 5
+    # A request has refilled: the batch call is still waiting, but the interactive one goes first
+    assert batch.try_acquire("gpt-4o", 10, "batch", "job-2", asked + 1) > 0
+    assert ui.try_acquire("gpt-4o", 10, "interactive", "ui-1", asked) == 0
+    clock.now += 10
+    assert batch.try_acquire("gpt-4o", 10, "batch", "job-2", asked + 1) == 0
+
+
+def test_retry_after_pauses_every_process(tmp_path, clock):
+    """A 429 with Retry-After holds back the model's calls in every limiter sharing the database."""
+    first, second = limiter(tmp_path, clock, rpm=100), limiter(tmp_path, clock, rpm=100)
+    first.block("gpt-4o", 20)
+    assert second.try_acquire("gpt-4o", 10, waiter_id="x") == pytest.approx(20.0)
+    clock.now += 20
+    assert second.try_acquire("gpt-4o", 10, waiter_id="x") == 0
+
+
+def test_429s_are_retried_instead_of_failing_the_analysis(tmp_path):
+    """analyze_text survives rate-limit errors: the call is retried after Retry-After and usage is settled."""
+    fake = FakeChatModel(rate_limited_calls=2, retry_after=0.05)
+    registry.set_llm_factory(lambda model_name, temperature: fake)
+    registry.set_rate_limiter(RateLimiter(RateLimits(requests_per_minute=600, tokens_per_minute=100000),
+                                          db_file=str(tmp_path / "limits.db")))
+    try:
+        with record_run() as run, request_priority("batch"):
+            analysis = analyze_text("Our release makes pipelines 40% faster.", condense_tokens=0)
+    finally:
+        registry.set_llm_factory(None)
+        registry.set_rate_limiter(None)
+    assert analysis.startswith("1. **Core Theme")
+    assert fake.rejected == 2 and fake.call_count == 1
+    summary = run.summary()
+    assert summary["retries"] == 2 and summary["llm_calls"] == 1
+
+
+def test_streams_retry_only_before_the_first_chunk():
+    """A rejected stream is retried; with retries exhausted, the 429 reaches the caller."""
+    fake = FakeChatModel(rate_limited_calls=1, retry_after=0)
+    model = RateLimitedChatModel(model=fake, model_name="gpt-4o")
+    assert "".join(chunk.content for chunk in model.stream("Summarize this")).startswith("1. **Core Theme")
+
+    impatient = RateLimitedChatModel(model=FakeChatModel(rate_limited_calls=5, retry_after=0),
+                                     model_name="gpt-4o", max_retries=1)
+    with pytest.raises(Exception, match="429"):
+        impatient.invoke("Summarize this")
+
+
+def test_only_429s_return_their_reserved_tokens(tmp_path, clock):
+    """A 429 gives back the call's estimate; a server error keeps it spent, in sync and async calls alike."""
+    limits = limiter(tmp_path, clock, rpm=100, tpm=3000)
+
+    def failing(status):
+        def respond(prompt):
+            raise FakeRateLimitError(status_code=status)
+        return RateLimitedChatModel(model=FakeChatModel(responder=respond), model_name="gpt-4o",
+                                    limiter=limits, max_retries=0)
+
+    def tokens_left():
+        return limits.storage.connection().execute("SELECT tokens FROM llm_rate_limits").fetchone()[0]
+
+    with pytest.raises(FakeRateLimitError):
+        asyncio.run(failing(500).ainvoke("Summarize this"))
+    spent = 3000 - tokens_left()
+    assert spent > 1000
+    with pytest.raises(FakeRateLimitError):
+        failing(429).invoke("Summarize this")
+    with pytest.raises(FakeRateLimitError):
+        asyncio.run(failing(429).ainvoke("Summarize this"))
+    assert 3000 - tokens_left() == pytest.approx(spent)
@@ -75,3 +75,53 @@ def test_invalid_date_format_scheduling(scheduler, caplog):
     # Ensure the post was not added to the DB
     posts = scheduler.get_all_scheduled_posts()
     assert len(posts) == 0
+
+def test_schedule_posts_bulk(scheduler):
+    """Test that bulk scheduling inserts every valid row."""
+    posts = [
+        {"platform": "Twitter", "content": f"Bulk post {i}", "scheduled_date": f"2025-11-{i + 1:02d}"}
+        for i in range(10)
+    ]
+    assert scheduler.schedule_posts_bulk(posts) == 10
+    assert scheduler.count_scheduled_posts() == 10
+
+def test_schedule_posts_bulk_rejects_invalid_batch(scheduler, caplog):
+    """Test that one invalid row rejects the whole batch."""
+    posts = [
+        {"platform": "Twitter", "content": "Good post", "scheduled_date": "2025-11-01"},
+        {"platform": "LinkedIn", "content": "Bad date", "scheduled_date": "01-11-2025"},
+    ]
+    assert scheduler.schedule_posts_bulk(posts) == 0
+    assert "invalid rows" in caplog.text
+    assert scheduler.get_all_scheduled_posts() == []
+
+def test_wal_mode_and_indexes(scheduler):
+    """Test that the database runs in WAL mode with the query indexes in place."""
+    assert scheduler.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    indexes = {row['name'] for row in scheduler.conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='index' AND tbl_name='scheduled_posts'")}
+    assert {"idx_scheduled_posts_date", "idx_scheduled_posts_status_date",
+            "idx_scheduled_posts_platform_date"} <= indexes
+
+def test_filtered_and_paginated_queries(scheduler):
+    """Test date range, platform and status filters with offset and keyset paging."""
+    posts = [
+        {"platform": "Twitter" if i % 2 else "LinkedIn", "content": f"Post {i}", "scheduled_date": f"2025-12-{i + 1:02d}"}
+        for i in range(20)
+    ]
+    scheduler.schedule_posts_bulk(posts)
+
+    in_range = scheduler.get_scheduled_posts(start_date="2025-12-05", end_date="2025-12-09")
+    assert [p['scheduled_date'] for p in in_range] == [f"2025-12-{d:02d}" for d in range(5, 10)]
+
+    twitter = scheduler.get_scheduled_posts(platform="Twitter", limit=100)
+    assert len(twitter) == 10 and all(p['platform'] == "Twitter" for p in twitter)
+    assert scheduler.count_scheduled_posts(status="scheduled") == 20
+    assert scheduler.get_scheduled_posts(status="sent") == []
+
+    first_page = scheduler.get_scheduled_posts(limit=8)
+    second_page = scheduler.get_scheduled_posts(limit=8, offset=8)
+    last = first_page[-1]
+    keyset_page = scheduler.get_scheduled_posts(limit=8, after=(last['scheduled_date'], last['id']))
+    assert keyset_page == second_page
+    assert first_page[-1]['scheduled_date'] < second_page[0]['scheduled_date']
@@ -0,0 +1,102 @@
+# tests/test_slots.py
+import itertools
+from datetime import date, datetime, time, timedelta
+import pytest
+from scheduler import slots
+from scheduler.scheduler import MockScheduler
+
+DAY = date.today() + timedelta(days=3)
+
+
+def at(hour: int, minute: int = 0, day: date = DAY) -> str:
+    return datetime.combine(day, time(hour, minute)).strftime(slots.TIMESTAMP_FORMAT)
+
+
+WORDS = ("launch", "pricing", "hiring", "webinar", "roadmap", "security", "partners", "docs", "billing", "mobile")
+_written = itertools.count()
+
+
+def posts(count: int, platform: str = "Twitter", day: date = DAY) -> list:
+    """Posts with distinct content, so none of them is dropped as a near-duplicate."""
+    batch = []
+    for _ in range(count):
+        n = next(_written)
+        words = " ".join(WORDS[(n // len(WORDS) ** k) % len(WORDS)] + str(k) for k in range(4))
+        batch.append({"platform": platform, "content": f"{words} {n}", "scheduled_date": day})
+    return batch
+
+
+@pytest.fixture
+def scheduler(tmp_path):
+    scheduler = MockScheduler(db_file=str(tmp_path / "slots.db"),
+                              slot_policy=slots.SlotPolicy(capacity={"Twitter": 2, "LinkedIn": 1}))
+    scheduler.initialize_db()
+    yield scheduler
+    scheduler.close()
+
+
+def scheduled_times(scheduler, platform="Twitter") -> list:
+    return [p["scheduled_date"] for p in scheduler.get_scheduled_posts(platform=platform, limit=1000)]
+
+
+def test_posts_fill_free_slots_after_quiet_hours(scheduler):
+    """Allocated posts start when quiet hours end and respect each platform's hourly capacity."""
+    assert scheduler.schedule_posts_bulk(posts(5) + posts(2, "LinkedIn"), allocate=True) == 7
+    assert scheduled_times(scheduler) == [at(7), at(7, 30), at(8), at(8, 30), at(9)]
+    assert scheduled_times(scheduler, "LinkedIn") == [at(7), at(8)]
+
+
+def test_blackouts_and_exact_posts_are_respected(tmp_path):
+    """Blackout windows are skipped, and posts given an exact time count against their slot."""
+    policy = slots.SlotPolicy(capacity={"Twitter": 2},
+                              blackouts=((datetime.combine(DAY, time(7)), datetime.combine(DAY, time(9))),))
+    scheduler = MockScheduler(db_file=str(tmp_path / "blackout.db"), slot_policy=policy)
+    scheduler.initialize_db()
+    scheduler.schedule_post("Twitter", "A post at an exact time", at(9, 15))
+    assert scheduler.schedule_posts_bulk(posts(2), allocate=True) == 2
+    assert scheduled_times(scheduler) == [at(9, 15), at(9, 30), at(10)]
+    scheduler.close()
+
+
+def test_deleted_posts_free_their_slot(scheduler):
+    """Replacing a campaign's posts gives their slots back before the new posts are placed."""
+    campaign_id = scheduler.save_campaign("https://acme.example/launch")
+    scheduler.schedule_posts_bulk(posts(2), campaign_id=campaign_id, allocate=True)
+    assert scheduler.replace_campaign_posts(campaign_id, posts(2)[::-1], allocate=True) == 2
+    assert scheduled_times(scheduler) == [at(7), at(7, 30)]
+
+
+def test_rebalance_moves_only_posts_that_no_longer_fit(scheduler):
+    """After lowering a capacity, the extra posts move to the next free slots and the rest stay."""
+    scheduler.slot_policy.capacity["Twitter"] = 4
+    scheduler.schedule_posts_bulk(posts(6), allocate=True)
+    legacy = scheduler.schedule_post("Twitter", "A post scheduled before time slots existed", DAY + timedelta(days=1))
+    assert scheduled_times(scheduler)[:6] == [at(7), at(7, 15), at(7, 30), at(7, 45), at(8), at(8, 15)]
+
+    scheduler.slot_policy.capacity["Twitter"] = 2
+    assert scheduler.rebalance() == 3
+    assert scheduled_times(scheduler) == [at(7), at(7, 15), at(8), at(8, 15), at(9), at(9, 30),
+                                          at(7, day=DAY + timedelta(days=1))]
+    assert scheduler.conn.execute("SELECT scheduled_date FROM scheduled_posts WHERE id = ?",
+                                  (legacy,)).fetchone()[0] == at(7, day=DAY + timedelta(days=1))
+    # The free-slot index matches the posts it now holds
+    assert scheduler.schedule_posts_bulk(posts(1, day=DAY), allocate=True) == 1
+    assert scheduled_times(scheduler)[6] == at(10)
+
+
+def test_timestamps_work_with_filters_and_dispatch(scheduler):
+    """Posts with times are found by date filters and become due at their time, not their day."""
+    scheduler.schedule_post("Twitter", "Morning post", at(9, 30))
+    assert [p["content"] for p in scheduler.get_scheduled_posts(start_date=DAY, end_date=DAY)] == ["Morning post"]
+    assert scheduler.claim_due_posts("w1", now=datetime.combine(DAY, time(9))) == []
+    assert len(scheduler.claim_due_posts("w1", now=datetime.combine(DAY, time(9, 30)))) == 1
+
+
+def test_no_free_slot_rejects_the_batch(tmp_path):
+    """A policy with nowhere to put a post schedules nothing."""
+    policy = slots.SlotPolicy(quiet_hours=((time(0), time(23, 59)),), capacity={"Twitter": 0})
+    scheduler = MockScheduler(db_file=str(tmp_path / "closed.db"), slot_policy=policy)
+    scheduler.initialize_db()
+    assert scheduler.schedule_posts_bulk(posts(1), allocate=True) == 0
+    assert scheduler.count_scheduled_posts() == 0
+    scheduler.close()
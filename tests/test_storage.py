@@ -0,0 +1,71 @@
+# tests/test_storage.py
+import threading
+from unittest.mock import patch
+from datetime import datetime
+from scheduler.scheduler import MockScheduler, get_scheduler
+from scheduler.storage import SQLiteStorage
+
+TODAY = datetime.now().strftime('%Y-%m-%d')
+
+
+def test_shared_scheduler_handles_concurrent_writers(tmp_path):
+    """One scheduler shared by many threads writes without 'database is locked' errors."""
+    scheduler = MockScheduler(db_file=str(tmp_path / "shared.db"))
+    scheduler.initialize_db()
+    results = []
+
+    def writer(n):
+        for r in range(5):
+            # Distinct content per round, or the dedup index would reject the repeats
+            posts = [{"platform": "Twitter", "content": f"t{n}-{i}-{r}", "scheduled_date": TODAY} for i in range(50)]
+            results.append(scheduler.schedule_posts_bulk(posts))
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [50] * 40
+    assert scheduler.count_scheduled_posts() == 2000
+    scheduler.close()
+
+
+def test_connections_are_reused_per_thread_and_pruned(tmp_path):
+    """Each thread reuses its connection, and connections of finished threads are closed."""
+    storage = SQLiteStorage(str(tmp_path / "pool.db"))
+    assert storage.connection() is storage.connection()
+
+    for _ in range(10):
+        thread = threading.Thread(target=storage.connection)
+        thread.start()
+        thread.join()
+
+    assert storage.open_connections <= 2
+    storage.close()
+    assert storage.open_connections == 0
+
+
+def test_schema_initialized_once(tmp_path):
+    """Repeated initialize_db calls only run the DDL the first time."""
+    db_file = str(tmp_path / "once.db")
+    with patch.object(MockScheduler, "_apply_migrations", wraps=MockScheduler._apply_migrations) as migrate:
+        scheduler = MockScheduler(db_file=db_file)
+        for _ in range(3):
+            scheduler.initialize_db()
+        assert migrate.call_count == 1
+
+        # A second process opening an up-to-date database skips the DDL too.
+        other = MockScheduler(db_file=db_file)
+        other.initialize_db()
+        assert migrate.call_count == 1
+    scheduler.close()
+    other.close()
+
+
+def test_get_scheduler_is_shared(tmp_path):
+    """get_scheduler returns one initialized instance per database file."""
+    db_file = str(tmp_path / "app.db")
+    scheduler = get_scheduler(db_file)
+    assert get_scheduler(db_file) is scheduler
+    assert scheduler.get_all_scheduled_posts() == []
@@ -0,0 +1,78 @@
+# tests/test_streaming.py
+import json
+import time
+import pytest
+from llm import registry
+from llm.fake import FakeChatModel
+from agent.streaming import IncrementalPostParser, recover_posts
+from agent.content_genrator import stream_campaign_content, generate_campaign_content
+
+POSTS = [
+    {"platform": "Twitter", "content": "Braces {in} strings and \"quotes\" \\ survive", "scheduled_date": "2025-01-01"},
+    {"platform": "LinkedIn", "content": "Second post with ] and [ inside", "scheduled_date": "2025-01-02"},
+]
+
+
+def test_parser_yields_each_object_as_it_closes():
+    """Posts come out one by one while the array is still being streamed."""
+    text = "```json\n" + json.dumps(POSTS, indent=2) + "\n```"
+    parser = IncrementalPostParser()
+    seen_at = []
+    for i, char in enumerate(text):
+        for post in parser.feed(char):
+            seen_at.append((i, post))
+
+    assert [post for _, post in seen_at] == POSTS
+    assert seen_at[0][0] < len(text) // 2 + 10
+    assert parser.finished and not parser.truncated
+
+
+def test_recover_posts_from_truncated_response():
+    """Complete posts survive a response that is cut off mid-object."""
+    text = json.dumps(POSTS)
+    truncated = text[:text.index("Second post") + 5]
+    assert recover_posts(truncated) == POSTS[:1]
+
+
+def test_parser_skips_malformed_objects():
+    """A malformed object is dropped without losing its neighbours."""
+    text = '[{"platform": "Twitter", "content": "ok"}, {"platform": Twitter}, {"platform": "LinkedIn", "content": "ok"}]'
+    parser = IncrementalPostParser()
+    posts = parser.feed(text)
+    assert [p["platform"] for p in posts] == ["Twitter", "LinkedIn"]
+    assert parser.errors == 1
+
+
+@pytest.fixture
+def slow_stream_llm():
+    model = FakeChatModel(stream_chunk_size=20, chunk_latency=0.01)
+    registry.set_llm_factory(lambda model_name, temperature: model)
+    yield model
+    registry.set_llm_factory(None)
+
+
+def test_stream_campaign_content_yields_before_completion(slow_stream_llm):
+    """The first post arrives well before the full campaign has been streamed."""
+    start = time.perf_counter()
+    arrivals = []
+    for post in stream_campaign_content("Core Theme: speed", "https://example.com/launch"):
+        arrivals.append((time.perf_counter() - start, post))
+
+    assert len(arrivals) == 10
+    assert {post["platform"] for _, post in arrivals} == {"Twitter", "LinkedIn"}
+    assert arrivals[0][0] < arrivals[-1][0] / 2
+    assert all(post["approved"] and post["scheduled_date"] for _, post in arrivals)
+
+
+def test_generate_recovers_complete_posts_from_cut_off_response():
+    """The non-streaming generator keeps the complete posts of a truncated response."""
+    text = json.dumps(POSTS)
+    model = FakeChatModel(responses=[text[:text.index("Second post")]])
+    registry.set_llm_factory(lambda model_name, temperature: model)
+    try:
+        posts = generate_campaign_content("Core Theme: speed", "https://example.com/launch")
+    finally:
+        registry.set_llm_factory(None)
+
+    assert len(posts) == 1
+    assert posts[0]["content"] == POSTS[0]["content"]
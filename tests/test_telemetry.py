@@ -0,0 +1,87 @@
+# tests/test_telemetry.py
+import json
+import time
+import urllib.request
+import pytest
+from llm import registry
+from llm.fake import FakeChatModel
+from cache.store import ResultCache
+from nlp.analysis import analyze_text
+from agent.content_genrator import stream_campaign_content
+from telemetry import metrics
+from telemetry.metrics import record_run, span, REGISTRY, JsonlSink, add_sink, remove_sink, start_metrics_server
+
+
+@pytest.fixture
+def fake_llm():
+    model = FakeChatModel()
+    registry.set_llm_factory(lambda model_name, temperature: model)
+    yield model
+    registry.set_llm_factory(None)
+
+
+def test_run_collects_spans_tokens_and_cost(fake_llm):
+    """LLM calls made during a run, including from streaming threads, are counted with their cost."""
+    with record_run() as run:
+        analysis = analyze_text("Our release makes pipelines 40% faster.")
+        posts = list(stream_campaign_content(analysis, "https://example.com/launch"))
+    summary = run.summary()
+
+    assert len(posts) == 10
+    assert summary["llm_calls"] == 3
+    assert summary["prompt_tokens"] > 0 and summary["completion_tokens"] > 0
+    assert summary["cost_usd"] > 0
+    assert {"analyze", "generate", "generate.first_post", "llm"} <= set(summary["spans"])
+    assert summary["spans"]["llm"]["count"] == 3
+
+
+def test_cache_lookups_are_counted(tmp_path):
+    """Cache hits and misses are attributed to the active run."""
+    cache = ResultCache(db_file=str(tmp_path / "cache.db"))
+    with record_run() as run:
+        cache.get("page", "missing")
+        cache.set("page", "present", "text")
+        cache.get("page", "present")
+    cache.close()
+    assert (run.summary()["cache_hits"], run.summary()["cache_misses"]) == (1, 1)
+
+
+def test_prometheus_endpoint_serves_registry():
+    """The /metrics endpoint renders counters and span histograms in the text format."""
+    with span("unit.test", kind="demo"):
+        pass
+    metrics.record_retry("unit")
+    server = start_metrics_server(0)
+    body = urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}/metrics").read().decode()
+
+    assert "# TYPE campaign_span_seconds histogram" in body
+    assert 'campaign_span_seconds_count{kind="demo",span="unit.test"} ' in body
+    assert 'campaign_retries_total{operation="unit"} ' in body
+
+
+def test_jsonl_sink_records_spans_and_run_summary(tmp_path):
+    """Spans and the run summary are appended as JSON lines."""
+    path = tmp_path / "metrics.jsonl"
+    sink = JsonlSink(str(path))
+    add_sink(sink)
+    try:
+        with record_run():
+            with span("scrape"):
+                pass
+    finally:
+        remove_sink(sink)
+        sink.close()
+
+    events = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [event["type"] for event in events] == ["span", "run"]
+    assert events[1]["spans"]["scrape"]["count"] == 1
+
+
+def test_span_overhead_is_small():
+    """Recording a span costs a few microseconds, so instrumentation can stay on."""
+    started = time.perf_counter()
+    for _ in range(20000):
+        with span("overhead"):
+            pass
+    assert (time.perf_counter() - started) / 20000 < 50e-6
+    assert REGISTRY.counter_value("nonexistent") == 0.0
@@ -0,0 +1,93 @@
+# tests/test_transfer.py
+import json
+import pytest
+import cli
+from scheduler import transfer
+from scheduler.scheduler import MockScheduler
+
+POSTS = [
+    {"platform": "Twitter", "content": "Acme Cloud deploys any app in seconds", "scheduled_date": "2030-01-01"},
+    {"platform": "LinkedIn", "content": "We are hiring backend engineers in Berlin", "scheduled_date": "2030-01-02"},
+    {"platform": "Twitter", "content": "Join our webinar on zero-config scaling, \"live\"", "scheduled_date": "2030-01-03 09:30"},
+    {"platform": "LinkedIn", "content": "Our security report for the year,\nwith two lines", "scheduled_date": "2030-01-04"},
+    {"platform": "Twitter", "content": "New pricing: a free tier for hobby projects", "scheduled_date": "2030-01-05"},
+]
+
+
+def make_scheduler(path):
+    scheduler = MockScheduler(db_file=str(path))
+    scheduler.initialize_db()
+    return scheduler
+
+
+@pytest.fixture
+def source(tmp_path):
+    scheduler = make_scheduler(tmp_path / "source.db")
+    scheduler.schedule_posts_bulk(POSTS)
+    yield scheduler
+    scheduler.close()
+
+
+def stored(scheduler):
+    return [(p["platform"], p["content"], p["scheduled_date"]) for p in scheduler.get_scheduled_posts()]
+
+
+@pytest.mark.parametrize("name", ["posts.csv", "posts.jsonl", "posts.parquet", "posts.arrow"])
+def test_export_then_import_round_trips_in_batches(source, tmp_path, name):
+    """Every format carries the posts over unchanged, moving a batch at a time."""
+    if name.endswith((".parquet", ".arrow")):
+        pytest.importorskip("pyarrow")
+    path = str(tmp_path / name)
+    exported = source.export_posts(path, batch_size=2)
+    assert exported["rows"] == 5 and exported["rows_per_sec"] > 0
+    assert [len(batch) for batch in transfer.read_batches(path, batch_size=2)] == [2, 2, 1]
+
+    target = make_scheduler(tmp_path / "target.db")
+    imported = target.import_posts(path, batch_size=2)
+    assert (imported["rows"], imported["imported"], imported["error"]) == (5, 5, "")
+    assert stored(target) == stored(source)
+    target.close()
+
+
+def test_parquet_export_writes_a_row_group_per_batch(source, tmp_path):
+    """Parquet exports keep every column and flush each fetched batch as its own row group."""
+    parquet = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "sent.parquet")
+    source.conn.execute("UPDATE scheduled_posts SET status = 'sent', external_id = 'tw-1' WHERE id = 1")
+    source.conn.commit()
+
+    assert source.export_posts(path, status="scheduled", batch_size=3)["rows"] == 4
+    assert parquet.ParquetFile(path).metadata.num_row_groups == 2
+    assert source.export_posts(path, status="sent")["rows"] == 1
+    [row] = parquet.read_table(path).to_pylist()
+    assert list(row) == [name for name, _ in transfer.EXPORT_COLUMNS]
+    assert (row["id"], row["status"], row["external_id"], row["campaign_id"]) == (1, "sent", "tw-1", None)
+
+
+def test_import_skips_invalid_rows_and_near_duplicates(source, tmp_path):
+    """Bad rows and repeats of stored posts are counted and skipped; the rest is imported."""
+    path = tmp_path / "incoming.jsonl"
+    rows = [POSTS[0], {"platform": "Twitter", "content": "", "scheduled_date": "2030-02-01"},
+            {"platform": "LinkedIn", "content": "Quarterly roadmap review with partners", "scheduled_date": "tomorrow"},
+            {"platform": "LinkedIn", "content": "Quarterly roadmap review with partners", "scheduled_date": "2030-02-02"}]
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows))
+
+    stats = source.import_posts(str(path), batch_size=3)
+    assert {key: stats[key] for key in ("rows", "imported", "rejected", "invalid")} == \
+        {"rows": 4, "imported": 1, "rejected": 1, "invalid": 2}
+    assert source.count_scheduled_posts() == 6
+    with pytest.raises(ValueError):
+        source.import_posts(str(tmp_path / "posts.xlsx"))
+
+
+def test_cli_export_and_import(source, tmp_path, capsys):
+    """`cli.py export` and `cli.py import` report the rows moved and their rate."""
+    path = str(tmp_path / "posts.csv")
+    assert cli.main(["export", path, "--db", source.db_file, "--platform", "LinkedIn"]) == 0
+    assert "Exported 2 posts" in capsys.readouterr().err
+
+    target = tmp_path / "target.db"
+    assert cli.main(["import", path, "--db", str(target)]) == 0
+    err = capsys.readouterr().err
+    assert "Imported 2 of 2 posts" in err and "rows/s" in err
+    assert [p["platform"] for p in MockScheduler(str(target)).get_scheduled_posts()] == ["LinkedIn", "LinkedIn"]
@@ -0,0 +1,63 @@
+# tests/test_ui.py
+import pytest
+import streamlit as st
+from datetime import datetime, timedelta
+from streamlit.testing.v1 import AppTest
+from scheduler import scheduler as scheduler_module
+
+APP = "../ui/app_ui.py"
+DAY = datetime.now()
+
+
+@pytest.fixture
+def app_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(scheduler_module, "DB_FILE", str(tmp_path / "ui.db"))
+    st.cache_resource.clear()
+    st.cache_data.clear()
+    scheduler = scheduler_module.get_scheduler()
+    scheduler.schedule_posts_bulk([
+        {"platform": "Twitter" if i % 2 else "LinkedIn", "content": f"post {i}",
+         "scheduled_date": (DAY + timedelta(days=i % 30)).strftime('%Y-%m-%d')}
+        for i in range(250)
+    ])
+    yield scheduler
+    st.cache_resource.clear()
+    st.cache_data.clear()
+
+
+def test_scheduled_view_is_paginated_and_filtered_in_sql(app_db):
+    """The scheduled view only loads one page, and filters change the server-side query."""
+    at = AppTest.from_file(APP, default_timeout=30).run()
+    assert not at.exception
+    assert len(at.dataframe[0].value) == 100
+    assert "of 250 scheduled posts" in at.caption[-1].value
+
+    at.selectbox(key="filter_platform").select("Twitter").run()
+    assert set(at.dataframe[0].value["platform"]) == {"Twitter"}
+    assert "of 125 scheduled posts" in at.caption[-1].value
+
+    at.number_input(key="scheduled_page").set_value(2).run()
+    assert len(at.dataframe[0].value) == 25
+
+
+def test_scheduled_reads_are_cached_until_a_write(app_db):
+    """Reruns reuse the cached page; invalidating the cache picks up new posts."""
+    from ui.app_ui import load_scheduled_count, invalidate_scheduled_cache
+
+    assert load_scheduled_count() == 250
+    app_db.schedule_post("Twitter", "late addition", DAY.strftime('%Y-%m-%d'))
+    assert load_scheduled_count() == 250
+    invalidate_scheduled_cache()
+    assert load_scheduled_count() == 251
+
+
+def test_review_frame_shows_validation_results(app_db):
+    """Each row of the review table says whether the post passes its platform's rules."""
+    from ui.app_ui import build_review_frame
+
+    url = "https://example.com/launch"
+    posts = [{"platform": "Twitter", "content": f"Launch day {url}", "scheduled_date": "2030-01-01", "approved": True},
+             {"platform": "Twitter", "content": "x" * 300, "scheduled_date": "2030-01-02", "approved": False}]
+    df = build_review_frame(posts, url)
+    assert df["issues"][0] == "✓"
+    assert "over the 280 limit" in df["issues"][1] and "missing the source URL" in df["issues"][1]
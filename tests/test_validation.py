@@ -0,0 +1,108 @@
+# tests/test_validation.py
+import json
+import pytest
+from llm import registry
+from llm.fake import FakeChatModel
+from agent.content_genrator import generate_campaign_content_parallel
+from agent.validation import validate_posts, repair_posts, post_length, PLATFORM_RULES
+
+URL = "https://example.com/launch"
+
+
+def posts_for(platform, count):
+    return [{"platform": platform, "content": f"{platform} post {i} {URL}", "scheduled_date": "2030-01-01",
+             "approved": True} for i in range(count)]
+
+
+@pytest.fixture
+def model():
+    prompts = []
+    holder = {"responses": {}}
+
+    def respond(prompt):
+        prompts.append(prompt)
+        for marker, response in holder["responses"].items():
+            if marker in prompt:
+                return response
+        raise AssertionError(f"unexpected prompt: {prompt[:200]}")
+
+    fake = FakeChatModel(responder=respond)
+    registry.set_llm_factory(lambda model_name, temperature: fake)
+    yield prompts, holder["responses"]
+    registry.set_llm_factory(None)
+
+
+def test_validate_posts_checks_every_rule():
+    """Length (links count as 23 on Twitter), source URL, platform and per-platform counts are checked."""
+    long_link = URL + "?" + "x" * 300
+    posts = posts_for("Twitter", 5) + posts_for("LinkedIn", 8) + [
+        {"platform": "Twitter", "content": "y" * 250 + " " + long_link},
+        {"platform": "Twitter", "content": "z" * 281 + " " + URL},
+        {"platform": "LinkedIn", "content": "No link here"},
+        {"platform": "Mastodon", "content": URL},
+    ]
+    assert post_length(posts[13]["content"], PLATFORM_RULES["Twitter"]) == 274
+    report = validate_posts(posts, URL)
+    assert report.failing == [14, 15, 16]
+    assert report.issues[14] == ["305 characters, over the 280 limit"]
+    assert report.issues[15] == ["missing the source URL"]
+    assert report.issues[16] == ["unknown platform 'Mastodon'"]
+    assert report.extra == {"LinkedIn": 2} and report.missing == {}
+    assert not validate_posts(posts_for("Twitter", 5), URL, platforms=("Twitter",)).failing
+
+
+def test_only_failing_posts_are_sent_for_repair(model):
+    """One repair call carries just the failing posts; valid posts come back untouched."""
+    prompts, responses = model
+    twitter = posts_for("Twitter", 5)
+    twitter[1]["content"] = "A launch tweet without the link"
+    twitter[3]["content"] = "w" * 300 + " " + URL
+    linkedin = posts_for("LinkedIn", 5)
+    responses["for Twitter"] = json.dumps(twitter)
+    responses["for LinkedIn"] = json.dumps(linkedin)
+    responses["break the platform rules"] = json.dumps([
+        {"index": 1, "platform": "Twitter", "content": f"A launch tweet {URL}"},
+        {"index": 3, "platform": "Twitter", "content": f"Shorter now {URL}"},
+    ])
+
+    posts = generate_campaign_content_parallel("Core Theme: speed", URL)
+
+    assert len(prompts) == 3
+    repair = prompts[-1]
+    assert "A launch tweet without the link" in repair and "w" * 300 in repair
+    assert "Twitter post 0" not in repair and "LinkedIn post" not in repair and "ANALYSIS" not in repair
+    contents = [p["content"] for p in posts]
+    assert contents[1] == f"A launch tweet {URL}" and contents[3] == f"Shorter now {URL}"
+    assert contents[0] == twitter[0]["content"] and contents[5:] == [p["content"] for p in linkedin]
+    assert all(p["approved"] for p in posts) and validate_posts(posts, URL).valid
+
+
+def test_missing_posts_are_requested_and_extras_dropped(model):
+    """Too few posts are topped up in the same call; posts over the maximum are dropped without one."""
+    prompts, responses = model
+    responses["break the platform rules"] = json.dumps(
+        [{"index": None, "platform": "LinkedIn", "content": f"New LinkedIn post {i} {URL}"} for i in range(3)])
+    extra = posts_for("Twitter", 9)
+    extra[2]["content"] = "no link"
+
+    trimmed = repair_posts(extra, "Core Theme: speed", URL, platforms=("Twitter",))
+    assert not prompts
+    assert len(trimmed) == 7 and all(URL in p["content"] for p in trimmed)
+
+    posts = repair_posts(posts_for("LinkedIn", 3), "Core Theme: speed", URL, platforms=("LinkedIn",))
+    assert len(prompts) == 1 and "Also write 2 new posts for LinkedIn" in prompts[0] and "ANALYSIS" in prompts[0]
+    assert [p["content"] for p in posts[3:]] == [f"New LinkedIn post {i} {URL}" for i in range(2)]
+    assert all(p["scheduled_date"] and p["approved"] for p in posts)
+
+
+def test_posts_still_failing_are_left_unapproved(model):
+    """If the repair call fails, the failing posts are kept for review but not approved."""
+    prompts, responses = model
+    responses["break the platform rules"] = "not json"
+    posts = posts_for("Twitter", 5)
+    posts[4]["content"] = "Forgot the link"
+
+    repaired = repair_posts(posts, "Core Theme: speed", URL, platforms=("Twitter",))
+    assert len(prompts) == 1
+    assert [p["approved"] for p in repaired] == [True, True, True, True, False]
+    assert repaired[4]["content"] == "Forgot the link" and posts[4]["approved"]
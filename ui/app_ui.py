@@ -1,10 +1,80 @@
 # ui/app_ui.py
 import streamlit as st
 import pandas as pd
-from scraper.scraper import scrape_text_from_url
-from nlp.analysis import analyze_text
-from agents.content_generator import generate_campaign_content
-from scheduler.scheduler import MockScheduler
+from scheduler.scheduler import get_scheduler
+from cache.store import get_default_cache
+from pipeline.jobs import JobStore, JobWorkerPool, ACTIVE_STATUSES
+from agent.validation import validate_posts
+from telemetry.logs import configure_logging
+from telemetry.metrics import configure_exporters
+
+SCHEDULED_PAGE_SIZE = 100
+SCHEDULED_CACHE_TTL_SECONDS = 60
+PLATFORM_FILTERS = ("All", "Twitter", "LinkedIn")
+STATUS_FILTERS = ("All", "scheduled", "sending", "sent", "failed")
+JOB_POLL_SECONDS = 1.0
+JOB_STAGE_LABELS = {
+    None: "Step 1: Scraping website content...",
+    "scrape": "Step 2: Analyzing content with AI...",
+    "analyze": "Step 3: Generating social media campaign...",
+}
+
+@st.cache_resource
+def load_scheduler():
+    """The process-wide scheduler, shared by every session and rerun."""
+    return get_scheduler()
+
+@st.cache_resource
+def load_job_pool():
+    """The background workers that run campaign jobs, started once per process."""
+    pool = JobWorkerPool(JobStore(storage=load_scheduler().storage))
+    pool.start()
+    return pool
+
+@st.cache_data(ttl=SCHEDULED_CACHE_TTL_SECONDS, show_spinner=False)
+def load_scheduled_page(platform=None, status=None, start_date=None, end_date=None,
+                        page=0, page_size=SCHEDULED_PAGE_SIZE):
+    """One filtered page of scheduled posts as a DataFrame, cached until the next write."""
+    posts = load_scheduler().get_scheduled_posts(
+        start_date=start_date, end_date=end_date, status=status, platform=platform,
+        limit=page_size, offset=page * page_size
+    )
+    return pd.DataFrame(posts)
+
+@st.cache_data(ttl=SCHEDULED_CACHE_TTL_SECONDS, show_spinner=False)
+def load_scheduled_count(platform=None, status=None, start_date=None, end_date=None):
+    """The number of scheduled posts matching the filters, cached until the next write."""
+    return load_scheduler().count_scheduled_posts(
+        start_date=start_date, end_date=end_date, status=status, platform=platform
+    )
+
+def invalidate_scheduled_cache():
+    """Drops cached scheduled-post reads after the UI writes to the scheduler."""
+    load_scheduled_page.clear()
+    load_scheduled_count.clear()
+
+def describe_duplicate(flag):
+    """The review table's near-duplicate note for one post."""
+    if flag is None:
+        return ""
+    if "post_id" in flag:
+        return f"≈ scheduled post #{flag['post_id']} ({flag['similarity']:.0%})"
+    return f"≈ row {flag['index'] + 1} ({flag['similarity']:.0%})"
+
+def describe_issues(issues):
+    """The review table's validation note for one post."""
+    return "⚠️ " + "; ".join(issues) if issues else "✓"
+
+def build_review_frame(posts, url=None):
+    """
+    Builds the review table's DataFrame from generated posts, flagging near-duplicates and
+    posts that break their platform's rules (checked for `url` when it is given).
+    """
+    df = pd.DataFrame(posts)
+    df['scheduled_date'] = pd.to_datetime(df['scheduled_date'])
+    df['duplicate'] = [describe_duplicate(flag) for flag in load_scheduler().find_near_duplicates(posts)]
+    df['issues'] = [describe_issues(issues) for issues in validate_posts(posts, url).issues]
+    return df[['approved', 'platform', 'scheduled_date', 'content', 'issues', 'duplicate']]
 
 def initialize_session_state():
     """Initializes session state variables."""
@@ -16,33 +86,106 @@ def initialize_session_state():
         st.session_state.analysis_complete = False
     if 'analysis_result' not in st.session_state:
         st.session_state.analysis_result = ""
+    if 'review_df' not in st.session_state:
+        st.session_state.review_df = None
+    if 'job_id' not in st.session_state:
+        # Lets a browser refresh reattach to the job that was running
+        st.session_state.job_id = st.query_params.get("job")
+    if 'loaded_job' not in st.session_state:
+        st.session_state.loaded_job = None
+    if 'run_metrics' not in st.session_state:
+        st.session_state.run_metrics = {}
 
-def run_agent_workflow(url):
-    """Orchestrates the agent workflow from scraping to content generation."""
-    with st.spinner("Step 1: Scraping website content..."):
-        scraped_text = scrape_text_from_url(url)
-        if not scraped_text:
-            st.error("Failed to scrape the URL. Please check the URL and try again.")
-            return
-
-    with st.spinner("Step 2: Analyzing content with AI..."):
-        analysis = analyze_text(scraped_text)
-        if not analysis or "Error" in analysis:
-            st.error("Failed to analyze the content.")
-            return
-        st.session_state.analysis_result = analysis
-        st.session_state.analysis_complete = True
-
-    with st.spinner("Step 3: Generating social media campaign..."):
-        posts = generate_campaign_content(analysis, url)
-        if not posts:
-            st.error("Failed to generate the campaign content.")
-            return
-        st.session_state.campaign_posts = posts
-        st.session_state.campaign_generated = True
+def reset_campaign_state():
+    """Clears the analysis and campaign of the previous run."""
+    st.session_state.campaign_generated = False
+    st.session_state.campaign_posts = []
+    st.session_state.analysis_complete = False
+    st.session_state.analysis_result = ""
+    st.session_state.review_df = None
+    st.session_state.loaded_job = None
+    st.session_state.run_metrics = {}
+    st.session_state.campaign_source = None
+
+def submit_campaign_job(url, use_cache=True, long_document=False):
+    """Queues the scrape -> analyze -> generate workflow as a background job."""
+    job_id, created = load_job_pool().submit(url, {"use_cache": use_cache, "chunked": long_document})
+    st.session_state.job_id = job_id
+    st.query_params["job"] = job_id
+    if not created:
+        st.info("This URL is already being processed. Showing the existing job.")
+
+def load_job_results(job):
+    """Copies a finished job's analysis and posts into the session."""
+    st.session_state.loaded_job = job['id']
+    st.session_state.run_metrics = job['metrics']
+    if job['status'] == 'failed':
+        messages = {
+            "scrape": "Failed to scrape the URL. Please check the URL and try again.",
+            "analyze": "Failed to analyze the content.",
+            "generate": "Failed to generate the campaign content.",
+        }
+        st.session_state.job_error = messages.get(job['failed_stage'], job['error'])
+        return
+    st.session_state.analysis_result = job['analysis']
+    st.session_state.campaign_source = {"url": job['url'], "content_hash": job.get('content_hash'),
+                                        "analysis": job['analysis']}
+    st.session_state.analysis_complete = True
+    st.session_state.campaign_posts = job['posts']
+    st.session_state.review_df = build_review_frame(job['posts'], job['url'])
+    st.session_state.campaign_generated = True
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def render_job_progress(job_id):
+    """Polls a running job without blocking the rest of the page."""
+    job = load_job_pool().store.get(job_id)
+    if job is None or job['status'] not in ACTIVE_STATUSES:
+        # Finished: rerun the whole page so the results render outside this fragment
+        st.rerun()
+    label = "Queued, waiting for a worker..." if job['status'] == 'queued' else JOB_STAGE_LABELS[job['stage']]
+    st.progress(job['progress'], text=label)
+    if job['posts']:
+        # Posts appear as soon as they are parsed from the token stream
+        st.dataframe(
+            pd.DataFrame(job['posts'])[['platform', 'scheduled_date', 'content']],
+            use_container_width=True,
+            hide_index=True
+        )
+
+def render_run_summary(metrics):
+    """Shows where the last run spent its time and tokens."""
+    with st.expander("⏱️ Run summary", expanded=False):
+        cols = st.columns(4)
+        cols[0].metric("Elapsed", f"{metrics['elapsed_seconds']:.1f}s")
+        cols[1].metric("Tokens", f"{metrics['prompt_tokens']} + {metrics['completion_tokens']}")
+        cols[2].metric("Est. cost", f"${metrics['cost_usd']:.4f}")
+        cols[3].metric("Cache hits", f"{metrics['cache_hits']}/{metrics['cache_hits'] + metrics['cache_misses']}")
+        spans = pd.DataFrame(
+            [{"span": name, "count": s["count"], "seconds": s["seconds"]} for name, s in metrics['spans'].items()]
+        )
+        if not spans.empty:
+            st.dataframe(spans, use_container_width=True, hide_index=True)
+        if metrics['retries']:
+            st.caption(f"Retries: {metrics['retries']}")
+
+def render_job():
+    """Shows the current job's progress, or loads its results once it has finished."""
+    job_id = st.session_state.job_id
+    if not job_id or st.session_state.loaded_job == job_id:
+        return
+    job = load_job_pool().store.get(job_id)
+    if job is None:
+        st.session_state.job_id = None
+        return
+    if job['status'] in ACTIVE_STATUSES:
+        render_job_progress(job_id)
+    else:
+        load_job_results(job)
 
 def main():
     """Main function to run the Streamlit UI."""
+    configure_logging()
+    configure_exporters()
     st.set_page_config(page_title="Autonomous Social Media Agent", layout="wide")
     
     st.title("🚀 Autonomous Social Media Campaign Agent")
@@ -53,81 +196,156 @@ def main():
     # --- 1. URL Input ---
     url = st.text_input("Enter URL here:", "[https://langchain.ai/blog/langchain-v0-2-and-langsmith-v0-1-in-beta](https://langchain.ai/blog/langchain-v0-2-and-langsmith-v0-1-in-beta)", key="url_input")
 
+    bypass_cache = st.checkbox("Bypass cache (re-scrape and regenerate)", value=False)
+    long_document = st.checkbox("Long-document mode (analyze the full text in chunks)", value=False)
+
     if st.button("Generate Campaign", type="primary"):
         if url:
             # Reset state for a new run
-            st.session_state.campaign_generated = False
-            st.session_state.campaign_posts = []
-            st.session_state.analysis_complete = False
-            st.session_state.analysis_result = ""
-            run_agent_workflow(url)
+            reset_campaign_state()
+            submit_campaign_job(url, use_cache=not bypass_cache, long_document=long_document)
         else:
             st.warning("Please enter a URL.")
 
+    render_job()
+    error = st.session_state.pop('job_error', None)
+    if error:
+        st.error(error)
+
     # --- 2. Display Analysis and Campaign for Approval ---
     if st.session_state.analysis_complete:
         with st.expander("📝 View AI Analysis", expanded=False):
             st.markdown(st.session_state.analysis_result)
+        cache_stats = get_default_cache().stats()
+        st.caption(f"Cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+        if st.session_state.run_metrics:
+            render_run_summary(st.session_state.run_metrics)
 
     if st.session_state.campaign_generated:
-        st.header("✍️ Review and Approve Your Campaign")
-        st.markdown("You can edit the content, change dates, or remove posts before scheduling.")
-
-        df = pd.DataFrame(st.session_state.campaign_posts)
-        
-        # Ensure correct column order and data types
-        df['scheduled_date'] = pd.to_datetime(df['scheduled_date'])
-        df = df[['approved', 'platform', 'scheduled_date', 'content']]
-
-        # Use st.data_editor for an editable table
-        edited_df = st.data_editor(
-            df,
-            column_config={
-                "approved": st.column_config.CheckboxColumn(
-                    "Approve?",
-                    default=True,
-                ),
-                "platform": st.column_config.TextColumn("Platform", disabled=True),
-                "scheduled_date": st.column_config.DateColumn(
-                    "Schedule Date",
-                    format="YYYY-MM-DD",
-                ),
-                "content": st.column_config.TextColumn("Post Content", width="large")
-            },
-            use_container_width=True,
-            hide_index=True,
-            num_rows="dynamic"
-        )
+        render_review()
 
-        if st.button("Approve and Schedule Campaign", type="primary"):
-            approved_posts = edited_df[edited_df['approved']].to_dict('records')
-            
-            if not approved_posts:
-                st.warning("No posts were approved for scheduling.")
-            else:
-                with MockScheduler() as scheduler:
-                    scheduler.initialize_db()
-                    with st.spinner("Scheduling approved posts..."):
-                        for post in approved_posts:
-                            scheduler.schedule_post(
-                                platform=post['platform'],
-                                content=post['content'],
-                                scheduled_date=post['scheduled_date'].strftime('%Y-%m-%d')
-                            )
-                st.success(f"✅ Successfully scheduled {len(approved_posts)} posts!")
-                st.session_state.campaign_scheduled = True
+    # --- 3. Display Scheduled Posts ---
+    render_scheduled_posts()
 
+@st.fragment
+def render_review():
+    """The editable review table. Edits rerun only this fragment."""
+    st.header("✍️ Review and Approve Your Campaign")
+    st.markdown("You can edit the content, change dates, or remove posts before scheduling.")
 
-    # --- 3. Display Scheduled Posts ---
-    st.header("🗓️ Scheduled Posts")
-    with MockScheduler() as scheduler:
-        scheduler.initialize_db() # Ensure table exists
-        scheduled_posts = scheduler.get_all_scheduled_posts()
-        if scheduled_posts:
-            scheduled_df = pd.DataFrame(scheduled_posts)
-            st.dataframe(scheduled_df, use_container_width=True, hide_index=True)
+    source = st.session_state.get('campaign_source')
+    url = source['url'] if source else None
+    # Built once per generated campaign, not on every rerun
+    if st.session_state.review_df is None:
+        st.session_state.review_df = build_review_frame(st.session_state.campaign_posts, url)
+    report = validate_posts(st.session_state.campaign_posts, url)
+    passing = len(report.issues) - len(report.failing)
+    st.caption(f"{passing} of {len(report.issues)} posts pass the platform rules."
+               + "".join(f" {issue[0].upper()}{issue[1:]}." for issue in report.campaign_issues()))
+
+    # Use st.data_editor for an editable table
+    edited_df = st.data_editor(
+        st.session_state.review_df,
+        column_config={
+            "approved": st.column_config.CheckboxColumn(
+                "Approve?",
+                default=True,
+            ),
+            "platform": st.column_config.TextColumn("Platform", disabled=True),
+            "scheduled_date": st.column_config.DateColumn(
+                "Schedule Date",
+                format="YYYY-MM-DD",
+                help="Posts go out in the first free time slot on or after this date.",
+            ),
+            "content": st.column_config.TextColumn("Post Content", width="large"),
+            "issues": st.column_config.TextColumn(
+                "Checks",
+                help="Length, source URL and platform rules. Posts that still fail after the automatic "
+                     "repair are left unapproved.",
+                disabled=True,
+            ),
+            "duplicate": st.column_config.TextColumn(
+                "Near-duplicate of",
+                help="Near-duplicates are skipped when the campaign is scheduled.",
+                disabled=True,
+            ),
+        },
+        use_container_width=True,
+        hide_index=True,
+        num_rows="dynamic",
+        key="review_editor"
+    )
+
+    replace = bool(source) and st.checkbox(
+        "Replace this URL's posts that are still scheduled",
+        help="Posts from an earlier campaign for the same URL that have not been sent are removed.",
+    )
+
+    if st.button("Approve and Schedule Campaign", type="primary"):
+        approved_posts = edited_df[edited_df['approved']].to_dict('records')
+        rows = edited_df.to_dict('records')
+        invalid = [i + 1 for i in validate_posts(rows, url, check_counts=False).failing if rows[i]['approved']]
+        if not approved_posts:
+            st.warning("No posts were approved for scheduling.")
+        elif invalid:
+            st.error(f"Approved rows {', '.join(map(str, invalid))} break their platform's rules. "
+                     "Edit them or untick them before scheduling.")
         else:
-            st.info("No posts are currently scheduled.")
+            with st.spinner("Scheduling approved posts..."):
+                scheduler = load_scheduler()
+                campaign_id = None
+                if source:
+                    campaign_id = scheduler.save_campaign(source['url'], source['content_hash'], source['analysis'])
+                if replace and campaign_id is not None:
+                    scheduled = scheduler.replace_campaign_posts(campaign_id, approved_posts, allocate=True)
+                else:
+                    scheduled = scheduler.schedule_posts_bulk(approved_posts, campaign_id=campaign_id, allocate=True)
+            if scheduled:
+                st.session_state.campaign_scheduled = True
+                skipped = len(approved_posts) - scheduled
+                st.session_state.schedule_message = f"✅ Successfully scheduled {scheduled} posts!" + (
+                    f" {skipped} near-duplicates were skipped." if skipped else "")
+                invalidate_scheduled_cache()
+                # Refresh the scheduled view, which lives outside this fragment
+                st.rerun()
+            else:
+                st.error("Nothing was scheduled: some approved posts are missing a platform, content or "
+                         "valid date, or all of them repeat posts that are already scheduled.")
+
+@st.fragment
+def render_scheduled_posts():
+    """The scheduled-posts view, filtered and paginated in SQL. Filters rerun only this fragment."""
+    st.header("🗓️ Scheduled Posts")
+    message = st.session_state.pop('schedule_message', None)
+    if message:
+        st.success(message)
+
+    platform_col, status_col, start_col, end_col = st.columns(4)
+    platform = platform_col.selectbox("Platform", PLATFORM_FILTERS, key="filter_platform")
+    status = status_col.selectbox("Status", STATUS_FILTERS, key="filter_status")
+    start_date = start_col.date_input("From", value=None, key="filter_start")
+    end_date = end_col.date_input("To", value=None, key="filter_end")
+    filters = {
+        "platform": None if platform == "All" else platform,
+        "status": None if status == "All" else status,
+        "start_date": start_date.isoformat() if start_date else None,
+        "end_date": end_date.isoformat() if end_date else None,
+    }
+
+    total = load_scheduled_count(**filters)
+    if not total:
+        st.info("No posts are currently scheduled.")
+        return
+
+    pages = (total + SCHEDULED_PAGE_SIZE - 1) // SCHEDULED_PAGE_SIZE
+    # Narrower filters can leave the remembered page past the end
+    if st.session_state.get("scheduled_page", 1) > pages:
+        st.session_state.scheduled_page = pages
+    page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1, key="scheduled_page") - 1
+    scheduled_df = load_scheduled_page(page=page, **filters)
+    st.dataframe(scheduled_df, use_container_width=True, hide_index=True)
+    first = page * SCHEDULED_PAGE_SIZE + 1
+    st.caption(f"Showing {first}-{first + len(scheduled_df) - 1} of {total} scheduled posts (page {page + 1} of {pages}).")
 
 if __name__ == '__main__':
     main()